@@ -41,6 +41,9 @@ CREATE TABLE public.sensor_readings (
   CONSTRAINT sensor_readings_node_id_fkey FOREIGN KEY (node_id) REFERENCES nodes (node_id)
 ) TABLESPACE pg_default;
 
+CREATE INDEX IF NOT EXISTS sensor_readings_node_id_timestamp_idx
+  ON public.sensor_readings USING btree (node_id, timestamp DESC) TABLESPACE pg_default;
+
 CREATE TABLE public.metadata (
   metadata_id serial NOT NULL,
   description text NULL,
@@ -1,4 +1,10 @@
-
+CREATE OR REPLACE FUNCTION public.get_nodes_by_region(region_id_param character varying)
+RETURNS TABLE (
+    node_id character varying,
+    title character varying,
+    location character varying
+)
+LANGUAGE plpgsql STABLE AS $$
 BEGIN
     RETURN QUERY
     SELECT n.node_id, n.title, n.location
@@ -6,7 +12,20 @@ BEGIN
     JOIN Node_Regions nr ON n.node_id = nr.node_id
     WHERE nr.region_id = region_id_param;
 END;
+$$;
 
+CREATE OR REPLACE FUNCTION public.get_nodes_with_latest_status()
+RETURNS TABLE (
+    node_id character varying,
+    title character varying,
+    location character varying,
+    is_parent boolean,
+    lat double precision,
+    lng double precision,
+    danger_level integer,
+    last_updated timestamp without time zone
+)
+LANGUAGE plpgsql STABLE AS $$
 BEGIN
     RETURN QUERY
     SELECT
@@ -20,15 +39,28 @@ BEGIN
         sr.timestamp as last_updated
     FROM nodes n
     LEFT JOIN LATERAL (
-        SELECT danger_level, timestamp
-        FROM sensor_readings
-        WHERE node_id = n.node_id
-        ORDER BY timestamp DESC
+        SELECT s.danger_level, s.timestamp
+        FROM sensor_readings s
+        WHERE s.node_id = n.node_id
+        ORDER BY s.timestamp DESC
         LIMIT 1
     ) sr ON true;
 END;
+$$;
 
 
+CREATE OR REPLACE FUNCTION public.get_region_nodes_with_latest_status(region_id_param character varying)
+RETURNS TABLE (
+    node_id character varying,
+    title character varying,
+    location character varying,
+    is_parent boolean,
+    lat double precision,
+    lng double precision,
+    danger_level integer,
+    last_updated timestamp without time zone
+)
+LANGUAGE plpgsql STABLE AS $$
 BEGIN
     RETURN QUERY
     SELECT
@@ -43,11 +75,71 @@ BEGIN
     FROM nodes n
     JOIN node_regions nr ON n.node_id = nr.node_id
     LEFT JOIN LATERAL (
-        SELECT danger_level, timestamp
-        FROM sensor_readings
-        WHERE node_id = n.node_id
-        ORDER BY timestamp DESC
+        SELECT s.danger_level, s.timestamp
+        FROM sensor_readings s
+        WHERE s.node_id = n.node_id
+        ORDER BY s.timestamp DESC
         LIMIT 1
     ) sr ON true
     WHERE nr.region_id = region_id_param;
 END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.get_node_history_buckets(
+    node_id_param character varying,
+    bucket_seconds integer,
+    from_ts timestamp without time zone DEFAULT NULL,
+    to_ts timestamp without time zone DEFAULT NULL
+)
+RETURNS TABLE (
+    bucket timestamp without time zone,
+    count bigint,
+    temperature_min numeric, temperature_max numeric, temperature_avg numeric, temperature_last numeric,
+    humidity_min numeric, humidity_max numeric, humidity_avg numeric, humidity_last numeric,
+    gas_and_smoke_min numeric, gas_and_smoke_max numeric, gas_and_smoke_avg numeric, gas_and_smoke_last numeric,
+    wind_speed_min numeric, wind_speed_max numeric, wind_speed_avg numeric, wind_speed_last numeric,
+    danger_level_min numeric, danger_level_max numeric, danger_level_avg numeric, danger_level_last numeric
+)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        to_timestamp(floor(extract(epoch FROM s.timestamp) / bucket_seconds) * bucket_seconds) AT TIME ZONE 'UTC',
+        count(*),
+        min(s.temperature), max(s.temperature), avg(s.temperature),
+        (array_agg(s.temperature ORDER BY s.timestamp DESC, s.reading_id DESC) FILTER (WHERE s.temperature IS NOT NULL))[1],
+        min(s.humidity), max(s.humidity), avg(s.humidity),
+        (array_agg(s.humidity ORDER BY s.timestamp DESC, s.reading_id DESC) FILTER (WHERE s.humidity IS NOT NULL))[1],
+        min(s.gas_and_smoke), max(s.gas_and_smoke), avg(s.gas_and_smoke),
+        (array_agg(s.gas_and_smoke ORDER BY s.timestamp DESC, s.reading_id DESC) FILTER (WHERE s.gas_and_smoke IS NOT NULL))[1],
+        min(s.wind_speed), max(s.wind_speed), avg(s.wind_speed),
+        (array_agg(s.wind_speed ORDER BY s.timestamp DESC, s.reading_id DESC) FILTER (WHERE s.wind_speed IS NOT NULL))[1],
+        min(s.danger_level)::numeric, max(s.danger_level)::numeric, avg(s.danger_level),
+        ((array_agg(s.danger_level ORDER BY s.timestamp DESC, s.reading_id DESC) FILTER (WHERE s.danger_level IS NOT NULL))[1])::numeric
+    FROM sensor_readings s
+    WHERE s.node_id = node_id_param
+      AND (from_ts IS NULL OR s.timestamp >= from_ts)
+      AND (to_ts IS NULL OR s.timestamp <= to_ts)
+    GROUP BY 1
+    ORDER BY 1;
+$$;
+
+CREATE OR REPLACE FUNCTION public.get_latest_readings(node_ids character varying[])
+RETURNS SETOF sensor_readings
+LANGUAGE sql STABLE AS $$
+    SELECT DISTINCT ON (s.node_id) s.*
+    FROM sensor_readings s
+    WHERE s.node_id = ANY(node_ids)
+    ORDER BY s.node_id, s.timestamp DESC, s.reading_id DESC;
+$$;
+
+-- Digest of the topology tables, so refreshes can skip rereading them when nothing changed
+CREATE OR REPLACE FUNCTION public.get_topology_version()
+RETURNS text
+LANGUAGE sql STABLE AS $$
+    SELECT md5(
+        (SELECT coalesce(string_agg(md5(n::text), ',' ORDER BY n.node_id), '') FROM nodes n) || '|' ||
+        (SELECT coalesce(string_agg(nr.node_id || '=' || nr.region_id, ',' ORDER BY nr.node_id), '')
+         FROM node_regions nr) || '|' ||
+        (SELECT coalesce(string_agg(h.parent_id || '>' || h.child_id, ',' ORDER BY h.parent_id, h.child_id), '')
+         FROM node_hierarchy h)
+    );
+$$;
@@ -30,5 +30,37 @@ def create_app(config_name='default'):
     # Register error handlers
     from app.errors import register_error_handlers
     register_error_handlers(app)
+
+    from app.database import db_manager
+    db_manager.init_app(app)
+
+    # Tell clients when a response was built from last-known-good data
+    from app.resilience import add_staleness_headers
+    app.after_request(add_staleness_headers)
+
+    if app.config.get('STORAGE_BACKEND', 'supabase') == 'supabase':
+        # Keep the database connection established off the request path
+        if app.config.get('DB_SUPERVISOR_ENABLED', True):
+            db_manager.start_supervisor(app)
+
+        # Keep ingested rows on local disk while Supabase is unreachable
+        if app.config.get('WAL_ENABLED', True):
+            db_manager.enable_wal(app)
+
+        # Mirror the database locally and serve reads from the mirror
+        if app.config.get('REPLICA_ENABLED', False):
+            db_manager.start_replica(app)
+
+    # Turn bursts of ingestion requests into a few large writes
+    if app.config.get('WRITE_BEHIND_ENABLED', True):
+        db_manager.start_write_behind(app)
+
+    # Serve node topology lookups from memory
+    if app.config.get('TOPOLOGY_INDEX_ENABLED', True):
+        db_manager.start_topology_refresh(app)
+
+    # Rescore fire risk across all nodes on a schedule
+    if app.config.get('RISK_REFRESH_ENABLED', True):
+        db_manager.start_risk_refresh(app)
     
     return app 
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""
+Threshold alert rules evaluated on every incoming reading
+
+A rule is a conjunction of conditions on sensor_readings fields (e.g.
+gas_and_smoke > 300 AND humidity < 25 AND wind_speed > 40), optionally scoped
+to a region or a single node. Rules are indexed by the field and threshold of
+one of their conditions, so a reading only fully evaluates the rules whose
+indexed condition it already satisfies, found by bisecting sorted thresholds.
+
+Alerts are deduplicated per (rule, node): a rule that keeps matching updates
+its open alert, and the alert resolves on the node's first reading that no
+longer matches.
+"""
+import json
+import bisect
+import logging
+import operator
+import threading
+from collections import deque
+from typing import Optional, List, Dict, Any, Callable, Iterable, Tuple
+from app.ingest import NUMERIC_FIELDS, READING_FIELDS
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+             "==": operator.eq, "!=": operator.ne}
+ORDERED_FIELDS = NUMERIC_FIELDS + ("danger_level",)
+RULE_FIELDS = READING_FIELDS[2:]
+SEVERITIES = {"critical": 0, "warning": 1, "info": 2}
+
+class Rule:
+    """Named conjunction of (field, op, value) conditions"""
+
+    def __init__(self, rule_id: str, conditions: List[Tuple[str, str, Any]], name: Optional[str] = None,
+                 severity: str = "warning", region_id: Optional[str] = None, node_id: Optional[str] = None):
+        if not conditions:
+            raise ValueError(f"Rule {rule_id} has no conditions")
+        if severity not in SEVERITIES:
+            raise ValueError(f"Rule {rule_id}: unknown severity {severity}")
+        for field, op, value in conditions:
+            if field not in RULE_FIELDS:
+                raise ValueError(f"Rule {rule_id}: unknown field {field}")
+            if op not in OPERATORS:
+                raise ValueError(f"Rule {rule_id}: unknown operator {op}")
+            if op not in ("==", "!=") and (field not in ORDERED_FIELDS or isinstance(value, bool)
+                                           or not isinstance(value, (int, float))):
+                raise ValueError(f"Rule {rule_id}: {field} {op} needs a numeric field and threshold")
+        self.rule_id = rule_id
+        self.conditions = [(field, OPERATORS[op], op, value) for field, op, value in conditions]
+        self.name = name or rule_id
+        self.severity = severity
+        self.region_id = region_id
+        self.node_id = node_id
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Rule":
+        """Rule from its JSON form: {"id", "name", "severity", "region", "node", "all": [{field, op, value}]}"""
+        try:
+            conditions = [(c["field"], c["op"], c["value"]) for c in data.get("all", [])]
+            return cls(str(data["id"]), conditions, name=data.get("name"), severity=data.get("severity", "warning"),
+                       region_id=data.get("region"), node_id=data.get("node"))
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Malformed rule {data!r}: {e}")
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        for field, compare, _, value in self.conditions:
+            actual = row.get(field)
+            if actual is None or not compare(actual, value):
+                return False
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.rule_id, "name": self.name, "severity": self.severity,
+                "region": self.region_id, "node": self.node_id,
+                "all": [{"field": field, "op": op, "value": value} for field, _, op, value in self.conditions]}
+
+class _FieldIndex:
+    """Rules of one scope keyed on a condition of one field"""
+
+    def __init__(self):
+        # op -> (sorted thresholds, rules in the same order)
+        self.ordered: Dict[str, Tuple[List[float], List[Rule]]] = {}
+        self.equal: Dict[Any, List[Rule]] = {}
+
+    def add(self, op: str, value: Any, rule: Rule):
+        if op == "==":
+            self.equal.setdefault(value, []).append(rule)
+            return
+        thresholds, rules = self.ordered.setdefault(op, ([], []))
+        position = bisect.bisect_right(thresholds, value)
+        thresholds.insert(position, value)
+        rules.insert(position, rule)
+
+    def candidates(self, value: Any) -> Iterable[Rule]:
+        """Rules whose indexed condition holds for value"""
+        yield from self.equal.get(value, ())
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return
+        for op, (thresholds, rules) in self.ordered.items():
+            if op == ">":
+                yield from rules[:bisect.bisect_left(thresholds, value)]
+            elif op == ">=":
+                yield from rules[:bisect.bisect_right(thresholds, value)]
+            elif op == "<":
+                yield from rules[bisect.bisect_right(thresholds, value):]
+            else:
+                yield from rules[bisect.bisect_left(thresholds, value):]
+
+class AlertEngine:
+    """Indexed rules plus the open and recently resolved alerts they raised"""
+
+    def __init__(self, region_of: Callable[[str], Optional[str]], history_size: int = 1000):
+        self.region_of = region_of
+        self._rules: Dict[str, Rule] = {}
+        # scope ((kind, id) or None for every node) -> field -> index
+        self._index: Dict[Any, Dict[str, _FieldIndex]] = {}
+        # Rules with only != conditions, checked against every reading in their scope
+        self._unindexed: Dict[Any, List[Rule]] = {}
+        self._active: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._node_active: Dict[str, set] = {}
+        self._node_timestamp: Dict[str, str] = {}
+        self._resolved: deque = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+        self.readings_seen = 0
+        self.rules_evaluated = 0
+        self.raised = 0
+        self.resolved = 0
+
+    # ---- Rules ----
+    def load_rules(self, rules: Iterable[Rule]):
+        """Replace every rule; open alerts of rules that no longer exist are dropped"""
+        rules = list(rules)
+        with self._lock:
+            self._rules = {rule.rule_id: rule for rule in rules}
+            self._index, self._unindexed = {}, {}
+            for rule in rules:
+                self._add_to_index(rule)
+            for key in [key for key in self._active if key[0] not in self._rules]:
+                self._active.pop(key)
+                self._node_active.get(key[1], set()).discard(key[0])
+
+    def _add_to_index(self, rule: Rule):
+        scope = ("node", rule.node_id) if rule.node_id else ("region", rule.region_id) if rule.region_id else None
+        # Index on the first condition that narrows the candidates; equality is the most selective
+        anchor = next((c for c in rule.conditions if c[2] == "=="), None) \
+            or next((c for c in rule.conditions if c[2] != "!="), None)
+        if anchor is None:
+            self._unindexed.setdefault(scope, []).append(rule)
+            return
+        field, _, op, value = anchor
+        self._index.setdefault(scope, {}).setdefault(field, _FieldIndex()).add(op, value, rule)
+
+    def resize_history(self, history_size: int):
+        """Keep up to history_size resolved alerts"""
+        with self._lock:
+            self._resolved = deque(self._resolved, maxlen=history_size)
+
+    def rules(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [rule.to_dict() for rule in self._rules.values()]
+
+    # ---- Evaluation ----
+    def observe(self, rows: Iterable[Dict[str, Any]]):
+        """Check sensor_readings rows against their rules, raising and resolving alerts"""
+        with self._lock:
+            for row in rows:
+                self.readings_seen += 1
+                node_id, timestamp = row.get("node_id"), row.get("timestamp")
+                if not node_id or not timestamp or timestamp < self._node_timestamp.get(node_id, ""):
+                    continue
+                self._node_timestamp[node_id] = timestamp
+                region_id = self.region_of(node_id)
+                matched = set()
+                for scope in (None, ("region", region_id), ("node", node_id)):
+                    for field, index in self._index.get(scope, {}).items():
+                        value = row.get(field)
+                        if value is None:
+                            continue
+                        for rule in index.candidates(value):
+                            self.rules_evaluated += 1
+                            if rule.matches(row):
+                                matched.add(rule.rule_id)
+                    for rule in self._unindexed.get(scope, ()):
+                        self.rules_evaluated += 1
+                        if rule.matches(row):
+                            matched.add(rule.rule_id)
+                active = self._node_active.get(node_id)
+                for rule_id in matched:
+                    self._raise(self._rules[rule_id], node_id, region_id, row)
+                if active:
+                    for rule_id in [rule_id for rule_id in active if rule_id not in matched]:
+                        self._resolve(rule_id, node_id, timestamp)
+
+    def _raise(self, rule: Rule, node_id: str, region_id: Optional[str], row: Dict[str, Any]):
+        values = {field: row.get(field) for field, _, _, _ in rule.conditions}
+        alert = self._active.get((rule.rule_id, node_id))
+        if alert is not None:
+            alert.update(last_seen=row["timestamp"], readings=alert["readings"] + 1, values=values)
+            return
+        self._active[(rule.rule_id, node_id)] = {
+            "id": f"{rule.rule_id}:{node_id}", "rule_id": rule.rule_id, "rule": rule.name,
+            "severity": rule.severity, "node_id": node_id, "region_id": region_id, "state": "active",
+            "raised_at": row["timestamp"], "last_seen": row["timestamp"], "resolved_at": None,
+            "readings": 1, "values": values,
+        }
+        self._node_active.setdefault(node_id, set()).add(rule.rule_id)
+        self.raised += 1
+
+    def _resolve(self, rule_id: str, node_id: str, timestamp: str):
+        alert = self._active.pop((rule_id, node_id))
+        self._node_active[node_id].discard(rule_id)
+        alert.update(state="resolved", resolved_at=timestamp)
+        self._resolved.appendleft(alert)
+        self.resolved += 1
+
+    # ---- Queries ----
+    def alerts(self, region_id: Optional[str] = None, state: str = "active", severity: Optional[str] = None,
+               node_id: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Alerts, most severe then most recent first; region_id None means every region"""
+        with self._lock:
+            pool = []
+            if state in ("active", "all"):
+                pool.extend(self._active.values())
+            if state in ("resolved", "all"):
+                pool.extend(self._resolved)
+            selected = [dict(alert) for alert in pool
+                        if (region_id is None or alert["region_id"] == region_id)
+                        and (severity is None or alert["severity"] == severity)
+                        and (node_id is None or alert["node_id"] == node_id)]
+        selected.sort(key=lambda alert: alert["resolved_at"] or alert["last_seen"], reverse=True)
+        selected.sort(key=lambda alert: (alert["state"] != "active", SEVERITIES[alert["severity"]]))
+        return selected[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"rules": len(self._rules), "active": len(self._active), "raised": self.raised,
+                    "resolved": self.resolved, "readings_seen": self.readings_seen,
+                    "rules_evaluated": self.rules_evaluated}
+
+def load_rule_file(path: Optional[str]) -> List[Rule]:
+    """Rules from a JSON list; a missing or invalid file yields no rules"""
+    if not path:
+        return []
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [Rule.from_dict(data) for data in json.load(f)]
+    except FileNotFoundError:
+        logger.info(f"No alert rules file at {path}")
+    except (OSError, ValueError) as e:
+        logger.error(f"Loading alert rules from {path} failed: {e}")
+    return []
@@ -0,0 +1,208 @@
+"""
+Streaming anomaly detection on sensor readings
+
+Each node keeps, per monitored field, an exponentially weighted mean and
+variance, its last value and time, and how many readings in a row repeated
+that value, all in preallocated NumPy arrays (one column per node). Every
+reading is scored against that state before updating it, in constant time:
+
+- spike: the value is more than z_threshold standard deviations from the mean
+- jump: the change since the previous reading exceeds the field's MAX_STEP
+- stuck: the same value STUCK_SAMPLES readings in a row
+
+so a sudden rise in temperature or gas_and_smoke is flagged on the first
+sample that shows it.
+"""
+import math
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Callable, Iterable
+import numpy as np
+
+FIELDS = ("temperature", "gas_and_smoke", "humidity")
+# Standard deviation floor, so a very steady sensor does not flag noise
+MIN_STD = {"temperature": 0.5, "gas_and_smoke": 2.0, "humidity": 1.0}
+# Largest plausible change between consecutive readings
+MAX_STEP = {"temperature": 10.0, "gas_and_smoke": 100.0, "humidity": 25.0}
+# Fields whose sensors should never repeat the exact same value for long (clean air reads 0 smoke)
+STUCK_FIELDS = ("temperature", "humidity")
+STUCK_SAMPLES = 12
+
+def _epoch(timestamp: str) -> float:
+    """Seconds since the epoch of an ISO timestamp (naive ones are UTC, as stored)"""
+    moment = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+class AnomalyDetector:
+    """EWMA state per (field, node) in column arrays, with active and recent anomalies"""
+
+    def __init__(self, region_of: Callable[[str], Optional[str]], alpha: float = 0.1, z_threshold: float = 4.0,
+                 warmup: int = 5, history_size: int = 1000, capacity: int = 1024):
+        self.region_of = region_of
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self._slots: Dict[str, int] = {}
+        shape = (len(FIELDS), capacity)
+        self._mean = np.zeros(shape)
+        self._var = np.zeros(shape)
+        self._last = np.full(shape, np.nan)
+        self._repeats = np.zeros(shape, dtype=np.int64)
+        self._samples = np.zeros(shape, dtype=np.int64)
+        # z-score of the latest value and when the field was last flagged (epoch seconds)
+        self._z = np.zeros(shape)
+        self._flagged_at = np.full(shape, np.nan)
+        self._time = np.full(capacity, np.nan)
+        # node_id -> field -> anomaly flagged on the node's latest reading of that field
+        self._active: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._recent: deque = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+        self.readings_seen = 0
+        self.anomalies = 0
+
+    def _slot(self, node_id: str) -> int:
+        slot = self._slots.get(node_id)
+        if slot is None:
+            slot = self._slots[node_id] = len(self._slots)
+            capacity = self._time.shape[0]
+            if slot >= capacity:
+                for name in ("_mean", "_var", "_last", "_repeats", "_samples", "_z", "_flagged_at"):
+                    column = getattr(self, name)
+                    grown = np.zeros((len(FIELDS), capacity * 2), dtype=column.dtype)
+                    if name in ("_last", "_flagged_at"):
+                        grown.fill(np.nan)
+                    grown[:, :capacity] = column
+                    setattr(self, name, grown)
+                self._time = np.concatenate([self._time, np.full(capacity, np.nan)])
+        return slot
+
+    def resize_history(self, history_size: int):
+        with self._lock:
+            self._recent = deque(self._recent, maxlen=history_size)
+
+    # ---- Updates ----
+    def observe(self, rows: Iterable[Dict[str, Any]]):
+        """Score and fold in sensor_readings rows; readings older than a node's latest are skipped"""
+        with self._lock:
+            for row in rows:
+                self.readings_seen += 1
+                node_id, timestamp = row.get("node_id"), row.get("timestamp")
+                if not node_id or not timestamp:
+                    continue
+                try:
+                    now = _epoch(timestamp)
+                except ValueError:
+                    continue
+                slot = self._slot(node_id)
+                previous = self._time[slot]
+                if now < previous:
+                    continue
+                self._time[slot] = now
+                minutes = (now - previous) / 60 if previous == previous else None
+                for f, field in enumerate(FIELDS):
+                    value = row.get(field)
+                    if value is not None:
+                        self._update(node_id, slot, f, field, float(value), now, minutes, timestamp)
+
+    def _update(self, node_id: str, slot: int, f: int, field: str, value: float, now: float,
+                minutes: Optional[float], timestamp: str):
+        samples = self._samples[f, slot]
+        mean, var, last = self._mean[f, slot], self._var[f, slot], self._last[f, slot]
+        found = []
+        if samples:
+            std = max(math.sqrt(var), MIN_STD[field])
+            z = (value - mean) / std
+            step = value - last
+            repeats = self._repeats[f, slot] + 1 if step == 0 else 0
+            self._repeats[f, slot] = repeats
+            if samples >= self.warmup and abs(z) > self.z_threshold:
+                found.append(("spike", z))
+            if abs(step) > MAX_STEP[field]:
+                found.append(("jump", z))
+            # Stays flagged on every further repeat, recorded once
+            if field in STUCK_FIELDS and repeats + 1 >= STUCK_SAMPLES:
+                found.append(("stuck", z))
+            diff = value - mean
+            increment = self.alpha * diff
+            self._mean[f, slot] = mean + increment
+            self._var[f, slot] = (1 - self.alpha) * (var + diff * increment)
+        else:
+            self._mean[f, slot] = value
+            step, z = None, 0.0
+        self._last[f, slot] = value
+        self._samples[f, slot] = samples + 1
+        self._z[f, slot] = z
+
+        node_active = self._active.get(node_id)
+        if not found:
+            if node_active:
+                node_active.pop(field, None)
+            return
+        self._flagged_at[f, slot] = now
+        rate = round(float(step) / minutes, 3) if step is not None and minutes else None
+        region_id = self.region_of(node_id)
+        anomalies = [{"node_id": node_id, "region_id": region_id, "field": field, "kind": kind,
+                      "value": value, "expected": round(float(mean), 2), "z": round(float(score), 2),
+                      "rate_per_minute": rate, "timestamp": timestamp} for kind, score in found]
+        for anomaly in anomalies:
+            if anomaly["kind"] != "stuck" or self._repeats[f, slot] + 1 == STUCK_SAMPLES:
+                self._recent.appendleft(anomaly)
+                self.anomalies += 1
+        self._active.setdefault(node_id, {})[field] = anomalies[0]
+
+    # ---- Queries ----
+    def node_state(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """Rolling statistics of every field of a node and its active anomalies"""
+        with self._lock:
+            slot = self._slots.get(node_id)
+            if slot is None:
+                return None
+            fields = {}
+            for f, field in enumerate(FIELDS):
+                if self._samples[f, slot]:
+                    fields[field] = {"mean": round(float(self._mean[f, slot]), 2),
+                                     "std": round(math.sqrt(self._var[f, slot]), 2),
+                                     "last": float(self._last[f, slot]),
+                                     "samples": int(self._samples[f, slot])}
+            return {"fields": fields, "active": list(self._active.get(node_id, {}).values())}
+
+    def evidence(self, node_ids: Iterable[str], since: float) -> Dict[str, Dict[str, Any]]:
+        """Nodes that reported since an epoch time, with each field's latest z-score and
+        whether it was flagged since then"""
+        result = {}
+        with self._lock:
+            for node_id in node_ids:
+                slot = self._slots.get(node_id)
+                if slot is None or not self._time[slot] >= since:
+                    continue
+                result[node_id] = {
+                    field: {"z": float(self._z[f, slot]), "flagged": bool(self._flagged_at[f, slot] >= since)}
+                    for f, field in enumerate(FIELDS) if self._samples[f, slot]
+                }
+        return result
+
+    def anomalies_for(self, region_id: Optional[str] = None, state: str = "active",
+                      limit: int = 100) -> List[Dict[str, Any]]:
+        """Active anomalies (on nodes' latest readings) or recent ones, newest first; None means every region"""
+        with self._lock:
+            if state == "active":
+                pool = [anomaly for fields in self._active.values() for anomaly in fields.values()]
+                pool.sort(key=lambda anomaly: anomaly["timestamp"], reverse=True)
+            else:
+                pool = self._recent
+            result = []
+            for anomaly in pool:
+                if region_id is None or anomaly["region_id"] == region_id:
+                    result.append(dict(anomaly))
+                    if len(result) == limit:
+                        break
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"nodes": len(self._slots), "readings_seen": self.readings_seen,
+                    "anomalies": self.anomalies,
+                    "active": sum(len(fields) for fields in self._active.values())}
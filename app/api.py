@@ -1,13 +1,30 @@
 """
 API blueprint for handling API endpoints
 """
+import time
 import random
+import asyncio
 from flask import Blueprint, jsonify, current_app, request, session
 from app.main import drone_data
-from app.database import db_manager
+from app.database import db_manager, parse_time_bound, DatabaseUnavailable
+from app.ingest import parse_batch, validate_readings, validate_reports
+from app.async_database import async_db_manager
+from app.downsample import parse_resolution
+from app.spatial import parse_bbox
 
 api = Blueprint('api', __name__)
 
+def _page_limit(value):
+    """Parse a ?limit= value, clamped to the configured history page size"""
+    max_limit = current_app.config.get('HISTORY_MAX_PAGE_SIZE', 1000)
+    if not value:
+        return min(current_app.config.get('HISTORY_PAGE_SIZE', 200), max_limit)
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid limit: {value}")
+    return max(1, min(limit, max_limit))
+
 @api.route('/drone_telemetry')
 def drone_telemetry():
     """Get real-time drone telemetry data"""
@@ -22,25 +39,84 @@ def drone_telemetry():
         drone_data["fire_detection"]["detected"] = random.random() > 0.8
         drone_data["fire_detection"]["confidence"] = random.uniform(0.7, 0.95) if drone_data["fire_detection"]["detected"] else 0.0
         drone_data["fire_detection"]["temperature"] = random.uniform(200, 300) if drone_data["fire_detection"]["detected"] else 0.0
-        
-        return jsonify(drone_data)
+
+        # Cross-check a detection with the ground sensors around the drone
+        correlation = None
+        if drone_data["fire_detection"]["detected"]:
+            correlation = db_manager.correlate_detection(
+                drone_data["location"]["lat"], drone_data["location"]["lon"],
+                drone_data["fire_detection"]["confidence"], drone_data["fire_detection"]["temperature"])
+
+        return jsonify({**drone_data, "ground_correlation": correlation})
     except Exception as e:
         current_app.logger.error(f"Error in drone telemetry: {str(e)}")
         return jsonify({"error": "Failed to get drone telemetry"}), 500
 
+def _spatial_args():
+    """Parse ?bbox= or ?lat=&lng=[&k=|&radius_km=]; None when the query is not spatial"""
+    args = request.args
+    if args.get('bbox'):
+        return {"bbox": parse_bbox(args['bbox'])}
+    if args.get('lat') is None and args.get('lng') is None:
+        return None
+    try:
+        lat, lng = float(args['lat']), float(args['lng'])
+        k = int(args['k']) if args.get('k') else None
+        radius_km = float(args['radius_km']) if args.get('radius_km') else None
+    except (KeyError, ValueError):
+        raise ValueError("lat and lng must both be numbers, k an integer and radius_km a number")
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("lat/lng out of range")
+    if radius_km is not None and radius_km <= 0:
+        raise ValueError("radius_km must be positive")
+    if k is None and radius_km is None:
+        k = 10
+    if k is not None:
+        k = max(1, min(k, current_app.config.get('SPATIAL_MAX_NEAREST', 1000)))
+    return {"lat": lat, "lng": lng, "k": k, "radius_km": radius_km}
+
 @api.route('/nodes')
-def api_nodes():
-    """Return nodes for a region as JSON. Region comes from querystring or session."""
+async def api_nodes():
+    """Return nodes for a region as JSON. Region comes from querystring or session.
+
+    With ``?with_status=true`` each node also carries its latest danger level.
+    ``?bbox=minLng,minLat,maxLng,maxLat`` limits the result to a viewport;
+    ``?lat=&lng=`` with ``k=`` (nearest k, default 10) and/or ``radius_km=``
+    returns the nodes closest to a point, nearest first.
+    """
     try:
         region_name = request.args.get('region') or session.get('region')
+        with_status = request.args.get('with_status', 'false').lower() in ('1', 'true', 'yes')
         current_app.logger.info(f"API /nodes called with region: {region_name}")
         
         if not region_name:
             current_app.logger.warning("API /nodes: No region specified")
             return jsonify({"error": "region not specified"}), 400
 
+        try:
+            spatial = _spatial_args()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         current_app.logger.info(f"API /nodes: Fetching nodes for region: {region_name}")
-        nodes = db_manager.get_nodes_for_dashboard(region_name)
+        if spatial is not None:
+            nodes = db_manager.find_nodes(region_name, **spatial)
+            if with_status and nodes:
+                status = {node['node_id']: node for node in db_manager.get_nodes_with_status(region_name)}
+                nodes = [{**status.get(node['node_id'], {"danger_level": None, "last_updated": None}), **node}
+                         for node in nodes]
+            # An empty viewport is a normal answer, not a missing region
+            return jsonify({
+                "nodes": nodes,
+                "region": region_name,
+                "db_connected": db_manager.connected,
+                "with_status": with_status,
+                "count": len(nodes)
+            })
+        if with_status:
+            nodes = db_manager.get_nodes_with_status(region_name)
+        else:
+            nodes = await async_db_manager.get_nodes_for_dashboard(region_name)
         current_app.logger.info(f"API /nodes: Retrieved {len(nodes) if nodes else 0} nodes")
         current_app.logger.info(f"API /nodes: Database connected: {db_manager.connected}")
         
@@ -52,14 +128,204 @@ def api_nodes():
             "nodes": nodes,
             "region": region_name,
             "db_connected": db_manager.connected,
+            "with_status": with_status,
             "count": len(nodes)
         })
     except Exception as e:
         current_app.logger.error(f"/api/nodes failed: {e}")
         return jsonify({"error": "Failed to fetch nodes", "details": str(e)}), 500
 
+@api.route('/clusters')
+def api_clusters():
+    """Map markers for a viewport: clusters of nodes or single nodes, depending on zoom.
+
+    ``?bbox=minLng,minLat,maxLng,maxLat&zoom=<map zoom>``; region from the
+    querystring or session. Each cluster carries its node count, centroid,
+    highest latest danger level and the zoom at which it splits up.
+    """
+    region_name = request.args.get('region') or session.get('region')
+    if not region_name:
+        return jsonify({"error": "region not specified"}), 400
+    try:
+        bbox = parse_bbox(request.args.get('bbox', ''))
+        zoom = int(request.args.get('zoom', ''))
+    except ValueError:
+        return jsonify({"error": "bbox=minLng,minLat,maxLng,maxLat and an integer zoom are required"}), 400
+    try:
+        clusters = db_manager.get_clusters(region_name, bbox, zoom)
+        return jsonify({
+            "clusters": clusters,
+            "region": region_name,
+            "zoom": zoom,
+            "count": len(clusters),
+            "nodes": sum(cluster["count"] for cluster in clusters),
+        })
+    except Exception as e:
+        current_app.logger.error(f"/api/clusters failed: {e}")
+        return jsonify({"error": "Failed to cluster nodes", "details": str(e)}), 500
+
+@api.route('/alerts')
+def api_alerts():
+    """Alerts raised by the threshold rules, most severe and most recent first.
+
+    ``?state=active`` (default), ``resolved`` or ``all``; optional ``severity``,
+    ``node`` and ``limit``. Region from the querystring or session.
+    """
+    region_name = request.args.get('region') or session.get('region')
+    if not region_name:
+        return jsonify({"error": "region not specified"}), 400
+    state = request.args.get('state', 'active')
+    if state not in ('active', 'resolved', 'all'):
+        return jsonify({"error": "state must be active, resolved or all"}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 100)), current_app.config.get('ALERT_FEED_MAX', 1000)))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    node_id = request.args.get('node')
+    if node_id and not node_id.startswith('N'):
+        node_id = f"N{node_id.replace('.', '_')}"
+    try:
+        alerts = db_manager.get_alerts(region_name, state=state, severity=request.args.get('severity'),
+                                       node_id=node_id, limit=limit)
+        if alerts is None:
+            return jsonify({"error": f"Unknown region: {region_name}"}), 400
+        return jsonify({
+            "alerts": alerts,
+            "region": region_name,
+            "state": state,
+            "count": len(alerts),
+            "engine": db_manager.alerts.stats(),
+        })
+    except Exception as e:
+        current_app.logger.error(f"/api/alerts failed: {e}")
+        return jsonify({"error": "Failed to fetch alerts", "details": str(e)}), 500
+
+@api.route('/incidents')
+def api_incidents():
+    """Stream of fire incidents confirmed by both the drone and nearby ground sensors.
+
+    Returns incidents opened or updated after ``?since=<cursor>`` (0 for all
+    kept) in the order they changed, with the ``cursor`` to pass next time.
+    Region from the querystring or session.
+    """
+    region_name = request.args.get('region') or session.get('region')
+    if not region_name:
+        return jsonify({"error": "region not specified"}), 400
+    try:
+        since = max(0, int(request.args.get('since', 0)))
+        limit = max(1, min(int(request.args.get('limit', 100)), current_app.config.get('ALERT_FEED_MAX', 1000)))
+    except ValueError:
+        return jsonify({"error": "since and limit must be integers"}), 400
+    try:
+        result = db_manager.get_incidents(region_name, since, limit)
+        if result is None:
+            return jsonify({"error": f"Unknown region: {region_name}"}), 400
+        incidents, cursor = result
+        return jsonify({
+            "incidents": incidents,
+            "region": region_name,
+            "count": len(incidents),
+            "cursor": cursor,
+            "engine": db_manager.correlation.stats(),
+        })
+    except Exception as e:
+        current_app.logger.error(f"/api/incidents failed: {e}")
+        return jsonify({"error": "Failed to fetch incidents", "details": str(e)}), 500
+
+@api.route('/anomalies')
+def api_anomalies():
+    """Sensor anomalies (spikes, jumps, stuck values) across a region, newest first.
+
+    ``?state=active`` (default) lists anomalies flagged on each node's latest
+    reading; ``recent`` lists the last anomalies detected. Region from the
+    querystring or session.
+    """
+    region_name = request.args.get('region') or session.get('region')
+    if not region_name:
+        return jsonify({"error": "region not specified"}), 400
+    state = request.args.get('state', 'active')
+    if state not in ('active', 'recent'):
+        return jsonify({"error": "state must be active or recent"}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 100)), current_app.config.get('ALERT_FEED_MAX', 1000)))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    try:
+        anomalies = db_manager.get_anomalies(region_name, state=state, limit=limit)
+        if anomalies is None:
+            return jsonify({"error": f"Unknown region: {region_name}"}), 400
+        return jsonify({
+            "anomalies": anomalies,
+            "region": region_name,
+            "state": state,
+            "count": len(anomalies),
+            "detector": db_manager.anomalies.stats(),
+        })
+    except Exception as e:
+        current_app.logger.error(f"/api/anomalies failed: {e}")
+        return jsonify({"error": "Failed to fetch anomalies", "details": str(e)}), 500
+
+@api.route('/risk')
+def api_risk():
+    """Nodes with the highest computed fire risk (0-100) in a region.
+
+    Scores come from each node's latest temperature, humidity, wind, rain,
+    flora density, slope and vegetation type and are refreshed every
+    ``RISK_REFRESH_INTERVAL`` seconds. ``?min_risk=`` and ``?limit=`` narrow
+    the list; region from the querystring or session.
+    """
+    region_name = request.args.get('region') or session.get('region')
+    if not region_name:
+        return jsonify({"error": "region not specified"}), 400
+    try:
+        min_risk = float(request.args.get('min_risk', 0))
+        limit = max(1, min(int(request.args.get('limit', 100)), current_app.config.get('RISK_MAX_NODES', 1000)))
+    except ValueError:
+        return jsonify({"error": "min_risk must be a number and limit an integer"}), 400
+    try:
+        result = db_manager.get_risk(region_name, min_risk, limit)
+        if result is None:
+            return jsonify({"error": f"Unknown region: {region_name}"}), 400
+        nodes, matching = result
+        return jsonify({
+            "nodes": nodes,
+            "region": region_name,
+            "count": len(nodes),
+            "matching": matching,
+            "min_risk": min_risk,
+            "engine": db_manager.risk.stats(),
+        })
+    except Exception as e:
+        current_app.logger.error(f"/api/risk failed: {e}")
+        return jsonify({"error": "Failed to fetch fire risk", "details": str(e)}), 500
+
+@api.route('/regions/summary')
+def api_regions_summary():
+    """Danger-level counts for every region, kept current as readings arrive.
+
+    Per region: nodes at each danger level by their latest reading, how many
+    are at or above ``?min_level=`` (default 3), the highest level, the node
+    that has gone longest without reporting and how many never reported.
+    """
+    try:
+        min_level = int(request.args.get('min_level', 3))
+    except ValueError:
+        return jsonify({"error": "min_level must be an integer"}), 400
+    try:
+        regions = db_manager.region_summary(min_level)
+        return jsonify({
+            "regions": regions,
+            "min_level": min_level,
+            "count": len(regions),
+            "at_or_above": sum(region["at_or_above"] for region in regions),
+            "rollup": db_manager.rollup.stats(),
+        })
+    except Exception as e:
+        current_app.logger.error(f"/api/regions/summary failed: {e}")
+        return jsonify({"error": "Failed to summarise regions", "details": str(e)}), 500
+
 @api.route('/node/<node_id>')
-def api_node(node_id: str):
+async def api_node(node_id: str):
     """Return a single node's merged info as JSON."""
     try:
         current_app.logger.info(f"API /node/{node_id}: Fetching node info")
@@ -68,51 +334,135 @@ def api_node(node_id: str):
         supabase_node_id = node_id if node_id.startswith('N') else f"N{node_id.replace('.', '_')}"
         current_app.logger.info(f"API /node/{node_id}: Converted to Supabase ID: {supabase_node_id}")
         
-        node_info = db_manager.get_node_info(supabase_node_id)
+        node_info, latest = await asyncio.gather(
+            async_db_manager.get_node_info(supabase_node_id),
+            async_db_manager.get_latest_readings([supabase_node_id])
+        )
         if not node_info:
             current_app.logger.warning(f"API /node/{node_id}: Node not found")
             return jsonify({"error": "Node not found", "node_id": node_id, "supabase_id": supabase_node_id}), 404
 
-        history_data = db_manager.get_node_history(supabase_node_id)
-        latest_data = history_data[0] if history_data else {}
+        latest_data = latest.get(supabase_node_id) or {}
         merged = {**node_info, **latest_data}
         
         current_app.logger.info(f"API /node/{node_id}: Successfully retrieved node with {len(latest_data) if latest_data else 0} history records")
         
         return jsonify({
             "node": merged,
+            "risk": db_manager.risk.risk_of(supabase_node_id),
+            "anomalies": db_manager.anomalies.node_state(supabase_node_id),
             "db_connected": db_manager.connected,
-            "has_history": bool(history_data)
+            "has_history": bool(latest_data)
         })
     except Exception as e:
         current_app.logger.error(f"/api/node/{node_id} failed: {e}")
         return jsonify({"error": "Failed to fetch node", "details": str(e)}), 500
 
+@api.route('/latest')
+def api_latest():
+    """Return the newest reading for many nodes in one query.
+
+    Nodes come from ``?nodes=N1_1,N1_2`` (raw or dotted ids) or, failing that,
+    from ``?region=`` / the session region.
+    """
+    try:
+        nodes_param = request.args.get('nodes')
+        if nodes_param:
+            node_ids = [
+                node_id if node_id.startswith('N') else f"N{node_id.replace('.', '_')}"
+                for node_id in (part.strip() for part in nodes_param.split(',')) if node_id
+            ]
+            region_name = None
+        else:
+            region_name = request.args.get('region') or session.get('region')
+            if not region_name:
+                return jsonify({"error": "nodes or region not specified"}), 400
+            node_ids = [node['node_id'] for node in db_manager.get_nodes_for_dashboard(region_name)]
+
+        max_nodes = current_app.config.get('LATEST_MAX_NODES', 5000)
+        if len(node_ids) > max_nodes:
+            return jsonify({"error": f"Too many nodes requested (max {max_nodes})", "count": len(node_ids)}), 400
+
+        current_app.logger.info(f"API /latest: Fetching latest readings for {len(node_ids)} nodes")
+        readings = db_manager.get_latest_readings(node_ids)
+
+        return jsonify({
+            "readings": readings,
+            "region": region_name,
+            "db_connected": db_manager.connected,
+            "count": sum(1 for reading in readings.values() if reading)
+        })
+    except Exception as e:
+        current_app.logger.error(f"/api/latest failed: {e}")
+        return jsonify({"error": "Failed to fetch latest readings", "details": str(e)}), 500
+
 @api.route('/history/<node_id>')
 def api_history(node_id: str):
-    """Return chronological readings for a node as JSON."""
+    """Return a page of readings for a node as JSON, newest first.
+
+    Query parameters: ``limit``, ``before``/``after`` (cursors from a previous
+    response) and ``from``/``to`` (ISO-8601 timestamps). Passing ``resolution``
+    (e.g. 15m, 1h) or ``max_points`` returns downsampled series instead, with
+    ``mode=bucket`` (default) or ``mode=lttb``.
+    """
     try:
         current_app.logger.info(f"API /history/{node_id}: Fetching history")
         
         supabase_node_id = node_id if node_id.startswith('N') else f"N{node_id.replace('.', '_')}"
         current_app.logger.info(f"API /history/{node_id}: Converted to Supabase ID: {supabase_node_id}")
-        
-        history_data = db_manager.get_node_history(supabase_node_id)
-        current_app.logger.info(f"API /history/{node_id}: Retrieved {len(history_data) if history_data else 0} history records")
+
+        if 'resolution' in request.args or 'max_points' in request.args:
+            try:
+                max_points = request.args.get('max_points')
+                result = db_manager.get_node_history_downsampled(
+                    supabase_node_id,
+                    mode=request.args.get('mode', 'bucket'),
+                    bucket_seconds=parse_resolution(request.args.get('resolution')),
+                    max_points=int(max_points) if max_points else None,
+                    start=parse_time_bound(request.args.get('from')),
+                    end=parse_time_bound(request.args.get('to'))
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e), "node_id": node_id}), 400
+
+            return jsonify({
+                **result,
+                "node_id": node_id,
+                "supabase_id": supabase_node_id,
+                "db_connected": db_manager.connected
+            })
+
+        try:
+            page = db_manager.get_node_history_page(
+                supabase_node_id,
+                _page_limit(request.args.get('limit')),
+                before=request.args.get('before'),
+                after=request.args.get('after'),
+                start=parse_time_bound(request.args.get('from')),
+                end=parse_time_bound(request.args.get('to'))
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e), "node_id": node_id}), 400
+
+        history_data = page["readings"]
+        current_app.logger.info(f"API /history/{node_id}: Retrieved {len(history_data)} history records")
         
         return jsonify({
-            "history": history_data or [],
+            "history": history_data,
             "node_id": node_id,
             "supabase_id": supabase_node_id,
             "db_connected": db_manager.connected,
-            "count": len(history_data) if history_data else 0
+            "count": len(history_data),
+            "limit": page["limit"],
+            "next_cursor": page["next_cursor"],
+            "prev_cursor": page["prev_cursor"]
         })
     except Exception as e:
         current_app.logger.error(f"/api/history/{node_id} failed: {e}")
         return jsonify({"error": "Failed to fetch history", "details": str(e)}), 500
 
 @api.route('/parent/<node_id>/reports')
-def api_parent_reports(node_id: str):
+async def api_parent_reports(node_id: str):
     """Return reports for a parent node as JSON."""
     try:
         current_app.logger.info(f"API /parent/{node_id}/reports: Fetching reports")
@@ -120,7 +470,7 @@ def api_parent_reports(node_id: str):
         supabase_node_id = node_id if node_id.startswith('N') else f"N{node_id.replace('.', '_')}"
         current_app.logger.info(f"API /parent/{node_id}/reports: Converted to Supabase ID: {supabase_node_id}")
         
-        reports = db_manager.get_parent_node_reports(supabase_node_id)
+        reports = await async_db_manager.get_parent_node_reports(supabase_node_id)
         current_app.logger.info(f"API /parent/{node_id}/reports: Retrieved {len(reports) if reports else 0} reports")
         
         return jsonify({
@@ -134,6 +484,82 @@ def api_parent_reports(node_id: str):
         current_app.logger.error(f"/api/parent/{node_id}/reports failed: {e}")
         return jsonify({"error": "Failed to fetch reports", "details": str(e)}), 500
 
+def _ingest_batch(table: str, key: str, validate):
+    """Validate and store one batch for the /ingest endpoints, returning the acknowledgement"""
+    started = time.perf_counter()
+    parent_id = request.args.get('parent') or request.headers.get('X-Parent-Id')
+    try:
+        items, body_batch_id = parse_batch(request.get_data(), request.content_type or '', key)
+    except (UnicodeDecodeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    max_batch = current_app.config.get('INGEST_MAX_BATCH', 10000)
+    if len(items) > max_batch:
+        return jsonify({"error": f"Batch too large (max {max_batch} {key})", "count": len(items)}), 413
+
+    batch_id = request.headers.get('X-Batch-Id') or body_batch_id
+    ledger_key = (f"{table}:{parent_id or '-'}", batch_id)
+    if batch_id:
+        try:
+            previous = db_manager.ingest_ledger.begin(ledger_key)
+        except KeyError:
+            return jsonify({"error": "Batch is already being processed", "batch_id": batch_id}), 409
+        if previous is not None:
+            return jsonify({**previous, "duplicate": True})
+
+    ack = None
+    try:
+        try:
+            rows, errors, rejected = validate(items, db_manager.ingest_node_filter(parent_id))
+            if not rows and items:
+                return jsonify({"batch_id": batch_id, "accepted": 0, "rejected": rejected, "errors": errors}), 422
+
+            queued = db_manager.write_buffer.running
+            if not db_manager.ingest(table, rows):
+                response = jsonify({"error": "Ingestion queue is full, retry later", "batch_id": batch_id})
+                response.headers['Retry-After'] = str(db_manager.write_buffer.retry_after())
+                return response, 429
+        except DatabaseUnavailable as e:
+            response = jsonify({"error": "Database unavailable, retry later", "details": str(e), "batch_id": batch_id})
+            response.headers['Retry-After'] = str(max(1, int(db_manager.retry_wait())))
+            return response, 503
+
+        ack = {
+            "batch_id": batch_id,
+            "accepted": len(rows),
+            "rejected": rejected,
+            "errors": errors,
+            "queued": queued,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        return jsonify(ack), 202 if queued else 200
+    except Exception as e:
+        current_app.logger.error(f"/api/ingest/{key} failed: {e}")
+        return jsonify({"error": f"Failed to ingest {key}", "details": str(e), "batch_id": batch_id}), 500
+    finally:
+        if batch_id:
+            db_manager.ingest_ledger.finish(ledger_key, ack)
+
+@api.route('/ingest/readings', methods=['POST'])
+def ingest_readings():
+    """Append a batch of sensor readings from a parent node.
+
+    The body is a JSON array of readings, ``{"batch_id": ..., "readings": [...]}``
+    or NDJSON (``Content-Type: application/x-ndjson``). ``?parent=`` (or
+    ``X-Parent-Id``) restricts the batch to that parent and its children, and
+    ``X-Batch-Id`` makes resending the same batch safe. Valid readings are
+    written with one multi-row insert, or queued on the write-behind buffer
+    (202) when it runs; the response acknowledges the batch with
+    accepted/rejected counts and the first errors by index. A full queue
+    answers 429 with Retry-After.
+    """
+    return _ingest_batch('sensor_readings', 'readings', validate_readings)
+
+@api.route('/ingest/reports', methods=['POST'])
+def ingest_reports():
+    """Append a batch of Parent_Node_Reports rows (same protocol as /ingest/readings)"""
+    return _ingest_batch('Parent_Node_Reports', 'reports', validate_reports)
+
 @api.route('/health')
 def health_check():
     """Health check endpoint"""
@@ -143,12 +569,37 @@ def health_check():
             "status": "healthy",
             "database_connected": db_manager.connected,
             "database_status": "connected" if db_manager.connected else "disconnected",
+            "query_cache": db_manager.cache_stats(),
+            "topology": db_manager.topology.stats(),
+            "supervisor": db_manager.supervisor.stats(),
+            "degraded_mode": db_manager.resilience_stats(),
+            "replica": db_manager.replica.stats(),
+            "storage": db_manager.backend.stats() if db_manager.backend else {"backend": "supabase"},
+            "write_behind": db_manager.write_buffer.stats(),
+            "wal": db_manager.wal.stats() if db_manager.wal else None,
+            "region_rollup": db_manager.rollup.stats(),
+            "alerts": db_manager.alerts.stats(),
+            "risk": db_manager.risk.stats(),
+            "anomalies": db_manager.anomalies.stats(),
+            "correlation": db_manager.correlation.stats(),
             "version": "1.2.0",
             "endpoints": [
                 "/api/nodes",
+                "/api/nodes?with_status=true",
+                "/api/nodes?bbox=<minLng,minLat,maxLng,maxLat>|lat=&lng=&k=|radius_km=",
+                "/api/clusters?bbox=<minLng,minLat,maxLng,maxLat>&zoom=<z>",
+                "/api/alerts?state=active|resolved|all&severity=&node=",
+                "/api/risk?min_risk=&limit=",
+                "/api/anomalies?state=active|recent",
+                "/api/incidents?since=<cursor>",
+                "/api/regions/summary?min_level=3",
                 "/api/node/<node_id>",
+                "/api/latest?nodes=<ids>|region=<name>",
                 "/api/history/<node_id>",
+                "/api/history/<node_id>?resolution=15m|max_points=500&mode=lttb",
                 "/api/parent/<node_id>/reports",
+                "POST /api/ingest/readings",
+                "POST /api/ingest/reports",
                 "/api/health"
             ]
         })
@@ -0,0 +1,300 @@
+"""
+Asyncio database access module
+
+AsyncDatabaseManager mirrors the read methods of DatabaseManager on top of the
+async PostgREST client. All queries run on one dedicated event loop, so a
+single process can keep many queries in flight without a thread per request.
+"""
+import asyncio
+import logging
+import threading
+from typing import Optional, List, Dict, Any, Callable, Awaitable
+from postgrest import AsyncPostgrestClient
+from flask import current_app
+from app.resilience import note_stale, current_data_age
+from app.database import (
+    DatabaseManager, DatabaseUnavailable, CachedQuery, ALL_REGIONS, DASHBOARD_NODE_FIELDS,
+    db_manager, decode_history_cursor
+)
+from app.supabase_store import history_query, latest_by_node, id_chunks
+
+logger = logging.getLogger(__name__)
+
+class AsyncDatabaseManager:
+    """Async counterpart of DatabaseManager.
+
+    Connection state, the topology index, the query cache and mock fallbacks
+    are shared with the synchronous manager. The public coroutines can be
+    awaited from any event loop (e.g. Flask async views); the work itself is
+    scheduled on the manager's own loop, which owns the HTTP connection pool.
+    """
+
+    def __init__(self, sync_manager: DatabaseManager):
+        self._db = sync_manager
+        self._client: Optional[AsyncPostgrestClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._db.connected
+
+    # ---- Event loop and client ----
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="async-db-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    async def _run(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a coroutine on the query loop inside the caller's app context"""
+        app = current_app._get_current_object()
+
+        async def in_app_context():
+            with app.app_context():
+                return await factory(), current_data_age()
+
+        loop = self._get_loop()
+        if asyncio.get_running_loop() is loop:
+            value, age = await in_app_context()
+        else:
+            value, age = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(in_app_context(), loop))
+        if age is not None:
+            # Staleness recorded on the query loop belongs to the caller's request
+            note_stale(age)
+        return value
+
+    async def _require_client(self) -> AsyncPostgrestClient:
+        """Return the async client, raising DatabaseUnavailable while disconnected"""
+        if not self._db.connected:
+            if self._db.supervisor.running:
+                # The supervisor reconnects in the background; never wait on it here
+                self._db.supervisor.nudge()
+                raise DatabaseUnavailable("Supabase connection not available")
+            # Connection state belongs to the sync manager; probe it off the event loop
+            app = current_app._get_current_object()
+
+            def probe():
+                with app.app_context():
+                    self._db._initialize_connection()
+
+            await asyncio.get_running_loop().run_in_executor(None, probe)
+            if not self._db.connected:
+                raise DatabaseUnavailable("Supabase connection not available")
+
+        if self._client is None:
+            url = current_app.config['SUPABASE_URL'].strip()
+            key = current_app.config['SUPABASE_KEY'].strip()
+            self._client = AsyncPostgrestClient(
+                f"{url}/rest/v1",
+                headers={"apiKey": key, "Authorization": f"Bearer {key}"}
+            )
+        return self._client
+
+    # ---- Read-through query cache (keys, fallbacks and breaker shared with the sync manager) ----
+    async def _guarded_call(self, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a backend call through the shared circuit breaker"""
+        self._db._admit_call()
+        try:
+            value = await loader()
+        except Exception as e:
+            self._db._settle_call(e)
+            raise
+        self._db._settle_call()
+        return value
+
+    async def _read_through(self, name: str, loader: Callable[[], Awaitable[Any]],
+                            region_id: Optional[str] = None, node_id: Optional[str] = None,
+                            params: str = '') -> Any:
+        """Async DatabaseManager._read_through"""
+        query = self._db._lookup_query(name, region_id, node_id, params)
+        if query.revalidate:
+            self._revalidate(query, loader)
+        if query.found:
+            return query.value
+        return await self._load_query(query, loader)
+
+    async def _load_query(self, query: CachedQuery, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await self._guarded_call(loader)
+        except Exception as e:
+            return self._db._fallback_to_stale(query.name, query.lkg_key, e)
+        self._db._store_query(query, value)
+        return value
+
+    async def _load_or_stale(self, name: str, lkg_key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        return await self._load_query(CachedQuery(name, lkg_key), loader)
+
+    async def _read_through_many(self, name: str, node_ids: List[str],
+                                 loader: Callable[[List[str]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Async DatabaseManager._read_through_many"""
+        results, missing, keys = self._db._lookup_many(name, node_ids)
+        if missing:
+            try:
+                loaded = await self._guarded_call(lambda: loader(missing))
+            except Exception as e:
+                results.update(self._db._fallback_to_stale_many(name, missing, e))
+                return results
+            self._db._store_many(name, missing, loaded, keys)
+            results.update({node_id: loaded.get(node_id) for node_id in missing})
+        return results
+
+    def _revalidate(self, query: CachedQuery, loader: Callable[[], Awaitable[Any]]):
+        """Refresh one cached query as a task on the query loop"""
+        if not self._db._claim_revalidation(query):
+            return
+        app = current_app._get_current_object()
+
+        async def refresh():
+            try:
+                with app.app_context():
+                    self._db._store_query(query, await self._guarded_call(loader))
+            except Exception as e:
+                logger.warning(f"Background refresh of {query.name} failed: {e}")
+            finally:
+                self._db._end_revalidation(query)
+
+        asyncio.get_running_loop().create_task(refresh())
+
+    # ---- Queries ----
+    async def get_node_info(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """Get node information by ID"""
+        node = self._db.topology.node(node_id)
+        if node is not None:
+            return dict(node)
+        if self._db.local_backend() is not None:
+            # Local reads are sub-millisecond; no need to leave the calling loop
+            return self._db.get_node_info(node_id)
+        try:
+            return await self._run(lambda: self._read_through(
+                'node_info', lambda: self._query_node_info(node_id), node_id=node_id))
+        except DatabaseUnavailable:
+            return self._db._get_mock_node_info(node_id)
+        except Exception as e:
+            logger.error(f"Error querying node {node_id}: {e}")
+            return self._db._get_mock_node_info(node_id)
+
+    async def _query_node_info(self, node_id: str) -> Optional[Dict[str, Any]]:
+        client = await self._require_client()
+        response = await client.table("nodes").select("*").eq("node_id", node_id).execute()
+        return response.data[0] if response.data else None
+
+    async def get_node_history(self, node_id: str, limit: Optional[int] = None, before: Optional[str] = None,
+                               after: Optional[str] = None, start: Optional[str] = None,
+                               end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get historical data for a node, newest first (see DatabaseManager.get_node_history)"""
+        if self._db.local_backend() is not None:
+            return self._db.get_node_history(node_id, limit, before, after, start, end)
+        for cursor in (before, after):
+            if cursor:
+                decode_history_cursor(cursor)
+        params = f"l={limit}:b={before}:a={after}:f={start}:t={end}"
+        try:
+            return await self._run(lambda: self._read_through(
+                'node_history',
+                lambda: self._query_node_history(node_id, limit, before, after, start, end),
+                node_id=node_id, params=params))
+        except DatabaseUnavailable:
+            return self._db._get_mock_node_history(node_id)[:limit]
+        except Exception as e:
+            logger.error(f"Error querying history for node {node_id}: {e}")
+            return self._db._get_mock_node_history(node_id)[:limit]
+
+    async def _query_node_history(self, node_id: str, limit: Optional[int], before: Optional[str],
+                                  after: Optional[str], start: Optional[str],
+                                  end: Optional[str]) -> List[Dict[str, Any]]:
+        client = await self._require_client()
+        query = history_query(client.table("sensor_readings").select("*").eq("node_id", node_id), limit,
+                              before and decode_history_cursor(before), after and decode_history_cursor(after),
+                              start, end)
+        rows = (await query.execute()).data or []
+        return rows[::-1] if after else rows
+
+    async def get_nodes_for_dashboard(self, region_name: str) -> List[Dict[str, Any]]:
+        """Get nodes for dashboard based on region"""
+        try:
+            region_id = self._db._dashboard_region_id(region_name)
+            if not region_id:
+                return []
+
+            if self._db.topology.ready:
+                nodes = self._db.topology.all_nodes() if region_id == ALL_REGIONS \
+                    else self._db.topology.nodes_in_region(region_id)
+                return [{field: node.get(field) for field in DASHBOARD_NODE_FIELDS} for node in nodes]
+
+            if self._db.local_backend() is not None:
+                return self._db.get_nodes_for_dashboard(region_name)
+
+            return await self._run(lambda: self._read_through(
+                'nodes_for_dashboard', lambda: self._query_nodes_for_dashboard(region_id),
+                region_id=region_id))
+        except DatabaseUnavailable:
+            return self._db._get_mock_nodes()
+        except Exception as e:
+            logger.error(f"Error loading nodes for dashboard: {str(e)}")
+            return self._db._get_mock_nodes()
+
+    async def _query_nodes_for_dashboard(self, region_id: str) -> List[Dict[str, Any]]:
+        client = await self._require_client()
+        fields = ", ".join(DASHBOARD_NODE_FIELDS)
+        if region_id == ALL_REGIONS:
+            response = await client.table("nodes").select(fields).execute()
+            return response.data or []
+
+        node_regions = await client.table('node_regions').select('node_id').eq('region_id', region_id).execute()
+        node_ids = [nr['node_id'] for nr in node_regions.data] if node_regions.data else []
+        if not node_ids:
+            return []
+
+        response = await client.table("nodes").select(fields).in_("node_id", node_ids).execute()
+        return response.data or []
+
+    async def get_parent_node_reports(self, parent_id: str) -> List[Dict[str, Any]]:
+        """Get reports for a parent node"""
+        if self._db.local_backend() is not None:
+            return self._db.get_parent_node_reports(parent_id)
+        try:
+            return await self._run(lambda: self._load_or_stale(
+                'parent_reports', self._db._lkg_key('parent_reports', node_id=parent_id),
+                lambda: self._query_parent_node_reports(parent_id)))
+        except DatabaseUnavailable:
+            return self._db._get_mock_parent_reports(parent_id)
+        except Exception as e:
+            logger.error(f"Error querying Parent_Node_Reports for parent {parent_id}: {e}")
+            return self._db._get_mock_parent_reports(parent_id)
+
+    async def _query_parent_node_reports(self, parent_id: str) -> List[Dict[str, Any]]:
+        client = await self._require_client()
+        response = await client.table("Parent_Node_Reports")\
+            .select("*")\
+            .eq("parent_id", parent_id)\
+            .order("timestamp", desc=True)\
+            .execute()
+        return response.data or []
+
+    async def get_latest_readings(self, node_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get the newest reading of each node in one query (None for nodes without readings)"""
+        node_ids = list(dict.fromkeys(node_ids or []))
+        if not node_ids:
+            return {}
+        if self._db.local_backend() is not None:
+            return self._db.get_latest_readings(node_ids)
+        try:
+            return await self._run(lambda: self._read_through_many(
+                'latest_reading', node_ids, self._query_latest_readings))
+        except DatabaseUnavailable:
+            return self._db._get_mock_latest_readings(node_ids)
+        except Exception as e:
+            logger.error(f"Error querying latest readings for {len(node_ids)} nodes: {e}")
+            return self._db._get_mock_latest_readings(node_ids)
+
+    async def _query_latest_readings(self, node_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        client = await self._require_client()
+        responses = await asyncio.gather(*(client.rpc('get_latest_readings', {'node_ids': chunk}).execute()
+                                           for chunk in id_chunks(node_ids)))
+        return latest_by_node(node_ids, [row for response in responses for row in response.data or []])
+
+# Global async database manager instance, sharing state with db_manager
+async_db_manager = AsyncDatabaseManager(db_manager)
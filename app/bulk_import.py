@@ -0,0 +1,219 @@
+"""
+Bulk import of CSV / JSONL data into a storage backend
+
+BulkImporter streams an input file, groups its rows into multi-row upserts
+and runs up to ``workers`` chunks concurrently. Progress is checkpointed to a
+JSON file as the contiguous number of rows committed per input file, so an
+interrupted import resumes after the last fully written chunk. Replaying a
+partially written chunk is only safe because every row carries its primary
+key: `sensor_readings` and `Parent_Node_Reports` rows must include their
+serial `reading_id` / `report_id` (without it an upsert inserts a second
+copy), and files where one is missing are refused.
+"""
+import os
+import re
+import csv
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, List, Dict, Any, Iterator, Callable
+from app.sqlite_store import SCHEMA_PATH
+from app.storage import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+INPUT_FORMATS = (".csv", ".jsonl")
+
+# Tables keyed by a serial id, which input rows must still carry
+SERIAL_KEYS = {"sensor_readings": "reading_id", "Parent_Node_Reports": "report_id"}
+
+class BulkImportError(Exception):
+    """A chunk could not be written after retrying"""
+
+def schema_column_types(schema_path: str = SCHEMA_PATH) -> Dict[str, Dict[str, type]]:
+    """Python types of the non-text columns of every table in the schema DDL"""
+    with open(schema_path, encoding='utf-8') as f:
+        sql = f.read()
+    types: Dict[str, Dict[str, type]] = {}
+    for table, body in re.findall(r'CREATE TABLE\s+(?:public\.)?"?(\w+)"?\s*\((.*?)\n\)', sql, re.S):
+        columns = {}
+        for name, column_type in re.findall(r'^\s*"?(\w+)"?\s+([a-z]+)', body, re.M):
+            if column_type == 'boolean':
+                columns[name] = bool
+            elif column_type in ('integer', 'serial', 'bigint', 'smallint', 'bigserial'):
+                columns[name] = int
+            elif column_type in ('numeric', 'double', 'real', 'decimal'):
+                columns[name] = float
+        types[table] = columns
+    return types
+
+def _convert(value: str, column_type: Optional[type]) -> Any:
+    if value == "":
+        return None
+    if column_type is bool:
+        return value.strip().lower() in ("true", "t", "1", "yes")
+    if column_type is not None:
+        return column_type(value)
+    return value
+
+def read_rows(path: str, table: str, column_types: Optional[Dict[str, Dict[str, type]]] = None) -> Iterator[Dict[str, Any]]:
+    """Stream the rows of a CSV (with header) or JSONL file; CSV values are typed from the schema"""
+    if path.endswith(".jsonl"):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    types = (column_types if column_types is not None else schema_column_types()).get(table, {})
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield {column: _convert(value, types.get(column)) for column, value in row.items()}
+
+def table_for_path(path: str) -> str:
+    """Input files are named after their table: sensor_readings.csv, nodes.jsonl, ..."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+class Checkpoint:
+    """Rows committed per input file, persisted atomically as JSON"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self._entries = json.load(f)
+
+    @staticmethod
+    def _fingerprint(source: str) -> Dict[str, Any]:
+        stat = os.stat(source)
+        return {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+    def rows_done(self, source: str) -> int:
+        """Rows already committed for an input file (0 when it is new or has changed)"""
+        entry = self._entries.get(os.path.abspath(source))
+        if not entry or {k: entry.get(k) for k in ("size", "mtime")} != self._fingerprint(source):
+            return 0
+        return entry["rows"]
+
+    def is_complete(self, source: str) -> bool:
+        entry = self._entries.get(os.path.abspath(source))
+        return bool(entry and entry.get("complete") and self.rows_done(source) == entry["rows"])
+
+    def save(self, source: str, rows: int, complete: bool = False):
+        with self._lock:
+            self._entries[os.path.abspath(source)] = dict(self._fingerprint(source), rows=rows, complete=complete)
+            if not self.path:
+                return
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp, self.path)
+
+class BulkImporter:
+    """Chunked, concurrent, resumable upserts into a StorageBackend"""
+
+    def __init__(self, store: StorageBackend, batch_size: int = 1000, workers: int = 4,
+                 checkpoint_path: Optional[str] = None, retries: int = 3, retry_delay: float = 1.0,
+                 on_progress: Optional[Callable[[str, int], None]] = None):
+        if batch_size < 1 or workers < 1:
+            raise ValueError("batch_size and workers must be at least 1")
+        self.store = store
+        self.batch_size = batch_size
+        self.workers = workers
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.on_progress = on_progress
+        self._column_types = schema_column_types()
+
+    def _write_chunk(self, table: str, rows: List[Dict[str, Any]]):
+        for attempt in range(self.retries + 1):
+            try:
+                self.store.upsert_rows(table, rows)
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    raise BulkImportError(f"{table}: chunk of {len(rows)} rows failed: {e}") from e
+                logger.warning(f"{table}: chunk failed ({e}), retrying")
+                time.sleep(self.retry_delay * 2 ** attempt)
+
+    def _chunks(self, table: str, rows: Iterator[Dict[str, Any]], skip: int) -> Iterator[List[Dict[str, Any]]]:
+        key = SERIAL_KEYS.get(table)
+        chunk: List[Dict[str, Any]] = []
+        for position, row in enumerate(rows):
+            if position < skip:
+                continue
+            if key and row.get(key) is None:
+                raise BulkImportError(f"{table}: row {position + 1} has no {key}; "
+                                      f"only keyed rows can be imported and resumed without duplicates")
+            chunk.append(row)
+            if len(chunk) >= self.batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def import_file(self, path: str, table: Optional[str] = None) -> Dict[str, Any]:
+        """Import one file, resuming from its checkpoint; returns row count and throughput"""
+        table = table or table_for_path(path)
+        started = time.time()
+        if self.checkpoint.is_complete(path):
+            return {"table": table, "rows": 0, "skipped": self.checkpoint.rows_done(path),
+                    "seconds": 0.0, "rows_per_second": 0.0}
+
+        skip = self.checkpoint.rows_done(path)
+        committed = skip
+        # Chunks finish out of order; only the contiguous prefix is checkpointed
+        sizes: Dict[int, int] = {}
+        finished: set = set()
+        next_index = 0
+        pending = {}
+        error: Optional[BaseException] = None
+
+        def advance(done):
+            nonlocal committed, next_index, error
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    future.result()
+                except BaseException as e:
+                    error = error or e
+                    continue
+                finished.add(index)
+            advanced = False
+            while next_index in finished:
+                finished.discard(next_index)
+                committed += sizes.pop(next_index)
+                next_index += 1
+                advanced = True
+            if advanced:
+                self.checkpoint.save(path, committed)
+                if self.on_progress:
+                    self.on_progress(table, committed)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk-import") as pool:
+            try:
+                for index, chunk in enumerate(self._chunks(table, read_rows(path, table, self._column_types), skip)):
+                    if error:
+                        break
+                    while len(pending) >= self.workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        advance(done)
+                    sizes[index] = len(chunk)
+                    pending[pool.submit(self._write_chunk, table, chunk)] = index
+            except BulkImportError as e:
+                error = error or e
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                advance(done)
+
+        if error:
+            raise error
+        self.checkpoint.save(path, committed, complete=True)
+        elapsed = time.time() - started
+        imported = committed - skip
+        return {"table": table, "rows": imported, "skipped": skip, "seconds": round(elapsed, 3),
+                "rows_per_second": round(imported / elapsed, 1) if elapsed else 0.0}
@@ -0,0 +1,303 @@
+"""
+Zoom-aware marker clustering for the dashboard map
+
+A supercluster-style hierarchy: nodes are projected to Web Mercator and,
+from the deepest zoom up, every point or cluster within ``radius`` pixels of
+an unclustered neighbour is merged into one weighted centroid. Each zoom
+level keeps a tile-sized grid, so a viewport query only touches the clusters
+it shows. Danger levels change with every reading while positions do not, so
+the per-cluster maximum is folded up the finished hierarchy with NumPy from
+the latest statuses instead of rebuilding it.
+"""
+import math
+import time
+import threading
+import numpy as np
+from typing import Optional, List, Dict, Any, Tuple, Callable, Iterable
+from app.spatial import BBox, coordinates
+
+def _project(lat: float, lng: float) -> Tuple[float, float]:
+    """Web Mercator position in [0, 1] x [0, 1]"""
+    sin = math.sin(math.radians(max(min(lat, 85.0511), -85.0511)))
+    y = 0.5 - 0.25 * math.log((1 + sin) / (1 - sin)) / math.pi
+    return lng / 360 + 0.5, min(max(y, 0.0), 1.0)
+
+def _unproject(x: float, y: float) -> Tuple[float, float]:
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return lat, (x - 0.5) * 360
+
+# Grid cell or tile coordinates packed into one int64 key: x * CELL_KEY + y
+CELL_KEY = 1 << 31
+NEIGHBOURS = [dx * CELL_KEY + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+# Wider viewports are filtered with one vectorized pass over the whole level
+MAX_TILE_COLUMNS = 64
+
+class _Level:
+    """Points or clusters shown at one zoom level"""
+
+    def __init__(self, zoom: int, x: np.ndarray, y: np.ndarray, count: np.ndarray,
+                 expansion: np.ndarray, leaf: np.ndarray):
+        self.zoom = zoom
+        self.x = x
+        self.y = y
+        self.count = count
+        # First zoom at which the item splits into several, and the node a single-node item stands for
+        self.expansion = expansion
+        self.leaf = leaf
+        # Index of the enclosing cluster one zoom level up
+        self.parent = np.zeros(len(x), dtype=np.int64)
+        # Items sorted by the 256px tile they fall in at this zoom
+        scale = 2 ** zoom
+        keys = np.minimum(x * scale, scale - 1).astype(np.int64) * CELL_KEY \
+            + np.minimum(y * scale, scale - 1).astype(np.int64)
+        self._order = np.argsort(keys, kind="stable")
+        self._keys = keys[self._order]
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def in_tiles(self, min_tx: int, min_ty: int, max_tx: int, max_ty: int) -> np.ndarray:
+        """Indices of the items in a block of tiles"""
+        if max_tx - min_tx + 1 > MAX_TILE_COLUMNS:
+            return np.arange(len(self.x))
+        found = []
+        for tx in range(min_tx, max_tx + 1):
+            start = np.searchsorted(self._keys, tx * CELL_KEY + min_ty, side="left")
+            end = np.searchsorted(self._keys, tx * CELL_KEY + max_ty, side="right")
+            if end > start:
+                found.append(self._order[start:end])
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+class ClusterIndex:
+    """Cluster hierarchy over one set of nodes, from min_zoom to max_zoom"""
+
+    def __init__(self, nodes: Iterable[Dict[str, Any]], radius: int = 60, extent: int = 256,
+                 min_zoom: int = 0, max_zoom: int = 14):
+        self.radius = radius
+        self.extent = extent
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.nodes: List[Dict[str, Any]] = []
+        xs, ys = [], []
+        for node in nodes:
+            position = coordinates(node)
+            if position is None:
+                continue
+            x, y = _project(*position)
+            self.nodes.append(node)
+            xs.append(x)
+            ys.append(y)
+        self.node_index = {node["node_id"]: i for i, node in enumerate(self.nodes)}
+        count = len(self.nodes)
+        # levels[zoom - min_zoom]; the last level (max_zoom + 1) holds the nodes themselves
+        leaves = _Level(max_zoom + 1, np.array(xs, dtype=np.float64), np.array(ys, dtype=np.float64),
+                        np.ones(count, dtype=np.int64), np.full(count, max_zoom + 1, dtype=np.int64),
+                        np.arange(count, dtype=np.int64))
+        self.levels: List[_Level] = [leaves]
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            self.levels.insert(0, self._cluster(self.levels[0], zoom))
+        self.built_at = time.time()
+        self._danger: Optional[List[np.ndarray]] = None
+
+    def _cluster(self, below: _Level, zoom: int) -> _Level:
+        """Merge the items of the level below that fall within radius pixels at this zoom"""
+        r = self.radius / (self.extent * 2 ** zoom)
+        cx = (below.x / r).astype(np.int64)
+        cy = (below.y / r).astype(np.int64)
+        keys = cx * CELL_KEY + cy
+        occupied, inverse, per_cell = np.unique(keys, return_inverse=True, return_counts=True)
+        # Alone in its 3x3 block of cells: nothing is within radius, so it stays as it is
+        isolated = per_cell[inverse] == 1
+        for offset in NEIGHBOURS:
+            probe = keys + offset
+            slot = np.minimum(np.searchsorted(occupied, probe), len(occupied) - 1)
+            isolated &= occupied[slot] != probe
+        crowded = np.flatnonzero(~isolated)
+
+        # Greedy merge, in index order, of the items that have neighbours
+        bx, by, bcount = below.x.tolist(), below.y.tolist(), below.count.tolist()
+        grid: Dict[Tuple[int, int], List[int]] = {}
+        for i, gx, gy in zip(crowded.tolist(), cx[crowded].tolist(), cy[crowded].tolist()):
+            grid.setdefault((gx, gy), []).append(i)
+        r2 = r * r
+        done = bytearray(len(below))
+        parent = [0] * len(below)
+        xs, ys, counts, sources = [], [], [], []
+        for i, gx, gy in zip(crowded.tolist(), cx[crowded].tolist(), cy[crowded].tolist()):
+            if done[i]:
+                continue
+            done[i] = 1
+            x, y = bx[i], by[i]
+            members = [i]
+            for nx in (gx - 1, gx, gx + 1):
+                for ny in (gy - 1, gy, gy + 1):
+                    for j in grid.get((nx, ny), ()):
+                        if not done[j]:
+                            dx, dy = bx[j] - x, by[j] - y
+                            if dx * dx + dy * dy <= r2:
+                                done[j] = 1
+                                members.append(j)
+            for j in members:
+                parent[j] = len(xs)
+            if len(members) == 1:
+                xs.append(x)
+                ys.append(y)
+                counts.append(bcount[i])
+                sources.append(i)
+            else:
+                total = sum(bcount[j] for j in members)
+                xs.append(sum(bx[j] * bcount[j] for j in members) / total)
+                ys.append(sum(by[j] * bcount[j] for j in members) / total)
+                counts.append(total)
+                sources.append(-1)
+
+        # Items that stay alone keep their position, expansion zoom and node
+        alone = np.flatnonzero(isolated)
+        below.parent = np.array(parent, dtype=np.int64)
+        below.parent[alone] = len(xs) + np.arange(len(alone))
+        sources = np.concatenate([np.array(sources, dtype=np.int64), alone])
+        single = sources >= 0
+        expansion = np.full(len(sources), below.zoom, dtype=np.int64)
+        expansion[single] = below.expansion[sources[single]]
+        leaf = np.full(len(sources), -1, dtype=np.int64)
+        leaf[single] = below.leaf[sources[single]]
+        return _Level(zoom,
+                      np.concatenate([np.array(xs, dtype=np.float64), below.x[alone]]),
+                      np.concatenate([np.array(ys, dtype=np.float64), below.y[alone]]),
+                      np.concatenate([np.array(counts, dtype=np.int64), below.count[alone]]),
+                      expansion, leaf)
+
+    def _level(self, zoom: int) -> _Level:
+        zoom = max(self.min_zoom, min(int(zoom), self.max_zoom + 1))
+        return self.levels[zoom - self.min_zoom]
+
+    # ---- Danger aggregation ----
+    def set_danger(self, danger_by_node: Dict[str, Optional[int]]):
+        """Fold the latest danger level of every node up the hierarchy (-1: no reading)"""
+        leaf = np.full(len(self.nodes), -1, dtype=np.int64)
+        for node_id, level in danger_by_node.items():
+            i = self.node_index.get(node_id)
+            if i is not None and level is not None:
+                leaf[i] = level
+        danger = [leaf]
+        for index in range(len(self.levels) - 1, 0, -1):
+            above = np.full(len(self.levels[index - 1]), -1, dtype=np.int64)
+            np.maximum.at(above, self.levels[index].parent, danger[0])
+            danger.insert(0, above)
+        self._danger = danger
+
+    # ---- Queries ----
+    def clusters(self, bbox: BBox, zoom: int) -> List[Dict[str, Any]]:
+        """Clusters and single nodes inside the viewport at a zoom level"""
+        level = self._level(zoom)
+        index = level.zoom - self.min_zoom
+        min_lng, min_lat, max_lng, max_lat = bbox
+        min_x, max_y = _project(min_lat, min_lng)
+        max_x, min_y = _project(max_lat, max_lng)
+        scale = 2 ** level.zoom
+        danger = self._danger[index] if self._danger is not None else None
+        candidates = level.in_tiles(int(min_x * scale), int(min_y * scale),
+                                    min(int(max_x * scale), scale - 1), min(int(max_y * scale), scale - 1))
+        x, y = level.x[candidates], level.y[candidates]
+        visible = candidates[(x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)]
+        found = []
+        for i in visible.tolist():
+            max_danger = int(danger[i]) if danger is not None and danger[i] >= 0 else None
+            if level.count[i] == 1:
+                node = self.nodes[level.leaf[i]]
+                found.append({"type": "node", "count": 1, "lat": float(node["lat"]),
+                              "lng": float(node["lng"]), "max_danger": max_danger, "node": node})
+                continue
+            lat, lng = _unproject(float(level.x[i]), float(level.y[i]))
+            found.append({"type": "cluster", "id": f"{level.zoom}:{i}", "count": int(level.count[i]),
+                          "lat": round(lat, 6), "lng": round(lng, 6), "max_danger": max_danger,
+                          "expansion_zoom": int(level.expansion[i])})
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "nodes": len(self.nodes),
+            "clusters_by_zoom": {level.zoom: len(level) for level in self.levels[:-1]},
+            "age_seconds": round(time.time() - self.built_at, 1),
+        }
+
+class RegionClusters:
+    """ClusterIndex per region, rebuilt only for regions whose nodes changed.
+
+    Builds run outside the lock, at most one per region at a time. While a
+    changed region is rebuilt its previous index keeps answering; only
+    callers with no index to serve wait for the build in flight.
+    """
+
+    def __init__(self, radius: int = 60, max_zoom: int = 14, danger_ttl: float = 15):
+        self.radius = radius
+        self.max_zoom = max_zoom
+        self.danger_ttl = danger_ttl
+        self._indexes: Dict[str, ClusterIndex] = {}
+        self._danger_at: Dict[str, float] = {}
+        # Regions whose index predates a topology change, and how often each was invalidated
+        self._stale: set = set()
+        self._versions: Dict[str, int] = {}
+        self._building: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, region_id: str, load_nodes: Callable[[], List[Dict[str, Any]]],
+            load_danger: Callable[[], Dict[str, Optional[int]]]) -> ClusterIndex:
+        """The region's index, built on first use; danger levels refreshed every danger_ttl seconds"""
+        while True:
+            with self._lock:
+                index = self._indexes.get(region_id)
+                building = self._building.get(region_id)
+                if index is not None and (region_id not in self._stale or building is not None):
+                    break
+                if building is None:
+                    self._building[region_id] = threading.Event()
+                    version = self._versions.get(region_id, 0)
+            if building is None:
+                return self._build(region_id, version, load_nodes, load_danger)
+            building.wait()
+
+        with self._lock:
+            due = time.time() - self._danger_at.get(region_id, 0) >= self.danger_ttl
+            if due:
+                self._danger_at[region_id] = time.time()
+        if due:
+            index.set_danger(load_danger())
+        return index
+
+    def _build(self, region_id: str, version: int, load_nodes: Callable[[], List[Dict[str, Any]]],
+               load_danger: Callable[[], Dict[str, Optional[int]]]) -> ClusterIndex:
+        """Build a region's index off the lock and swap it in (the caller holds the region's build slot)"""
+        try:
+            index = ClusterIndex(load_nodes(), radius=self.radius, max_zoom=self.max_zoom)
+            index.set_danger(load_danger())
+            with self._lock:
+                self._indexes[region_id] = index
+                self._danger_at[region_id] = time.time()
+                self.builds += 1
+                # Invalidated again while building: serve this index, but rebuild on the next request
+                if self._versions.get(region_id, 0) == version:
+                    self._stale.discard(region_id)
+                else:
+                    self._stale.add(region_id)
+            return index
+        finally:
+            with self._lock:
+                self._building.pop(region_id).set()
+
+    def invalidate(self, region_ids: Optional[Iterable[str]] = None):
+        """Mark the indexes of changed regions for rebuilding (every region when None)"""
+        with self._lock:
+            if region_ids is None:
+                region_ids = set(self._indexes) | set(self._building)
+            for region_id in region_ids:
+                self._versions[region_id] = self._versions.get(region_id, 0) + 1
+                if region_id in self._indexes:
+                    self._stale.add(region_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"builds": self.builds,
+                    "regions": {region_id: index.stats() for region_id, index in self._indexes.items()}}
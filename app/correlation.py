@@ -0,0 +1,138 @@
+"""
+Cross-checking drone fire detections against the ground sensor network
+
+For every drone detection, the sensor nodes within a radius are taken from
+the topology's spatial grid, and each node's streaming anomaly state (see
+app.anomaly) says whether it reported within the time window and whether its
+smoke or temperature rose. No readings are queried or scanned. The strongest
+nearby agreement, discounted with distance, decides whether the detection is
+confirmed. Confirmed detections close in space and time are merged into one
+incident, published on a stream that clients follow with a sequence cursor.
+"""
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from app.spatial import haversine_km
+
+# Fields whose rise supports a fire, with their weight
+SUPPORTING_FIELDS = {"gas_and_smoke": 1.0, "temperature": 0.8}
+# Supporting sensors listed with a detection or incident
+MAX_LISTED_SENSORS = 5
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat(timespec="seconds")
+
+class CorrelationEngine:
+    """Scores detections against nearby sensors and keeps the confirmed-incident stream"""
+
+    def __init__(self, radius_km: float = 1.0, window_seconds: float = 600, min_agreement: float = 0.5,
+                 z_scale: float = 4.0, history_size: int = 500):
+        self.radius_km = radius_km
+        self.window_seconds = window_seconds
+        self.min_agreement = min_agreement
+        # z-score at which a field counts as full agreement
+        self.z_scale = z_scale
+        self.history_size = history_size
+        self._incidents: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._sequence = 0
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.detections = 0
+        self.confirmed = 0
+
+    def _node_agreement(self, fields: Dict[str, Dict[str, Any]]) -> float:
+        """Probability-style OR of the supporting fields' evidence, 0-1"""
+        doubt = 1.0
+        for field, weight in SUPPORTING_FIELDS.items():
+            state = fields.get(field)
+            if state is None:
+                continue
+            support = 1.0 if state["flagged"] and state["z"] > 0 else min(max(state["z"] / self.z_scale, 0.0), 1.0)
+            doubt *= 1 - weight * support
+        return 1 - doubt
+
+    def correlate(self, lat: float, lng: float, confidence: float, temperature: Optional[float],
+                  nearby: List[Tuple[str, float]], evidence: Dict[str, Dict[str, Dict[str, Any]]],
+                  region_of: Callable[[str], Optional[str]], now: Optional[float] = None) -> Dict[str, Any]:
+        """Score one detection; nearby is (node_id, distance_km), evidence from AnomalyDetector.evidence"""
+        now = now or time.time()
+        sensors = []
+        for node_id, distance in nearby:
+            fields = evidence.get(node_id)
+            if fields is None:
+                continue
+            weight = 1 - 0.5 * min(distance / self.radius_km, 1.0)
+            sensors.append({"node_id": node_id, "distance_km": round(distance, 3),
+                            "agreement": round(self._node_agreement(fields) * weight, 3)})
+        sensors.sort(key=lambda sensor: -sensor["agreement"])
+        agreement = sensors[0]["agreement"] if sensors else 0.0
+        if not sensors:
+            status = "no_coverage"
+        elif agreement >= self.min_agreement:
+            status = "confirmed"
+        else:
+            status = "unconfirmed"
+        result = {"status": status, "agreement": agreement, "sensors_nearby": len(nearby),
+                  "sensors_reporting": len(sensors), "sensors": sensors[:MAX_LISTED_SENSORS], "incident_id": None}
+        with self._lock:
+            self.detections += 1
+            if status == "confirmed":
+                self.confirmed += 1
+                supporting = [sensor for sensor in sensors if sensor["agreement"] >= self.min_agreement]
+                result["incident_id"] = self._record(lat, lng, confidence, temperature, agreement,
+                                                     supporting, region_of(supporting[0]["node_id"]), now)
+        return result
+
+    def _record(self, lat: float, lng: float, confidence: float, temperature: Optional[float], agreement: float,
+                supporting: List[Dict[str, Any]], region_id: Optional[str], now: float) -> int:
+        """Merge a confirmed detection into an ongoing incident nearby, or open a new one"""
+        self._sequence += 1
+        node_ids = [sensor["node_id"] for sensor in supporting[:MAX_LISTED_SENSORS]]
+        for incident in reversed(self._incidents.values()):
+            if now - incident["_last_epoch"] > self.window_seconds:
+                break
+            if haversine_km(lat, lng, incident["lat"], incident["lng"]) <= self.radius_km:
+                incident.update(
+                    last_seen=_iso(now), _last_epoch=now, sequence=self._sequence,
+                    detections=incident["detections"] + 1,
+                    max_confidence=max(incident["max_confidence"], confidence),
+                    max_temperature=max(incident["max_temperature"] or 0, temperature or 0) or None,
+                    agreement=max(incident["agreement"], agreement),
+                    nodes=sorted(set(incident["nodes"]) | set(node_ids)),
+                )
+                self._incidents.move_to_end(incident["incident_id"])
+                return incident["incident_id"]
+        incident_id = self._next_id
+        self._next_id += 1
+        self._incidents[incident_id] = {
+            "incident_id": incident_id, "sequence": self._sequence, "region_id": region_id,
+            "lat": lat, "lng": lng, "first_seen": _iso(now), "last_seen": _iso(now), "_last_epoch": now,
+            "detections": 1, "max_confidence": confidence, "max_temperature": temperature,
+            "agreement": agreement, "nodes": sorted(node_ids),
+        }
+        while len(self._incidents) > self.history_size:
+            self._incidents.popitem(last=False)
+        return incident_id
+
+    def incidents(self, since: int = 0, region_id: Optional[str] = None,
+                  limit: int = 100) -> Tuple[List[Dict[str, Any]], int]:
+        """Incidents opened or updated after sequence `since`, oldest change first, and the cursor to resume from"""
+        with self._lock:
+            changed = []
+            # Most recently changed incidents are at the end
+            for incident in reversed(self._incidents.values()):
+                if incident["sequence"] <= since:
+                    break
+                if region_id is None or incident["region_id"] == region_id:
+                    changed.append({key: value for key, value in incident.items() if not key.startswith("_")})
+            changed.reverse()
+            if len(changed) > limit:
+                return changed[:limit], changed[limit - 1]["sequence"]
+            return changed, self._sequence
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"detections": self.detections, "confirmed": self.confirmed,
+                    "incidents": len(self._incidents), "sequence": self._sequence}
@@ -1,15 +1,106 @@
 """
 Database connection and query management module
 """
+import os
 import time
+import atexit
+import base64
 import logging
-from typing import Optional, List, Dict, Any
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable, Tuple, AbstractSet
 from supabase import create_client, Client
-from flask import current_app
+from postgrest import APIError
+from flask import current_app, has_app_context
+from app import cache
+from app.topology import TopologyIndex, TopologySnapshot
+from app.supervisor import ConnectionSupervisor
+from app.replica import ReplicaSync
+from app.resilience import LastKnownGoodStore, CircuitBreaker, TRANSPORT_ERRORS, note_stale, current_data_age
+from app.downsample import downsample, check_downsample_args
+from app.storage import StorageBackend, create_backend, normalize_timestamp
+from app.spatial import GridIndex, BBox
+from app.clustering import RegionClusters
+from app.tiles import TileCache, Tile, encode_tile, build_tile
+from app.rollup import DangerRollup
+from app.alerts import AlertEngine, load_rule_file
+from app.risk import RiskEngine
+from app.anomaly import AnomalyDetector
+from app.correlation import CorrelationEngine
+from app.supabase_store import SupabaseStore, PAGE_SIZE
+from app.ingest import BatchLedger
+from app.write_buffer import WriteBehindBuffer
+from app.wal import WriteAheadLog
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Region scope used for headquarters queries that span every region
+ALL_REGIONS = 'ALL'
+
+# Column naming the node whose cached queries a written row affects
+WRITE_INVALIDATES = {"sensor_readings": "node_id", "Parent_Node_Reports": "parent_id"}
+
+# Per table written through the WAL: (serial id column, column the rows are looked up by)
+WAL_ROW_KEYS = {"sensor_readings": ("reading_id", "node_id"), "Parent_Node_Reports": ("report_id", "parent_id")}
+
+# Node columns shown on the dashboard map
+DASHBOARD_NODE_FIELDS = ("node_id", "title", "location", "is_parent", "lat", "lng")
+
+class DatabaseUnavailable(RuntimeError):
+    """Raised when no Supabase connection can be established"""
+
+# ---- Keyset pagination helpers for sensor history ----
+def encode_history_cursor(reading: Dict[str, Any]) -> str:
+    """Build an opaque cursor from a reading's (timestamp, reading_id) key"""
+    raw = f"{reading.get('timestamp')}|{reading.get('reading_id') or 0}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_history_cursor(cursor: str) -> Tuple[str, int]:
+    """Return the (timestamp, reading_id) pair of a cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, reading_id = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8').rsplit('|', 1)
+        return timestamp, int(reading_id)
+    except ValueError as e:
+        raise ValueError(f"Invalid history cursor: {cursor}") from e
+
+def parse_time_bound(value: Optional[str]) -> Optional[str]:
+    """Validate an ISO-8601 from/to bound and return it normalized, raising ValueError if invalid"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.strip().replace('Z', '+00:00')).isoformat()
+    except ValueError as e:
+        raise ValueError(f"Invalid timestamp: {value}") from e
+
+def _row_fingerprint(row: Dict[str, Any], columns: List[str]) -> Tuple[Any, ...]:
+    """Comparable values of a row's columns, whether it came from the WAL or back from the database"""
+    values = []
+    for column in columns:
+        value = row.get(column)
+        if column == 'timestamp':
+            value = normalize_timestamp(value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(value)
+        values.append(value)
+    return tuple(values)
+
+class CachedQuery:
+    """Keys and cache outcome of one read-through query, shared by the sync and async managers"""
+
+    def __init__(self, name: str, lkg_key: str):
+        self.name = name
+        self.lkg_key = lkg_key
+        # Cache key and invalidation generation; key stays None while the query cache is off
+        self.key: Optional[str] = None
+        self.generation = ''
+        self.found = False
+        self.value: Any = None
+        self.revalidate = False
+
 class DatabaseManager:
     """Manages database connections and operations"""
     
@@ -20,6 +111,54 @@ class DatabaseManager:
         self._failed_connect_attempts: int = 0
         self._last_retry_time: float = 0.0
         self._current_retry_delay: float = 0.0
+        # Query cache hit/miss counters, keyed by query name
+        self._cache_stats: Dict[str, Dict[str, int]] = {}
+        self._cache_stats_lock = threading.Lock()
+        # Process-wide node topology, refreshed in the background
+        self.topology = TopologyIndex()
+        # Bounded pool for issuing independent queries concurrently
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # Background owner of the connection state (when started)
+        self.supervisor = ConnectionSupervisor()
+        self._connect_lock = threading.Lock()
+        # Degraded mode: last successful result per query and a breaker for the backend
+        self.last_known_good = LastKnownGoodStore()
+        self.breaker = CircuitBreaker()
+        self._revalidating: set = set()
+        self._revalidating_lock = threading.Lock()
+        # Queries against Supabase; connection state stays with this manager
+        self.supabase_store = SupabaseStore(self._require_client)
+        # Non-Supabase backend selected by STORAGE_BACKEND (serves everything locally)
+        self.backend: Optional[StorageBackend] = None
+        # Optional local SQLite mirror that serves reads when ready
+        self.replica = ReplicaSync()
+        # Acknowledgements of recently ingested batches, by (parent_id, batch_id)
+        self.ingest_ledger = BatchLedger()
+        # Batches ingested rows into large writes (when started)
+        self.write_buffer = WriteBehindBuffer()
+        # Map marker clusters per region, dropped when the region's nodes change
+        self.clusters = RegionClusters()
+        # Encoded map tiles, dropped where a topology refresh changed something
+        self.tiles = TileCache()
+        # Callbacks receiving every accepted batch of ingested rows, per table
+        self.row_listeners: Dict[str, List[Callable[[List[Dict[str, Any]]], Any]]] = {}
+        # Per-region danger levels kept current from ingested readings
+        self.rollup = DangerRollup(lambda node_id: self.topology.region_of(node_id))
+        self.subscribe('sensor_readings', self.rollup.observe)
+        # Threshold alert rules checked against every ingested reading
+        self.alerts = AlertEngine(lambda node_id: self.topology.region_of(node_id))
+        self.subscribe('sensor_readings', self.alerts.observe)
+        # Fire-risk scores over every node's latest reading
+        self.risk = RiskEngine()
+        self.subscribe('sensor_readings', self.risk.observe)
+        # Per-node rolling statistics flagging spikes, jumps and stuck sensors
+        self.anomalies = AnomalyDetector(lambda node_id: self.topology.region_of(node_id))
+        self.subscribe('sensor_readings', self.anomalies.observe)
+        # Drone fire detections checked against nearby ground sensors
+        self.correlation = CorrelationEngine()
+        # Local write-ahead log for writes made while Supabase is unreachable (when enabled)
+        self.wal: Optional[WriteAheadLog] = None
         # Don't initialize connection during import. Lazily init on first use
     
     def _initialize_connection(self):
@@ -27,6 +166,16 @@ class DatabaseManager:
         if self.connected and self.supabase:
             return self.supabase
 
+        # Only one connection attempt at a time; concurrent callers see "not connected"
+        if not self._connect_lock.acquire(blocking=False):
+            return None
+        try:
+            return self._attempt_connection()
+        finally:
+            self._connect_lock.release()
+
+    def _attempt_connection(self):
+
         current_time = time.time()
         if current_time - self._last_retry_time < self._current_retry_delay:
             logger.debug(f"Still in backoff period, waiting {self._current_retry_delay - (current_time - self._last_retry_time):.1f}s")
@@ -58,14 +207,16 @@ class DatabaseManager:
 
         try:
             logger.info("Creating Supabase client...")
-            self.supabase = create_client(supabase_url, supabase_key)
+            client = create_client(supabase_url, supabase_key)
             logger.info("Supabase client created, testing connection...")
             
             # Test connection with a simple query
             logger.info("Executing test query...")
-            response = self.supabase.table("nodes").select("*").limit(1).execute()
+            response = client.table("nodes").select("*").limit(1).execute()
             logger.info(f"Test query successful, returned {len(response.data) if response.data else 0} rows")
             
+            # Publish the verified client before flipping readiness
+            self.supabase = client
             self.connected = True
             self._current_retry_delay = 0
             self._failed_connect_attempts = 0
@@ -105,37 +256,804 @@ class DatabaseManager:
             self.connected = False
             return None
     
+    def _ensure_connected(self) -> bool:
+        """Return readiness, connecting inline only when no supervisor owns the connection"""
+        if not self.connected:
+            if self.supervisor.running:
+                self.supervisor.nudge()
+            else:
+                self._initialize_connection()
+        return self.connected
+
+    def _require_client(self) -> Client:
+        """Return a connected client or raise DatabaseUnavailable"""
+        if not self._ensure_connected():
+            raise DatabaseUnavailable("Supabase connection not available")
+        return self.supabase
+
+    def init_app(self, app):
+        """Apply degraded-mode settings from the app config"""
+        self.last_known_good.max_entries = app.config.get('LAST_KNOWN_GOOD_MAX_ENTRIES', 5000)
+        self.breaker.failure_threshold = app.config.get('DB_BREAKER_FAILURE_THRESHOLD', 5)
+        self.breaker.reset_timeout = app.config.get('DB_BREAKER_RESET_TIMEOUT', 30)
+        self.ingest_ledger.max_entries = app.config.get('INGEST_LEDGER_SIZE', 10000)
+        self.write_buffer.capacity = app.config.get('WRITE_BEHIND_CAPACITY', 100000)
+        self.write_buffer.flush_rows = app.config.get('WRITE_BEHIND_FLUSH_ROWS', 5000)
+        self.write_buffer.flush_interval = app.config.get('WRITE_BEHIND_FLUSH_INTERVAL', 1.0)
+        self.clusters.radius = app.config.get('CLUSTER_RADIUS', 60)
+        self.clusters.max_zoom = app.config.get('CLUSTER_MAX_ZOOM', 14)
+        self.clusters.danger_ttl = app.config.get('QUERY_CACHE_TTLS', {}).get('nodes_with_status', 15)
+        self.tiles.max_entries = app.config.get('TILE_CACHE_SIZE', 10000)
+        self.tiles.min_zoom = app.config.get('TILE_MIN_ZOOM', 10)
+        self.tiles.max_zoom = app.config.get('TILE_MAX_ZOOM', 20)
+        self.alerts.resize_history(app.config.get('ALERT_HISTORY_SIZE', 1000))
+        self.alerts.load_rules(load_rule_file(app.config.get('ALERT_RULES_FILE')))
+        self.anomalies.alpha = app.config.get('ANOMALY_ALPHA', 0.1)
+        self.anomalies.z_threshold = app.config.get('ANOMALY_Z_THRESHOLD', 4.0)
+        self.anomalies.warmup = app.config.get('ANOMALY_WARMUP', 5)
+        self.anomalies.resize_history(app.config.get('ANOMALY_HISTORY_SIZE', 1000))
+        self.correlation.radius_km = app.config.get('CORRELATION_RADIUS_KM', 1.0)
+        self.correlation.window_seconds = app.config.get('CORRELATION_WINDOW', 600)
+        self.correlation.min_agreement = app.config.get('CORRELATION_MIN_AGREEMENT', 0.5)
+        self.correlation.z_scale = app.config.get('ANOMALY_Z_THRESHOLD', 4.0)
+        self.correlation.history_size = app.config.get('INCIDENT_HISTORY_SIZE', 500)
+
+        backend = app.config.get('STORAGE_BACKEND', 'supabase')
+        if backend != 'supabase' and self.backend is None:
+            self.backend = create_backend(backend, app.config.get('STORAGE_SQLITE_PATH', 'fire_sensors.sqlite3'))
+            logger.info(f"Using {backend} storage backend")
+
+    def local_backend(self) -> Optional[StorageBackend]:
+        """The backend serving reads without a Supabase round trip, if any"""
+        if self.backend is not None:
+            return self.backend
+        if self.replica.ready:
+            return self.replica.store
+        return None
+
+    # ---- Connection supervision ----
+    def start_supervisor(self, app):
+        """Hand connection establishment and health probing to a background thread"""
+        self.supervisor.start(app, self)
+
+    def check_health(self):
+        """Probe the connection with a trivial query, raising on failure"""
+        self.supabase.table("nodes").select("node_id").limit(1).execute()
+
+    def mark_disconnected(self):
+        """Flip readiness off so requests fall back until the supervisor reconnects"""
+        self.connected = False
+        self._current_retry_delay = 0
+        self._last_retry_time = 0.0
+
+    def retry_wait(self) -> float:
+        """Seconds left in the current connection backoff period"""
+        return max(0.0, self._last_retry_time + self._current_retry_delay - time.time())
+
+    # ---- Read-through query cache ----
+    def _query_cache_enabled(self) -> bool:
+        return has_app_context() and current_app.config.get('QUERY_CACHE_ENABLED', True)
+
+    def _cache_generation(self, region_id: Optional[str], node_id: Optional[str]) -> str:
+        """Return the invalidation generation for the scopes a key depends on"""
+        scopes = ['dbq:gen:all']
+        if region_id:
+            scopes.append(f"dbq:gen:region:{region_id}")
+        if node_id:
+            scopes.append(f"dbq:gen:node:{node_id}")
+        return '.'.join(str(gen or 0) for gen in cache.get_many(*scopes))
+
+    def _query_cache_key(self, name: str, region_id: Optional[str] = None, node_id: Optional[str] = None,
+                         params: str = '', generation: Optional[str] = None) -> str:
+        if generation is None:
+            generation = self._cache_generation(region_id, node_id)
+        return f"dbq:{name}:{region_id or '-'}:{node_id or '-'}:{params}:{generation}"
+
+    def _count_cache(self, name: str, outcome: str, count: int = 1):
+        with self._cache_stats_lock:
+            stats = self._cache_stats.setdefault(name, {'hits': 0, 'misses': 0})
+            stats[outcome] += count
+
+    def _cache_lookup(self, name: str, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry ({'value': ...}) for a key, or None on a miss"""
+        entry = cache.get(key)
+        self._count_cache(name, 'hits' if entry is not None else 'misses')
+        return entry
+
+    def _cache_store(self, name: str, key: str, value: Any):
+        ttl = current_app.config.get('QUERY_CACHE_TTLS', {}).get(name)
+        cache.set(key, {'value': value}, timeout=ttl)
+
+    def _lookup_query(self, name: str, region_id: Optional[str] = None, node_id: Optional[str] = None,
+                      params: str = '') -> CachedQuery:
+        """Resolve a query's keys and answer it from the cache if possible.
+
+        An entry that only expired is answered from the last-known-good store
+        and marked for revalidation. Both the sync and async read-throughs
+        start here; only running the loader differs between them.
+        """
+        query = CachedQuery(name, self._lkg_key(name, region_id, node_id, params))
+        if not self._query_cache_enabled():
+            return query
+        query.generation = self._cache_generation(region_id, node_id)
+        query.key = self._query_cache_key(name, region_id, node_id, params, query.generation)
+        entry = self._cache_lookup(name, query.key)
+        if entry is not None:
+            query.found, query.value = True, entry['value']
+            return query
+
+        stale = self.last_known_good.get(query.lkg_key, current_app.config.get('STALE_WHILE_REVALIDATE', 30))
+        if stale is not None and stale[2] == query.generation:
+            # Expired by TTL, not invalidated: answer now, refresh off the request path
+            query.found, query.value, query.revalidate = True, self._serve_stale(stale), True
+        return query
+
+    def _store_query(self, query: CachedQuery, value: Any):
+        """Keep a freshly loaded value as last-known-good and, when caching, in the cache"""
+        self.last_known_good.put(query.lkg_key, value, query.generation)
+        if query.key is not None:
+            self._cache_store(query.name, query.key, value)
+
+    def _read_through(self, name: str, loader: Callable[[], Any], region_id: Optional[str] = None,
+                      node_id: Optional[str] = None, params: str = '') -> Any:
+        """Serve a query from the cache, loading and storing it on a miss.
+
+        An entry that only expired is answered from the last-known-good store
+        while it is refreshed in the background; if the load fails, the
+        last-known-good value is served instead. The loader must raise on
+        failure so that mock fallbacks are never cached.
+        """
+        query = self._lookup_query(name, region_id, node_id, params)
+        if query.revalidate:
+            self._revalidate(query, loader)
+        if query.found:
+            return query.value
+        return self._load_query(query, loader)
+
+    def _load_query(self, query: CachedQuery, loader: Callable[[], Any]) -> Any:
+        try:
+            value = self._guarded_call(loader)
+        except Exception as e:
+            # Stale values are served but never written back to the cache
+            return self._fallback_to_stale(query.name, query.lkg_key, e)
+        self._store_query(query, value)
+        return value
+
+    def _load_or_stale(self, name: str, lkg_key: str, loader: Callable[[], Any]) -> Any:
+        """Uncached query with the last-known-good fallback"""
+        return self._load_query(CachedQuery(name, lkg_key), loader)
+
+    def _lookup_many(self, name: str, node_ids: List[str]) -> Tuple[Dict[str, Any], List[str], Optional[Dict[str, str]]]:
+        """Look up per-node cache entries: returns (cached results, missing node ids, keys or None uncached)"""
+        if not self._query_cache_enabled():
+            return {}, list(node_ids), None
+        keys = {node_id: self._query_cache_key(name, node_id=node_id) for node_id in node_ids}
+        cached = cache.get_dict(*keys.values())
+        results = {}
+        missing = []
+        for node_id, key in keys.items():
+            entry = cached.get(key)
+            if entry is not None:
+                results[node_id] = entry['value']
+            else:
+                missing.append(node_id)
+        self._count_cache(name, 'hits', len(results))
+        self._count_cache(name, 'misses', len(missing))
+        return results, missing, keys
+
+    def _store_many(self, name: str, node_ids: List[str], loaded: Dict[str, Any], keys: Optional[Dict[str, str]]):
+        for node_id in node_ids:
+            self.last_known_good.put(self._lkg_key(name, node_id=node_id), loaded.get(node_id))
+        if keys is not None:
+            ttl = current_app.config.get('QUERY_CACHE_TTLS', {}).get(name)
+            cache.set_many({keys[node_id]: {'value': loaded.get(node_id)} for node_id in node_ids}, timeout=ttl)
+
+    def _read_through_many(self, name: str, node_ids: List[str],
+                           loader: Callable[[List[str]], Dict[str, Any]]) -> Dict[str, Any]:
+        """Batch read-through keyed per node: only the missing nodes reach the loader"""
+        results, missing, keys = self._lookup_many(name, node_ids)
+        if missing:
+            try:
+                loaded = self._guarded_call(lambda: loader(missing))
+            except Exception as e:
+                results.update(self._fallback_to_stale_many(name, missing, e))
+                return results
+            self._store_many(name, missing, loaded, keys)
+            results.update({node_id: loaded.get(node_id) for node_id in missing})
+        return results
+
+    # ---- Last-known-good fallback and circuit breaker ----
+    @staticmethod
+    def _lkg_key(name: str, region_id: Optional[str] = None, node_id: Optional[str] = None,
+                 params: str = '') -> str:
+        """Query identity without the cache generation, so it survives invalidation"""
+        return f"{name}:{region_id or '-'}:{node_id or '-'}:{params}"
+
+    def _admit_call(self):
+        """Raise DatabaseUnavailable while the circuit breaker refuses backend calls"""
+        if not self.breaker.allow_request():
+            raise DatabaseUnavailable("Database circuit breaker is open")
+
+    def _settle_call(self, error: Optional[Exception] = None):
+        """Report how a backend call ended; only transport failures count against the breaker"""
+        if error is None or isinstance(error, APIError):
+            # An APIError means the backend answered; the query itself was rejected
+            self.breaker.record_success()
+        elif isinstance(error, TRANSPORT_ERRORS):
+            self.breaker.record_failure()
+        else:
+            # Not connected, or a bug in the loader: says nothing about the backend
+            self.breaker.release()
+
+    def _guarded_call(self, loader: Callable[[], Any]) -> Any:
+        """Run a backend call through the circuit breaker"""
+        self._admit_call()
+        try:
+            value = loader()
+        except Exception as e:
+            self._settle_call(e)
+            raise
+        self._settle_call()
+        return value
+
+    def _stale_max_age(self) -> Optional[float]:
+        return current_app.config.get('STALE_MAX_AGE', 86400) if has_app_context() else None
+
+    def _serve_stale(self, stale: Tuple[Any, float, str]) -> Any:
+        value, age, _ = stale
+        self.last_known_good.note_served()
+        note_stale(age)
+        return value
+
+    def _fallback_to_stale(self, name: str, lkg_key: str, error: Exception) -> Any:
+        """Return the last-known-good value for a failed query, or re-raise the failure"""
+        stale = self.last_known_good.get(lkg_key, self._stale_max_age())
+        if stale is None:
+            raise error
+        logger.info(f"Serving last-known-good {name} ({int(stale[1])}s old): {error}")
+        return self._serve_stale(stale)
+
+    def _fallback_to_stale_many(self, name: str, node_ids: List[str], error: Exception) -> Dict[str, Any]:
+        """Batch variant: falls back only if every node has a last-known-good value"""
+        max_age = self._stale_max_age()
+        stale = {node_id: self.last_known_good.get(self._lkg_key(name, node_id=node_id), max_age)
+                 for node_id in node_ids}
+        if any(entry is None for entry in stale.values()):
+            raise error
+        logger.info(f"Serving last-known-good {name} for {len(node_ids)} nodes: {error}")
+        return {node_id: self._serve_stale(entry) for node_id, entry in stale.items()}
+
+    def _claim_revalidation(self, query: CachedQuery) -> bool:
+        """Whether the caller may refresh this query (at most one refresh per query at a time)"""
+        with self._revalidating_lock:
+            if query.lkg_key in self._revalidating:
+                return False
+            self._revalidating.add(query.lkg_key)
+            return True
+
+    def _end_revalidation(self, query: CachedQuery):
+        with self._revalidating_lock:
+            self._revalidating.discard(query.lkg_key)
+
+    def _revalidate(self, query: CachedQuery, loader: Callable[[], Any]):
+        """Refresh one cached query in the background"""
+        if not self._claim_revalidation(query):
+            return
+        app = current_app._get_current_object()
+
+        def refresh():
+            try:
+                with app.app_context():
+                    self._store_query(query, self._guarded_call(loader))
+            except Exception as e:
+                logger.warning(f"Background refresh of {query.name} failed: {e}")
+            finally:
+                self._end_revalidation(query)
+
+        self._get_executor().submit(refresh)
+
+    def resilience_stats(self) -> Dict[str, Any]:
+        """Return circuit breaker and last-known-good store state"""
+        return {"circuit_breaker": self.breaker.stats(), "last_known_good": self.last_known_good.stats()}
+
+    def _bump_generation(self, scope_key: str):
+        current = cache.get(scope_key) or 0
+        cache.set(scope_key, current + 1, timeout=0)
+
+    def invalidate_node(self, node_id: str, region_id: Optional[str] = None):
+        """Drop cached queries for a node (and its region's node lists, if given)"""
+        if not has_app_context():
+            return
+        self._bump_generation(f"dbq:gen:node:{node_id}")
+        if region_id:
+            self.invalidate_region(region_id)
+
+    def invalidate_region(self, region_id: str):
+        """Drop cached node lists for a region and for headquarters"""
+        if not has_app_context():
+            return
+        self._bump_generation(f"dbq:gen:region:{region_id}")
+        if region_id != ALL_REGIONS:
+            self._bump_generation(f"dbq:gen:region:{ALL_REGIONS}")
+
+    def invalidate_all(self):
+        """Drop every cached query"""
+        if not has_app_context():
+            return
+        self._bump_generation('dbq:gen:all')
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return query cache hit/miss counters per query"""
+        with self._cache_stats_lock:
+            stats = {name: dict(counts) for name, counts in self._cache_stats.items()}
+        for counts in stats.values():
+            total = counts['hits'] + counts['misses']
+            counts['hit_ratio'] = round(counts['hits'] / total, 3) if total else 0.0
+        return stats
+    
+    # ---- Concurrent fan-out ----
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                workers = current_app.config.get('DB_FANOUT_WORKERS', 8) if has_app_context() else 8
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-fanout")
+            return self._executor
+
+    def run_parallel(self, **calls: Callable[[], Any]) -> Dict[str, Any]:
+        """Run independent zero-argument queries concurrently and return their results by name.
+
+        Latency is that of the slowest call rather than the sum. Each call runs
+        inside the caller's app context; the first exception raised is re-raised.
+        """
+        if len(calls) < 2:
+            return {name: call() for name, call in calls.items()}
+
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def run_in_context(call):
+            if app is None:
+                return call(), None
+            with app.app_context():
+                return call(), current_data_age()
+
+        executor = self._get_executor()
+        futures = {name: executor.submit(run_in_context, call) for name, call in calls.items()}
+        results = {}
+        for name, future in futures.items():
+            results[name], age = future.result()
+            if age is not None:
+                # Staleness recorded in a worker's context belongs to this request
+                note_stale(age)
+        return results
+
+    # ---- Local read replica ----
+    def start_replica(self, app):
+        """Open the local replica and keep it synchronized from a background thread"""
+        self.replica.open(app.config.get('REPLICA_PATH', 'replica.sqlite3'))
+        self.replica.start(app, self, app.config.get('REPLICA_SYNC_INTERVAL', 10))
+
+    def sync_replica(self):
+        """Pull new rows into the replica and invalidate what they affect"""
+        if not self._ensure_connected():
+            return
+        batch_size = current_app.config.get('REPLICA_SYNC_BATCH', 1000)
+        touched = self.replica.sync_once(self._require_client(), batch_size,
+                                         current_app.config.get('REPLICA_RESCAN_IDS', 1000))
+        for node_id in touched:
+            self.invalidate_node(node_id)
+        self.refresh_topology()
+
+    # ---- Topology index ----
+    def start_topology_refresh(self, app):
+        """Keep the in-memory topology index fresh from a background thread"""
+        self.topology.start(app, self, app.config.get('TOPOLOGY_REFRESH_INTERVAL', 60))
+
+    def refresh_topology(self):
+        """Reload the topology index, invalidate queries for changed nodes and reconcile the rollup"""
+        store = self.local_backend()
+        if store is None:
+            if not self._ensure_connected():
+                return
+            store = self.supabase_store
+        was_ready = self.topology.ready
+        old = self.topology.snapshot
+        changed_nodes, changed_regions = self.topology.refresh(store)
+        if not was_ready:
+            self.invalidate_all()
+            self.clusters.invalidate()
+            self.tiles.invalidate()
+            self.seed_rollup(store)
+            self.seed_risk(store)
+            return
+        self.tiles.invalidate_changes(old, self.topology.snapshot, changed_nodes)
+        self.rollup.relocate(changed_nodes)
+        if changed_nodes or changed_regions or self._reconcile_due():
+            self.reconcile_rollup(store)
+        for node_id in changed_nodes:
+            self.invalidate_node(node_id)
+        for region_id in changed_regions:
+            self.invalidate_region(region_id)
+        if changed_regions:
+            self.clusters.invalidate(changed_regions | {ALL_REGIONS})
+        if changed_nodes:
+            logger.info(f"Topology index refreshed: {len(changed_nodes)} nodes changed")
+
+    # ---- Writes ----
+    def ingest_node_filter(self, parent_id: Optional[str] = None) -> AbstractSet[str]:
+        """Node ids a batch may report on: the parent and its children, or any known node.
+
+        The topology index is loaded on demand if the background refresh has
+        not loaded it yet; while it cannot be, batches are refused with
+        DatabaseUnavailable rather than accepted unchecked.
+        """
+        if not self.topology.ready:
+            try:
+                self.refresh_topology()
+            except Exception as e:
+                logger.warning(f"Loading the topology for ingestion failed: {e}")
+            if not self.topology.ready:
+                raise DatabaseUnavailable("Node topology is not loaded yet")
+        if parent_id:
+            return {parent_id, *self.topology.children_of(parent_id)}
+        return self.topology.node_ids()
+
+    def write_rows(self, table: str, rows: List[Dict[str, Any]]):
+        """Append validated rows (see app.ingest) with one multi-row write.
+
+        While Supabase is unreachable (or earlier rows are still waiting in
+        the write-ahead log) the batch is appended to the WAL instead, to be
+        replayed in order later. Without a WAL this raises DatabaseUnavailable.
+        The whole batch is written or nothing is.
+        """
+        if not rows:
+            return
+        if self.backend is not None:
+            self.backend.insert_rows(table, rows)
+        elif self.wal is not None and (self.wal.pending or not self.connected):
+            self.wal.append(table, rows)
+            return
+        else:
+            try:
+                self._guarded_call(lambda: self.supabase_store.insert_rows(table, rows))
+            except APIError:
+                # Rejected by the database; logging it locally would not help
+                raise
+            except Exception as e:
+                if self.wal is None:
+                    raise
+                logger.warning(f"Writing {len(rows)} {table} rows to the WAL: {e}")
+                self.wal.append(table, rows)
+                return
+        self._invalidate_written(table, rows)
+
+    def _invalidate_written(self, table: str, rows: List[Dict[str, Any]]):
+        column = WRITE_INVALIDATES.get(table)
+        if column:
+            for node_id in {row[column] for row in rows}:
+                self.invalidate_node(node_id)
+
+    # ---- Write-ahead log ----
+    def enable_wal(self, app):
+        """Log writes to local disk during outages and replay them from a background thread"""
+        if self.wal is None:
+            directory = app.config.get('WAL_DIR', 'wal')
+            if not os.path.isabs(directory):
+                directory = os.path.join(app.instance_path, directory)
+            self.wal = WriteAheadLog(directory,
+                                     app.config.get('WAL_SEGMENT_BYTES', 64 * 1024 * 1024),
+                                     app.config.get('WAL_FSYNC_INTERVAL', 0.05))
+        if not self.wal.running:
+            self.wal.start(app, self, app.config.get('WAL_REPLAY_INTERVAL', 5))
+            atexit.register(self.wal.close)
+
+    def replay_wal(self) -> Dict[str, Any]:
+        """Write everything pending in the WAL to Supabase, in order and in large batches"""
+        batch_rows = current_app.config.get('WAL_REPLAY_BATCH', 5000) if has_app_context() else 5000
+        return self.wal.replay(self._replay_write, batch_rows, dedupe=self._drop_already_written)
+
+    def _replay_write(self, table: str, rows: List[Dict[str, Any]]):
+        id_column = WAL_ROW_KEYS.get(table, (None,))[0]
+        with_ids = [row for row in rows if id_column and row.get(id_column) is not None]
+        without_ids = [row for row in rows if not (id_column and row.get(id_column) is not None)]
+        # Rows that carry their id are upserted, so replaying them twice is harmless
+        if with_ids:
+            self._guarded_call(lambda: self.supabase_store.upsert_rows(table, with_ids))
+        if without_ids:
+            self._guarded_call(lambda: self.supabase_store.insert_rows(table, without_ids))
+        self._invalidate_written(table, rows)
+
+    def _drop_already_written(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Filter out id-less rows already in Supabase (a batch written just before a crash).
+
+        Rows are compared on every column they carry and each stored row
+        accounts for at most one logged row, so distinct readings sharing a
+        timestamp are kept. The stored window is read page by page.
+        """
+        id_column, owner = WAL_ROW_KEYS.get(table, (None, None))
+        pending = [row for row in rows if id_column and row.get(id_column) is None]
+        if not pending:
+            return rows
+        columns = sorted({column for row in pending for column in row} - {id_column})
+        existing: Counter = Counter()
+        for key in {row[owner] for row in pending}:
+            timestamps = [normalize_timestamp(row['timestamp']) for row in pending if row[owner] == key]
+            for stored in self._stored_window(table, key, min(timestamps), max(timestamps)):
+                existing[_row_fingerprint(stored, columns)] += 1
+        kept = []
+        for row in rows:
+            fingerprint = _row_fingerprint(row, columns) if row.get(id_column) is None else None
+            if fingerprint is not None and existing[fingerprint]:
+                existing[fingerprint] -= 1
+            else:
+                kept.append(row)
+        return kept
+
+    def _stored_window(self, table: str, key: str, start: str, end: str):
+        """Yield a node's readings (or a parent's reports) stored within [start, end], one page per call"""
+        store = self.supabase_store
+        if table == 'sensor_readings':
+            cursor = None
+            while True:
+                page = self._guarded_call(lambda: store.node_history(key, PAGE_SIZE, before=cursor,
+                                                                     start=start, end=end))
+                yield from page
+                if len(page) < PAGE_SIZE:
+                    return
+                cursor = (page[-1]['timestamp'], page[-1]['reading_id'])
+        else:
+            offset = 0
+            while True:
+                page = self._guarded_call(lambda: store.parent_node_reports_between(key, start, end, offset))
+                yield from page
+                if len(page) < PAGE_SIZE:
+                    return
+                offset += len(page)
+
+    def ingest(self, table: str, rows: List[Dict[str, Any]]) -> bool:
+        """Queue rows on the write-behind buffer, or write them now when it is not running.
+
+        Accepted rows are handed to the table's listeners (see subscribe).
+        Returns False when the buffer is full and nothing was queued.
+        """
+        if self.write_buffer.running:
+            if not self.write_buffer.offer(table, rows):
+                return False
+        else:
+            self.write_rows(table, rows)
+        self._publish(table, rows)
+        return True
+
+    def subscribe(self, table: str, listener: Callable[[List[Dict[str, Any]]], Any]):
+        """Call listener with every accepted batch of validated rows for table"""
+        self.row_listeners.setdefault(table, []).append(listener)
+
+    def _publish(self, table: str, rows: List[Dict[str, Any]]):
+        for listener in self.row_listeners.get(table, ()):
+            try:
+                listener(rows)
+            except Exception as e:
+                logger.error(f"Ingest listener {getattr(listener, '__qualname__', listener)} failed: {e}")
+
+    # ---- Region rollup ----
+    def seed_rollup(self, store: Optional[StorageBackend] = None):
+        """Load every node's latest danger level into the rollup (ingestion keeps it current)"""
+        try:
+            store = store or self.local_backend() or self.supabase_store
+            self.rollup.seed(store.nodes_with_status(None))
+        except Exception as e:
+            logger.warning(f"Seeding the region rollup failed: {e}")
+
+    def _reconcile_due(self) -> bool:
+        """Whether ROLLUP_RECONCILE_INTERVAL has passed since the rollup was last seeded or reconciled"""
+        interval = current_app.config.get('ROLLUP_RECONCILE_INTERVAL', 600) if has_app_context() else 600
+        last = self.rollup.reconciled_at or self.rollup.seeded_at
+        return last is None or time.time() - last >= interval
+
+    def reconcile_rollup(self, store: Optional[StorageBackend] = None):
+        """Fold readings stored without passing through ingest (Supabase writes, imports) into the rollup"""
+        try:
+            store = store or self.local_backend() or self.supabase_store
+            changed = self.rollup.reconcile(store.nodes_with_status(None))
+            if changed:
+                logger.info(f"Region rollup reconciled: {changed} nodes updated from storage")
+        except Exception as e:
+            logger.warning(f"Reconciling the region rollup failed: {e}")
+
+    # ---- Fire risk ----
+    def start_risk_refresh(self, app):
+        """Rescore every node's fire risk on a schedule, reloading the latest readings from storage"""
+        def reload():
+            with app.app_context():
+                self.seed_risk()
+        self.risk.start(app.config.get('RISK_REFRESH_INTERVAL', 30), reload,
+                        app.config.get('RISK_RELOAD_INTERVAL', 300))
+
+    def seed_risk(self, store: Optional[StorageBackend] = None, batch: int = 5000):
+        """Load the latest reading of every node into the risk engine (newer in-memory readings are kept)"""
+        try:
+            if store is None:
+                store = self.local_backend()
+                if store is None:
+                    if not self._ensure_connected():
+                        return
+                    store = self.supabase_store
+            node_ids = sorted(self.topology.node_ids())
+            readings = []
+            for start in range(0, len(node_ids), batch):
+                readings.extend(store.latest_readings(node_ids[start:start + batch]).values())
+            self.risk.seed(readings)
+        except Exception as e:
+            logger.warning(f"Seeding fire-risk scores failed: {e}")
+
+    def get_risk(self, region_name: str, min_risk: float = 0.0,
+                 limit: int = 100) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """Highest fire-risk nodes of a dashboard region and how many reach min_risk (None: unknown region)"""
+        region_id = self._dashboard_region_id(region_name)
+        if not region_id:
+            return None
+        if region_id == ALL_REGIONS:
+            return self.risk.top(None, min_risk, limit)
+        if self.topology.ready:
+            node_ids = self.topology.node_ids_in_region(region_id)
+        else:
+            node_ids = [node['node_id'] for node in self.get_nodes_for_dashboard(region_name)]
+        return self.risk.top(node_ids, min_risk, limit)
+
+    def region_summary(self, min_level: int = 3) -> List[Dict[str, Any]]:
+        """Per-region danger counts from the rollup, named after REGION_MAPPING"""
+        names = {region_id: name for name, region_id in current_app.config.get('REGION_MAPPING', {}).items()}
+        sizes = self.topology.region_sizes()
+        summary = self.rollup.summary({region_id: sizes.get(region_id, 0) for region_id in {**names, **sizes}},
+                                      min_level)
+        for region in summary:
+            region['region'] = names.get(region['region_id'])
+        return summary
+
+    def start_write_behind(self, app):
+        """Flush ingested rows from a background thread, draining the queue at exit"""
+        if not self.write_buffer.running:
+            self.write_buffer.start(app, self)
+            atexit.register(self.write_buffer.stop, 5)
+
+    def get_all_nodes(self) -> List[Dict[str, Any]]:
+        """Get every node (headquarters view)"""
+        if self.topology.ready:
+            return [dict(node) for node in self.topology.all_nodes()]
+        try:
+            local = self.local_backend()
+            if local is not None:
+                return local.all_nodes()
+            return self._load_or_stale('all_nodes', self._lkg_key('all_nodes'), self.supabase_store.all_nodes)
+        except DatabaseUnavailable:
+            return self._get_mock_nodes()
+        except Exception as e:
+            logger.error(f"Error getting all nodes: {e}")
+            return self._get_mock_nodes()
+
+    def get_node_children(self, parent_id: str) -> List[str]:
+        """Get the child node ids of a parent node"""
+        if self.topology.ready:
+            return self.topology.children_of(parent_id)
+        try:
+            local = self.local_backend()
+            if local is not None:
+                return local.node_children(parent_id)
+            return self._load_or_stale('node_children', self._lkg_key('node_children', node_id=parent_id),
+                                       lambda: self.supabase_store.node_children(parent_id))
+        except DatabaseUnavailable:
+            return []
+        except Exception as e:
+            logger.error(f"Error getting children of {parent_id}: {e}")
+            return []
+
     def get_node_info(self, node_id: str) -> Optional[Dict[str, Any]]:
         """Get node information by ID"""
+        node = self.topology.node(node_id)
+        if node is not None:
+            return dict(node)
         try:
-            if not self.connected:
-                self._initialize_connection()
-                if not self.connected:
-                    return self._get_mock_node_info(node_id)
-            
-            response = self.supabase.table("nodes").select("*").eq("node_id", node_id).execute()
-            return response.data[0] if response.data else None
+            local = self.local_backend()
+            if local is not None:
+                return local.node(node_id)
+            return self._read_through('node_info', lambda: self.supabase_store.node(node_id), node_id=node_id)
+        except DatabaseUnavailable:
+            return self._get_mock_node_info(node_id)
         except Exception as e:
             logger.error(f"Error querying node {node_id}: {e}")
             return self._get_mock_node_info(node_id)
     
-    def get_node_history(self, node_id: str) -> List[Dict[str, Any]]:
-        """Get historical data for a node"""
+    def get_node_history(self, node_id: str, limit: Optional[int] = None, before: Optional[str] = None,
+                         after: Optional[str] = None, start: Optional[str] = None,
+                         end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get historical data for a node, newest first.
+
+        ``before``/``after`` are keyset cursors (see encode_history_cursor) and
+        ``start``/``end`` bound the timestamp range; all are pushed down to the query.
+        Raises ValueError for a malformed cursor.
+        """
+        before_key = decode_history_cursor(before) if before else None
+        after_key = decode_history_cursor(after) if after else None
+        params = f"l={limit}:b={before}:a={after}:f={start}:t={end}"
         try:
-            if not self.connected:
-                self._initialize_connection()
-                if not self.connected:
-                    return self._get_mock_node_history(node_id)
-            
-            response = self.supabase.table("sensor_readings")\
-                .select("*")\
-                .eq("node_id", node_id)\
-                .order("timestamp", desc=True)\
-                .execute()
-            return response.data or []
+            local = self.local_backend()
+            if local is not None:
+                return local.node_history(node_id, limit, before_key, after_key, start, end)
+            return self._read_through(
+                'node_history',
+                lambda: self.supabase_store.node_history(node_id, limit, before_key, after_key, start, end),
+                node_id=node_id, params=params
+            )
+        except DatabaseUnavailable:
+            return self._get_mock_node_history(node_id)[:limit]
         except Exception as e:
             logger.error(f"Error querying history for node {node_id}: {e}")
-            return self._get_mock_node_history(node_id)
+            return self._get_mock_node_history(node_id)[:limit]
+
+    def get_node_history_page(self, node_id: str, limit: int, before: Optional[str] = None,
+                              after: Optional[str] = None, start: Optional[str] = None,
+                              end: Optional[str] = None) -> Dict[str, Any]:
+        """Get one page of history with cursors for the older and newer neighbouring pages"""
+        rows = self.get_node_history(node_id, limit=limit + 1, before=before, after=after, start=start, end=end)
+        has_more = len(rows) > limit
+        if after:
+            # The extra row is the newest one
+            readings = rows[1:] if has_more else rows
+            older = bool(readings)
+            newer = has_more
+        else:
+            readings = rows[:limit]
+            older = has_more
+            newer = bool(before) and bool(readings)
+        return {
+            "readings": readings,
+            "next_cursor": encode_history_cursor(readings[-1]) if older else None,
+            "prev_cursor": encode_history_cursor(readings[0]) if newer else None,
+            "limit": limit,
+        }
+
+    def get_node_history_downsampled(self, node_id: str, mode: str = 'bucket', bucket_seconds: Optional[int] = None,
+                                     max_points: Optional[int] = None, start: Optional[str] = None,
+                                     end: Optional[str] = None) -> Dict[str, Any]:
+        """Get chart-sized history for a node (see app.downsample).
+
+        On Supabase, fixed-resolution buckets are computed in SQL by
+        get_node_history_buckets; other requests are downsampled in-process
+        over the fetched rows. Raises ValueError for invalid arguments.
+        """
+        check_downsample_args(mode, bucket_seconds, max_points)
+        params = f"m={mode}:b={bucket_seconds}:p={max_points}:f={start}:t={end}"
+        max_rows = current_app.config.get('HISTORY_DOWNSAMPLE_MAX_ROWS', 500000)
+        try:
+            local = self.local_backend()
+            if local is not None:
+                return local.node_history_downsampled(node_id, mode, bucket_seconds, max_points, start, end, max_rows)
+            return self._read_through(
+                'node_history_downsampled',
+                lambda: self.supabase_store.node_history_downsampled(
+                    node_id, mode, bucket_seconds, max_points, start, end, max_rows),
+                node_id=node_id, params=params
+            )
+        except DatabaseUnavailable:
+            return downsample(self._get_mock_node_history(node_id), mode, bucket_seconds, max_points)
+        except Exception as e:
+            logger.error(f"Error downsampling history for node {node_id}: {e}")
+            return downsample(self._get_mock_node_history(node_id), mode, bucket_seconds, max_points)
+
+    def get_latest_readings(self, node_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get the newest reading of each node in one query (None for nodes without readings)"""
+        node_ids = list(dict.fromkeys(node_ids or []))
+        if not node_ids:
+            return {}
+        try:
+            local = self.local_backend()
+            if local is not None:
+                return local.latest_readings(node_ids)
+            return self._read_through_many('latest_reading', node_ids, self.supabase_store.latest_readings)
+        except DatabaseUnavailable:
+            return self._get_mock_latest_readings(node_ids)
+        except Exception as e:
+            logger.error(f"Error querying latest readings for {len(node_ids)} nodes: {e}")
+            return self._get_mock_latest_readings(node_ids)
 
     # ---- Normalization helpers for templates and API ----
     def normalize_reading(self, reading: Dict[str, Any]) -> Dict[str, Any]:
@@ -172,47 +1090,33 @@ class DatabaseManager:
     
     def get_nodes_by_region(self, region_id: str) -> List[Dict[str, Any]]:
         """Get all nodes for a specific region"""
+        if self.topology.ready:
+            return [dict(node) for node in self.topology.nodes_in_region(region_id)]
         try:
-            if not self.connected:
-                self._initialize_connection()
-                if not self.connected:
-                    return self._get_mock_nodes()
-            
-            # Get node IDs for this region
-            node_regions = self.supabase.table('node_regions')\
-                .select('node_id')\
-                .eq('region_id', region_id)\
-                .execute()
-            
-            node_ids = [nr['node_id'] for nr in node_regions.data] if node_regions.data else []
-            
-            if not node_ids:
-                return []
-            
-            # Get the actual nodes
-            response = self.supabase.table("nodes")\
-                .select("*")\
-                .in_('node_id', node_ids)\
-                .execute()
-            
-            return response.data or []
+            local = self.local_backend()
+            if local is not None:
+                return local.nodes_by_region(region_id)
+            return self._load_or_stale('nodes_by_region', self._lkg_key('nodes_by_region', region_id=region_id),
+                                       lambda: self.supabase_store.nodes_by_region(region_id))
+        except DatabaseUnavailable:
+            return self._get_mock_nodes()
         except Exception as e:
             logger.error(f"Error getting nodes by region: {e}")
             return self._get_mock_nodes()
     
     def get_node_region(self, node_id: str) -> Optional[str]:
         """Get the region_id for a specific node"""
+        region_id = self.topology.region_of(node_id)
+        if region_id is not None:
+            return region_id
         try:
-            if not self.connected:
-                self._initialize_connection()
-                if not self.connected:
-                    return "FR1"  # Mock region
-            
-            response = self.supabase.table('node_regions')\
-                .select('region_id')\
-                .eq('node_id', node_id)\
-                .execute()
-            return response.data[0]['region_id'] if response.data else None
+            local = self.local_backend()
+            if local is not None:
+                return local.node_region(node_id)
+            return self._read_through('node_region', lambda: self.supabase_store.node_region(node_id),
+                                      node_id=node_id)
+        except DatabaseUnavailable:
+            return "FR1"  # Mock region
         except Exception as e:
             logger.error(f"Error getting node region: {e}")
             return "FR1"
@@ -220,17 +1124,13 @@ class DatabaseManager:
     def get_parent_node_reports(self, parent_id: str) -> List[Dict[str, Any]]:
         """Get reports for a parent node"""
         try:
-            if not self.connected:
-                self._initialize_connection()
-                if not self.connected:
-                    return self._get_mock_parent_reports(parent_id)
-            
-            response = self.supabase.table("Parent_Node_Reports")\
-                .select("*")\
-                .eq("parent_id", parent_id)\
-                .order("timestamp", desc=True)\
-                .execute()
-            return response.data or []
+            local = self.local_backend()
+            if local is not None:
+                return local.parent_node_reports(parent_id)
+            return self._load_or_stale('parent_reports', self._lkg_key('parent_reports', node_id=parent_id),
+                                       lambda: self.supabase_store.parent_node_reports(parent_id))
+        except DatabaseUnavailable:
+            return self._get_mock_parent_reports(parent_id)
         except Exception as e:
             logger.error(f"Error querying Parent_Node_Reports for parent {parent_id}: {e}")
             return self._get_mock_parent_reports(parent_id)
@@ -238,44 +1138,159 @@ class DatabaseManager:
     def get_nodes_for_dashboard(self, region_name: str) -> List[Dict[str, Any]]:
         """Get nodes for dashboard based on region"""
         try:
-            if not self.connected:
-                self._initialize_connection()
-                if not self.connected:
-                    return self._get_mock_nodes()
-            
-            if region_name == 'Αρχηγείο / Ε.Σ.Κ.Ε.ΔΙ.Κ.':
-                # For headquarters, get all nodes without region filtering
-                response = self.supabase.table("nodes")\
-                    .select("node_id, title, location, is_parent, lat, lng")\
-                    .execute()
-            else:
-                # For regional offices, filter by region
-                region_id = self._get_region_id(region_name)
-                if not region_id:
-                    return []
-                
-                # First get all node_ids for this region from node_regions table
-                node_regions = self.supabase.table('node_regions')\
-                    .select('node_id')\
-                    .eq('region_id', region_id)\
-                    .execute()
-                
-                node_ids = [nr['node_id'] for nr in node_regions.data] if node_regions.data else []
-                
-                if not node_ids:
-                    return []
-                
-                # Then get all node details for these node_ids
-                response = self.supabase.table("nodes")\
-                    .select("node_id, title, location, is_parent, lat, lng")\
-                    .in_("node_id", node_ids)\
-                    .execute()
-            
-            return response.data or []
+            region_id = self._dashboard_region_id(region_name)
+            if not region_id:
+                return []
+
+            if self.topology.ready:
+                nodes = self.topology.all_nodes() if region_id == ALL_REGIONS \
+                    else self.topology.nodes_in_region(region_id)
+                return [{field: node.get(field) for field in DASHBOARD_NODE_FIELDS} for node in nodes]
+
+            local = self.local_backend()
+            if local is not None:
+                return self._query_nodes_for_dashboard(local, region_id)
+
+            return self._read_through('nodes_for_dashboard',
+                                      lambda: self._query_nodes_for_dashboard(self.supabase_store, region_id),
+                                      region_id=region_id)
+        except DatabaseUnavailable:
+            return self._get_mock_nodes()
         except Exception as e:
             logger.error(f"Error loading nodes for dashboard: {str(e)}")
             return self._get_mock_nodes()
+
+    @staticmethod
+    def _query_nodes_for_dashboard(store: StorageBackend, region_id: str) -> List[Dict[str, Any]]:
+        if region_id == ALL_REGIONS:
+            return [{field: node.get(field) for field in DASHBOARD_NODE_FIELDS} for node in store.all_nodes()]
+        return store.nodes_by_region(region_id, DASHBOARD_NODE_FIELDS)
     
+    def find_nodes(self, region_name: str, bbox: Optional[BBox] = None, lat: Optional[float] = None,
+                   lng: Optional[float] = None, k: Optional[int] = None,
+                   radius_km: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Dashboard nodes of a region inside a bbox, or nearest-k / within a radius of a point.
+
+        Proximity results are nearest first and carry ``distance_km``.
+        """
+        region_id = self._dashboard_region_id(region_name)
+        if not region_id:
+            return []
+        scope = None if region_id == ALL_REGIONS else region_id
+        if self.topology.ready:
+            if bbox is not None:
+                return [self._dashboard_fields(node) for node in self.topology.nodes_in_bbox(bbox, scope)]
+            if k is None:
+                matches = self.topology.nodes_within(lat, lng, radius_km, scope)
+            else:
+                matches = self.topology.nearest_nodes(lat, lng, k, scope, radius_km)
+            return [{**self._dashboard_fields(node), "distance_km": round(distance, 3)}
+                    for node, distance in matches]
+
+        # No topology snapshot yet: index this region's nodes for the one query
+        nodes = {node['node_id']: node for node in self.get_nodes_for_dashboard(region_name)}
+        spatial = GridIndex.from_nodes(nodes.values())
+        if bbox is not None:
+            return [nodes[node_id] for node_id in sorted(spatial.bbox(bbox))]
+        matches = spatial.within(lat, lng, radius_km) if k is None else spatial.nearest(lat, lng, k, radius_km)
+        return [{**nodes[node_id], "distance_km": round(distance, 3)} for node_id, distance in matches]
+
+    def get_clusters(self, region_name: str, bbox: BBox, zoom: int) -> List[Dict[str, Any]]:
+        """Map clusters (count, centroid, max danger level) and single nodes in a viewport"""
+        region_id = self._dashboard_region_id(region_name)
+        if not region_id:
+            return []
+
+        def latest_danger() -> Dict[str, Optional[int]]:
+            return {node['node_id']: node.get('danger_level') for node in self.get_nodes_with_status(region_name)}
+
+        index = self.clusters.get(region_id, lambda: self.get_nodes_for_dashboard(region_name), latest_danger)
+        return index.clusters(bbox, zoom)
+
+    def get_alerts(self, region_name: str, state: str = 'active', severity: Optional[str] = None,
+                   node_id: Optional[str] = None, limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        """Alerts visible to a dashboard region (None: unknown region)"""
+        region_id = self._dashboard_region_id(region_name)
+        if not region_id:
+            return None
+        scope = None if region_id == ALL_REGIONS else region_id
+        return self.alerts.alerts(scope, state=state, severity=severity, node_id=node_id, limit=limit)
+
+    def get_anomalies(self, region_name: str, state: str = 'active',
+                      limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        """Sensor anomalies visible to a dashboard region (None: unknown region)"""
+        region_id = self._dashboard_region_id(region_name)
+        if not region_id:
+            return None
+        scope = None if region_id == ALL_REGIONS else region_id
+        return self.anomalies.anomalies_for(scope, state=state, limit=limit)
+
+    def correlate_detection(self, lat: float, lng: float, confidence: float,
+                            temperature: Optional[float] = None) -> Dict[str, Any]:
+        """Check a drone fire detection against the sensors around it (see CorrelationEngine)"""
+        now = time.time()
+        snapshot = self.topology.snapshot
+        # Before the first topology load there is no spatial index to consult
+        nearby = snapshot.spatial.within(lat, lng, self.correlation.radius_km) if snapshot else []
+        evidence = self.anomalies.evidence([node_id for node_id, _ in nearby], now - self.correlation.window_seconds)
+        return self.correlation.correlate(lat, lng, confidence, temperature, nearby, evidence,
+                                          self.topology.region_of, now)
+
+    def get_incidents(self, region_name: str, since: int = 0,
+                      limit: int = 100) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """Confirmed incidents changed after a stream cursor, for a dashboard region (None: unknown region)"""
+        region_id = self._dashboard_region_id(region_name)
+        if not region_id:
+            return None
+        scope = None if region_id == ALL_REGIONS else region_id
+        return self.correlation.incidents(since, scope, limit)
+
+    def get_tile(self, region_name: str, z: int, x: int, y: int) -> Optional[Tile]:
+        """Encoded GeoJSON tile of a region's nodes and links, with its ETag (None: unknown region)"""
+        region_id = self._dashboard_region_id(region_name)
+        if not region_id:
+            return None
+        scope = None if region_id == ALL_REGIONS else region_id
+        snapshot = self.topology.snapshot
+        if snapshot is not None:
+            return self.tiles.get(snapshot, z, x, y, scope)
+        # No topology snapshot yet: build this tile from the region's nodes without caching it
+        nodes = {node['node_id']: node for node in self.get_nodes_for_dashboard(region_name)}
+        return encode_tile(build_tile(TopologySnapshot(nodes, {}, {}), z, x, y))
+
+    @staticmethod
+    def _dashboard_fields(node: Dict[str, Any]) -> Dict[str, Any]:
+        return {field: node.get(field) for field in DASHBOARD_NODE_FIELDS}
+
+    def get_nodes_with_status(self, region_name: str) -> List[Dict[str, Any]]:
+        """Get dashboard nodes joined with their latest danger level in one query"""
+        try:
+            region_id = self._dashboard_region_id(region_name)
+            if not region_id:
+                return []
+
+            scope = None if region_id == ALL_REGIONS else region_id
+            local = self.local_backend()
+            if local is not None:
+                return local.nodes_with_status(scope)
+
+            return self._read_through('nodes_with_status',
+                                      lambda: self.supabase_store.nodes_with_status(scope),
+                                      region_id=region_id)
+        except DatabaseUnavailable:
+            return [{**node, "danger_level": None, "last_updated": None} for node in self._get_mock_nodes()]
+        except Exception as e:
+            logger.error(f"Error loading nodes with latest status: {str(e)}")
+            return [{**node, "danger_level": None, "last_updated": None} for node in self._get_mock_nodes()]
+    
+    def _dashboard_region_id(self, region_name: str) -> Optional[str]:
+        """Region scope for a dashboard region name: ALL_REGIONS for headquarters, None if unknown"""
+        if region_name == 'Αρχηγείο / Ε.Σ.Κ.Ε.ΔΙ.Κ.':
+            # For headquarters, get all nodes without region filtering
+            return ALL_REGIONS
+        # For regional offices, filter by region
+        return self._get_region_id(region_name)
+
     def _get_region_id(self, region_name: str) -> Optional[str]:
         """Get region ID from region name"""
         if region_name == "Αρχηγείο / Ε.Σ.Κ.Ε.ΔΙ.Κ.":
@@ -324,6 +1339,10 @@ class DatabaseManager:
             }
         ]
     
+    def _get_mock_latest_readings(self, node_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Return mock latest readings"""
+        return {node_id: self._get_mock_node_history(node_id)[0] for node_id in node_ids}
+    
     def _get_mock_parent_reports(self, parent_id: str) -> List[Dict[str, Any]]:
         """Return mock parent reports"""
         return [
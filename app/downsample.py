@@ -0,0 +1,206 @@
+"""
+Time-series downsampling for sensor history
+
+Reduces raw `sensor_readings` rows to chart-sized series, either as fixed
+time buckets (min/max/avg/last per field) or with Largest-Triangle-Three-
+Buckets (LTTB), which keeps the visual shape of each series.
+"""
+import re
+import math
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Tuple
+import numpy as np
+
+# Numeric sensor fields that are downsampled
+SERIES_FIELDS = ("temperature", "humidity", "gas_and_smoke", "wind_speed", "danger_level")
+
+# Aggregates reported per field in bucket mode
+BUCKET_AGGREGATES = ("min", "max", "avg", "last")
+
+DOWNSAMPLE_MODES = ("bucket", "lttb")
+
+_RESOLUTION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parse_resolution(value: Optional[str]) -> Optional[int]:
+    """Convert a resolution such as ``15m`` or ``1h`` to seconds, raising ValueError if invalid"""
+    if not value:
+        return None
+    match = re.fullmatch(r"\s*(\d+)\s*([smhd])\s*", value.lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid resolution: {value} (expected e.g. 1m, 15m, 1h, 1d)")
+    return int(match.group(1)) * _RESOLUTION_UNITS[match.group(2)]
+
+def _to_epoch(timestamp: Any) -> float:
+    if not timestamp:
+        return math.nan
+    parsed = datetime.fromisoformat(str(timestamp).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def _to_iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+def _to_float(value: Any) -> float:
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _none_if_nan(value: float, digits: int = 3) -> Optional[float]:
+    return None if math.isnan(value) else round(float(value), digits)
+
+def readings_to_arrays(readings: List[Dict[str, Any]]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Columnarize readings into a sorted epoch array and one float array per field"""
+    count = len(readings)
+    times = np.fromiter((_to_epoch(r.get("timestamp")) for r in readings), dtype=float, count=count)
+    columns = {
+        field: np.fromiter(
+            (_to_float(r.get(field, r.get("smoke_level")) if field == "gas_and_smoke" else r.get(field))
+             for r in readings),
+            dtype=float, count=count
+        )
+        for field in SERIES_FIELDS
+    }
+    keep = ~np.isnan(times)
+    order = np.argsort(times[keep], kind="stable")
+    return times[keep][order], {field: values[keep][order] for field, values in columns.items()}
+
+def bucket_seconds_for(times: np.ndarray, max_points: int) -> int:
+    """Smallest whole-second bucket width that yields at most max_points buckets"""
+    if times.size < 2:
+        return 1
+    span = float(times[-1] - times[0])
+    # Buckets are epoch-aligned, so the span may straddle one extra bucket boundary
+    return int(span // max(1, max_points - 1)) + 1
+
+def downsample_buckets(times: np.ndarray, columns: Dict[str, np.ndarray], bucket_seconds: int) -> List[Dict[str, Any]]:
+    """Aggregate readings into fixed-width time buckets (min/max/avg/last per field)"""
+    if times.size == 0:
+        return []
+
+    bucket_ids = np.floor(times / bucket_seconds).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+    ends = np.r_[starts[1:], times.size]
+    counts = ends - starts
+    positions = np.arange(times.size)
+
+    aggregates = {}
+    for field, values in columns.items():
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+        valid_counts = np.add.reduceat(valid.astype(np.int64), starts)
+        sums = np.add.reduceat(filled, starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mins = np.fmin.reduceat(values, starts)
+            maxs = np.fmax.reduceat(values, starts)
+            avgs = np.where(valid_counts > 0, sums / np.maximum(valid_counts, 1), np.nan)
+        last_index = np.maximum.reduceat(np.where(valid, positions, -1), starts)
+        lasts = np.where(last_index >= 0, values[np.maximum(last_index, 0)], np.nan)
+        aggregates[field] = (mins, maxs, avgs, lasts)
+
+    points = []
+    for i, bucket_id in enumerate(bucket_ids[starts]):
+        point = {"timestamp": _to_iso(float(bucket_id) * bucket_seconds), "count": int(counts[i])}
+        for field, (mins, maxs, avgs, lasts) in aggregates.items():
+            point[field] = {
+                "min": _none_if_nan(mins[i]),
+                "max": _none_if_nan(maxs[i]),
+                "avg": _none_if_nan(avgs[i]),
+                "last": _none_if_nan(lasts[i]),
+            }
+        points.append(point)
+    return points
+
+def lttb_indices(times: np.ndarray, values: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices selected by Largest-Triangle-Three-Buckets for one series"""
+    size = times.size
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = size - 1
+    # Interior points are split into threshold - 2 buckets of equal size
+    every = (size - 2) / (threshold - 2)
+
+    previous = 0
+    for i in range(threshold - 2):
+        start = int(math.floor(i * every)) + 1
+        end = int(math.floor((i + 1) * every)) + 1
+        # Average of the following bucket (the last point for the final bucket)
+        next_end = min(int(math.floor((i + 2) * every)) + 1, size)
+        avg_t = times[end:next_end].mean()
+        avg_v = values[end:next_end].mean()
+
+        t, v = times[start:end], values[start:end]
+        areas = np.abs((times[previous] - avg_t) * (v - values[previous])
+                       - (times[previous] - t) * (avg_v - values[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+def downsample_lttb(times: np.ndarray, columns: Dict[str, np.ndarray], max_points: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Reduce each field to at most max_points shape-preserving points"""
+    series = {}
+    for field, values in columns.items():
+        valid = ~np.isnan(values)
+        field_times, field_values = times[valid], values[valid]
+        indices = lttb_indices(field_times, field_values, max_points)
+        series[field] = [
+            {"timestamp": _to_iso(float(field_times[i])), "value": round(float(field_values[i]), 3)}
+            for i in indices
+        ]
+    return series
+
+def check_downsample_args(mode: str, bucket_seconds: Optional[int], max_points: Optional[int]):
+    """Raise ValueError unless the arguments describe a valid downsampling request"""
+    if mode not in DOWNSAMPLE_MODES:
+        raise ValueError(f"Invalid downsampling mode: {mode} (expected one of {', '.join(DOWNSAMPLE_MODES)})")
+    if max_points is not None and max_points < 2:
+        raise ValueError("max_points must be at least 2")
+    if mode == "lttb" and not max_points:
+        raise ValueError("LTTB downsampling requires max_points")
+    if mode == "bucket" and not bucket_seconds and not max_points:
+        raise ValueError("Bucket downsampling requires resolution or max_points")
+
+def downsample(readings: List[Dict[str, Any]], mode: str = "bucket", bucket_seconds: Optional[int] = None,
+               max_points: Optional[int] = None) -> Dict[str, Any]:
+    """Downsample raw readings, returning a JSON-ready result.
+
+    Bucket mode needs ``bucket_seconds`` or ``max_points``; LTTB mode needs ``max_points``.
+    """
+    check_downsample_args(mode, bucket_seconds, max_points)
+
+    times, columns = readings_to_arrays(readings)
+    result: Dict[str, Any] = {"mode": mode, "source_count": int(times.size)}
+    if mode == "lttb":
+        result["max_points"] = max_points
+        result["series"] = downsample_lttb(times, columns, max_points)
+        return result
+
+    if not bucket_seconds:
+        bucket_seconds = bucket_seconds_for(times, max_points)
+    result["bucket_seconds"] = bucket_seconds
+    result["points"] = downsample_buckets(times, columns, bucket_seconds)
+    return result
+
+def buckets_from_rows(rows: List[Dict[str, Any]], bucket_seconds: int) -> Dict[str, Any]:
+    """Shape rows from the get_node_history_buckets SQL function like downsample() output"""
+    points = []
+    for row in rows:
+        point = {"timestamp": str(row.get("bucket")), "count": int(row.get("count") or 0)}
+        for field in SERIES_FIELDS:
+            point[field] = {
+                aggregate: _none_if_nan(_to_float(row.get(f"{field}_{aggregate}")))
+                for aggregate in BUCKET_AGGREGATES
+            }
+        points.append(point)
+    return {
+        "mode": "bucket",
+        "source_count": sum(point["count"] for point in points),
+        "bucket_seconds": bucket_seconds,
+        "points": points,
+    }
@@ -6,6 +6,13 @@ from flask import render_template, current_app
 def register_error_handlers(app):
     """Register error handlers with the Flask app"""
     
+    @app.errorhandler(400)
+    def bad_request_error(error):
+        """Handle 400 errors"""
+        current_app.logger.warning(f"400 error: {error}")
+        return render_template('error.html', 
+                             error_message="Invalid request parameters."), 400
+
     @app.errorhandler(404)
     def not_found_error(error):
         """Handle 404 errors"""
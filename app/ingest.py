@@ -0,0 +1,218 @@
+"""
+Validation for batches of sensor readings and reports sent by parent nodes
+
+Rows are checked against the `sensor_readings` / `Parent_Node_Reports`
+columns in one pass and normalized to a uniform shape (every column present,
+timestamps naive UTC), so a whole batch can be written with a single
+multi-row INSERT. Ids are assigned by the database.
+"""
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple, Iterable, Callable, AbstractSet
+from app.storage import normalize_timestamp
+
+# numeric(5, 2) columns of sensor_readings
+NUMERIC_FIELDS = ("temperature", "humidity", "gas_and_smoke", "wind_speed", "flora_density", "slope")
+NUMERIC_LIMIT = 1000
+
+# danger_level scale (app.rollup.DANGER_LEVELS)
+DANGER_LEVEL_MIN, DANGER_LEVEL_MAX = 0, 5
+
+# Every column written by ingestion, in table order
+READING_FIELDS = ("node_id", "timestamp", "danger_level") + NUMERIC_FIELDS[:3] + ("rain",) \
+    + NUMERIC_FIELDS[3:] + ("vegetation_type",)
+
+REPORT_FIELDS = ("parent_id", "child_id", "timestamp", "data_received", "data_valid", "status_message")
+
+STRING_LIMITS = {"node_id": 20, "vegetation_type": 50, "parent_id": 20, "child_id": 20, "status_message": 500}
+
+# Errors reported back per batch; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+def _string(field: str, value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    if len(value) > STRING_LIMITS[field]:
+        raise ValueError(f"{field} longer than {STRING_LIMITS[field]} characters")
+    return value
+
+def _number(field: str, value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    kind = type(value)
+    if kind is not float and kind is not int:
+        if kind is not str:
+            raise ValueError(f"{field} must be a number")
+        value = float(value)
+    # NaN fails the comparison as well
+    if not -NUMERIC_LIMIT < value < NUMERIC_LIMIT:
+        raise ValueError(f"{field} out of range")
+    return round(value, 2)
+
+def _integer(field: str, value: Any, low: int, high: int) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or int(value) != float(value):
+        raise ValueError(f"{field} must be an integer")
+    if not low <= int(value) <= high:
+        raise ValueError(f"{field} must be between {low} and {high}")
+    return int(value)
+
+def _boolean(field: str, value: Any) -> Optional[bool]:
+    if value is None or isinstance(value, bool):
+        return value
+    if value in (0, 1):
+        return bool(value)
+    raise ValueError(f"{field} must be a boolean")
+
+def _check_fields(raw: Any, kind: str, fields: Tuple[str, ...], id_column: str):
+    if not isinstance(raw, dict):
+        raise ValueError(f"{kind} must be an object")
+    unknown = set(raw) - set(fields)
+    if unknown:
+        if id_column in unknown:
+            raise ValueError(f"{id_column} is assigned by the database")
+        raise ValueError(f"unknown field(s): {', '.join(sorted(unknown))}")
+
+def _required(field: str, raw: Dict[str, Any]) -> str:
+    value = _string(field, raw.get(field))
+    if not value:
+        raise ValueError(f"{field} is required")
+    return value
+
+def _timestamp(raw: Dict[str, Any], now: str) -> str:
+    try:
+        value = raw.get("timestamp")
+        return normalize_timestamp(value) if value is not None else now
+    except (TypeError, ValueError):
+        raise ValueError("timestamp must be ISO-8601")
+
+def validate_reading(raw: Any, now: str) -> Dict[str, Any]:
+    """Return a normalized reading row, raising ValueError for the first problem found"""
+    _check_fields(raw, "reading", READING_FIELDS, "reading_id")
+    row = {"node_id": _required("node_id", raw), "timestamp": _timestamp(raw, now),
+           "danger_level": _integer("danger_level", raw.get("danger_level"), DANGER_LEVEL_MIN, DANGER_LEVEL_MAX)}
+    for field in NUMERIC_FIELDS:
+        row[field] = _number(field, raw.get(field))
+    row["rain"] = _boolean("rain", raw.get("rain"))
+    row["vegetation_type"] = _string("vegetation_type", raw.get("vegetation_type"))
+    return {field: row[field] for field in READING_FIELDS}
+
+def validate_report(raw: Any, now: str) -> Dict[str, Any]:
+    """Return a normalized parent report row, raising ValueError for the first problem found"""
+    _check_fields(raw, "report", REPORT_FIELDS, "report_id")
+    return {
+        "parent_id": _required("parent_id", raw),
+        "child_id": _required("child_id", raw),
+        "timestamp": _timestamp(raw, now),
+        "data_received": _boolean("data_received", raw.get("data_received")),
+        "data_valid": _boolean("data_valid", raw.get("data_valid")),
+        "status_message": _string("status_message", raw.get("status_message")),
+    }
+
+def _validate_batch(items: Iterable[Any], validate: Callable[[Any, str], Dict[str, Any]],
+                    node_fields: Tuple[str, ...], allowed_nodes: Optional[AbstractSet[str]]
+                    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    now = datetime.utcnow().isoformat()
+    rows: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    rejected = 0
+    for index, raw in enumerate(items):
+        try:
+            row = validate(raw, now)
+            if allowed_nodes is not None:
+                for field in node_fields:
+                    if row[field] not in allowed_nodes:
+                        raise ValueError(f"node {row[field]} is not reported by this parent")
+        except (TypeError, ValueError) as e:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"index": index, "error": str(e)})
+            continue
+        rows.append(row)
+    return rows, errors, rejected
+
+def validate_readings(readings: Iterable[Any], allowed_nodes: Optional[AbstractSet[str]] = None
+                      ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    """Validate a batch, returning (rows, reported errors, rejected count).
+
+    With ``allowed_nodes`` readings for any other node are rejected.
+    """
+    return _validate_batch(readings, validate_reading, ("node_id",), allowed_nodes)
+
+def validate_reports(reports: Iterable[Any], allowed_nodes: Optional[AbstractSet[str]] = None
+                     ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    """Validate a batch of parent reports, like validate_readings"""
+    return _validate_batch(reports, validate_report, ("parent_id", "child_id"), allowed_nodes)
+
+def parse_batch(body: bytes, content_type: str, key: str = "readings") -> Tuple[List[Any], Optional[str]]:
+    """Decode a JSON array, a {"<key>": [...], "batch_id": ...} object or NDJSON.
+
+    Returns (readings, batch_id from the body); raises ValueError on malformed input.
+    """
+    text = body.decode("utf-8")
+    if "ndjson" in content_type or "jsonlines" in content_type or "x-jsonl" in content_type:
+        lines = [line for line in text.splitlines() if line.strip()]
+        try:
+            # One decoder pass over the whole batch instead of one per line
+            readings = json.loads("[" + ",".join(lines) + "]")
+            if len(readings) == len(lines):
+                return readings, None
+        except json.JSONDecodeError:
+            pass
+        for number, line in enumerate(lines, start=1):
+            try:
+                json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid NDJSON in record {number}: {e.msg}")
+        raise ValueError("Invalid NDJSON: one JSON value per line expected")
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e.msg}")
+    if isinstance(payload, list):
+        return payload, None
+    if isinstance(payload, dict) and isinstance(payload.get(key), list):
+        batch_id = payload.get("batch_id")
+        return payload[key], str(batch_id) if batch_id is not None else None
+    raise ValueError(f"Expected a JSON array of {key}, an object with a {key} array, or NDJSON")
+
+class BatchLedger:
+    """Acknowledgements of recent batches, so a resent batch is not written twice"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._acks: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight: set = set()
+
+    def begin(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        """Claim a batch key; returns the earlier ack if it was already processed.
+
+        Raises KeyError if the same batch is being processed concurrently.
+        """
+        with self._lock:
+            if key in self._acks:
+                self._acks.move_to_end(key)
+                return self._acks[key]
+            if key in self._in_flight:
+                raise KeyError(key)
+            self._in_flight.add(key)
+            return None
+
+    def finish(self, key: Tuple[str, str], ack: Optional[Dict[str, Any]]):
+        """Record the ack of a claimed batch (None when it failed and may be retried)"""
+        with self._lock:
+            self._in_flight.discard(key)
+            if ack is None:
+                return
+            self._acks[key] = ack
+            while len(self._acks) > self.max_entries:
+                self._acks.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._acks)
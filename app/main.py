@@ -2,8 +2,10 @@
 Main blueprint for web routes and pages
 """
 import random
-from flask import Blueprint, render_template, redirect, url_for, request, session, flash, abort, current_app
-from app.database import db_manager
+from flask import Blueprint, render_template, redirect, url_for, request, session, flash, abort, current_app, \
+    jsonify, make_response
+from werkzeug.exceptions import HTTPException
+from app.database import db_manager, parse_time_bound
 
 main = Blueprint('main', __name__)
 
@@ -69,19 +71,47 @@ def dashboard():
         return redirect(url_for('main.login'))
 
     try:
-        nodes = db_manager.get_nodes_for_dashboard(session['region'])
-        if nodes is None:
-            abort(500)
-
-        current_app.logger.info(f"Nodes data from database: {nodes}")
-        return render_template('index.html', 
-                             region=session['region'], 
-                             nodes=nodes, 
-                             db_connected=db_manager.connected)
+        # Map data is loaded by the page itself: clusters, then /tiles once zoomed in
+        return render_template('index.html',
+                             region=session['region'],
+                             db_connected=db_manager.connected,
+                             cluster_max_zoom=current_app.config.get('CLUSTER_MAX_ZOOM', 14))
     except Exception as e:
         current_app.logger.error(f"Error loading dashboard: {str(e)}")
         abort(500)
 
+@main.route('/tiles/<int:z>/<int:x>/<int:y>')
+def tile(z, x, y):
+    """GeoJSON tile of the region's nodes (Points) and parent-child links (LineStrings)"""
+    region_name = request.args.get('region') or session.get('region')
+    if not region_name:
+        return jsonify({"error": "region not specified"}), 400
+    min_zoom = current_app.config.get('TILE_MIN_ZOOM', 10)
+    max_zoom = current_app.config.get('TILE_MAX_ZOOM', 20)
+    if not min_zoom <= z <= max_zoom:
+        return jsonify({"error": f"tiles are served for zoom {min_zoom}-{max_zoom}"}), 400
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        abort(404)
+
+    try:
+        encoded = db_manager.get_tile(region_name, z, x, y)
+    except Exception as e:
+        current_app.logger.error(f"Error building tile {z}/{x}/{y}: {str(e)}")
+        return jsonify({"error": "Failed to build tile", "details": str(e)}), 500
+    if encoded is None:
+        return jsonify({"error": "unknown region", "region": region_name}), 404
+
+    body, etag = encoded
+    if etag.strip('"') in request.if_none_match:
+        response = make_response('', 304)
+    else:
+        response = make_response(body)
+        response.headers['Content-Type'] = 'application/geo+json'
+    response.headers['ETag'] = etag
+    # Revalidate every time: unchanged tiles cost a 304, changed ones arrive at once
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @main.route('/node/<node_id>')
 def node(node_id):
     """Individual node details page"""
@@ -90,7 +120,13 @@ def node(node_id):
 
     try:
         supabase_node_id = f"N{node_id.replace('.', '_')}"
-        node_info = db_manager.get_node_info(supabase_node_id)
+        # Info, region and latest reading are independent: fetch them concurrently
+        results = db_manager.run_parallel(
+            info=lambda: db_manager.get_node_info(supabase_node_id),
+            region=lambda: db_manager.get_node_region(supabase_node_id),
+            history=lambda: db_manager.get_node_history(supabase_node_id, limit=1)
+        )
+        node_info = results["info"]
 
         # Ensure the node exists
         if not node_info:
@@ -98,7 +134,7 @@ def node(node_id):
 
         # Secure region validation
         current_region_id = db_manager._get_region_id(session['region'])
-        node_region = db_manager.get_node_region(supabase_node_id)
+        node_region = results["region"]
 
         # Allow access if:
         # 1. User is from headquarters (current_region_id is None)
@@ -108,7 +144,7 @@ def node(node_id):
             abort(404, description=f"Node {node_id} not found in this region")
 
         # Merge with normalized latest readings
-        history_data = db_manager.get_node_history(supabase_node_id)
+        history_data = results["history"]
         latest_data = db_manager.normalize_reading(history_data[0]) if history_data else {}
         merged = db_manager.build_node_view(node_info, latest_data)
 
@@ -128,11 +164,7 @@ def nodes_info():
     try:
         if region_id is None:
             # Headquarters case - get all nodes
-            if not db_manager.connected:
-                nodes = db_manager._get_mock_nodes()
-            else:
-                response = db_manager.supabase.table("nodes").select("*").execute()
-                nodes = response.data or []
+            nodes = db_manager.get_all_nodes()
         else:
             # Regional case - get nodes by region
             nodes = db_manager.get_nodes_by_region(region_id)
@@ -168,24 +200,44 @@ def parent_node(node_id):
 
 @main.route('/history/<node_id>')
 def history(node_id):
-    """Node history page"""
+    """Node history page, one keyset-paginated page at a time"""
     try:
-        node_info = db_manager.get_node_info(node_id)
+        limit = min(current_app.config.get('HISTORY_PAGE_SIZE', 200),
+                    current_app.config.get('HISTORY_MAX_PAGE_SIZE', 1000))
+        try:
+            start = parse_time_bound(request.args.get('from'))
+            end = parse_time_bound(request.args.get('to'))
+            before, after = request.args.get('before'), request.args.get('after')
+            # Node info and the history page are independent: fetch them concurrently
+            results = db_manager.run_parallel(
+                info=lambda: db_manager.get_node_info(node_id),
+                page=lambda: db_manager.get_node_history_page(node_id, limit, before=before, after=after,
+                                                              start=start, end=end)
+            )
+        except ValueError as e:
+            abort(400, description=str(e))
+
+        page = results["page"]
+        history_data = page["readings"]
+        node_info = results["info"]
 
         # Fallback: if no metadata, use latest sensor reading
         if not node_info:
-            history_data = db_manager.get_node_history(node_id)
             if history_data:
                 node_info = {"node_id": node_id, **history_data[0]}
             else:
                 abort(404, description=f"Node {node_id} not found")
-        else:
-            history_data = db_manager.get_node_history(node_id)
 
         return render_template('history.html',
                              node=node_info,
                              readings=db_manager.normalize_readings(history_data) or [],
+                             next_cursor=page["next_cursor"],
+                             prev_cursor=page["prev_cursor"],
+                             range_from=request.args.get('from', ''),
+                             range_to=request.args.get('to', ''),
                              message=None if history_data else "No historical data available")
+    except HTTPException:
+        raise
     except Exception as e:
         current_app.logger.error(f"Error in /history/{node_id}: {str(e)}")
         abort(500)
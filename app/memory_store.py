@@ -0,0 +1,225 @@
+"""
+In-memory storage backend
+
+Keeps every table in Python structures, with readings and reports held per
+node in (timestamp, id) order so history pages are found by bisection. Meant
+for tests, benchmarks and offline load testing; nothing is persisted.
+"""
+import bisect
+import threading
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+from app.storage import StorageBackend, Cursor, normalize_timestamp
+
+# Primary key column(s) per table
+PRIMARY_KEYS = {
+    "nodes": ("node_id",),
+    "fire_regions": ("region_id",),
+    "node_regions": ("node_id",),
+    "node_hierarchy": ("parent_id", "child_id"),
+    "sensor_readings": ("reading_id",),
+    "Parent_Node_Reports": ("report_id",),
+    "metadata": ("metadata_id",),
+    "drones": ("drone_id",),
+}
+
+# Tables the topology index is built from
+TOPOLOGY_TABLES = ("nodes", "node_regions", "node_hierarchy")
+
+# Tables whose single-column key is a serial id
+SERIAL_TABLES = ("sensor_readings", "Parent_Node_Reports", "metadata")
+
+class _SortedRows:
+    """Rows of one node kept sorted by (timestamp, id)"""
+
+    def __init__(self, id_column: str):
+        self.id_column = id_column
+        self.keys: List[Tuple[str, int]] = []
+        self.rows: List[Dict[str, Any]] = []
+
+    def key(self, row: Dict[str, Any]) -> Tuple[str, int]:
+        return (row.get("timestamp") or "", row[self.id_column])
+
+    def add(self, row: Dict[str, Any]):
+        key = self.key(row)
+        index = bisect.bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            self.rows[index] = row
+            return
+        self.keys.insert(index, key)
+        self.rows.insert(index, row)
+
+    def remove(self, row: Dict[str, Any]):
+        index = bisect.bisect_left(self.keys, self.key(row))
+        if index < len(self.keys) and self.keys[index] == self.key(row):
+            del self.keys[index]
+            del self.rows[index]
+
+class MemoryStore(StorageBackend):
+    """Dictionary-backed implementation of StorageBackend"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._tables: Dict[str, Dict[Tuple[Any, ...], Dict[str, Any]]] = {table: {} for table in PRIMARY_KEYS}
+        self._readings: Dict[str, _SortedRows] = {}
+        self._reports: Dict[str, _SortedRows] = {}
+        self._lock = threading.RLock()
+        # Next serial id per table, for rows inserted without one
+        self._next_ids: Dict[str, int] = {}
+        self._topology_writes = 0
+
+    # ---- Writes ----
+    def upsert_rows(self, table: str, rows: List[Dict[str, Any]]):
+        keys = PRIMARY_KEYS[table]
+        with self._lock:
+            if table in TOPOLOGY_TABLES:
+                self._topology_writes += 1
+            target = self._tables[table]
+            for row in rows:
+                row = dict(row)
+                if "timestamp" in row:
+                    row["timestamp"] = normalize_timestamp(row["timestamp"])
+                pk = tuple(row[key] for key in keys)
+                previous = target.get(pk)
+                if previous is not None:
+                    self._unindex(table, previous)
+                target[pk] = row
+                self._index(table, row)
+                if table in SERIAL_TABLES and pk[0] >= self._next_ids.get(table, 1):
+                    self._next_ids[table] = pk[0] + 1
+
+    def insert_rows(self, table: str, rows: List[Dict[str, Any]]):
+        id_column = PRIMARY_KEYS[table][0]
+        with self._lock:
+            next_id = self._next_ids.get(table, 1)
+            assigned = []
+            for row in rows:
+                if row.get(id_column) is None:
+                    row = dict(row, **{id_column: next_id})
+                    next_id += 1
+                assigned.append(row)
+            self.upsert_rows(table, assigned)
+
+    def replace_rows(self, table: str, rows: List[Dict[str, Any]]):
+        with self._lock:
+            if table in TOPOLOGY_TABLES:
+                self._topology_writes += 1
+            self._tables[table] = {}
+            if table == "sensor_readings":
+                self._readings = {}
+            elif table == "Parent_Node_Reports":
+                self._reports = {}
+            self.upsert_rows(table, rows)
+
+    def _index(self, table: str, row: Dict[str, Any]):
+        if table == "sensor_readings":
+            self._readings.setdefault(row.get("node_id"), _SortedRows("reading_id")).add(row)
+        elif table == "Parent_Node_Reports":
+            self._reports.setdefault(row.get("parent_id"), _SortedRows("report_id")).add(row)
+
+    def _unindex(self, table: str, row: Dict[str, Any]):
+        if table == "sensor_readings" and row.get("node_id") in self._readings:
+            self._readings[row["node_id"]].remove(row)
+        elif table == "Parent_Node_Reports" and row.get("parent_id") in self._reports:
+            self._reports[row["parent_id"]].remove(row)
+
+    def topology_version(self) -> Optional[str]:
+        with self._lock:
+            return str(self._topology_writes)
+
+    def count(self, table: str) -> int:
+        return len(self._tables[table])
+
+    # ---- Topology ----
+    def all_nodes(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for _, row in sorted(self._tables["nodes"].items())]
+
+    def node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        row = self._tables["nodes"].get((node_id,))
+        return dict(row) if row else None
+
+    def node_regions(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"node_id": row["node_id"], "region_id": row.get("region_id")}
+                    for row in self._tables["node_regions"].values()]
+
+    def hierarchy(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self._tables["node_hierarchy"].values()]
+
+    def node_children(self, parent_id: str) -> List[str]:
+        with self._lock:
+            return sorted(child for parent, child in self._tables["node_hierarchy"] if parent == parent_id)
+
+    def node_region(self, node_id: str) -> Optional[str]:
+        row = self._tables["node_regions"].get((node_id,))
+        return row.get("region_id") if row else None
+
+    def _region_node_ids(self, region_id: str) -> List[str]:
+        return sorted(row["node_id"] for row in self._tables["node_regions"].values()
+                      if row.get("region_id") == region_id)
+
+    def nodes_by_region(self, region_id: str, fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            nodes = [self._tables["nodes"][(node_id,)] for node_id in self._region_node_ids(region_id)
+                     if (node_id,) in self._tables["nodes"]]
+        if fields:
+            return [{field: node.get(field) for field in fields} for node in nodes]
+        return [dict(node) for node in nodes]
+
+    def nodes_with_status(self, region_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        nodes = self.all_nodes() if region_id is None else self.nodes_by_region(region_id)
+        latest = self.latest_readings([node["node_id"] for node in nodes])
+        result = []
+        for node in nodes:
+            reading = latest.get(node["node_id"]) or {}
+            result.append({
+                "node_id": node["node_id"], "title": node.get("title"), "location": node.get("location"),
+                "is_parent": node.get("is_parent"), "lat": node.get("lat"), "lng": node.get("lng"),
+                "danger_level": reading.get("danger_level"), "last_updated": reading.get("timestamp"),
+            })
+        return result
+
+    # ---- Readings and reports ----
+    def node_history(self, node_id: str, limit: Optional[int] = None, before: Optional[Cursor] = None,
+                     after: Optional[Cursor] = None, start: Optional[str] = None,
+                     end: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            series = self._readings.get(node_id)
+            if series is None:
+                return []
+            # Slice [low, high) of the ascending (timestamp, reading_id) order
+            low, high = 0, len(series.keys)
+            if start:
+                low = max(low, bisect.bisect_left(series.keys, (normalize_timestamp(start), -1)))
+            if end:
+                high = min(high, bisect.bisect_right(series.keys, (normalize_timestamp(end), float("inf"))))
+            if after:
+                low = max(low, bisect.bisect_right(series.keys, (normalize_timestamp(after[0]), after[1])))
+            if before:
+                high = min(high, bisect.bisect_left(series.keys, (normalize_timestamp(before[0]), before[1])))
+            if low >= high:
+                return []
+            if after:
+                # Oldest rows past the cursor, returned newest first
+                stop = min(high, low + limit) if limit else high
+                return [dict(row) for row in reversed(series.rows[low:stop])]
+            begin = max(low, high - limit) if limit else low
+            return [dict(row) for row in reversed(series.rows[begin:high])]
+
+    def latest_readings(self, node_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        with self._lock:
+            latest = {}
+            for node_id in node_ids:
+                series = self._readings.get(node_id)
+                latest[node_id] = dict(series.rows[-1]) if series and series.rows else None
+            return latest
+
+    def parent_node_reports(self, parent_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            series = self._reports.get(parent_id)
+            return [dict(row) for row in reversed(series.rows)] if series else []
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "nodes": self.count("nodes"), "readings": self.count("sensor_readings")}
@@ -0,0 +1,176 @@
+"""
+Local read replica of the Supabase tables
+
+ReplicaSync mirrors `nodes`, `node_regions`, `node_hierarchy`,
+`sensor_readings` and `Parent_Node_Reports` into a SQLiteStore. Topology
+tables are copied whole; readings and reports are pulled incrementally past
+a persisted reading_id / report_id watermark. Serial ids are handed out
+before commit, so a row can become visible after a higher id was already
+pulled; every sync re-checks a trailing window of ids below the watermark
+and fetches the ones still missing locally. Once the first sync has
+completed, DatabaseManager serves its reads from the local file and only the
+sync loop talks to Supabase.
+"""
+import time
+import logging
+import threading
+from typing import Optional, List, Dict, Any, Set
+from app.sqlite_store import SQLiteStore
+from app.supabase_store import fetch_all, id_chunks, PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Tables copied in full on every sync: table -> primary key order
+FULL_SYNC_TABLES = {
+    "nodes": "node_id",
+    "node_regions": "node_id",
+    "node_hierarchy": "parent_id,child_id",
+}
+
+# Append-only tables pulled past a watermark: table -> serial id column
+INCREMENTAL_TABLES = {
+    "sensor_readings": "reading_id",
+    "Parent_Node_Reports": "report_id",
+}
+
+class ReplicaSync:
+    """Keeps a SQLiteStore in step with Supabase from a background thread"""
+
+    def __init__(self):
+        self.store: Optional[SQLiteStore] = None
+        self._ready = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._sync_lock = threading.Lock()
+        self.last_sync: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.rows_synced = 0
+        self.late_rows = 0
+
+    @property
+    def ready(self) -> bool:
+        """True once the local copy holds a complete snapshot"""
+        return self._ready
+
+    def open(self, path: str):
+        """Open (or create) the replica database; an earlier completed sync makes it ready at once"""
+        if self.store is not None:
+            return
+        store = SQLiteStore(path)
+        store.create_schema()
+        self.store = store
+        self._ready = store.get_state('synced_at') is not None
+
+    # ---- Sync ----
+    def sync_once(self, client, batch_size: int = 1000, rescan_ids: int = 1000) -> Set[str]:
+        """Pull changes from Supabase and return the node ids with new readings or reports.
+
+        rescan_ids is the trailing window below each watermark checked for
+        rows that committed after a higher id had already been pulled.
+        """
+        with self._sync_lock:
+            for table, order in FULL_SYNC_TABLES.items():
+                self.store.replace_rows(table, fetch_all(client, table, order, page_size=batch_size))
+
+            touched: Set[str] = set()
+            for table, id_column in INCREMENTAL_TABLES.items():
+                touched |= self._sync_late(client, table, id_column, rescan_ids)
+                touched |= self._sync_incremental(client, table, id_column, batch_size)
+
+            self.store.set_state('synced_at', time.time())
+            self.last_sync = time.time()
+            self.last_error = None
+            self._ready = True
+            return touched
+
+    def _sync_incremental(self, client, table: str, id_column: str, batch_size: int) -> Set[str]:
+        watermark_key = f"watermark:{table}"
+        watermark = self.store.get_state(watermark_key, 0)
+        touched: Set[str] = set()
+        while True:
+            rows = client.table(table).select("*")\
+                .gt(id_column, watermark)\
+                .order(id_column)\
+                .limit(batch_size)\
+                .execute().data or []
+            if not rows:
+                break
+            watermark = rows[-1][id_column]
+            # Rows and the advanced watermark commit together, so a crash never skips rows
+            self.store.upsert_rows(table, rows, {watermark_key: watermark})
+            self.rows_synced += len(rows)
+            touched.update(row.get('node_id') or row.get('parent_id') for row in rows)
+            if len(rows) < batch_size:
+                break
+        touched.discard(None)
+        return touched
+
+    def _sync_late(self, client, table: str, id_column: str, window: int) -> Set[str]:
+        """Fetch rows in the trailing window that are missing locally (committed out of id order)"""
+        watermark = self.store.get_state(f"watermark:{table}", 0)
+        low = max(0, watermark - window)
+        if window <= 0 or watermark <= low:
+            return set()
+        remote: Set[int] = set()
+        cursor = low
+        while True:
+            # Only the ids are compared; ordered keyset pages keep each response under the row cap
+            page = client.table(table).select(id_column)\
+                .gt(id_column, cursor)\
+                .lte(id_column, watermark)\
+                .order(id_column)\
+                .limit(PAGE_SIZE)\
+                .execute().data or []
+            remote.update(row[id_column] for row in page)
+            if len(page) < PAGE_SIZE:
+                break
+            cursor = page[-1][id_column]
+        missing = sorted(remote - self.store.ids_between(table, id_column, low, watermark))
+        touched: Set[str] = set()
+        for chunk in id_chunks(missing):
+            rows = client.table(table).select("*").in_(id_column, chunk).execute().data or []
+            self.store.upsert_rows(table, rows)
+            self.late_rows += len(rows)
+            self.rows_synced += len(rows)
+            touched.update(row.get('node_id') or row.get('parent_id') for row in rows)
+        touched.discard(None)
+        return touched
+
+    def stats(self) -> Dict[str, Any]:
+        if self.store is None:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "ready": self.ready,
+            "path": self.store.path,
+            "last_sync_age_seconds": round(time.time() - self.last_sync, 1) if self.last_sync else None,
+            "last_error": self.last_error,
+            "rows_synced": self.rows_synced,
+            "late_rows": self.late_rows,
+            "watermarks": {table: self.store.get_state(f"watermark:{table}", 0) for table in INCREMENTAL_TABLES},
+        }
+
+    # ---- Background sync ----
+    def start(self, app, db_manager, interval: float):
+        """Start the background sync thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(app, db_manager, interval),
+            name="replica-sync", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, app, db_manager, interval: float):
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    db_manager.sync_replica()
+                except Exception as e:
+                    self.last_error = str(e)
+                    logger.warning(f"Replica sync failed: {e}")
+            self._stop.wait(interval)
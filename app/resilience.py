@@ -0,0 +1,148 @@
+"""
+Degraded-mode helpers for database outages
+
+LastKnownGoodStore keeps the most recent successful result of every query so
+that stale real data can be served (marked with its age) instead of mock data
+while Supabase is unreachable. CircuitBreaker stops issuing queries against a
+failing backend until a cool-down period has passed.
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+import httpx
+from flask import g, has_app_context
+
+# Response headers describing served stale data
+DATA_AGE_HEADER = 'X-Data-Age'
+STALE_WARNING = '110 - "Response is Stale"'
+
+# Failures that say the backend is unreachable or too slow, as opposed to a rejected query or a bug
+TRANSPORT_ERRORS = (httpx.TransportError, ConnectionError, TimeoutError)
+
+class LastKnownGoodStore:
+    """Bounded in-process map of query identity -> (value, stored_at, generation)"""
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.served = 0
+
+    def put(self, key: str, value: Any, generation: str = ''):
+        with self._lock:
+            self._entries[key] = (value, time.time(), generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Tuple[Any, float, str]]:
+        """Return (value, age_seconds, generation), or None if absent or older than max_age"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at, generation = entry
+        age = time.time() - stored_at
+        if max_age is not None and age > max_age:
+            return None
+        return value, age, generation
+
+    def note_served(self):
+        with self._lock:
+            self.served += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "stale_served": self.served}
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures; half-open admits one trial call after the cool-down"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.time() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Whether a backend call may be attempted now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.time() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a call that proved nothing about the backend, freeing the half-open trial slot"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.trips += 1
+                self._state = self.OPEN
+                self._opened_at = time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "trips": self.trips,
+                "retry_in_seconds": round(max(0.0, self._opened_at + self.reset_timeout - time.time()), 1)
+                if state == self.OPEN else None,
+            }
+
+# ---- Per-request staleness tracking ----
+def note_stale(age: float):
+    """Record that the current request is being answered with data age seconds old"""
+    if has_app_context():
+        g.data_age = max(g.get('data_age', 0.0), age)
+
+def current_data_age() -> Optional[float]:
+    return g.get('data_age') if has_app_context() else None
+
+def add_staleness_headers(response):
+    """after_request hook: advertise the age of stale data used to build the response"""
+    age = current_data_age()
+    if age is not None:
+        response.headers[DATA_AGE_HEADER] = str(int(age))
+        response.headers['Warning'] = STALE_WARNING
+    return response
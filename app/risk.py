@@ -0,0 +1,203 @@
+"""
+Fire-risk scores computed over the latest reading of every node at once
+
+The latest weather and fuel values of each node are kept in column arrays
+(one slot per node, updated in place as readings are ingested) and the whole
+network is rescored with NumPy on a schedule. The score follows the Canadian
+Fire Weather Index's Initial Spread Index: fine-fuel moisture is estimated
+from temperature and humidity (the FFMC equilibrium moisture content, without
+the day-to-day carry-over), combined with the FWI wind function, then scaled
+by fuel load (flora density and vegetation type) and a slope spread factor
+that doubles every 10 degrees. The result is mapped to 0-100.
+"""
+import time
+import logging
+import threading
+from typing import Optional, List, Dict, Any, Iterable, Tuple, Callable
+import numpy as np
+from app.storage import normalize_timestamp
+
+logger = logging.getLogger(__name__)
+
+INPUTS = ("temperature", "humidity", "wind_speed", "rain", "flora_density", "slope", "fuel")
+
+# Relative flammability of the vegetation types in sensor_readings
+VEGETATION_FUEL = {"Coniferous": 1.0, "Maquis": 0.95, "Mixed": 0.85, "Phrygana": 0.8,
+                   "Grassland": 0.75, "Deciduous": 0.6}
+DEFAULT_FUEL = 0.8
+
+# Upper bounds (exclusive) of the risk classes on the 0-100 scale
+RISK_CLASSES = ((20, "low"), (40, "moderate"), (60, "high"), (80, "very_high"), (float("inf"), "extreme"))
+
+# Spread index giving a risk of 63
+RISK_SCALE = 30.0
+
+# Fine fuel moisture (%) assumed while it rains
+WET_FUEL_MOISTURE = 35.0
+
+def fire_risk(temperature: np.ndarray, humidity: np.ndarray, wind_speed: np.ndarray, rain: np.ndarray,
+              flora_density: np.ndarray, slope: np.ndarray, fuel: np.ndarray) -> np.ndarray:
+    """0-100 fire risk per element; NaN where temperature or humidity is missing.
+
+    wind_speed in km/h, flora_density in percent, slope in degrees. Missing
+    wind, rain, density, slope and fuel fall back to neutral values.
+    """
+    humidity = np.clip(humidity, 0, 100)
+    # Equilibrium moisture content of fine fuels (FFMC drying curve)
+    moisture = (0.942 * humidity ** 0.679 + 11 * np.exp((humidity - 100) / 10)
+                + 0.18 * (21.1 - temperature) * (1 - np.exp(-0.115 * humidity)))
+    moisture = np.where(np.nan_to_num(rain) > 0, np.maximum(moisture, WET_FUEL_MOISTURE), moisture)
+    moisture = np.clip(moisture, 0, 250)
+    fine_fuel = 91.9 * np.exp(-0.1386 * moisture) * (1 + moisture ** 5.31 / 4.93e7)
+    spread = 0.208 * np.exp(0.05039 * np.nan_to_num(wind_speed)) * fine_fuel
+    load = np.clip(np.nan_to_num(flora_density, nan=50.0), 0, 100) / 100 * np.nan_to_num(fuel, nan=DEFAULT_FUEL)
+    slope_factor = np.exp(0.069 * np.clip(np.nan_to_num(slope), 0, 60))
+    # ~50 for 30°C, 30% humidity and 20 km/h over dense forest; saturates towards 100
+    return 100 * (1 - np.exp(-spread * load * slope_factor / RISK_SCALE))
+
+def risk_class(score: Optional[float]) -> Optional[str]:
+    if score is None:
+        return None
+    for bound, name in RISK_CLASSES:
+        if score < bound:
+            return name
+    return None
+
+class RiskEngine:
+    """Latest inputs of every node in column arrays, rescored in one vectorized pass"""
+
+    def __init__(self, capacity: int = 1024):
+        self._slots: Dict[str, int] = {}
+        self._node_ids: List[str] = []
+        self._timestamps: List[Optional[str]] = []
+        self._columns = {name: np.full(capacity, np.nan) for name in INPUTS}
+        self._lock = threading.Lock()
+        self._scores = np.empty(0)
+        self._scored_ids: List[str] = []
+        self._scored_timestamps: List[Optional[str]] = []
+        self.computed_at: Optional[float] = None
+        self.compute_ms: Optional[float] = None
+        self.readings_seen = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _slot(self, node_id: str) -> int:
+        slot = self._slots.get(node_id)
+        if slot is None:
+            slot = self._slots[node_id] = len(self._node_ids)
+            self._node_ids.append(node_id)
+            self._timestamps.append(None)
+            capacity = len(self._columns["temperature"])
+            if slot >= capacity:
+                for name, column in self._columns.items():
+                    grown = np.full(capacity * 2, np.nan)
+                    grown[:capacity] = column
+                    self._columns[name] = grown
+        return slot
+
+    def _store(self, row: Dict[str, Any], timestamp: str) -> bool:
+        slot = self._slot(row["node_id"])
+        if self._timestamps[slot] is not None and timestamp < self._timestamps[slot]:
+            return False
+        self._timestamps[slot] = timestamp
+        columns = self._columns
+        for name in INPUTS[:-1]:
+            value = row.get(name)
+            columns[name][slot] = np.nan if value is None else float(value)
+        vegetation = row.get("vegetation_type")
+        columns["fuel"][slot] = VEGETATION_FUEL.get(vegetation, DEFAULT_FUEL) if vegetation else np.nan
+        return True
+
+    # ---- Updates ----
+    def observe(self, rows: Iterable[Dict[str, Any]]):
+        """Keep the newest sensor_readings values of each node (scored on the next refresh)"""
+        with self._lock:
+            for row in rows:
+                self.readings_seen += 1
+                if row.get("node_id") and row.get("timestamp"):
+                    self._store(row, row["timestamp"])
+
+    def seed(self, readings: Iterable[Optional[Dict[str, Any]]]):
+        """Load latest readings (see latest_readings) and score them"""
+        with self._lock:
+            for row in readings:
+                if row and row.get("node_id") and row.get("timestamp"):
+                    self._store(row, normalize_timestamp(row["timestamp"]))
+        self.refresh()
+
+    def refresh(self):
+        """Rescore every node from its latest inputs"""
+        started = time.perf_counter()
+        with self._lock:
+            count = len(self._node_ids)
+            inputs = {name: column[:count].copy() for name, column in self._columns.items()}
+            node_ids, timestamps = list(self._node_ids), list(self._timestamps)
+        scores = fire_risk(**inputs)
+        with self._lock:
+            self._scores, self._scored_ids, self._scored_timestamps = scores, node_ids, timestamps
+            self.computed_at = time.time()
+            self.compute_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    # ---- Queries ----
+    def _entry(self, position: int) -> Dict[str, Any]:
+        score = float(self._scores[position])
+        return {"node_id": self._scored_ids[position], "risk": round(score, 1), "class": risk_class(score),
+                "timestamp": self._scored_timestamps[position]}
+
+    def top(self, node_ids: Optional[Iterable[str]] = None, min_risk: float = 0.0,
+            limit: int = 100) -> Tuple[List[Dict[str, Any]], int]:
+        """Highest-risk nodes (of node_ids, or every node) and how many scored at least min_risk"""
+        with self._lock:
+            scores = self._scores
+            if node_ids is None:
+                positions = np.arange(len(scores))
+            else:
+                scored = len(scores)
+                positions = np.fromiter((slot for slot in map(self._slots.get, node_ids)
+                                         if slot is not None and slot < scored), dtype=np.int64)
+            candidates = scores[positions]
+            keep = candidates >= min_risk
+            positions, candidates = positions[keep], candidates[keep]
+            if len(positions) > limit:
+                chosen = np.argpartition(-candidates, limit - 1)[:limit]
+                positions, candidates = positions[chosen], candidates[chosen]
+            order = positions[np.argsort(-candidates, kind="stable")]
+            return [self._entry(position) for position in order], int(keep.sum())
+
+    def risk_of(self, node_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            slot = self._slots.get(node_id)
+            if slot is None or slot >= len(self._scores) or np.isnan(self._scores[slot]):
+                return None
+            return self._entry(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            scored = int(np.count_nonzero(~np.isnan(self._scores)))
+            return {"nodes": len(self._node_ids), "scored": scored, "readings_seen": self.readings_seen,
+                    "computed_at": self.computed_at, "compute_ms": self.compute_ms}
+
+    # ---- Scheduled refresh ----
+    def start(self, interval: float, reload: Optional[Callable[[], None]] = None, reload_interval: float = 0):
+        """Rescore every interval seconds from a background thread (idempotent); every reload_interval
+        seconds reload() runs first, to pick up readings that were stored without being observed"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval, reload, reload_interval),
+                                        name="risk-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, interval: float, reload: Optional[Callable[[], None]], reload_interval: float):
+        reloaded = time.monotonic()
+        while not self._stop.wait(interval):
+            try:
+                if reload is not None and time.monotonic() - reloaded >= reload_interval:
+                    reloaded = time.monotonic()
+                    reload()
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Risk refresh failed: {e}")
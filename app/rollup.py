@@ -0,0 +1,182 @@
+"""
+Per-region danger-level rollup maintained from incoming readings
+
+Each region keeps how many of its nodes are at each danger level (by their
+latest reading), which node has gone longest without reporting, and the
+nodes that have not reported at all. A new reading moves its node from one
+danger bucket to another and pushes its timestamp on the region's min-heap
+(older entries are discarded lazily): logarithmic work per reading, and a
+summary costs the same for ten nodes or a hundred thousand.
+
+Ingestion keeps the rollup current between reconciliations against storage,
+which pick up readings written by other paths (parents writing to Supabase
+directly, the bulk importer).
+"""
+import time
+import heapq
+import threading
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable, Iterable, Tuple
+from app.storage import normalize_timestamp
+
+DANGER_LEVELS = range(0, 6)
+UNKNOWN = "unknown"
+
+class RegionRollup:
+    """Danger counts and reporting order of one region's nodes"""
+
+    def __init__(self):
+        self.counts: Dict[Any, int] = {level: 0 for level in DANGER_LEVELS}
+        self.counts[UNKNOWN] = 0
+        self.reporting = 0
+        # (timestamp, node_id) min-heap; entries no longer matching a node's latest reading are skipped
+        self.heap: List[Tuple[str, str]] = []
+
+    def max_danger(self) -> Optional[int]:
+        for level in reversed(DANGER_LEVELS):
+            if self.counts[level]:
+                return level
+        return None
+
+def _bucket(level: Any) -> Any:
+    if level is None:
+        return UNKNOWN
+    try:
+        return max(DANGER_LEVELS.start, min(int(level), DANGER_LEVELS.stop - 1))
+    except (TypeError, ValueError):
+        return UNKNOWN
+
+class DangerRollup:
+    """Latest danger level of every node, rolled up per region"""
+
+    def __init__(self, region_of: Callable[[str], Optional[str]]):
+        self.region_of = region_of
+        # node_id -> (danger bucket, timestamp, region_id)
+        self._latest: Dict[str, Tuple[Any, str, Optional[str]]] = {}
+        self._regions: Dict[Optional[str], RegionRollup] = {}
+        self._lock = threading.Lock()
+        self.readings_seen = 0
+        self.readings_applied = 0
+        self.seeded_at: Optional[float] = None
+        self.reconciled_at: Optional[float] = None
+
+    def _region(self, region_id: Optional[str]) -> RegionRollup:
+        region = self._regions.get(region_id)
+        if region is None:
+            region = self._regions[region_id] = RegionRollup()
+        return region
+
+    def _apply(self, node_id: str, level: Any, timestamp: str, region_id: Optional[str]) -> bool:
+        bucket = _bucket(level)
+        previous = self._latest.get(node_id)
+        if previous is not None:
+            if timestamp < previous[1] or previous == (bucket, timestamp, region_id):
+                return False
+            old = self._regions[previous[2]]
+            old.counts[previous[0]] -= 1
+            old.reporting -= 1
+        region = self._region(region_id)
+        region.counts[bucket] += 1
+        region.reporting += 1
+        heapq.heappush(region.heap, (timestamp, node_id))
+        self._latest[node_id] = (bucket, timestamp, region_id)
+        return True
+
+    def _stalest(self, region_id: Optional[str], region: RegionRollup) -> Optional[Tuple[str, str]]:
+        """(timestamp, node_id) of the region's oldest latest reading, dropping outdated heap entries"""
+        heap = region.heap
+        if len(heap) > 2 * region.reporting + 64:
+            region.heap = heap = [(latest[1], node_id) for node_id, latest in self._latest.items()
+                                  if latest[2] == region_id]
+            heapq.heapify(heap)
+        while heap:
+            timestamp, node_id = heap[0]
+            latest = self._latest.get(node_id)
+            if latest is not None and latest[1] == timestamp and latest[2] == region_id:
+                return timestamp, node_id
+            heapq.heappop(heap)
+        return None
+
+    # ---- Updates ----
+    def observe(self, rows: Iterable[Dict[str, Any]]):
+        """Fold sensor_readings rows in; readings older than a node's latest are ignored"""
+        with self._lock:
+            for row in rows:
+                self.readings_seen += 1
+                node_id, timestamp = row.get("node_id"), row.get("timestamp")
+                if not node_id or not timestamp:
+                    continue
+                if self._apply(node_id, row.get("danger_level"), timestamp, self.region_of(node_id)):
+                    self.readings_applied += 1
+
+    def seed(self, statuses: Iterable[Dict[str, Any]]):
+        """Start over from nodes joined with their latest reading (see nodes_with_status)"""
+        with self._lock:
+            self._latest.clear()
+            self._regions.clear()
+            self._merge(statuses)
+            self.seeded_at = time.time()
+
+    def reconcile(self, statuses: Iterable[Dict[str, Any]]) -> int:
+        """Fold in stored latest readings newer than what the rollup has; returns how many changed"""
+        with self._lock:
+            changed = self._merge(statuses)
+            self.reconciled_at = time.time()
+            return changed
+
+    def _merge(self, statuses: Iterable[Dict[str, Any]]) -> int:
+        changed = 0
+        for status in statuses:
+            if status.get("last_updated"):
+                changed += self._apply(status["node_id"], status.get("danger_level"),
+                                       normalize_timestamp(status["last_updated"]), self.region_of(status["node_id"]))
+        return changed
+
+    def relocate(self, node_ids: Iterable[str]):
+        """Move nodes whose region changed in the topology"""
+        with self._lock:
+            for node_id in node_ids:
+                previous = self._latest.get(node_id)
+                region_id = self.region_of(node_id)
+                if previous is None or previous[2] == region_id:
+                    continue
+                old = self._regions[previous[2]]
+                old.counts[previous[0]] -= 1
+                old.reporting -= 1
+                self._latest.pop(node_id)
+                self._apply(node_id, previous[0] if previous[0] != UNKNOWN else None, previous[1], region_id)
+
+    # ---- Queries ----
+    def summary(self, region_sizes: Dict[str, int], min_level: int = 3,
+                now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Per region: nodes at each level, at or above min_level, max danger and the stalest node"""
+        now = now or datetime.utcnow()
+        result = []
+        with self._lock:
+            for region_id in sorted(set(region_sizes) | {r for r in self._regions if r is not None}):
+                region = self._regions.get(region_id) or RegionRollup()
+                reporting = region.reporting
+                stalest = None
+                oldest = self._stalest(region_id, region)
+                if oldest is not None:
+                    timestamp, node_id = oldest
+                    stalest = {"node_id": node_id, "timestamp": timestamp,
+                               "age_seconds": round((now - datetime.fromisoformat(timestamp)).total_seconds())}
+                result.append({
+                    "region_id": region_id,
+                    "nodes": max(region_sizes.get(region_id, 0), reporting),
+                    "reporting": reporting,
+                    "never_reported": max(region_sizes.get(region_id, 0) - reporting, 0),
+                    "danger_levels": {str(level): region.counts[level] for level in DANGER_LEVELS},
+                    "unknown_danger": region.counts[UNKNOWN],
+                    "at_or_above": sum(region.counts[level] for level in DANGER_LEVELS if level >= min_level),
+                    "max_danger": region.max_danger(),
+                    "stalest": stalest,
+                })
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"nodes": len(self._latest), "regions": len(self._regions),
+                    "readings_seen": self.readings_seen, "readings_applied": self.readings_applied,
+                    "seeded": self.seeded_at is not None, "reconciled_at": self.reconciled_at}
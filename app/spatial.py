@@ -0,0 +1,177 @@
+"""
+Uniform-grid spatial index over node coordinates
+
+Nodes are bucketed into square lat/lng cells, so a bounding-box, radius or
+nearest-k query only looks at the cells it overlaps instead of every node.
+Distances are great-circle kilometres.
+"""
+import math
+from typing import Optional, List, Dict, Tuple, Iterable, Callable
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# (min_lng, min_lat, max_lng, max_lat), the GeoJSON / Leaflet toBBoxString() order
+BBox = Tuple[float, float, float, float]
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def parse_bbox(value: str) -> BBox:
+    """Parse "minLng,minLat,maxLng,maxLat", raising ValueError if malformed"""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError(f"Invalid bbox: {value} (expected minLng,minLat,maxLng,maxLat)")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise ValueError(f"Invalid bbox: {value} (expected minLng,minLat,maxLng,maxLat)")
+    return min_lng, min_lat, max_lng, max_lat
+
+def coordinates(node: Dict) -> Optional[Tuple[float, float]]:
+    """(lat, lng) of a node row, None when missing or not numeric"""
+    try:
+        lat, lng = float(node["lat"]), float(node["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if math.isnan(lat) or math.isnan(lng):
+        return None
+    return lat, lng
+
+class GridIndex:
+    """Immutable point index: cell (row, col) -> [(lat, lng, key), ...]"""
+
+    def __init__(self, points: Iterable[Tuple[str, float, float]], cell_degrees: float = 0.05):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, str]]] = {}
+        self._count = 0
+        self._max_abs_lat = 0.0
+        for key, lat, lng in points:
+            self._cells.setdefault(self._cell(lat, lng), []).append((lat, lng, key))
+            self._max_abs_lat = max(self._max_abs_lat, abs(lat))
+            self._count += 1
+        if self._cells:
+            rows = [row for row, _ in self._cells]
+            cols = [col for _, col in self._cells]
+            self._bounds = (min(rows), min(cols), max(rows), max(cols))
+        else:
+            self._bounds = (0, 0, -1, -1)
+
+    @classmethod
+    def from_nodes(cls, nodes: Iterable[Dict], cell_degrees: float = 0.05) -> "GridIndex":
+        """Index node rows by node_id, skipping rows without coordinates"""
+        points = []
+        for node in nodes:
+            position = coordinates(node)
+            if position is not None:
+                points.append((node["node_id"], position[0], position[1]))
+        return cls(points, cell_degrees)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    def _cells_in(self, min_row: int, min_col: int, max_row: int, max_col: int):
+        """Occupied cells in a row/col range (whichever of range or occupied cells is smaller)"""
+        min_row, min_col = max(min_row, self._bounds[0]), max(min_col, self._bounds[1])
+        max_row, max_col = min(max_row, self._bounds[2]), min(max_col, self._bounds[3])
+        if min_row > max_row or min_col > max_col:
+            return
+        if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self._cells):
+            for (row, col), points in self._cells.items():
+                if min_row <= row <= max_row and min_col <= col <= max_col:
+                    yield points
+            return
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                points = self._cells.get((row, col))
+                if points:
+                    yield points
+
+    # ---- Queries ----
+    def bbox(self, bbox: BBox, accept: Optional[Callable[[str], bool]] = None) -> List[str]:
+        """Keys of the points inside the box (edges included)"""
+        min_lng, min_lat, max_lng, max_lat = bbox
+        min_row, min_col = self._cell(min_lat, min_lng)
+        max_row, max_col = self._cell(max_lat, max_lng)
+        found = []
+        for points in self._cells_in(min_row, min_col, max_row, max_col):
+            for lat, lng, key in points:
+                if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng and (accept is None or accept(key)):
+                    found.append(key)
+        return found
+
+    def within(self, lat: float, lng: float, radius_km: float,
+               accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """(key, distance_km) of the points within radius_km, nearest first"""
+        dlat = radius_km / KM_PER_DEGREE
+        dlng = dlat / max(math.cos(math.radians(min(abs(lat) + dlat, 89.0))), 0.01)
+        min_row, min_col = self._cell(lat - dlat, lng - dlng)
+        max_row, max_col = self._cell(lat + dlat, lng + dlng)
+        found = []
+        for points in self._cells_in(min_row, min_col, max_row, max_col):
+            for point_lat, point_lng, key in points:
+                distance = haversine_km(lat, lng, point_lat, point_lng)
+                if distance <= radius_km and (accept is None or accept(key)):
+                    found.append((key, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    def nearest(self, lat: float, lng: float, k: int, max_km: Optional[float] = None,
+                accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """(key, distance_km) of the k nearest points, searching outward ring by ring"""
+        if k <= 0 or not self._cells:
+            return []
+        center_row, center_col = self._cell(lat, lng)
+        min_row, min_col, max_row, max_col = self._bounds
+        # Rings are clamped to the occupied bounds: the first one that reaches them, the last that covers them
+        first_ring = max(min_row - center_row, center_row - max_row, min_col - center_col, center_col - max_col, 0)
+        max_ring = max(abs(center_row - min_row), abs(center_row - max_row),
+                       abs(center_col - min_col), abs(center_col - max_col))
+        # Longitude differences are at most this wide before wrapping round the antimeridian
+        span = (max_ring + 1) * self.cell_degrees
+        cos_highest = math.cos(math.radians(min(max(self._max_abs_lat, abs(lat)), 90.0)))
+        found: List[Tuple[str, float]] = []
+        scanned = 0
+
+        def ring_bound(ring: int) -> float:
+            """Shortest great-circle distance to anything this ring or beyond (at least ring - 1 whole cells away)"""
+            degrees = max(ring - 1, 0) * self.cell_degrees
+            # East-west, both points at the highest latitude in play is the closest they can be
+            lng_degrees = max(min(degrees, 360.0 - span, 180.0), 0.0)
+            lng_km = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, cos_highest * math.sin(math.radians(lng_degrees) / 2)))
+            return min(degrees * KM_PER_DEGREE, lng_km)
+
+        def collect(points):
+            for point_lat, point_lng, key in points:
+                distance = haversine_km(lat, lng, point_lat, point_lng)
+                if (max_km is None or distance <= max_km) and (accept is None or accept(key)):
+                    found.append((key, distance))
+
+        for ring in range(first_ring, max_ring + 1):
+            bound = ring_bound(ring)
+            if (len(found) >= k and found[k - 1][1] <= bound) or (max_km is not None and bound > max_km):
+                break
+            rows = range(max(center_row - ring, min_row), min(center_row + ring, max_row) + 1)
+            edge_cols = range(max(center_col - ring, min_col), min(center_col + ring, max_col) + 1)
+            scanned += 2 * (len(rows) + len(edge_cols))
+            if scanned > len(self._cells):
+                # Ring by ring now costs more than the occupied cells: visit the remaining ones once instead
+                for (row, col), points in self._cells.items():
+                    if max(abs(row - center_row), abs(col - center_col)) >= ring:
+                        collect(points)
+                found.sort(key=lambda item: item[1])
+                break
+            for row in rows:
+                if abs(row - center_row) == ring:
+                    cols = edge_cols
+                else:
+                    cols = [col for col in ((center_col - ring, center_col + ring) if ring else (center_col,))
+                            if min_col <= col <= max_col]
+                for col in cols:
+                    collect(self._cells.get((row, col), ()))
+            found.sort(key=lambda item: item[1])
+        return found[:k]
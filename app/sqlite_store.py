@@ -0,0 +1,254 @@
+"""
+SQLite storage for the fire-sensor schema
+
+SQLiteStore builds its tables from Database/CreateTable(ALL).sql and answers
+the read queries used by DatabaseManager with the same row shapes PostgREST
+returns, so a local database file can stand in for Supabase.
+"""
+import os
+import re
+import json
+import sqlite3
+import threading
+import itertools
+from typing import Optional, List, Dict, Any, Iterable, Tuple, Set
+from app.storage import StorageBackend, Cursor, normalize_timestamp
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'Database', 'CreateTable(ALL).sql')
+
+# Indexes for local query patterns that Postgres serves differently
+LOCAL_INDEXES = """
+CREATE INDEX IF NOT EXISTS sensor_readings_node_ts_id_idx ON sensor_readings (node_id, timestamp, reading_id);
+CREATE INDEX IF NOT EXISTS node_regions_region_idx ON node_regions (region_id);
+CREATE INDEX IF NOT EXISTS parent_reports_parent_ts_idx ON "Parent_Node_Reports" (parent_id, timestamp);
+CREATE TABLE IF NOT EXISTS _store_state (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+TIMESTAMP_COLUMNS = ("timestamp",)
+
+_memory_ids = itertools.count()
+
+def sqlite_schema(sql: str) -> str:
+    """Translate the Postgres DDL in Database/ into SQLite DDL"""
+    sql = re.sub(r"\s*TABLESPACE\s+\w+", "", sql)
+    sql = re.sub(r"\bUSING\s+btree\s*", "", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bpublic\.", "", sql)
+    sql = re.sub(r"\bserial\b", "integer", sql)
+    return re.sub(r"CREATE TABLE\s+(?!IF NOT EXISTS)", "CREATE TABLE IF NOT EXISTS ", sql)
+
+class SQLiteStore(StorageBackend):
+    """Thread-safe SQLite database with the application's read queries.
+
+    Each thread gets its own connection; file databases use WAL so readers are
+    never blocked by a writer. ``:memory:`` opens a private shared-cache
+    in-memory database that lives as long as the store.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        if path == ':memory:':
+            self._uri = f"file:fire-sensors-{next(_memory_ids)}?mode=memory&cache=shared"
+        else:
+            self._uri = None
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._columns: Dict[str, List[str]] = {}
+        self._boolean_columns: set = set()
+        # Keeps a shared-cache memory database alive between thread connections
+        self._keepalive = self.connection()
+
+    # ---- Connections and schema ----
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self._uri:
+                conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+            else:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def create_schema(self, schema_path: str = SCHEMA_PATH):
+        """Create the application tables (idempotent)"""
+        with open(schema_path, encoding='utf-8') as f:
+            ddl = sqlite_schema(f.read())
+        conn = self.connection()
+        with self._write_lock, conn:
+            conn.executescript(ddl + LOCAL_INDEXES)
+        self._load_columns()
+
+    def _load_columns(self):
+        conn = self.connection()
+        tables = [row['name'] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        for table in tables:
+            info = conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+            self._columns[table] = [col['name'] for col in info]
+            self._boolean_columns.update(col['name'] for col in info if col['type'].lower() == 'boolean')
+
+    def _rows(self, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        cursor = self.connection().execute(sql, tuple(params))
+        rows = []
+        for row in cursor:
+            item = dict(row)
+            for column in self._boolean_columns.intersection(item):
+                if item[column] is not None:
+                    item[column] = bool(item[column])
+            rows.append(item)
+        return rows
+
+    # ---- Writes ----
+    def _prepare(self, table: str, rows: List[Dict[str, Any]]) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+        columns = [col for col in self._columns[table] if any(col in row for row in rows)]
+        values = []
+        for row in rows:
+            values.append(tuple(
+                normalize_timestamp(row.get(col)) if col in TIMESTAMP_COLUMNS else row.get(col)
+                for col in columns
+            ))
+        return columns, values
+
+    def upsert_rows(self, table: str, rows: List[Dict[str, Any]], state: Optional[Dict[str, Any]] = None):
+        """Insert or replace rows by primary key, optionally updating store state atomically"""
+        conn = self.connection()
+        with self._write_lock, conn:
+            if rows:
+                columns, values = self._prepare(table, rows)
+                names = ", ".join(f'"{col}"' for col in columns)
+                marks = ", ".join("?" for _ in columns)
+                conn.executemany(f'INSERT OR REPLACE INTO "{table}" ({names}) VALUES ({marks})', values)
+            for name, value in (state or {}).items():
+                conn.execute("INSERT OR REPLACE INTO _store_state (name, value) VALUES (?, ?)", (name, json.dumps(value)))
+
+    def insert_rows(self, table: str, rows: List[Dict[str, Any]]):
+        """Append rows in one transaction; omitted serial ids are assigned by SQLite"""
+        if not rows:
+            return
+        conn = self.connection()
+        columns, values = self._prepare(table, rows)
+        names = ", ".join(f'"{col}"' for col in columns)
+        marks = ", ".join("?" for _ in columns)
+        with self._write_lock, conn:
+            conn.executemany(f'INSERT INTO "{table}" ({names}) VALUES ({marks})', values)
+
+    def replace_rows(self, table: str, rows: List[Dict[str, Any]]):
+        """Replace the full contents of a table"""
+        conn = self.connection()
+        with self._write_lock, conn:
+            conn.execute(f'DELETE FROM "{table}"')
+            if rows:
+                columns, values = self._prepare(table, rows)
+                names = ", ".join(f'"{col}"' for col in columns)
+                marks = ", ".join("?" for _ in columns)
+                conn.executemany(f'INSERT INTO "{table}" ({names}) VALUES ({marks})', values)
+
+    def get_state(self, name: str, default: Any = None) -> Any:
+        row = self.connection().execute("SELECT value FROM _store_state WHERE name = ?", (name,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def set_state(self, name: str, value: Any):
+        self.upsert_rows('_store_state', [], {name: value})
+
+    def count(self, table: str) -> int:
+        return self.connection().execute(f'SELECT count(*) FROM "{table}"').fetchone()[0]
+
+    def ids_between(self, table: str, id_column: str, low: int, high: int) -> Set[int]:
+        """Serial ids stored in (low, high]"""
+        cursor = self.connection().execute(
+            f'SELECT "{id_column}" FROM "{table}" WHERE "{id_column}" > ? AND "{id_column}" <= ?', (low, high))
+        return {row[0] for row in cursor}
+
+    # ---- Topology ----
+    def all_nodes(self) -> List[Dict[str, Any]]:
+        return self._rows("SELECT * FROM nodes ORDER BY node_id")
+
+    def node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._rows("SELECT * FROM nodes WHERE node_id = ?", (node_id,))
+        return rows[0] if rows else None
+
+    def node_regions(self) -> List[Dict[str, Any]]:
+        return self._rows("SELECT node_id, region_id FROM node_regions")
+
+    def hierarchy(self) -> List[Dict[str, Any]]:
+        return self._rows("SELECT parent_id, child_id FROM node_hierarchy")
+
+    def node_children(self, parent_id: str) -> List[str]:
+        rows = self._rows("SELECT child_id FROM node_hierarchy WHERE parent_id = ? ORDER BY child_id", (parent_id,))
+        return [row['child_id'] for row in rows]
+
+    def node_region(self, node_id: str) -> Optional[str]:
+        rows = self._rows("SELECT region_id FROM node_regions WHERE node_id = ?", (node_id,))
+        return rows[0]['region_id'] if rows else None
+
+    def nodes_by_region(self, region_id: str, fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        select = ", ".join(f"n.{field}" for field in fields) if fields else "n.*"
+        return self._rows(
+            f"SELECT {select} FROM nodes n JOIN node_regions nr ON n.node_id = nr.node_id "
+            "WHERE nr.region_id = ? ORDER BY n.node_id", (region_id,))
+
+    def nodes_with_status(self, region_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        sql = (
+            "SELECT n.node_id, n.title, n.location, n.is_parent, n.lat, n.lng, "
+            "s.danger_level, s.timestamp AS last_updated FROM nodes n "
+        )
+        params: List[Any] = []
+        if region_id is not None:
+            sql += "JOIN node_regions nr ON n.node_id = nr.node_id AND nr.region_id = ? "
+            params.append(region_id)
+        sql += (
+            "LEFT JOIN sensor_readings s ON s.reading_id = ("
+            "SELECT r.reading_id FROM sensor_readings r WHERE r.node_id = n.node_id "
+            "ORDER BY r.timestamp DESC, r.reading_id DESC LIMIT 1) ORDER BY n.node_id"
+        )
+        return self._rows(sql, params)
+
+    # ---- Readings and reports ----
+    def node_history(self, node_id: str, limit: Optional[int] = None, before: Optional[Cursor] = None,
+                     after: Optional[Cursor] = None, start: Optional[str] = None,
+                     end: Optional[str] = None) -> List[Dict[str, Any]]:
+        sql = "SELECT * FROM sensor_readings WHERE node_id = ?"
+        params: List[Any] = [node_id]
+        if start:
+            sql += " AND timestamp >= ?"
+            params.append(normalize_timestamp(start))
+        if end:
+            sql += " AND timestamp <= ?"
+            params.append(normalize_timestamp(end))
+        if before:
+            sql += " AND (timestamp, reading_id) < (?, ?)"
+            params.extend((normalize_timestamp(before[0]), before[1]))
+        if after:
+            sql += " AND (timestamp, reading_id) > (?, ?)"
+            params.extend((normalize_timestamp(after[0]), after[1]))
+        sql += " ORDER BY timestamp, reading_id" if after else " ORDER BY timestamp DESC, reading_id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self._rows(sql, params)
+        return rows[::-1] if after else rows
+
+    def latest_readings(self, node_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        latest: Dict[str, Optional[Dict[str, Any]]] = {node_id: None for node_id in node_ids}
+        rows = self._rows(
+            "SELECT s.* FROM json_each(?) ids JOIN sensor_readings s ON s.reading_id = ("
+            "SELECT r.reading_id FROM sensor_readings r WHERE r.node_id = ids.value "
+            "ORDER BY r.timestamp DESC, r.reading_id DESC LIMIT 1)", (json.dumps(node_ids),))
+        for row in rows:
+            latest[row['node_id']] = row
+        return latest
+
+    def parent_node_reports(self, parent_id: str) -> List[Dict[str, Any]]:
+        return self._rows(
+            'SELECT * FROM "Parent_Node_Reports" WHERE parent_id = ? ORDER BY timestamp DESC, report_id DESC',
+            (parent_id,))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "path": self.path, "readings": self.count("sensor_readings")}
@@ -0,0 +1,116 @@
+"""
+Storage backend interface
+
+A StorageBackend answers the queries DatabaseManager needs and accepts bulk
+writes. Implementations:
+
+- SupabaseStore (app.supabase_store): the hosted Postgres database via PostgREST
+- SQLiteStore (app.sqlite_store): a local file built from Database/CreateTable(ALL).sql
+- MemoryStore (app.memory_store): plain Python structures, for tests and benchmarks
+
+Rows use PostgREST shapes throughout. History cursors are passed decoded,
+as (timestamp, reading_id) tuples.
+"""
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+from app.downsample import downsample
+
+STORAGE_BACKENDS = ("supabase", "sqlite", "memory")
+
+# Decoded keyset cursor: (timestamp, reading_id)
+Cursor = Tuple[str, int]
+
+def normalize_timestamp(value: Any) -> Optional[str]:
+    """Normalize a timestamp to naive-UTC ISO text so it sorts and compares lexically"""
+    if value is None or value == "":
+        return None
+    parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
+
+class StorageBackend:
+    """Queries and writes over the fire-sensor schema"""
+
+    name = "abstract"
+
+    # ---- Writes ----
+    def upsert_rows(self, table: str, rows: List[Dict[str, Any]]):
+        """Insert or replace rows by primary key"""
+        raise NotImplementedError
+
+    def replace_rows(self, table: str, rows: List[Dict[str, Any]]):
+        """Replace the full contents of a table"""
+        raise NotImplementedError
+
+    def insert_rows(self, table: str, rows: List[Dict[str, Any]]):
+        """Append new rows in one write, letting the store assign serial ids"""
+        raise NotImplementedError
+
+    # ---- Topology ----
+    def all_nodes(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def node_regions(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def hierarchy(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def node_children(self, parent_id: str) -> List[str]:
+        raise NotImplementedError
+
+    def node_region(self, node_id: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def nodes_by_region(self, region_id: str, fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def nodes_with_status(self, region_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Nodes joined with their newest danger level (all nodes when region_id is None)"""
+        raise NotImplementedError
+
+    def topology_version(self) -> Optional[str]:
+        """A value that changes whenever nodes, node_regions or node_hierarchy do.
+
+        None means the backend cannot tell, and topology refreshes reread the tables.
+        """
+        return None
+
+    # ---- Readings and reports ----
+    def node_history(self, node_id: str, limit: Optional[int] = None, before: Optional[Cursor] = None,
+                     after: Optional[Cursor] = None, start: Optional[str] = None,
+                     end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Readings newest first, keyset-paged by (timestamp, reading_id)"""
+        raise NotImplementedError
+
+    def node_history_downsampled(self, node_id: str, mode: str, bucket_seconds: Optional[int],
+                                 max_points: Optional[int], start: Optional[str], end: Optional[str],
+                                 max_rows: int) -> Dict[str, Any]:
+        """Chart-sized history; by default the raw rows are downsampled in-process"""
+        rows = self.node_history(node_id, max_rows, start=start, end=end)
+        return downsample(rows, mode, bucket_seconds, max_points)
+
+    def latest_readings(self, node_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        raise NotImplementedError
+
+    def parent_node_reports(self, parent_id: str) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+def create_backend(name: str, sqlite_path: str = ':memory:') -> StorageBackend:
+    """Build a local storage backend by name ('sqlite' or 'memory')"""
+    if name == "sqlite":
+        from app.sqlite_store import SQLiteStore
+        store = SQLiteStore(sqlite_path)
+        store.create_schema()
+        return store
+    if name == "memory":
+        from app.memory_store import MemoryStore
+        return MemoryStore()
+    raise ValueError(f"Unknown storage backend: {name} (expected one of {', '.join(STORAGE_BACKENDS)})")
@@ -0,0 +1,254 @@
+"""
+Supabase (PostgREST) storage backend
+"""
+import logging
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Iterable, Callable
+from postgrest import APIError
+from postgrest.types import ReturnMethod
+from supabase import Client
+from app.storage import StorageBackend, Cursor
+from app.downsample import downsample, buckets_from_rows
+
+logger = logging.getLogger(__name__)
+
+# PostgREST returns at most this many rows per request by default
+PAGE_SIZE = 1000
+
+def fetch_all(client, table: str, order: str, columns: str = "*", page_size: int = PAGE_SIZE) -> List[Dict[str, Any]]:
+    """Read a whole table in pages ordered by its primary key"""
+    rows: List[Dict[str, Any]] = []
+    while True:
+        page = client.table(table).select(columns).order(order)\
+            .range(len(rows), len(rows) + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+def rpc_all(client, function: str, params: Dict[str, Any], order: str,
+            page_size: int = PAGE_SIZE) -> List[Dict[str, Any]]:
+    """Read every row a set-returning function yields, in pages ordered by ``order``"""
+    rows: List[Dict[str, Any]] = []
+    while True:
+        query = client.rpc(function, params)
+        # The RPC builder has no .range(); PostgREST takes the same paging as query parameters
+        query.params = query.params.set("order", order)\
+            .set("offset", str(len(rows))).set("limit", str(page_size))
+        page = query.execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+def keyset_filter(query, operator: str, cursor: Cursor):
+    """Apply a (timestamp, reading_id) row comparison against a decoded cursor"""
+    timestamp, reading_id = cursor
+    query.params = query.params.add(
+        'or',
+        f'(timestamp.{operator}."{timestamp}",'
+        f'and(timestamp.eq."{timestamp}",reading_id.{operator}.{reading_id}))'
+    )
+    return query
+
+def history_query(query, limit: Optional[int] = None, before: Optional[Cursor] = None,
+                  after: Optional[Cursor] = None, start: Optional[str] = None, end: Optional[str] = None):
+    """Apply node_history's range, keyset and order to a sync or async sensor_readings query.
+
+    Rows sharing a timestamp page stably because the order includes
+    reading_id. "after" pages walk forward from the cursor and must be
+    flipped back to newest first by the caller.
+    """
+    if start:
+        query = query.gte("timestamp", start)
+    if end:
+        query = query.lte("timestamp", end)
+    if before:
+        query = keyset_filter(query, 'lt', before)
+    if after:
+        query = keyset_filter(query, 'gt', after)
+    # One order parameter listing both columns, each with its direction
+    direction = "asc" if after else "desc"
+    query.params = query.params.set("order", f"timestamp.{direction},reading_id.{direction}")
+    if limit:
+        query = query.limit(limit)
+    return query
+
+def id_chunks(ids: List[Any], size: int = PAGE_SIZE) -> List[List[Any]]:
+    """Split ids for calls that return one row per id, so no response exceeds the row cap"""
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+def latest_by_node(node_ids: List[str], rows: List[Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Map get_latest_readings rows to their nodes (None for nodes without readings)"""
+    latest = {node_id: None for node_id in node_ids}
+    for row in rows:
+        latest[row['node_id']] = row
+    return latest
+
+class SupabaseStore(StorageBackend):
+    """Queries issued against Supabase through PostgREST.
+
+    The client is resolved on every call through ``client_getter`` so that
+    connection state stays with DatabaseManager (which raises
+    DatabaseUnavailable while disconnected).
+    """
+
+    name = "supabase"
+
+    def __init__(self, client_getter: Callable[[], Client]):
+        self._client = client_getter
+        # Cleared once get_topology_version turns out not to be deployed
+        self._has_topology_version = True
+
+    # ---- Writes ----
+    def upsert_rows(self, table: str, rows: List[Dict[str, Any]]):
+        if rows:
+            self._client().table(table).upsert(rows).execute()
+
+    def insert_rows(self, table: str, rows: List[Dict[str, Any]]):
+        # One multi-row INSERT; rows must share the same keys for PostgREST
+        if rows:
+            self._client().table(table).insert(rows, returning=ReturnMethod.minimal).execute()
+
+    # ---- Topology ----
+    def all_nodes(self) -> List[Dict[str, Any]]:
+        return fetch_all(self._client(), "nodes", "node_id")
+
+    def topology_version(self) -> Optional[str]:
+        # Digest of the three tables computed in the database (Database/Functions.sql)
+        if not self._has_topology_version:
+            return None
+        try:
+            return self._client().rpc('get_topology_version', {}).execute().data
+        except APIError as e:
+            logger.warning(f"get_topology_version unavailable, topology refreshes reread every table: {e}")
+            self._has_topology_version = False
+            return None
+
+    def node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        response = self._client().table("nodes").select("*").eq("node_id", node_id).execute()
+        return response.data[0] if response.data else None
+
+    def node_regions(self) -> List[Dict[str, Any]]:
+        return fetch_all(self._client(), "node_regions", "node_id", "node_id, region_id")
+
+    def hierarchy(self) -> List[Dict[str, Any]]:
+        return fetch_all(self._client(), "node_hierarchy", "parent_id,child_id", "parent_id, child_id")
+
+    def node_children(self, parent_id: str) -> List[str]:
+        response = self._client().table("node_hierarchy")\
+            .select("child_id")\
+            .eq("parent_id", parent_id)\
+            .execute()
+        return sorted(row['child_id'] for row in response.data or [])
+
+    def node_region(self, node_id: str) -> Optional[str]:
+        response = self._client().table('node_regions')\
+            .select('region_id')\
+            .eq('node_id', node_id)\
+            .execute()
+        return response.data[0]['region_id'] if response.data else None
+
+    def nodes_by_region(self, region_id: str, fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        client = self._client()
+
+        # First get all node_ids for this region from node_regions table
+        node_regions = client.table('node_regions')\
+            .select('node_id')\
+            .eq('region_id', region_id)\
+            .execute()
+
+        node_ids = [nr['node_id'] for nr in node_regions.data] if node_regions.data else []
+
+        if not node_ids:
+            return []
+
+        # Then get the node details for these node_ids
+        response = client.table("nodes")\
+            .select(", ".join(fields) if fields else "*")\
+            .in_('node_id', node_ids)\
+            .execute()
+        return response.data or []
+
+    def nodes_with_status(self, region_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Functions defined in Database/Functions.sql (LEFT JOIN LATERAL on sensor_readings)
+        if region_id is None:
+            return rpc_all(self._client(), 'get_nodes_with_latest_status', {}, 'node_id')
+        return rpc_all(self._client(), 'get_region_nodes_with_latest_status',
+                       {'region_id_param': region_id}, 'node_id')
+
+    # ---- Readings and reports ----
+    def node_history(self, node_id: str, limit: Optional[int] = None, before: Optional[Cursor] = None,
+                     after: Optional[Cursor] = None, start: Optional[str] = None,
+                     end: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = self._client().table("sensor_readings")\
+            .select("*")\
+            .eq("node_id", node_id)
+        rows = history_query(query, limit, before, after, start, end).execute().data or []
+        return rows[::-1] if after else rows
+
+    def node_history_downsampled(self, node_id: str, mode: str, bucket_seconds: Optional[int],
+                                 max_points: Optional[int], start: Optional[str], end: Optional[str],
+                                 max_rows: int) -> Dict[str, Any]:
+        """Fixed-resolution buckets are computed in SQL by get_node_history_buckets"""
+        if mode == 'bucket' and not bucket_seconds and start and end:
+            # A bounded range lets max_points be turned into a fixed bucket width
+            span = (datetime.fromisoformat(end).replace(tzinfo=None)
+                    - datetime.fromisoformat(start).replace(tzinfo=None)).total_seconds()
+            bucket_seconds = int(max(span, 0) // max(1, max_points - 1)) + 1
+
+        if mode == 'bucket' and bucket_seconds:
+            try:
+                rows = rpc_all(self._client(), 'get_node_history_buckets', {
+                    'node_id_param': node_id,
+                    'bucket_seconds': bucket_seconds,
+                    'from_ts': start,
+                    'to_ts': end,
+                }, 'bucket')
+                return buckets_from_rows(rows, bucket_seconds)
+            except APIError as e:
+                logger.warning(f"get_node_history_buckets unavailable, downsampling in-process: {e}")
+
+        return downsample(self._recent_history(node_id, max_rows, start, end), mode, bucket_seconds, max_points)
+
+    def _recent_history(self, node_id: str, max_rows: int, start: Optional[str],
+                        end: Optional[str]) -> List[Dict[str, Any]]:
+        """Up to max_rows of a node's newest readings in range, read in keyset pages"""
+        rows: List[Dict[str, Any]] = []
+        cursor = None
+        while len(rows) < max_rows:
+            limit = min(PAGE_SIZE, max_rows - len(rows))
+            page = self.node_history(node_id, limit, before=cursor, start=start, end=end)
+            rows.extend(page)
+            if len(page) < limit:
+                break
+            cursor = (page[-1]['timestamp'], page[-1]['reading_id'])
+        return rows
+
+    def latest_readings(self, node_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        # DISTINCT ON (node_id) in Database/Functions.sql, served by the (node_id, timestamp) index.
+        # One row per node, so chunks of PAGE_SIZE ids stay under the response cap
+        client = self._client()
+        rows: List[Dict[str, Any]] = []
+        for chunk in id_chunks(node_ids):
+            rows.extend(client.rpc('get_latest_readings', {'node_ids': chunk}).execute().data or [])
+        return latest_by_node(node_ids, rows)
+
+    def parent_node_reports(self, parent_id: str) -> List[Dict[str, Any]]:
+        response = self._client().table("Parent_Node_Reports")\
+            .select("*")\
+            .eq("parent_id", parent_id)\
+            .order("timestamp", desc=True)\
+            .execute()
+        return response.data or []
+
+    def parent_node_reports_between(self, parent_id: str, start: str, end: str, offset: int = 0,
+                                    limit: int = PAGE_SIZE) -> List[Dict[str, Any]]:
+        """One page of a parent's reports within [start, end], ordered by (timestamp, report_id)"""
+        response = self._client().table("Parent_Node_Reports")\
+            .select("*")\
+            .eq("parent_id", parent_id)\
+            .gte("timestamp", start)\
+            .lte("timestamp", end)\
+            .order("timestamp,report_id")\
+            .range(offset, offset + limit - 1)\
+            .execute()
+        return response.data or []
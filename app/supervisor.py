@@ -0,0 +1,91 @@
+"""
+Background database connection supervisor
+
+Owns the Supabase connection state: it establishes the connection (with the
+DatabaseManager backoff policy), probes its health on a schedule and flips
+readiness, so request handlers never block on connection establishment.
+"""
+import time
+import logging
+import threading
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+class ConnectionSupervisor:
+    """Keeps a DatabaseManager connected from a daemon thread"""
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self.last_check: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.reconnects = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, app, db_manager):
+        """Start supervising (idempotent)"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(app, db_manager),
+            name="db-supervisor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def nudge(self):
+        """Ask for an early connection attempt (backoff still applies)"""
+        self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "last_check_age_seconds": round(time.time() - self.last_check, 1) if self.last_check else None,
+            "last_error": self.last_error,
+            "reconnects": self.reconnects,
+        }
+
+    def _run(self, app, db_manager):
+        interval = app.config.get('DB_HEALTH_CHECK_INTERVAL', 15)
+        while not self._stop.is_set():
+            with app.app_context():
+                wait = self._tick(db_manager, interval)
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def _tick(self, db_manager, interval: float) -> float:
+        """Run one supervision step and return how long to sleep"""
+        self.last_check = time.time()
+        if db_manager.connected:
+            try:
+                db_manager.check_health()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Database health check failed, marking disconnected: {e}")
+                db_manager.mark_disconnected()
+                return 0
+            return interval
+
+        try:
+            db_manager._initialize_connection()
+        except Exception as e:
+            # Misconfiguration (e.g. missing SUPABASE_URL) will not fix itself quickly
+            self.last_error = str(e)
+            logger.error(f"Database supervisor cannot connect: {e}")
+            return max(interval, 60)
+
+        if db_manager.connected:
+            self.reconnects += 1
+            self.last_error = None
+            return interval
+        return max(1.0, db_manager.retry_wait())
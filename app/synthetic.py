@@ -0,0 +1,292 @@
+"""
+Synthetic fire-sensor datasets
+
+SyntheticDataset produces parameterized data for every table of the schema:
+parent nodes clustered inside the 13 fire regions, child sensors around each
+parent, per-interval `sensor_readings` with diurnal/seasonal weather and
+occasional fire events, and periodic `Parent_Node_Reports`.
+
+Everything is derived from the seed and the node index, so any slice of the
+dataset can be regenerated independently. Reading and report ids increase
+with time, as they would in a live database.
+"""
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Iterator, Tuple
+import numpy as np
+from config import Config
+
+# Approximate (lat, lng) centre and spread in degrees of each fire region
+REGION_GEOGRAPHY = {
+    "FR1": (41.10, 25.20, 0.35),
+    "FR2": (40.70, 23.00, 0.40),
+    "FR3": (40.40, 21.60, 0.30),
+    "FR4": (39.60, 20.80, 0.30),
+    "FR5": (39.50, 22.20, 0.35),
+    "FR6": (38.70, 20.60, 0.20),
+    "FR7": (38.30, 21.60, 0.30),
+    "FR8": (38.70, 22.60, 0.35),
+    "FR9": (38.05, 23.75, 0.20),
+    "FR10": (37.50, 22.30, 0.35),
+    "FR11": (39.10, 26.30, 0.25),
+    "FR12": (36.80, 25.20, 0.30),
+    "FR13": (35.25, 24.90, 0.35),
+}
+
+VEGETATION_TYPES = ("Coniferous", "Deciduous", "Mixed", "Maquis", "Phrygana", "Grassland")
+
+READING_COLUMNS = ("reading_id", "node_id", "timestamp", "danger_level", "temperature", "humidity",
+                   "gas_and_smoke", "rain", "wind_speed", "flora_density", "slope", "vegetation_type")
+
+REPORT_COLUMNS = ("report_id", "parent_id", "child_id", "timestamp", "data_received", "data_valid",
+                  "status_message")
+
+# Forest clusters per region that parent stations group around
+CLUSTERS_PER_REGION = 4
+
+def _smooth_noise(rng: np.random.Generator, size: int, window: int, scale: float) -> np.ndarray:
+    """Low-frequency noise: white noise averaged over a moving window"""
+    noise = rng.normal(0.0, 1.0, size + window)
+    smoothed = np.convolve(noise, np.ones(window) / math.sqrt(window), mode="valid")[:size]
+    return smoothed * scale
+
+def danger_level(temperature: np.ndarray, humidity: np.ndarray, wind_speed: np.ndarray,
+                 gas_and_smoke: np.ndarray, rain: np.ndarray) -> np.ndarray:
+    """Fire danger index 0-5 from the weather and smoke readings"""
+    score = (0.08 * (temperature - 20) + 0.04 * (50 - humidity) + 0.08 * wind_speed
+             + 0.01 * gas_and_smoke - 1.5 * rain)
+    return np.clip(np.round(score), 0, 5).astype(np.int64)
+
+class SyntheticDataset:
+    """A reproducible synthetic network and its sensor history"""
+
+    def __init__(self, parents: int = 100, children_per_parent: int = 5, days: float = 30,
+                 interval_seconds: int = 60, report_interval_seconds: int = 3600,
+                 end: Optional[datetime] = None, seed: int = 42, fire_rate: float = 0.5,
+                 regions: Optional[List[str]] = None, start_id: int = 1):
+        if parents < 1 or children_per_parent < 0:
+            raise ValueError("parents must be at least 1 and children_per_parent non-negative")
+        if interval_seconds < 1 or report_interval_seconds < 1:
+            raise ValueError("intervals must be at least one second")
+        self.parents = parents
+        self.children_per_parent = children_per_parent
+        self.interval_seconds = interval_seconds
+        self.report_interval_seconds = report_interval_seconds
+        self.seed = seed
+        self.fire_rate = fire_rate
+        self.start_id = start_id
+        self.regions = list(regions or Config.REGION_MAPPING.values())
+        unknown = set(self.regions) - set(REGION_GEOGRAPHY)
+        if unknown:
+            raise ValueError(f"Unknown regions: {', '.join(sorted(unknown))}")
+
+        if end is None:
+            end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+        self.end = end
+        self.start = end - timedelta(days=days)
+        self.steps = int((self.end - self.start).total_seconds() // interval_seconds)
+        self.report_steps = int((self.end - self.start).total_seconds() // report_interval_seconds)
+        self._build_topology()
+
+    # ---- Topology ----
+    def _build_topology(self):
+        rng = np.random.default_rng([self.seed, 0])
+        clusters = {
+            region: [(lat + rng.normal(0, spread / 2), lng + rng.normal(0, spread / 2))
+                     for _ in range(CLUSTERS_PER_REGION)]
+            for region, (lat, lng, spread) in ((r, REGION_GEOGRAPHY[r]) for r in self.regions)
+        }
+
+        self._nodes: List[Dict[str, Any]] = []
+        self._node_regions: List[Dict[str, Any]] = []
+        self._hierarchy: List[Dict[str, Any]] = []
+        self.sensors: List[Dict[str, Any]] = []
+        for p in range(self.parents):
+            region = self.regions[p % len(self.regions)]
+            spread = REGION_GEOGRAPHY[region][2]
+            center = clusters[region][rng.integers(CLUSTERS_PER_REGION)]
+            lat = center[0] + rng.normal(0, spread / 6)
+            lng = center[1] + rng.normal(0, spread / 6)
+            parent_id = f"N{p + 1}"
+            self._add_node(parent_id, f"Node {p + 1}", region, True, lat, lng, "Κεντρικό")
+            for c in range(self.children_per_parent):
+                child_id = f"N{p + 1}_{c + 1}"
+                # Children sit within a couple of kilometres of their parent
+                node = self._add_node(child_id, f"Node {p + 1}.{c + 1}", region, False,
+                                      lat + rng.normal(0, 0.01), lng + rng.normal(0, 0.01), f"Αισθητήρας {c + 1}")
+                self._hierarchy.append({"parent_id": parent_id, "child_id": child_id})
+                self.sensors.append({
+                    "node_id": child_id,
+                    "parent_id": parent_id,
+                    "lat": node["lat"],
+                    "flora_density": round(float(rng.uniform(20, 95)), 2),
+                    "slope": round(float(rng.uniform(0, 35)), 2),
+                    "vegetation_type": VEGETATION_TYPES[rng.integers(len(VEGETATION_TYPES))],
+                })
+
+    def _add_node(self, node_id: str, title: str, region: str, is_parent: bool,
+                  lat: float, lng: float, place: str) -> Dict[str, Any]:
+        node = {
+            "node_id": node_id,
+            "title": title,
+            "location": f"{region}, {place}",
+            "description": None,
+            "is_parent": is_parent,
+            "lat": round(float(lat), 6),
+            "lng": round(float(lng), 6),
+        }
+        self._nodes.append(node)
+        self._node_regions.append({"node_id": node_id, "region_id": region})
+        return node
+
+    def fire_regions(self) -> List[Dict[str, Any]]:
+        return [{"region_id": region_id, "name": f"ΠΕΚΕ {name}"}
+                for name, region_id in Config.REGION_MAPPING.items() if region_id in self.regions]
+
+    def nodes(self) -> List[Dict[str, Any]]:
+        return list(self._nodes)
+
+    def node_regions(self) -> List[Dict[str, Any]]:
+        return list(self._node_regions)
+
+    def hierarchy(self) -> List[Dict[str, Any]]:
+        return list(self._hierarchy)
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "fire_regions": len(self.fire_regions()),
+            "nodes": len(self._nodes),
+            "node_regions": len(self._node_regions),
+            "node_hierarchy": len(self._hierarchy),
+            "sensor_readings": len(self.sensors) * self.steps,
+            "Parent_Node_Reports": len(self.sensors) * self.report_steps,
+        }
+
+    # ---- Readings ----
+    def _timestamps(self, steps: int, interval: int) -> np.ndarray:
+        offsets = np.arange(steps, dtype=np.int64) * interval
+        return (np.datetime64(self.start, "s") + offsets).astype(str)
+
+    def sensor_columns(self, index: int) -> Dict[str, np.ndarray]:
+        """Columns of every reading of one sensor (by index into self.sensors)"""
+        sensor = self.sensors[index]
+        rng = np.random.default_rng([self.seed, 1, index])
+        n = self.steps
+        epoch = (self.start - datetime(1970, 1, 1)).total_seconds() + np.arange(n) * self.interval_seconds
+        hours = (epoch % 86400) / 3600
+        day_of_year = (epoch / 86400) % 365.25
+
+        base = 22 - 0.8 * (sensor["lat"] - 35)
+        window = max(2, 3600 // self.interval_seconds)
+        temperature = (base + 10 * np.sin(2 * np.pi * (day_of_year - 110) / 365.25)
+                       + 6 * np.sin(2 * np.pi * (hours - 9) / 24)
+                       + _smooth_noise(rng, n, window, 0.6))
+        humidity = 60 - 1.6 * (temperature - base) + _smooth_noise(rng, n, window, 1.5)
+        wind_speed = np.abs(5 + _smooth_noise(rng, n, window, 0.8))
+        gas_and_smoke = rng.lognormal(1.5, 0.4, n)
+
+        # Fire events: a ramp in temperature and smoke with a drop in humidity
+        for _ in range(rng.poisson(self.fire_rate * n * self.interval_seconds / (30 * 86400))):
+            duration = max(1, int(rng.uniform(1, 6) * 3600 // self.interval_seconds))
+            start = int(rng.integers(0, max(1, n - 1)))
+            stop = min(n, start + duration)
+            ramp = np.sin(np.linspace(0, np.pi, stop - start))
+            temperature[start:stop] += 25 * ramp
+            humidity[start:stop] -= 30 * ramp
+            gas_and_smoke[start:stop] += rng.uniform(150, 600) * ramp
+
+        humidity = np.clip(humidity, 5, 100)
+        rain = (humidity > 85) & (rng.random(n) < 0.3)
+        wind_speed = np.clip(wind_speed, 0, 60)
+        gas_and_smoke = np.clip(gas_and_smoke, 0, 999)
+        ids = self.start_id + np.arange(n, dtype=np.int64) * len(self.sensors) + index
+        return {
+            "reading_id": ids,
+            "timestamp": self._timestamps(n, self.interval_seconds),
+            "danger_level": danger_level(temperature, humidity, wind_speed, gas_and_smoke, rain),
+            "temperature": np.round(temperature, 2),
+            "humidity": np.round(humidity, 2),
+            "gas_and_smoke": np.round(gas_and_smoke, 2),
+            "rain": rain,
+            "wind_speed": np.round(wind_speed, 2),
+        }
+
+    def sensor_readings(self, index: int) -> Iterator[Dict[str, Any]]:
+        """Reading rows of one sensor, oldest first"""
+        sensor = self.sensors[index]
+        columns = self.sensor_columns(index)
+        static = (sensor["flora_density"], sensor["slope"], sensor["vegetation_type"])
+        for reading_id, timestamp, danger, temp, hum, smoke, rain, wind in zip(
+                columns["reading_id"].tolist(), columns["timestamp"].tolist(), columns["danger_level"].tolist(),
+                columns["temperature"].tolist(), columns["humidity"].tolist(), columns["gas_and_smoke"].tolist(),
+                columns["rain"].tolist(), columns["wind_speed"].tolist()):
+            yield dict(zip(READING_COLUMNS, (reading_id, sensor["node_id"], timestamp, danger, temp, hum,
+                                             smoke, rain, wind) + static))
+
+    # ---- Reports ----
+    def parent_reports(self, index: int) -> Iterator[Dict[str, Any]]:
+        """Report rows a parent filed about one child sensor, oldest first"""
+        sensor = self.sensors[index]
+        rng = np.random.default_rng([self.seed, 2, index])
+        n = self.report_steps
+        received = rng.random(n) > 0.02
+        valid = received & (rng.random(n) > 0.05)
+        smoke_alarm = rng.random(n) < 0.5
+        ids = self.start_id + np.arange(n, dtype=np.int64) * len(self.sensors) + index
+        timestamps = self._timestamps(n, self.report_interval_seconds)
+        for report_id, timestamp, got, ok, smoke in zip(ids.tolist(), timestamps.tolist(), received.tolist(),
+                                                        valid.tolist(), smoke_alarm.tolist()):
+            if not got:
+                status = "No data received"
+            elif ok:
+                status = "All OK"
+            else:
+                status = "Gas and smoke level too high." if smoke else "Invalid reading"
+            yield dict(zip(REPORT_COLUMNS, (report_id, sensor["parent_id"], sensor["node_id"], timestamp,
+                                            got, ok if got else None, status)))
+
+    # ---- Batching ----
+    @staticmethod
+    def batched(rows: Iterator[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        batch: List[Dict[str, Any]] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def table_rows(self, table: str, sensors: Optional[range] = None) -> Iterator[Dict[str, Any]]:
+        """Stream the rows of any table; readings and reports can be limited to a range of sensors"""
+        static = {
+            "fire_regions": self.fire_regions,
+            "nodes": self.nodes,
+            "node_regions": self.node_regions,
+            "node_hierarchy": self.hierarchy,
+        }
+        if table in static:
+            yield from static[table]()
+            return
+        generate = {"sensor_readings": self.sensor_readings, "Parent_Node_Reports": self.parent_reports}[table]
+        for index in sensors if sensors is not None else range(len(self.sensors)):
+            yield from generate(index)
+
+# Load order respecting foreign keys
+TABLE_ORDER = ("fire_regions", "nodes", "node_regions", "node_hierarchy", "sensor_readings", "Parent_Node_Reports")
+
+def parse_end(value: Optional[str]) -> Optional[datetime]:
+    """Parse an --end argument (ISO date or datetime, naive UTC)"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def column_names(table: str, first_row: Dict[str, Any]) -> Tuple[str, ...]:
+    if table == "sensor_readings":
+        return READING_COLUMNS
+    if table == "Parent_Node_Reports":
+        return REPORT_COLUMNS
+    return tuple(first_row)
@@ -0,0 +1,143 @@
+"""
+GeoJSON tiles of nodes and hierarchy links
+
+The map loads nodes tile by tile (slippy-map z/x/y) instead of receiving the
+whole network inlined in the page. A tile holds the nodes inside it as Point
+features and every parent-child link touching it as a LineString, taken from
+the topology snapshot's spatial index. Encoded tiles are kept with a content
+ETag until a topology refresh moves, adds or relinks a node inside them.
+"""
+import math
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple, Iterable, Set
+from app.spatial import BBox, coordinates
+
+# (body, etag)
+Tile = Tuple[bytes, str]
+
+def tile_bbox(z: int, x: int, y: int) -> BBox:
+    """(min_lng, min_lat, max_lng, max_lat) of a slippy-map tile"""
+    scale = 2 ** z
+
+    def lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / scale))))
+    return x / scale * 360 - 180, lat(y + 1), (x + 1) / scale * 360 - 180, lat(y)
+
+def tile_of(lat: float, lng: float, z: int) -> Tuple[int, int]:
+    """The z/x/y tile containing a point"""
+    scale = 2 ** z
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lng + 180) / 360 * scale)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * scale)
+    return min(max(x, 0), scale - 1), min(max(y, 0), scale - 1)
+
+NODE_PROPERTIES = ("node_id", "title", "location", "is_parent")
+
+def _point(node: Dict[str, Any], lat: float, lng: float) -> Dict[str, Any]:
+    return {"type": "Feature", "geometry": {"type": "Point", "coordinates": [lng, lat]},
+            "properties": {field: node.get(field) for field in NODE_PROPERTIES}}
+
+def build_tile(snapshot, z: int, x: int, y: int, region_id: Optional[str] = None) -> Dict[str, Any]:
+    """FeatureCollection of the tile's nodes and the parent-child links touching them"""
+    members = snapshot.region_nodes.get(region_id, frozenset()) if region_id else None
+    accept = members.__contains__ if members is not None else None
+    node_ids = sorted(snapshot.spatial.bbox(tile_bbox(z, x, y), accept))
+    features = []
+    links: Set[Tuple[str, str]] = set()
+    for node_id in node_ids:
+        node = snapshot.nodes[node_id]
+        lat, lng = coordinates(node)
+        features.append(_point(node, lat, lng))
+        parent_id = snapshot.child_parent.get(node_id)
+        if parent_id:
+            links.add((parent_id, node_id))
+        for child_id in snapshot.parent_children.get(node_id, ()):
+            if members is None or child_id in members:
+                links.add((node_id, child_id))
+    for parent_id, child_id in sorted(links):
+        parent, child = snapshot.nodes.get(parent_id), snapshot.nodes.get(child_id)
+        start = coordinates(parent) if parent else None
+        end = coordinates(child) if child else None
+        if start is None or end is None:
+            continue
+        features.append({"type": "Feature",
+                         "geometry": {"type": "LineString",
+                                      "coordinates": [[start[1], start[0]], [end[1], end[0]]]},
+                         "properties": {"parent_id": parent_id, "child_id": child_id}})
+    return {"type": "FeatureCollection", "features": features}
+
+def encode_tile(collection: Dict[str, Any]) -> Tile:
+    body = json.dumps(collection, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return body, '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+def footprint(snapshot, node_ids: Iterable[str]) -> List[Tuple[float, float]]:
+    """Positions whose tiles show these nodes or their links"""
+    positions = []
+    for node_id in node_ids:
+        related = [node_id, snapshot.child_parent.get(node_id), *snapshot.parent_children.get(node_id, ())]
+        for related_id in related:
+            node = snapshot.nodes.get(related_id) if related_id else None
+            position = coordinates(node) if node else None
+            if position is not None:
+                positions.append(position)
+    return positions
+
+class TileCache:
+    """Encoded tiles per (region, z, x, y), bounded and invalidated by footprint"""
+
+    def __init__(self, max_entries: int = 10000, min_zoom: int = 10, max_zoom: int = 20):
+        self.max_entries = max_entries
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self._tiles: "OrderedDict[Tuple[Optional[str], int, int, int], Tile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    def get(self, snapshot, z: int, x: int, y: int, region_id: Optional[str] = None) -> Tile:
+        key = (region_id, z, x, y)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                return tile
+        tile = encode_tile(build_tile(snapshot, z, x, y, region_id))
+        with self._lock:
+            self.misses += 1
+            self._tiles[key] = tile
+            while len(self._tiles) > self.max_entries:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def invalidate(self, positions: Optional[Iterable[Tuple[float, float]]] = None):
+        """Drop the tiles (of every region and zoom) covering these positions; everything when None"""
+        with self._lock:
+            if positions is None:
+                self.invalidated += len(self._tiles)
+                self._tiles.clear()
+                return
+            stale = {(z, *tile_of(lat, lng, z)) for lat, lng in positions
+                     for z in range(self.min_zoom, self.max_zoom + 1)}
+            for key in [key for key in self._tiles if key[1:] in stale]:
+                del self._tiles[key]
+                self.invalidated += 1
+
+    def invalidate_changes(self, old, new, changed_nodes: Iterable[str]):
+        """Drop tiles affected by a topology refresh, at the old and new positions"""
+        changed_nodes = list(changed_nodes)
+        if not changed_nodes:
+            return
+        if old is None:
+            self.invalidate()
+            return
+        self.invalidate(footprint(old, changed_nodes) + footprint(new, changed_nodes))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"tiles": len(self._tiles), "hits": self.hits, "misses": self.misses,
+                    "invalidated": self.invalidated}
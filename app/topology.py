@@ -0,0 +1,216 @@
+"""
+In-memory node topology index
+
+Holds the region -> nodes, node -> region and parent -> children relations
+built from the `nodes`, `node_regions` and `node_hierarchy` tables so that
+page views and API calls can answer topology questions without a round trip.
+Node coordinates are indexed in a spatial grid for viewport and proximity
+queries.
+"""
+import time
+import logging
+import threading
+from typing import Optional, List, Dict, Any, Set, Tuple, AbstractSet
+from app.spatial import GridIndex, BBox
+
+logger = logging.getLogger(__name__)
+
+class TopologySnapshot:
+    """Immutable view of the node topology at one point in time"""
+
+    def __init__(self, nodes: Dict[str, Dict[str, Any]], node_region: Dict[str, str],
+                 parent_children: Dict[str, Set[str]]):
+        self.nodes = nodes
+        self.node_region = node_region
+        self.parent_children = parent_children
+        self.region_nodes: Dict[str, Set[str]] = {}
+        for node_id, region_id in node_region.items():
+            self.region_nodes.setdefault(region_id, set()).add(node_id)
+        self.child_parent: Dict[str, str] = {
+            child_id: parent_id
+            for parent_id, children in parent_children.items()
+            for child_id in children
+        }
+        self.spatial = GridIndex.from_nodes(nodes.values())
+        self.built_at = time.time()
+
+class TopologyIndex:
+    """Process-wide topology index refreshed by a background thread"""
+
+    def __init__(self):
+        self._snapshot: Optional[TopologySnapshot] = None
+        # Store's topology_version() when the snapshot was read (None: unknown)
+        self._version: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def snapshot(self) -> Optional[TopologySnapshot]:
+        """The current snapshot (replaced, never mutated, on refresh)"""
+        return self._snapshot
+
+    # ---- Lookups (all served from memory) ----
+    def node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        return self._snapshot.nodes.get(node_id) if self._snapshot else None
+
+    def all_nodes(self) -> List[Dict[str, Any]]:
+        snapshot = self._snapshot
+        if not snapshot:
+            return []
+        return [snapshot.nodes[node_id] for node_id in sorted(snapshot.nodes)]
+
+    def node_ids(self) -> AbstractSet[str]:
+        """Live view of every known node id (empty before the first load)"""
+        return self._snapshot.nodes.keys() if self._snapshot else frozenset()
+
+    def region_of(self, node_id: str) -> Optional[str]:
+        return self._snapshot.node_region.get(node_id) if self._snapshot else None
+
+    def node_ids_in_region(self, region_id: str) -> Set[str]:
+        return set(self._snapshot.region_nodes.get(region_id, ())) if self._snapshot else set()
+
+    def nodes_in_region(self, region_id: str) -> List[Dict[str, Any]]:
+        snapshot = self._snapshot
+        if not snapshot:
+            return []
+        node_ids = snapshot.region_nodes.get(region_id, ())
+        return [snapshot.nodes[node_id] for node_id in sorted(node_ids) if node_id in snapshot.nodes]
+
+    def region_sizes(self) -> Dict[str, int]:
+        """Number of nodes in each region"""
+        snapshot = self._snapshot
+        return {region_id: len(node_ids) for region_id, node_ids in snapshot.region_nodes.items()} if snapshot else {}
+
+    def children_of(self, parent_id: str) -> List[str]:
+        return sorted(self._snapshot.parent_children.get(parent_id, ())) if self._snapshot else []
+
+    def parent_of(self, node_id: str) -> Optional[str]:
+        return self._snapshot.child_parent.get(node_id) if self._snapshot else None
+
+    # ---- Spatial lookups ----
+    @staticmethod
+    def _region_filter(snapshot: TopologySnapshot, region_id: Optional[str]):
+        if region_id is None:
+            return None
+        members = snapshot.region_nodes.get(region_id, frozenset())
+        return members.__contains__
+
+    def nodes_in_bbox(self, bbox: BBox, region_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Nodes inside (min_lng, min_lat, max_lng, max_lat), optionally within one region"""
+        snapshot = self._snapshot
+        if not snapshot:
+            return []
+        node_ids = snapshot.spatial.bbox(bbox, self._region_filter(snapshot, region_id))
+        return [snapshot.nodes[node_id] for node_id in sorted(node_ids)]
+
+    def nearest_nodes(self, lat: float, lng: float, k: int, region_id: Optional[str] = None,
+                      max_km: Optional[float] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """(node, distance_km) of the k nodes nearest to a point"""
+        snapshot = self._snapshot
+        if not snapshot:
+            return []
+        return [(snapshot.nodes[node_id], distance) for node_id, distance
+                in snapshot.spatial.nearest(lat, lng, k, max_km, self._region_filter(snapshot, region_id))]
+
+    def nodes_within(self, lat: float, lng: float, radius_km: float,
+                     region_id: Optional[str] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """(node, distance_km) of every node within radius_km of a point, nearest first"""
+        snapshot = self._snapshot
+        if not snapshot:
+            return []
+        return [(snapshot.nodes[node_id], distance) for node_id, distance
+                in snapshot.spatial.within(lat, lng, radius_km, self._region_filter(snapshot, region_id))]
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        if not snapshot:
+            return {"ready": False}
+        return {
+            "ready": True,
+            "nodes": len(snapshot.nodes),
+            "regions": len(snapshot.region_nodes),
+            "parents": len(snapshot.parent_children),
+            "located_nodes": len(snapshot.spatial),
+            "age_seconds": round(time.time() - snapshot.built_at, 1),
+        }
+
+    # ---- Loading ----
+    def load(self, nodes: List[Dict[str, Any]], node_regions: List[Dict[str, Any]],
+             hierarchy: List[Dict[str, Any]]) -> Tuple[Set[str], Set[str]]:
+        """Install a new snapshot from table rows.
+
+        Returns the node ids and region ids whose data changed since the
+        previous snapshot so callers can invalidate only those.
+        """
+        new_nodes = {row['node_id']: row for row in nodes or [] if row.get('node_id')}
+        new_regions = {row['node_id']: row['region_id'] for row in node_regions or []
+                       if row.get('node_id') and row.get('region_id')}
+        new_children: Dict[str, Set[str]] = {}
+        for row in hierarchy or []:
+            new_children.setdefault(row['parent_id'], set()).add(row['child_id'])
+
+        with self._refresh_lock:
+            old = self._snapshot
+            self._snapshot = TopologySnapshot(new_nodes, new_regions, new_children)
+            self._version = None
+
+        if old is None:
+            return set(new_nodes), set(new_regions.values())
+
+        changed_nodes = {
+            node_id for node_id in set(old.nodes) | set(new_nodes)
+            if old.nodes.get(node_id) != new_nodes.get(node_id)
+            or old.node_region.get(node_id) != new_regions.get(node_id)
+            or old.parent_children.get(node_id) != new_children.get(node_id)
+        }
+        changed_regions = {
+            region_id
+            for node_id in changed_nodes
+            for region_id in (old.node_region.get(node_id), new_regions.get(node_id))
+            if region_id
+        }
+        return changed_nodes, changed_regions
+
+    def refresh(self, store) -> Tuple[Set[str], Set[str]]:
+        """Read the three topology tables from a StorageBackend and install them.
+
+        The tables carry no modification times, so changed rows cannot be
+        fetched on their own; instead the store's topology_version() is
+        compared first and the tables are only reread when it moved.
+        """
+        version = store.topology_version()
+        if version is not None and version == self._version and self.ready:
+            return set(), set()
+        changed = self.load(store.all_nodes(), store.node_regions(), store.hierarchy())
+        self._version = version
+        return changed
+
+    # ---- Background refresh ----
+    def start(self, app, db_manager, interval: float):
+        """Start the background refresh thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(app, db_manager, interval),
+            name="topology-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, app, db_manager, interval: float):
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    db_manager.refresh_topology()
+                except Exception as e:
+                    logger.warning(f"Topology refresh failed: {e}")
+            # Retry sooner until the first snapshot is available
+            self._stop.wait(interval if self.ready else min(interval, 5))
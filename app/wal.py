@@ -0,0 +1,367 @@
+"""
+Local write-ahead log for ingested rows
+
+While Supabase is unreachable, batches that cannot be written are appended
+to a segment-rotated log on local disk instead of being lost. Each record is
+framed as (length, crc32, JSON payload) and appends are fsync'ed in groups,
+so a crash loses at most the last ``fsync_interval`` seconds and a torn tail
+is detected and truncated on open. Once the database is back the log is
+replayed in order, in large batches, with the replay position checkpointed
+after every committed batch; fully replayed segments are deleted.
+
+A batch the database rejects (APIError) is split until the offending rows
+are isolated; those are moved to a rejects file next to the segments and the
+replay goes on, so a record that can never be written does not hold back
+everything logged after it. Only connection failures stop a replay.
+"""
+import os
+import json
+import time
+import zlib
+import struct
+import logging
+import threading
+from typing import Optional, List, Dict, Any, Callable, Iterator, Tuple
+from postgrest import APIError
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct("<II")
+SEGMENT_PREFIX = "wal-"
+SEGMENT_SUFFIX = ".log"
+CHECKPOINT_FILE = "checkpoint.json"
+REJECTS_FILE = "rejects.log"
+
+# Position in the log: (segment sequence number, byte offset)
+Position = Tuple[int, int]
+
+class WriteAheadLog:
+    """Append-only record log split into numbered segment files"""
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, fsync_interval: float = 0.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._file = None
+        self._last_fsync = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Metrics
+        self.appended_records = 0
+        self.appended_rows = 0
+        self.replayed_rows = 0
+        self.rejected_rows = 0
+        self.truncated_bytes = 0
+        self.last_replay: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self._open()
+
+    # ---- Segments ----
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{seq:012d}{SEGMENT_SUFFIX}")
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self._segments()
+        checkpoint = self._read_checkpoint()
+        if not segments:
+            seq = max(1, checkpoint[0])
+            self._write_checkpoint((seq, 0))
+        else:
+            seq = segments[-1]
+            self._checkpoint = max(checkpoint, (segments[0], 0))
+            self._truncate_torn_tail(self._segment_path(seq))
+        self._file = open(self._segment_path(seq), "ab")
+        self._seq = seq
+
+    def _truncate_torn_tail(self, path: str):
+        """Cut a partially written last record left by a crash"""
+        valid = 0
+        with open(path, "rb") as f:
+            for _, end in self._scan(f, 0):
+                valid = end
+            size = f.seek(0, os.SEEK_END)
+        if size > valid:
+            logger.warning(f"Truncating {size - valid} bytes of torn WAL tail in {path}")
+            self.truncated_bytes += size - valid
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+
+    @staticmethod
+    def _frame(payload: Dict[str, Any]) -> bytes:
+        data = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+        return HEADER.pack(len(data), zlib.crc32(data)) + data
+
+    @staticmethod
+    def _scan(f, offset: int) -> Iterator[Tuple[Dict[str, Any], int]]:
+        """Yield (payload, end offset) for each intact record from offset"""
+        f.seek(offset)
+        while True:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            length, crc = HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length or zlib.crc32(data) != crc:
+                return
+            offset += HEADER.size + length
+            yield json.loads(data), offset
+
+    # ---- Checkpoint ----
+    def _read_checkpoint(self) -> Position:
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        if not os.path.exists(path):
+            return (0, 0)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return (data["segment"], data["offset"])
+
+    def _write_checkpoint(self, position: Position):
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"segment": position[0], "offset": position[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._checkpoint = position
+
+    # ---- Appends ----
+    def append(self, table: str, rows: List[Dict[str, Any]]):
+        """Durably append one batch (fsync'ed now or within fsync_interval)"""
+        record = self._frame({"table": table, "rows": rows})
+        with self._lock:
+            if self._file.tell() and self._file.tell() + len(record) > self.segment_bytes:
+                self._rotate()
+            self._file.write(record)
+            self._file.flush()
+            now = time.time()
+            if now - self._last_fsync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+            self.appended_records += 1
+            self.appended_rows += len(rows)
+
+    def _rotate(self):
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._seq += 1
+        self._file = open(self._segment_path(self._seq), "ab")
+
+    def sync(self):
+        """Force buffered appends to disk"""
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._last_fsync = time.time()
+
+    def _end(self) -> Position:
+        with self._lock:
+            return (self._seq, self._file.tell())
+
+    @property
+    def pending(self) -> bool:
+        """True while appended records have not all been replayed"""
+        return self._checkpoint < self._end()
+
+    def pending_bytes(self) -> int:
+        checkpoint_seq, checkpoint_offset = self._checkpoint
+        total = 0
+        for seq in self._segments():
+            if seq >= checkpoint_seq:
+                path = self._segment_path(seq)
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                total += size - (checkpoint_offset if seq == checkpoint_seq else 0)
+        return max(0, total)
+
+    # ---- Replay ----
+    def _records(self, start: Position) -> Iterator[Tuple[str, List[Dict[str, Any]], Position]]:
+        """Yield (table, rows, position after the record) from start to the current end"""
+        end = self._end()
+        for seq in self._segments():
+            if seq < start[0] or seq > end[0]:
+                continue
+            offset = start[1] if seq == start[0] else 0
+            with open(self._segment_path(seq), "rb") as f:
+                for payload, offset in self._scan(f, offset):
+                    if (seq, offset) > end:
+                        return
+                    yield payload["table"], payload["rows"], (seq, offset)
+
+    def replay(self, writer: Callable[[str, List[Dict[str, Any]]], Any], batch_rows: int = 5000,
+               dedupe: Optional[Callable[[str, List[Dict[str, Any]]], List[Dict[str, Any]]]] = None
+               ) -> Dict[str, Any]:
+        """Write every pending record in order, in batches of up to batch_rows rows per table.
+
+        The first batch goes through ``dedupe`` because it may already have
+        been written just before a crash (after the write, before the
+        checkpoint). Rows the database rejects are quarantined and skipped;
+        any other failure stops the replay, leaving the checkpoint at the
+        last committed batch.
+        """
+        with self._replay_lock:
+            self.sync()
+            started = time.time()
+            replayed = 0
+            rejected = 0
+            first = True
+            table: Optional[str] = None
+            batch: List[Dict[str, Any]] = []
+            position = self._checkpoint
+
+            def commit(upto: Position):
+                nonlocal first, replayed, rejected, batch
+                rows = dedupe(table, batch) if first and dedupe else batch
+                try:
+                    writer(table, rows)
+                except APIError as e:
+                    logger.warning(f"Database rejected a replayed {table} batch of {len(rows)} rows, "
+                                   f"isolating bad rows: {e}")
+                    rejected += self._write_accepted(writer, table, rows)
+                self._write_checkpoint(upto)
+                replayed += len(batch)
+                first = False
+                batch = []
+
+            try:
+                for record_table, rows, after in self._records(self._checkpoint):
+                    if batch and (record_table != table or len(batch) + len(rows) > batch_rows):
+                        commit(position)
+                    table = record_table
+                    batch.extend(rows)
+                    position = after
+                if batch:
+                    commit(position)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            finally:
+                elapsed = time.time() - started
+                result = {
+                    "rows": replayed,
+                    "rejected": rejected,
+                    "seconds": round(elapsed, 3),
+                    "rows_per_second": round(replayed / elapsed, 1) if elapsed else None,
+                }
+                self.replayed_rows += replayed
+                if replayed:
+                    self.last_replay = dict(result, finished_at=time.time())
+                self._drop_replayed_segments()
+            return result
+
+    def _write_accepted(self, writer: Callable[[str, List[Dict[str, Any]]], Any], table: str,
+                        rows: List[Dict[str, Any]]) -> int:
+        """Write a rejected batch in halves, quarantining single rows the database still rejects.
+
+        Returns the number of rows quarantined. A connection failure part way
+        propagates; the retried batch then goes through dedupe again.
+        """
+        quarantined = 0
+        parts = [rows[len(rows) // 2:], rows[:len(rows) // 2]]
+        while parts:
+            part = parts.pop()
+            if not part:
+                continue
+            try:
+                writer(table, part)
+            except APIError as e:
+                if len(part) > 1:
+                    parts.extend([part[len(part) // 2:], part[:len(part) // 2]])
+                    continue
+                self._quarantine(table, part[0], str(e))
+                quarantined += 1
+        return quarantined
+
+    def _quarantine(self, table: str, row: Dict[str, Any], error: str):
+        """Append a rejected row to the rejects file, for an operator to fix and resubmit"""
+        record = self._frame({"table": table, "rows": [row], "error": error, "at": time.time()})
+        with open(os.path.join(self.directory, REJECTS_FILE), "ab") as f:
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        self.rejected_rows += 1
+        logger.error(f"Quarantined a {table} row the database rejects: {error}")
+
+    def rejects(self) -> Iterator[Dict[str, Any]]:
+        """Yield the quarantined records ({"table", "rows", "error", "at"}), oldest first"""
+        path = os.path.join(self.directory, REJECTS_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            for payload, _ in self._scan(f, 0):
+                yield payload
+
+    def _drop_replayed_segments(self):
+        with self._lock:
+            for seq in self._segments():
+                if seq < self._checkpoint[0] and seq != self._seq:
+                    os.remove(self._segment_path(seq))
+            # Everything replayed: start a fresh segment so the old one can go
+            if self._checkpoint == (self._seq, self._file.tell()) and self._file.tell():
+                self._rotate()
+                self._write_checkpoint((self._seq, 0))
+                os.remove(self._segment_path(self._seq - 1))
+
+    # ---- Background replay ----
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, app, db_manager, interval: float):
+        """Replay pending records from a daemon thread whenever the database is reachable"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(app, db_manager, interval),
+            name="wal-replay", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, app, db_manager, interval: float):
+        while not self._stop.wait(interval):
+            if not self.pending or not db_manager.connected:
+                continue
+            try:
+                with app.app_context():
+                    result = db_manager.replay_wal()
+                logger.info(f"Replayed {result['rows']} rows from the WAL "
+                            f"({result.get('rows_per_second')} rows/s)")
+            except Exception as e:
+                logger.warning(f"WAL replay stopped, will retry: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._file and not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "segments": len(self._segments()),
+            "pending": self.pending,
+            "pending_bytes": self.pending_bytes(),
+            "appended_records": self.appended_records,
+            "appended_rows": self.appended_rows,
+            "replayed_rows": self.replayed_rows,
+            "rejected_rows": self.rejected_rows,
+            "truncated_bytes": self.truncated_bytes,
+            "last_replay": self.last_replay,
+            "last_error": self.last_error,
+            "replaying": self.running,
+        }
@@ -0,0 +1,269 @@
+"""
+Write-behind buffer for ingested rows
+
+Ingestion requests enqueue validated `sensor_readings` and
+`Parent_Node_Reports` rows and return immediately. A daemon thread flushes
+each table with one multi-row write once enough rows are queued or the oldest
+row has waited long enough, so a burst of small batches becomes a few large
+writes. Identical rows within a flush (a parent resending the same readings)
+are coalesced into one. The queue is bounded: once full, offers are refused
+and the caller answers 429 with a Retry-After estimated from the drain rate.
+
+Connection failures leave a batch queued to be retried. A batch the database
+rejects (APIError: a foreign key or an out-of-range value) is split in halves
+until the offending rows are isolated; those are dead-lettered and the rest
+is written, so one bad row cannot stall the queue.
+"""
+import time
+import logging
+import threading
+from collections import deque
+from typing import Optional, List, Dict, Any, Callable
+from postgrest import APIError
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindBuffer:
+    """Bounded per-table queues drained by a background flusher"""
+
+    def __init__(self, capacity: int = 100000, flush_rows: int = 5000, flush_interval: float = 1.0,
+                 dead_letter_size: int = 1000):
+        self.capacity = capacity
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._oldest: Dict[str, float] = {}
+        self._depth = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Metrics
+        self.accepted_rows = 0
+        self.rejected_batches = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.rows_coalesced = 0
+        self.failed_flushes = 0
+        self.dead_lettered_rows = 0
+        self.last_error: Optional[str] = None
+        # Most recent rows the database rejected: {"table", "row", "error", "at"}
+        self.dead_letters: deque = deque(maxlen=dead_letter_size)
+        self._latencies: deque = deque(maxlen=256)
+        self._drain: deque = deque(maxlen=32)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ---- Producers ----
+    def offer(self, table: str, rows: List[Dict[str, Any]]) -> bool:
+        """Queue rows for writing; False (nothing queued) when the buffer is full"""
+        if not rows:
+            return True
+        with self._cond:
+            if self._depth + len(rows) > self.capacity:
+                self.rejected_batches += 1
+                return False
+            self._pending.setdefault(table, []).extend(rows)
+            self._oldest.setdefault(table, time.time())
+            self._depth += len(rows)
+            self.accepted_rows += len(rows)
+            if len(self._pending[table]) >= self.flush_rows:
+                self._cond.notify()
+        return True
+
+    def retry_after(self) -> int:
+        """Seconds a refused producer should wait, from the recent drain rate"""
+        with self._cond:
+            depth = self._depth
+            drained = list(self._drain)
+        if len(drained) >= 2 and drained[-1][0] > drained[0][0]:
+            rate = sum(rows for _, rows in drained[1:]) / (drained[-1][0] - drained[0][0])
+            if rate > 0:
+                return max(1, min(60, int(depth / rate) + 1))
+        return max(1, int(self.flush_interval) + 1)
+
+    # ---- Flushing ----
+    def _due(self, now: float) -> Optional[str]:
+        """The table to flush now, if any"""
+        due = None
+        for table, rows in self._pending.items():
+            if not rows:
+                continue
+            if len(rows) >= self.flush_rows or self._stop.is_set():
+                return table
+            if now - self._oldest[table] >= self.flush_interval and (
+                    due is None or self._oldest[table] < self._oldest[due]):
+                due = table
+        return due
+
+    def _take(self, table: str) -> List[Dict[str, Any]]:
+        rows = self._pending[table]
+        batch, rest = rows[:self.flush_rows], rows[self.flush_rows:]
+        self._pending[table] = rest
+        if not rest:
+            # Leftover rows keep the older timestamp, so they are flushed promptly
+            self._oldest.pop(table, None)
+        return batch
+
+    def _restore(self, table: str, batch: List[Dict[str, Any]]):
+        """Put a failed batch back at the head of its queue"""
+        with self._cond:
+            self._pending[table] = batch + self._pending.get(table, [])
+            self._oldest[table] = min(self._oldest.get(table, time.time()), time.time())
+
+    @staticmethod
+    def coalesce(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop exact duplicates (validated rows share one column order)"""
+        unique = {tuple(row.values()): row for row in rows}
+        return list(unique.values()) if len(unique) < len(rows) else rows
+
+    def flush_once(self, writer: Callable[[str, List[Dict[str, Any]]], Any], force: bool = False) -> int:
+        """Write one due batch; returns rows taken off the queue (0 if nothing was due)"""
+        with self._flush_lock:
+            with self._cond:
+                table = next((t for t, rows in self._pending.items() if rows), None) if force \
+                    else self._due(time.time())
+                if table is None:
+                    return 0
+                batch = self._take(table)
+            rows = self.coalesce(batch)
+            started = time.perf_counter()
+            rejected: List[Dict[str, Any]] = []
+            try:
+                writer(table, rows)
+            except APIError as e:
+                logger.warning(f"Database rejected a {table} batch of {len(rows)} rows, isolating bad rows: {e}")
+                rejected = self._isolate(writer, table, rows, batch)
+            except Exception as e:
+                self._restore(table, batch)
+                self.failed_flushes += 1
+                self.last_error = str(e)
+                raise
+            elapsed = time.perf_counter() - started
+            with self._cond:
+                self._depth -= len(batch)
+                self.flushes += 1
+                self.rows_written += len(rows) - len(rejected)
+                self.rows_coalesced += len(batch) - len(rows)
+                self._latencies.append(elapsed)
+                self._drain.append((time.time(), len(batch)))
+                if not rejected:
+                    self.last_error = None
+            return len(batch)
+
+    def _isolate(self, writer: Callable[[str, List[Dict[str, Any]]], Any], table: str,
+                 rows: List[Dict[str, Any]], batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Write a rejected batch in halves, dead-lettering single rows the database still rejects.
+
+        Returns the rejected rows. A connection failure part way puts the
+        rows not yet written back on the queue and re-raises.
+        """
+        rejected = []
+        parts = [rows[len(rows) // 2:], rows[:len(rows) // 2]]
+        while parts:
+            part = parts.pop()
+            if not part:
+                continue
+            try:
+                writer(table, part)
+            except APIError as e:
+                if len(part) > 1:
+                    parts.extend([part[len(part) // 2:], part[:len(part) // 2]])
+                    continue
+                rejected.append(part[0])
+                with self._cond:
+                    self.dead_lettered_rows += 1
+                    self.dead_letters.append({"table": table, "row": part[0], "error": str(e), "at": time.time()})
+                    self.last_error = str(e)
+                logger.error(f"Dead-lettered a {table} row the database rejects: {e}")
+            except Exception as e:
+                unwritten = [row for remaining in parts + [part] for row in remaining]
+                self._restore(table, unwritten)
+                with self._cond:
+                    self._depth -= len(batch) - len(unwritten)
+                self.failed_flushes += 1
+                self.last_error = str(e)
+                raise
+        return rejected
+
+    def flush(self, writer: Callable[[str, List[Dict[str, Any]]], Any]):
+        """Synchronously write everything queued (raises on the first failure)"""
+        while self.flush_once(writer, force=True):
+            pass
+
+    # ---- Background flusher ----
+    def start(self, app, db_manager):
+        """Start the flusher thread (idempotent)"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(app, db_manager),
+            name="write-behind", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the flusher after it drains what it can"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _wait_time(self) -> float:
+        if not self._oldest:
+            return self.flush_interval
+        return max(0.0, min(self._oldest.values()) + self.flush_interval - time.time())
+
+    def _run(self, app, db_manager):
+        backoff = 0.0
+        while True:
+            with self._cond:
+                if self._due(time.time()) is None:
+                    if self._stop.is_set():
+                        return
+                    self._cond.wait(self._wait_time())
+            try:
+                with app.app_context():
+                    while self.flush_once(db_manager.write_rows):
+                        pass
+                backoff = 0.0
+            except Exception as e:
+                # Rows stay queued; the bounded queue turns a long outage into backpressure
+                backoff = min(max(backoff * 2, 0.5), 30.0)
+                logger.warning(f"Write-behind flush failed, retrying in {backoff:.1f}s: {e}")
+                if self._stop.wait(backoff):
+                    return
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            latencies = sorted(self._latencies)
+            oldest = min(self._oldest.values()) if self._oldest else None
+            stats = {
+                "running": self.running,
+                "depth": self._depth,
+                "capacity": self.capacity,
+                "depth_by_table": {table: len(rows) for table, rows in self._pending.items() if rows},
+                "oldest_age_seconds": round(time.time() - oldest, 3) if oldest else None,
+                "accepted_rows": self.accepted_rows,
+                "rejected_batches": self.rejected_batches,
+                "flushes": self.flushes,
+                "rows_written": self.rows_written,
+                "rows_coalesced": self.rows_coalesced,
+                "failed_flushes": self.failed_flushes,
+                "dead_lettered_rows": self.dead_lettered_rows,
+                "last_error": self.last_error,
+            }
+        stats["flush_latency_ms"] = _percentiles(latencies)
+        return stats
+
+def _percentiles(sorted_values: List[float]) -> Dict[str, Optional[float]]:
+    if not sorted_values:
+        return {"p50": None, "p95": None, "max": None}
+
+    def pick(fraction: float) -> float:
+        return round(sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))] * 1000, 2)
+    return {"p50": pick(0.5), "p95": pick(0.95), "max": round(sorted_values[-1] * 1000, 2)}
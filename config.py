@@ -19,11 +19,118 @@ class Config:
     # Flask-Caching defaults (avoid null warning)
     CACHE_TYPE = os.environ.get('CACHE_TYPE', 'SimpleCache')
     CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))
+
+    # Read-through query cache (seconds per DatabaseManager query)
+    QUERY_CACHE_ENABLED = os.environ.get('QUERY_CACHE_ENABLED', 'True').lower() == 'true'
+    QUERY_CACHE_TTLS = {
+        'node_info': int(os.environ.get('CACHE_TTL_NODE_INFO', 300)),
+        'node_region': int(os.environ.get('CACHE_TTL_NODE_REGION', 3600)),
+        'nodes_for_dashboard': int(os.environ.get('CACHE_TTL_DASHBOARD', 60)),
+        'node_history': int(os.environ.get('CACHE_TTL_NODE_HISTORY', 30)),
+        'nodes_with_status': int(os.environ.get('CACHE_TTL_NODES_STATUS', 15)),
+        'node_history_downsampled': int(os.environ.get('CACHE_TTL_NODE_HISTORY_DOWNSAMPLED', 60)),
+        'latest_reading': int(os.environ.get('CACHE_TTL_LATEST_READING', 15)),
+    }
     
     # Database settings
     DB_RETRY_ATTEMPTS = int(os.environ.get('DB_RETRY_ATTEMPTS', 3))
     DB_RETRY_DELAY = int(os.environ.get('DB_RETRY_DELAY', 2))
     DB_MAX_RETRY_DELAY = int(os.environ.get('DB_MAX_RETRY_DELAY', 300))
+    # Worker threads for issuing independent queries concurrently
+    DB_FANOUT_WORKERS = int(os.environ.get('DB_FANOUT_WORKERS', 8))
+    # Background connection supervisor (connects, health-checks, reconnects)
+    DB_SUPERVISOR_ENABLED = os.environ.get('DB_SUPERVISOR_ENABLED', 'True').lower() == 'true'
+    DB_HEALTH_CHECK_INTERVAL = int(os.environ.get('DB_HEALTH_CHECK_INTERVAL', 15))
+    # Circuit breaker: open after N consecutive backend failures, retry after the timeout (seconds)
+    DB_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('DB_BREAKER_FAILURE_THRESHOLD', 5))
+    DB_BREAKER_RESET_TIMEOUT = int(os.environ.get('DB_BREAKER_RESET_TIMEOUT', 30))
+
+    # Last-known-good results served during outages (ages in seconds)
+    STALE_WHILE_REVALIDATE = int(os.environ.get('STALE_WHILE_REVALIDATE', 30))
+    STALE_MAX_AGE = int(os.environ.get('STALE_MAX_AGE', 86400))
+    LAST_KNOWN_GOOD_MAX_ENTRIES = int(os.environ.get('LAST_KNOWN_GOOD_MAX_ENTRIES', 5000))
+
+    # Sensor history paging
+    HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 200))
+    HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', 1000))
+    HISTORY_DOWNSAMPLE_MAX_ROWS = int(os.environ.get('HISTORY_DOWNSAMPLE_MAX_ROWS', 500000))
+
+    # Maximum nodes per /api/latest request
+    LATEST_MAX_NODES = int(os.environ.get('LATEST_MAX_NODES', 5000))
+
+    # Maximum k for nearest-node queries (/api/nodes?lat=&lng=&k=)
+    SPATIAL_MAX_NEAREST = int(os.environ.get('SPATIAL_MAX_NEAREST', 1000))
+
+    # Map marker clustering (/api/clusters): merge radius in pixels, deepest clustered zoom
+    CLUSTER_RADIUS = int(os.environ.get('CLUSTER_RADIUS', 60))
+    CLUSTER_MAX_ZOOM = int(os.environ.get('CLUSTER_MAX_ZOOM', 14))
+
+    # GeoJSON node tiles (/tiles/<z>/<x>/<y>): served zoom range and cached tile count
+    TILE_MIN_ZOOM = int(os.environ.get('TILE_MIN_ZOOM', 10))
+    TILE_MAX_ZOOM = int(os.environ.get('TILE_MAX_ZOOM', 20))
+    TILE_CACHE_SIZE = int(os.environ.get('TILE_CACHE_SIZE', 10000))
+
+    # Threshold alert rules (JSON list, see alert_rules.json) and resolved alerts kept for /api/alerts
+    ALERT_RULES_FILE = os.environ.get('ALERT_RULES_FILE', 'alert_rules.json')
+    ALERT_HISTORY_SIZE = int(os.environ.get('ALERT_HISTORY_SIZE', 1000))
+    ALERT_FEED_MAX = int(os.environ.get('ALERT_FEED_MAX', 1000))
+
+    # Fire-risk scoring of every node's latest reading (/api/risk), rescored every REFRESH_INTERVAL seconds
+    RISK_REFRESH_ENABLED = os.environ.get('RISK_REFRESH_ENABLED', 'True').lower() == 'true'
+    RISK_REFRESH_INTERVAL = float(os.environ.get('RISK_REFRESH_INTERVAL', 30))
+    # Seconds between reloads of every node's latest reading from storage (rows written around ingest)
+    RISK_RELOAD_INTERVAL = float(os.environ.get('RISK_RELOAD_INTERVAL', 300))
+    RISK_MAX_NODES = int(os.environ.get('RISK_MAX_NODES', 1000))
+
+    # Streaming anomaly detection (/api/anomalies): EWMA smoothing factor, z-score threshold,
+    # readings before spikes are flagged, and anomalies kept for ?state=recent
+    ANOMALY_ALPHA = float(os.environ.get('ANOMALY_ALPHA', 0.1))
+    ANOMALY_Z_THRESHOLD = float(os.environ.get('ANOMALY_Z_THRESHOLD', 4.0))
+    ANOMALY_WARMUP = int(os.environ.get('ANOMALY_WARMUP', 5))
+    ANOMALY_HISTORY_SIZE = int(os.environ.get('ANOMALY_HISTORY_SIZE', 1000))
+
+    # Drone detection / ground sensor correlation (/api/incidents): search radius, how recent sensor
+    # evidence must be (seconds), agreement needed to confirm, incidents kept on the stream
+    CORRELATION_RADIUS_KM = float(os.environ.get('CORRELATION_RADIUS_KM', 1.0))
+    CORRELATION_WINDOW = float(os.environ.get('CORRELATION_WINDOW', 600))
+    CORRELATION_MIN_AGREEMENT = float(os.environ.get('CORRELATION_MIN_AGREEMENT', 0.5))
+    INCIDENT_HISTORY_SIZE = int(os.environ.get('INCIDENT_HISTORY_SIZE', 500))
+
+    # Batch ingestion of sensor readings (/api/ingest/readings)
+    INGEST_MAX_BATCH = int(os.environ.get('INGEST_MAX_BATCH', 10000))
+    INGEST_LEDGER_SIZE = int(os.environ.get('INGEST_LEDGER_SIZE', 10000))
+    # Write-behind buffer: flush per table at FLUSH_ROWS rows or FLUSH_INTERVAL seconds,
+    # answer 429 once CAPACITY rows are queued
+    WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'True').lower() == 'true'
+    WRITE_BEHIND_CAPACITY = int(os.environ.get('WRITE_BEHIND_CAPACITY', 100000))
+    WRITE_BEHIND_FLUSH_ROWS = int(os.environ.get('WRITE_BEHIND_FLUSH_ROWS', 5000))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ.get('WRITE_BEHIND_FLUSH_INTERVAL', 1.0))
+
+    # Local write-ahead log for ingested rows while Supabase is unreachable (relative WAL_DIR: under instance/)
+    WAL_ENABLED = os.environ.get('WAL_ENABLED', 'True').lower() == 'true'
+    WAL_DIR = os.environ.get('WAL_DIR', 'wal')
+    WAL_SEGMENT_BYTES = int(os.environ.get('WAL_SEGMENT_BYTES', 64 * 1024 * 1024))
+    WAL_FSYNC_INTERVAL = float(os.environ.get('WAL_FSYNC_INTERVAL', 0.05))
+    WAL_REPLAY_INTERVAL = float(os.environ.get('WAL_REPLAY_INTERVAL', 5))
+    WAL_REPLAY_BATCH = int(os.environ.get('WAL_REPLAY_BATCH', 5000))
+
+    # Storage backend: supabase, sqlite (STORAGE_SQLITE_PATH, built from Database/) or memory
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'supabase').lower()
+    STORAGE_SQLITE_PATH = os.environ.get('STORAGE_SQLITE_PATH', 'fire_sensors.sqlite3')
+
+    # Local SQLite read replica synchronized from Supabase
+    REPLICA_ENABLED = os.environ.get('REPLICA_ENABLED', 'False').lower() == 'true'
+    REPLICA_PATH = os.environ.get('REPLICA_PATH', 'replica.sqlite3')
+    REPLICA_SYNC_INTERVAL = int(os.environ.get('REPLICA_SYNC_INTERVAL', 10))
+    REPLICA_SYNC_BATCH = int(os.environ.get('REPLICA_SYNC_BATCH', 1000))
+    # Ids below the watermark re-checked on every sync for rows that committed late
+    REPLICA_RESCAN_IDS = int(os.environ.get('REPLICA_RESCAN_IDS', 1000))
+
+    # In-memory topology index (nodes, node_regions, node_hierarchy)
+    TOPOLOGY_INDEX_ENABLED = os.environ.get('TOPOLOGY_INDEX_ENABLED', 'True').lower() == 'true'
+    TOPOLOGY_REFRESH_INTERVAL = int(os.environ.get('TOPOLOGY_REFRESH_INTERVAL', 60))
+    # Full rescan of the latest readings for the region rollup, unless the topology changed sooner
+    ROLLUP_RECONCILE_INTERVAL = int(os.environ.get('ROLLUP_RECONCILE_INTERVAL', 600))
     
     # Regional mapping
     REGION_MAPPING = {
@@ -54,6 +161,11 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     DEBUG = True
+    TOPOLOGY_INDEX_ENABLED = False
+    DB_SUPERVISOR_ENABLED = False
+    WRITE_BEHIND_ENABLED = False
+    WAL_ENABLED = False
+    RISK_REFRESH_ENABLED = False
 
 # Configuration dictionary
 config = {
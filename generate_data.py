@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Synthetic Dataset Generator
+Generates a parameterized fire-sensor network (nodes across all fire regions,
+hierarchy, months of sensor readings and parent reports) and writes it as
+COPY-ready CSV files, into a SQLite database, or into Supabase.
+
+Examples:
+    python generate_data.py --parents 500 --children 6 --days 90 --format csv --output data/
+    python generate_data.py --parents 50 --days 7 --format sqlite --output fire_sensors.sqlite3
+    python generate_data.py --parents 20 --days 1 --format supabase
+"""
+import os
+import csv
+import sys
+import time
+import argparse
+from app.synthetic import SyntheticDataset, TABLE_ORDER, parse_end, column_names
+
+def csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+def write_csv(dataset: SyntheticDataset, output: str):
+    """Write one CSV per table plus a psql script that loads them with \\copy"""
+    os.makedirs(output, exist_ok=True)
+    copy_lines = []
+    for table in TABLE_ORDER:
+        path = os.path.join(output, f"{table}.csv")
+        started = time.time()
+        count = 0
+        columns = None
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            for row in dataset.table_rows(table):
+                if columns is None:
+                    columns = column_names(table, row)
+                    writer.writerow(columns)
+                writer.writerow([csv_value(row[column]) for column in columns])
+                count += 1
+        print(f"   ✅ {table}: {count:,} rows in {time.time() - started:.1f}s -> {path}")
+        if columns:
+            names = ", ".join(columns)
+            copy_lines.append(f"\\copy public.\"{table}\" ({names}) FROM '{os.path.abspath(path)}' WITH (FORMAT csv, HEADER true)")
+
+    copy_lines += [
+        "SELECT setval(pg_get_serial_sequence('public.sensor_readings', 'reading_id'), max(reading_id)) FROM public.sensor_readings;",
+        "SELECT setval(pg_get_serial_sequence('public.\"Parent_Node_Reports\"', 'report_id'), max(report_id)) FROM public.\"Parent_Node_Reports\";",
+    ]
+    script = os.path.join(output, "load.sql")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write("\n".join(copy_lines) + "\n")
+    print(f"\n   Load into Postgres with: psql \"$DATABASE_URL\" -f {script}")
+
+def write_store(dataset: SyntheticDataset, store, batch_size: int):
+    """Write every table through a StorageBackend in batched upserts"""
+    for table in TABLE_ORDER:
+        started = time.time()
+        count = 0
+        for batch in dataset.batched(dataset.table_rows(table), batch_size):
+            store.upsert_rows(table, batch)
+            count += len(batch)
+        elapsed = time.time() - started
+        rate = count / elapsed if elapsed else 0
+        print(f"   ✅ {table}: {count:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic fire-sensor dataset")
+    parser.add_argument("--parents", type=int, default=100, help="parent nodes (spread over the regions)")
+    parser.add_argument("--children", type=int, default=5, help="child sensors per parent")
+    parser.add_argument("--days", type=float, default=30, help="days of history ending at --end")
+    parser.add_argument("--interval", type=int, default=60, help="seconds between readings of a sensor")
+    parser.add_argument("--report-interval", type=int, default=3600, help="seconds between parent reports")
+    parser.add_argument("--end", help="end of the history (ISO date/time, UTC); default: today 00:00")
+    parser.add_argument("--fire-rate", type=float, default=0.5, help="fire events per sensor per 30 days")
+    parser.add_argument("--regions", help="comma-separated region ids (default: all)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=("csv", "sqlite", "supabase"), default="csv")
+    parser.add_argument("--output", default="synthetic_data", help="CSV directory or SQLite file")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per upsert batch")
+    args = parser.parse_args(argv)
+
+    dataset = SyntheticDataset(
+        parents=args.parents,
+        children_per_parent=args.children,
+        days=args.days,
+        interval_seconds=args.interval,
+        report_interval_seconds=args.report_interval,
+        end=parse_end(args.end),
+        seed=args.seed,
+        fire_rate=args.fire_rate,
+        regions=args.regions.split(",") if args.regions else None,
+    )
+
+    print("🔥 Fire Detection Dashboard - Synthetic Dataset Generator")
+    print("=" * 60)
+    print(f"   History: {dataset.start.isoformat()} -> {dataset.end.isoformat()}")
+    for table, count in dataset.counts().items():
+        print(f"   {table}: {count:,} rows")
+    print()
+
+    started = time.time()
+    if args.format == "csv":
+        write_csv(dataset, args.output)
+    elif args.format == "sqlite":
+        from app.sqlite_store import SQLiteStore
+        store = SQLiteStore(args.output)
+        store.create_schema()
+        write_store(dataset, store, args.batch_size)
+    else:
+        from supabase import create_client
+        from config import Config
+        from app.supabase_store import SupabaseStore
+        if not Config.SUPABASE_URL or not Config.SUPABASE_KEY:
+            print("❌ SUPABASE_URL and SUPABASE_KEY must be set")
+            return 1
+        client = create_client(Config.SUPABASE_URL.strip(), Config.SUPABASE_KEY.strip())
+        write_store(dataset, SupabaseStore(lambda: client), args.batch_size)
+
+    print("\n" + "=" * 60)
+    print(f"✅ Dataset generated in {time.time() - started:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,13 +7,20 @@ L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
   attribution: '© OpenStreetMap contributors'
 }).addTo(map);
 
-// Nodes injected by template
-const nodes = window.NODES || [];
+// Marker colour for the latest danger level (null when no reading exists)
+const dangerColor = (level) => {
+  if (level === null || level === undefined) return '#7f8c8d';
+  if (level >= 4) return '#c0392b';
+  if (level >= 3) return '#e67e22';
+  if (level >= 2) return '#f1c40f';
+  return '#27ae60';
+};
 
-const createNodeIcon = (isParent) => {
+const createNodeIcon = (isParent, dangerLevel) => {
+  const style = isParent ? '' : ` style="color: ${dangerColor(dangerLevel)}"`;
   return L.divIcon({
     className: isParent ? 'home-icon' : 'marker-icon',
-    html: `<i class="fas ${isParent ? 'fa-home' : 'fa-circle'}"></i>`,
+    html: `<i class="fas ${isParent ? 'fa-home' : 'fa-circle'}"${style}></i>`,
     iconSize: isParent ? [30, 30] : [20, 20],
     iconAnchor: isParent ? [15, 15] : [10, 10]
   });
@@ -24,44 +31,173 @@ const getNodeUrl = (nodeId, isParent) => {
   return isParent ? `/parent/${formattedId}` : `/node/${formattedId}`;
 };
 
-const parentCoords = {};
-
-nodes.forEach(node => {
-  if (!node.lat || !node.lng) return;
-  const isParent = node.is_parent === true || node.is_parent === 'true';
-  if (isParent) {
-    parentCoords[node.node_id] = {
-      lat: parseFloat(node.lat),
-      lng: parseFloat(node.lng)
-    };
-  }
-});
+const nodeLayer = L.layerGroup().addTo(map);
+const nodeList = document.getElementById('node-list');
+const clusterMaxZoom = window.CLUSTER_MAX_ZOOM || 14;
+const isParentNode = (node) => node.is_parent === true || node.is_parent === 'true';
 
-nodes.forEach(node => {
-  if (!node.lat || !node.lng) return;
-  const lat = parseFloat(node.lat);
-  const lng = parseFloat(node.lng);
-  const isParent = node.is_parent === true || node.is_parent === 'true';
-  const label = node.title || node.node_id;
+const renderNode = (node, lat, lng) => {
+  const isParent = isParentNode(node);
+  const label = node.danger_level !== null && node.danger_level !== undefined
+    ? `${node.title || node.node_id} (Επικινδυνότητα: ${node.danger_level})`
+    : (node.title || node.node_id);
   const url = getNodeUrl(node.node_id, isParent);
 
-  L.marker([lat, lng], { icon: createNodeIcon(isParent) })
-    .addTo(map)
+  L.marker([lat, lng], { icon: createNodeIcon(isParent, node.danger_level) })
+    .addTo(nodeLayer)
     .bindTooltip(label, { direction: 'top', offset: [0, -10], opacity: 0.9 })
     .on('click', () => { window.location.href = url; });
+};
+
+const renderLink = (start, end) => {
+  L.polyline([start, end], {
+    color: 'red',
+    weight: 2,
+    dashArray: '5,5'
+  }).addTo(nodeLayer);
+};
 
-  if (!isParent && node.node_id.includes('_')) {
-    const parentId = 'N' + node.node_id.split('_')[0].slice(1);
-    if (parentCoords[parentId]) {
-      L.polyline([[lat, lng], [parentCoords[parentId].lat, parentCoords[parentId].lng]], {
-        color: 'red',
-        weight: 2,
-        dashArray: '5,5'
-      }).addTo(map);
+// One marker per cluster of nearby nodes, coloured by its highest danger level
+const renderClusters = (clusters) => {
+  clusters.forEach(cluster => {
+    const size = cluster.count < 100 ? 34 : cluster.count < 1000 ? 42 : 50;
+    const icon = L.divIcon({
+      className: 'cluster-icon',
+      html: `<div style="width:${size}px;height:${size}px;line-height:${size}px;border-radius:50%;`
+        + `background:${dangerColor(cluster.max_danger)};color:#fff;font-weight:bold;text-align:center;`
+        + `opacity:0.85">${cluster.count}</div>`,
+      iconSize: [size, size],
+      iconAnchor: [size / 2, size / 2]
+    });
+    const label = cluster.max_danger !== null && cluster.max_danger !== undefined
+      ? `${cluster.count} κόμβοι (μέγιστη επικινδυνότητα: ${cluster.max_danger})`
+      : `${cluster.count} κόμβοι`;
+    L.marker([cluster.lat, cluster.lng], { icon })
+      .addTo(nodeLayer)
+      .bindTooltip(label, { direction: 'top', offset: [0, -size / 2], opacity: 0.9 })
+      .on('click', () => map.setView([cluster.lat, cluster.lng], cluster.expansion_zoom));
+  });
+};
+
+// Sidebar list of the individual nodes currently on the map
+const MAX_LISTED_NODES = 100;
+
+const renderNodeList = (list) => {
+  if (!nodeList) return;
+  nodeList.innerHTML = '';
+  list.slice(0, MAX_LISTED_NODES).forEach(node => {
+    const item = document.createElement('div');
+    item.className = 'node-item';
+    const title = document.createElement('h3');
+    title.textContent = node.title || node.node_id;
+    const location = document.createElement('p');
+    location.textContent = `Τοποθεσία: ${node.location || ''}`;
+    const link = document.createElement('a');
+    link.href = getNodeUrl(node.node_id, isParentNode(node));
+    link.innerHTML = isParentNode(node) ? 'Προβολή θυγατρικών κόμβων &rarr;' : 'Προβολή λεπτομερειών &rarr;';
+    item.append(title, location, link);
+    nodeList.appendChild(item);
+  });
+};
+
+// ---- Zoomed out: server-side clusters for the viewport ----
+const showClusters = (signal) => {
+  const params = new URLSearchParams({
+    region: window.REGION,
+    bbox: map.getBounds().pad(0.2).toBBoxString(),
+    zoom: map.getZoom()
+  });
+  return fetch(`/api/clusters?${params}`, { signal })
+    .then(response => response.ok ? response.json() : Promise.reject(response.status))
+    .then(data => {
+      const items = data.clusters || [];
+      const single = items.filter(item => item.type === 'node')
+        .map(item => ({ ...item.node, danger_level: item.max_danger }));
+      nodeLayer.clearLayers();
+      renderClusters(items.filter(item => item.type === 'cluster'));
+      single.forEach(node => renderNode(node, parseFloat(node.lat), parseFloat(node.lng)));
+      renderNodeList(single);
+    });
+};
+
+// ---- Zoomed in: GeoJSON tiles of nodes and parent-child links ----
+const tileRange = (zoom) => {
+  const bounds = map.getBounds();
+  const scale = 2 ** zoom;
+  const column = (lng) => Math.min(scale - 1, Math.max(0, Math.floor((lng + 180) / 360 * scale)));
+  const row = (lat) => {
+    const rad = lat * Math.PI / 180;
+    const y = (1 - Math.log(Math.tan(rad) + 1 / Math.cos(rad)) / Math.PI) / 2 * scale;
+    return Math.min(scale - 1, Math.max(0, Math.floor(y)));
+  };
+  const tiles = [];
+  for (let x = column(bounds.getWest()); x <= column(bounds.getEast()); x++) {
+    for (let y = row(bounds.getNorth()); y <= row(bounds.getSouth()); y++) {
+      tiles.push(`${zoom}/${x}/${y}`);
     }
   }
+  return tiles;
+};
+
+// The browser revalidates tiles with their ETag, so unchanged tiles cost a 304
+const fetchTile = (key, signal) => fetch(`/tiles/${key}?region=${encodeURIComponent(window.REGION)}`, { signal })
+  .then(response => response.ok ? response.json() : { features: [] });
+
+const fetchDangerLevels = (nodeIds, signal) => {
+  if (!nodeIds.length) return Promise.resolve({});
+  return fetch(`/api/latest?nodes=${nodeIds.slice(0, 1000).join(',')}`, { signal })
+    .then(response => response.ok ? response.json() : { readings: {} })
+    .then(data => data.readings || {});
+};
+
+const showTiles = (signal) => {
+  const zoom = Math.min(map.getZoom(), 20);
+  return Promise.all(tileRange(zoom).map(key => fetchTile(key, signal)))
+    .then(collections => {
+      const nodes = new Map();
+      const links = new Map();
+      collections.forEach(collection => collection.features.forEach(feature => {
+        const [lng, lat] = feature.geometry.coordinates;
+        if (feature.geometry.type === 'Point') {
+          nodes.set(feature.properties.node_id, { ...feature.properties, lat, lng });
+        } else {
+          links.set(`${feature.properties.parent_id}>${feature.properties.child_id}`, feature.geometry.coordinates);
+        }
+      }));
+      return fetchDangerLevels([...nodes.keys()], signal).then(readings => {
+        nodeLayer.clearLayers();
+        links.forEach(([[lng1, lat1], [lng2, lat2]]) => renderLink([lat1, lng1], [lat2, lng2]));
+        const list = [...nodes.values()].map(node => ({
+          ...node,
+          danger_level: readings[node.node_id] ? readings[node.node_id].danger_level : null
+        }));
+        list.forEach(node => renderNode(node, node.lat, node.lng));
+        renderNodeList(list);
+      });
+    });
+};
+
+let viewportRequest = null;
+let viewportTimer = null;
+
+const loadVisibleNodes = () => {
+  if (!window.REGION) return;
+  if (viewportRequest) viewportRequest.abort();
+  viewportRequest = new AbortController();
+  const load = map.getZoom() > clusterMaxZoom ? showTiles : showClusters;
+  load(viewportRequest.signal).catch(error => {
+    if (error && error.name === 'AbortError') return;
+    console.warn('Loading visible nodes failed', error);
+  });
+};
+
+map.on('moveend', () => {
+  clearTimeout(viewportTimer);
+  viewportTimer = setTimeout(loadVisibleNodes, 150);
 });
 
+loadVisibleNodes();
+
 function updateTime() {
   const now = new Date();
   const timeString = now.toLocaleTimeString('el-GR');
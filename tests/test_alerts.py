@@ -0,0 +1,89 @@
+"""
+Tests for the threshold alert rules engine
+"""
+import unittest
+from unittest.mock import patch
+from app import create_app
+from app.alerts import AlertEngine, Rule
+from app.database import db_manager
+
+REGIONS = {"N1_1": "FR1", "N1_2": "FR1", "N2_1": "FR2"}
+HQ = 'Αρχηγείο / Ε.Σ.Κ.Ε.ΔΙ.Κ.'
+RULES = [
+    Rule.from_dict({"id": "smoke-dry-wind", "severity": "critical", "all": [
+        {"field": "gas_and_smoke", "op": ">", "value": 300},
+        {"field": "humidity", "op": "<", "value": 25},
+        {"field": "wind_speed", "op": ">", "value": 30}]}),
+    Rule.from_dict({"id": "smoke", "all": [{"field": "gas_and_smoke", "op": ">", "value": 300}]}),
+    Rule.from_dict({"id": "fr2-heat", "region": "FR2", "all": [{"field": "temperature", "op": ">=", "value": 35}]}),
+]
+
+def reading(node_id, minute, **values):
+    return {"node_id": node_id, "timestamp": f"2026-07-01T11:{minute:02d}:00", **values}
+
+class TestAlertEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = AlertEngine(REGIONS.get)
+        self.engine.load_rules(RULES)
+
+    def test_compound_rules_raise_deduplicate_and_resolve(self):
+        self.engine.observe([reading("N1_1", 0, gas_and_smoke=350, humidity=40, wind_speed=50)])
+        self.assertEqual([a["rule_id"] for a in self.engine.alerts()], ["smoke"])
+
+        self.engine.observe([reading("N1_1", 1, gas_and_smoke=400, humidity=20, wind_speed=50)])
+        alerts = self.engine.alerts()
+        self.assertEqual([a["rule_id"] for a in alerts], ["smoke-dry-wind", "smoke"])
+        self.assertEqual(alerts[1]["readings"], 2)
+        self.assertEqual(alerts[1]["raised_at"], "2026-07-01T11:00:00")
+
+        self.engine.observe([reading("N1_1", 2, gas_and_smoke=100, humidity=20, wind_speed=50)])
+        self.assertEqual(self.engine.alerts(), [])
+        self.assertEqual(len(self.engine.alerts(state="resolved")), 2)
+        self.assertEqual(self.engine.stats()["raised"], 2)
+
+    def test_scoped_rules(self):
+        self.engine.observe([reading("N1_1", 0, temperature=40), reading("N2_1", 0, temperature=40)])
+        alerts = self.engine.alerts()
+        self.assertEqual([(a["rule_id"], a["node_id"]) for a in alerts], [("fr2-heat", "N2_1")])
+        self.assertEqual(self.engine.alerts(region_id="FR1"), [])
+
+    def test_only_rules_past_their_threshold_are_evaluated(self):
+        rules = [Rule.from_dict({"id": f"r{i}", "all": [{"field": "gas_and_smoke", "op": ">", "value": i},
+                                                        {"field": "humidity", "op": "<", "value": 10}]})
+                 for i in range(5000)]
+        self.engine.load_rules(rules)
+        self.engine.observe([reading("N1_1", 0, gas_and_smoke=10, humidity=50)])
+        self.assertEqual(self.engine.stats()["rules_evaluated"], 10)
+
+    def test_invalid_rules(self):
+        with self.assertRaises(ValueError):
+            Rule.from_dict({"id": "x", "all": [{"field": "vegetation_type", "op": ">", "value": 1}]})
+        with self.assertRaises(ValueError):
+            Rule.from_dict({"id": "x", "all": []})
+
+class TestAlertsEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        engine = AlertEngine(REGIONS.get)
+        engine.load_rules(RULES)
+        self.patches = [patch.object(db_manager, 'alerts', engine),
+                        patch.object(db_manager, 'write_rows'),
+                        patch.dict(db_manager.row_listeners, {'sensor_readings': [engine.observe]})]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_ingested_readings_raise_alerts(self):
+        db_manager.ingest('sensor_readings', [reading("N2_1", 0, gas_and_smoke=500, temperature=20)])
+        response = self.client.get('/api/alerts', query_string={"region": HQ, "node": "2.1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([a["rule_id"] for a in response.get_json()["alerts"]], ["smoke"])
+        self.assertEqual(self.client.get('/api/alerts', query_string={"region": HQ, "state": "x"}).status_code, 400)
+        self.assertEqual(self.client.get('/api/alerts', query_string={"region": "nowhere"}).status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Tests for streaming anomaly detection
+"""
+import random
+import unittest
+from unittest.mock import patch
+from app import create_app
+from app.anomaly import AnomalyDetector, STUCK_SAMPLES
+from app.database import db_manager
+
+REGIONS = {"N1_1": "FR1", "N2_1": "FR2"}
+HQ = 'Αρχηγείο / Ε.Σ.Κ.Ε.ΔΙ.Κ.'
+
+def readings(node_id, count, start=0, **overrides):
+    rng = random.Random(node_id)
+    rows = []
+    for minute in range(start, start + count):
+        row = {"node_id": node_id, "timestamp": f"2026-07-01T11:{minute:02d}:00",
+               "temperature": 25 + rng.gauss(0, 0.3), "gas_and_smoke": 10 + rng.gauss(0, 1),
+               "humidity": 50 + rng.gauss(0, 1)}
+        row.update(overrides)
+        rows.append(row)
+    return rows
+
+class TestAnomalyDetector(unittest.TestCase):
+    def setUp(self):
+        self.detector = AnomalyDetector(REGIONS.get, capacity=1)
+
+    def test_spike_flagged_on_first_sample(self):
+        self.detector.observe(readings("N1_1", 20) + readings("N2_1", 20))
+        self.assertEqual(self.detector.anomalies_for(), [])
+
+        self.detector.observe(readings("N1_1", 1, start=20, gas_and_smoke=80.0))
+        active = self.detector.anomalies_for()
+        self.assertEqual([(a["node_id"], a["field"], a["kind"]) for a in active],
+                         [("N1_1", "gas_and_smoke", "spike")])
+        self.assertGreater(active[0]["z"], 4)
+        self.assertEqual(self.detector.anomalies_for("FR2"), [])
+
+        # Back to normal: no longer active, still listed as recent
+        self.detector.observe(readings("N1_1", 1, start=21))
+        self.assertEqual(self.detector.anomalies_for(), [])
+        self.assertEqual(len(self.detector.anomalies_for(state="recent")), 1)
+
+    def test_jump_and_stuck(self):
+        self.detector.observe([{"node_id": "N1_1", "timestamp": "2026-07-01T11:00:00", "temperature": 20.0},
+                               {"node_id": "N1_1", "timestamp": "2026-07-01T11:02:00", "temperature": 35.0}])
+        jump = self.detector.anomalies_for()[0]
+        self.assertEqual((jump["kind"], jump["rate_per_minute"]), ("jump", 7.5))
+
+        self.detector.observe(readings("N2_1", STUCK_SAMPLES, temperature=21.5))
+        stuck = self.detector.anomalies_for("FR2")
+        self.assertEqual([(a["field"], a["kind"]) for a in stuck], [("temperature", "stuck")])
+        self.detector.observe(readings("N2_1", 3, start=STUCK_SAMPLES, temperature=21.5))
+        self.assertEqual(len(self.detector.anomalies_for("FR2")), 1)
+        self.assertEqual(len(self.detector.anomalies_for("FR2", state="recent")), 1)
+
+    def test_node_state(self):
+        self.detector.observe(readings("N1_1", 30))
+        state = self.detector.node_state("N1_1")
+        self.assertAlmostEqual(state["fields"]["temperature"]["mean"], 25, delta=0.5)
+        self.assertEqual(state["fields"]["humidity"]["samples"], 30)
+        self.assertIsNone(self.detector.node_state("N9"))
+
+class TestAnomaliesEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        detector = AnomalyDetector(REGIONS.get)
+        self.patches = [patch.object(db_manager, 'anomalies', detector),
+                        patch.object(db_manager, 'write_rows'),
+                        patch.dict(db_manager.row_listeners, {'sensor_readings': [detector.observe]})]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_region_anomaly_list(self):
+        db_manager.ingest('sensor_readings', readings("N2_1", 10) + readings("N2_1", 1, start=10, temperature=60.0))
+        response = self.client.get('/api/anomalies', query_string={"region": 'Κεντρικής Μακεδονίας'})
+        self.assertEqual(response.status_code, 200)
+        kinds = {a["kind"] for a in response.get_json()["anomalies"]}
+        self.assertEqual(kinds, {"spike"})
+        self.assertEqual(self.client.get('/api/anomalies', query_string={"region": HQ, "state": "x"}).status_code,
+                         400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Tests for the asyncio database manager
+"""
+import asyncio
+import unittest
+from unittest.mock import patch
+from app import create_app, cache
+from app.database import DatabaseManager
+from app.async_database import AsyncDatabaseManager
+
+class TestAsyncDatabaseManager(unittest.TestCase):
+    """Test cases for AsyncDatabaseManager"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        cache.clear()
+        self.db_manager = DatabaseManager()
+        self.async_manager = AsyncDatabaseManager(self.db_manager)
+
+    def tearDown(self):
+        self.ctx.pop()
+
+    def test_queries_share_the_sync_cache(self):
+        """Async reads populate the same cache entries as sync reads"""
+        calls = []
+
+        async def fake_query(node_id):
+            calls.append(node_id)
+            return {"node_id": node_id, "title": "Async Node"}
+
+        with patch.object(self.async_manager, '_query_node_info', side_effect=fake_query):
+            first = asyncio.run(self.async_manager.get_node_info('N1_1'))
+            second = asyncio.run(self.async_manager.get_node_info('N1_1'))
+
+        self.assertEqual(first, second)
+        self.assertEqual(calls, ['N1_1'])
+        self.assertEqual(self.db_manager.cache_stats()['node_info']['hits'], 1)
+
+    def test_batch_reads_share_keys_and_breaker_with_sync(self):
+        """Latest readings cached by the sync manager are served to async callers; only misses load"""
+        self.db_manager._read_through_many('latest_reading', ['N1_1'], lambda ids: {"N1_1": {"node_id": "N1_1"}})
+        calls = []
+
+        async def fake_query(node_ids):
+            calls.append(list(node_ids))
+            if node_ids == ['N1_3']:
+                raise ConnectionError("backend down")
+            return {node_id: {"node_id": node_id} for node_id in node_ids}
+
+        self.db_manager.connected = True
+        with patch.object(self.async_manager, '_query_latest_readings', side_effect=fake_query):
+            latest = asyncio.run(self.async_manager.get_latest_readings(['N1_1', 'N1_2']))
+            asyncio.run(self.async_manager.get_latest_readings(['N1_3']))
+        self.assertEqual(calls, [['N1_2'], ['N1_3']])
+        self.assertEqual(latest, {"N1_1": {"node_id": "N1_1"}, "N1_2": {"node_id": "N1_2"}})
+        self.assertEqual(self.db_manager.breaker.stats()['consecutive_failures'], 1)
+
+    def test_concurrent_queries_fall_back_to_mock_data(self):
+        """Gathered queries return mock data while the database is unavailable"""
+        self.db_manager._current_retry_delay = 60
+        self.db_manager._last_retry_time = float('inf')
+
+        async def gather():
+            return await asyncio.gather(
+                self.async_manager.get_node_info('N1_1'),
+                self.async_manager.get_parent_node_reports('N1')
+            )
+
+        info, reports = asyncio.run(gather())
+        self.assertEqual(info['title'], 'Mock Sensor Node 1')
+        self.assertEqual(reports[0]['parent_id'], 'N1')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Tests for the chunked, resumable bulk importer
+"""
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from app.bulk_import import BulkImporter, BulkImportError, read_rows
+from app.storage import create_backend
+
+class FlakyStore:
+    """Wraps a backend and fails every upsert once fail_after chunks were written"""
+
+    def __init__(self, store, fail_after):
+        self.store = store
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def upsert_rows(self, table, rows):
+        self.calls += 1
+        if self.calls > self.fail_after:
+            raise ConnectionError("connection reset")
+        self.store.upsert_rows(table, rows)
+
+class TestBulkImporter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmp, "sensor_readings.csv")
+        with open(self.csv_path, "w", encoding="utf-8") as f:
+            f.write("reading_id,node_id,timestamp,danger_level,temperature,rain,vegetation_type\n")
+            for i in range(1, 26):
+                f.write(f"{i},N1_1,2025-05-15T08:{i:02d}:00,{i % 5},{20 + i / 10},{'true' if i % 2 else 'false'},\n")
+        self.checkpoint = os.path.join(self.tmp, "checkpoint.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_csv_values_are_typed_from_schema(self):
+        row = next(read_rows(self.csv_path, "sensor_readings"))
+        self.assertEqual(row["reading_id"], 1)
+        self.assertEqual(row["temperature"], 20.1)
+        self.assertIs(row["rain"], True)
+        self.assertIsNone(row["vegetation_type"])
+
+    def test_imports_in_concurrent_chunks(self):
+        store = create_backend("memory")
+        result = BulkImporter(store, batch_size=4, workers=3).import_file(self.csv_path)
+        self.assertEqual(result["rows"], 25)
+        self.assertEqual(len(store.node_history("N1_1")), 25)
+
+    def test_resumes_after_interruption(self):
+        store = create_backend("memory")
+        flaky = FlakyStore(store, fail_after=3)
+        importer = BulkImporter(flaky, batch_size=5, workers=1, checkpoint_path=self.checkpoint, retries=0)
+        with self.assertRaises(BulkImportError):
+            importer.import_file(self.csv_path)
+        with open(self.checkpoint, encoding="utf-8") as f:
+            self.assertEqual(list(json.load(f).values())[0]["rows"], 15)
+
+        result = BulkImporter(store, batch_size=5, checkpoint_path=self.checkpoint).import_file(self.csv_path)
+        self.assertEqual((result["skipped"], result["rows"]), (15, 10))
+        self.assertEqual(len(store.node_history("N1_1")), 25)
+
+        again = BulkImporter(store, checkpoint_path=self.checkpoint).import_file(self.csv_path)
+        self.assertEqual(again["rows"], 0)
+
+    def test_readings_without_ids_are_refused(self):
+        path = os.path.join(self.tmp, "sensor_readings.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"reading_id": 1, "node_id": "N1_1", "timestamp": "2025-05-15T08:00:00"}) + "\n")
+            f.write(json.dumps({"node_id": "N1_1", "timestamp": "2025-05-15T08:01:00"}) + "\n")
+        store = create_backend("memory")
+        with self.assertRaisesRegex(BulkImportError, "row 2 has no reading_id"):
+            BulkImporter(store, batch_size=1, workers=1, checkpoint_path=self.checkpoint).import_file(path)
+        # Chunks before the unkeyed row are committed and checkpointed
+        self.assertEqual(len(store.node_history("N1_1")), 1)
+        with open(self.checkpoint, encoding="utf-8") as f:
+            self.assertEqual(list(json.load(f).values())[0]["rows"], 1)
+
+    def test_jsonl_input(self):
+        path = os.path.join(self.tmp, "nodes.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"node_id": "N1", "title": "Node 1", "is_parent": True}) + "\n\n")
+            f.write(json.dumps({"node_id": "N2", "title": "Node 2", "is_parent": True}) + "\n")
+        store = create_backend("memory")
+        self.assertEqual(BulkImporter(store).import_file(path)["rows"], 2)
+        self.assertEqual([n["node_id"] for n in store.all_nodes()], ["N1", "N2"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests for zoom-aware map clustering
+"""
+import time
+import random
+import threading
+import unittest
+from unittest.mock import patch
+from app import create_app
+from app.clustering import ClusterIndex, RegionClusters
+from app.database import db_manager
+from app.topology import TopologyIndex
+
+GREECE = (19.0, 34.5, 29.0, 42.0)
+
+def village(prefix, lat, lng, children=5):
+    nodes = [{"node_id": prefix, "title": prefix, "is_parent": True, "lat": lat, "lng": lng}]
+    nodes += [{"node_id": f"{prefix}_{i}", "title": f"{prefix}.{i}", "is_parent": False,
+               "lat": lat + 0.001 * i, "lng": lng - 0.001 * i} for i in range(1, children + 1)]
+    return nodes
+
+NODES = village("N1", 40.95, 24.4) + village("N2", 40.96, 24.42) + village("N3", 38.0, 23.7)
+
+class TestClusterIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ClusterIndex(NODES)
+
+    def test_zoom_levels(self):
+        # Country view: one cluster per area, every node counted once
+        country = self.index.clusters(GREECE, 6)
+        self.assertEqual(sorted(c["count"] for c in country), [6, 12])
+        north = max(country, key=lambda c: c["lat"])
+        self.assertEqual(north["type"], "cluster")
+        self.assertGreater(north["expansion_zoom"], 6)
+
+        # Past the deepest clustered zoom every node is shown on its own
+        street = self.index.clusters(GREECE, 18)
+        self.assertEqual(len(street), len(NODES))
+        self.assertTrue(all(c["type"] == "node" for c in street))
+
+        # Zooming to a cluster's expansion zoom splits it up
+        split = self.index.clusters(GREECE, north["expansion_zoom"])
+        self.assertGreater(len(split), len(country))
+
+    def test_viewport_and_danger(self):
+        self.index.set_danger({"N1_2": 4, "N3": 1, "UNKNOWN": 5})
+        clusters = self.index.clusters(GREECE, 6)
+        self.assertEqual(sorted(c["max_danger"] for c in clusters), [1, 4])
+        athens = self.index.clusters((23.5, 37.9, 23.9, 38.1), 6)
+        self.assertEqual([(c["count"], c["max_danger"]) for c in athens], [(6, 1)])
+
+    def test_matches_total_on_random_layout(self):
+        rng = random.Random(3)
+        nodes = [{"node_id": str(i), "lat": rng.uniform(35, 42), "lng": rng.uniform(19, 28)} for i in range(3000)]
+        index = ClusterIndex(nodes)
+        for zoom in range(0, 16, 3):
+            self.assertEqual(sum(c["count"] for c in index.clusters(GREECE, zoom)), 3000)
+
+class TestRegionClusters(unittest.TestCase):
+    def test_rebuilds_only_invalidated_regions(self):
+        clusters = RegionClusters(danger_ttl=60)
+        load = {"FR1": lambda: NODES[:6], "FR2": lambda: NODES[12:]}
+        for region in ("FR1", "FR2"):
+            clusters.get(region, load[region], dict)
+        first = clusters.get("FR1", load["FR1"], dict)
+        self.assertEqual(clusters.builds, 2)
+
+        clusters.invalidate({"FR2"})
+        self.assertIs(clusters.get("FR1", load["FR1"], dict), first)
+        clusters.get("FR2", load["FR2"], dict)
+        self.assertEqual(clusters.builds, 3)
+
+    def test_builds_outside_the_lock_once_per_region(self):
+        clusters = RegionClusters(danger_ttl=60)
+        release = threading.Event()
+        calls = []
+
+        def slow_load():
+            calls.append("FR1")
+            release.wait(5)
+            return NODES[:6]
+
+        results = []
+        builders = [threading.Thread(target=lambda: results.append(clusters.get("FR1", slow_load, dict)))
+                    for _ in range(2)]
+        for builder in builders:
+            builder.start()
+        # Another region is not held up by FR1's build
+        clusters.get("FR2", lambda: NODES[12:], dict)
+        release.set()
+        for builder in builders:
+            builder.join()
+        self.assertEqual(calls, ["FR1"])
+        self.assertIs(results[0], results[1])
+
+        # While a changed region is rebuilt, its previous index keeps answering
+        release.clear()
+        clusters.invalidate({"FR1"})
+        rebuild = threading.Thread(target=clusters.get, args=("FR1", slow_load, dict))
+        rebuild.start()
+        while len(calls) < 2:
+            time.sleep(0.001)
+        self.assertIs(clusters.get("FR1", slow_load, dict), results[0])
+        release.set()
+        rebuild.join()
+        self.assertIsNot(clusters.get("FR1", slow_load, dict), results[0])
+        self.assertEqual(clusters.builds, 3)
+
+class TestClustersEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        topology = TopologyIndex()
+        topology.load(NODES, [], [])
+        self.patches = [
+            patch.object(db_manager, 'topology', topology),
+            patch.object(db_manager, 'clusters', RegionClusters()),
+            patch.object(db_manager, 'get_nodes_with_status',
+                         return_value=[{"node_id": "N2_1", "danger_level": 3}]),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_clusters_for_viewport(self):
+        response = self.client.get('/api/clusters', query_string={
+            "region": 'Αρχηγείο / Ε.Σ.Κ.Ε.ΔΙ.Κ.', "bbox": ",".join(map(str, GREECE)), "zoom": 6})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["nodes"], len(NODES))
+        self.assertIn(3, [c["max_danger"] for c in data["clusters"]])
+
+        bad = self.client.get('/api/clusters', query_string={"region": 'Αρχηγείο / Ε.Σ.Κ.Ε.ΔΙ.Κ.', "zoom": 6})
+        self.assertEqual(bad.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
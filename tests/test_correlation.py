@@ -0,0 +1,98 @@
+"""
+Tests for drone detection / ground sensor correlation
+"""
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from app import create_app
+from app.anomaly import AnomalyDetector
+from app.correlation import CorrelationEngine
+from app.database import db_manager
+from app.topology import TopologyIndex
+
+NODES = [
+    {"node_id": "N1_1", "lat": 40.950, "lng": 24.350},
+    {"node_id": "N1_2", "lat": 40.953, "lng": 24.352},
+    {"node_id": "N2_1", "lat": 38.000, "lng": 23.700},
+]
+NODE_REGIONS = [{"node_id": "N1_1", "region_id": "FR1"}, {"node_id": "N1_2", "region_id": "FR1"},
+                {"node_id": "N2_1", "region_id": "FR2"}]
+HQ = 'Αρχηγείο / Ε.Σ.Κ.Ε.ΔΙ.Κ.'
+
+def recent_readings(node_id, count, **last):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = [{"node_id": node_id, "timestamp": (now - timedelta(minutes=count - i)).isoformat(),
+             "temperature": 25 + 0.2 * (i % 3), "gas_and_smoke": 10 + (i % 2)} for i in range(count)]
+    rows[-1].update(last)
+    return rows
+
+class TestCorrelationEngine(unittest.TestCase):
+    def test_status_and_incident_merging(self):
+        engine = CorrelationEngine(radius_km=1.0, window_seconds=600)
+        region_of = {"N1_1": "FR1"}.get
+        flagged = {"N1_1": {"gas_and_smoke": {"z": 9.0, "flagged": True}, "temperature": {"z": 0.1, "flagged": False}}}
+        quiet = {"N1_1": {"gas_and_smoke": {"z": 0.2, "flagged": False}}}
+
+        self.assertEqual(engine.correlate(40.95, 24.35, 0.9, 250, [], {}, region_of, now=1000)["status"],
+                         "no_coverage")
+        self.assertEqual(engine.correlate(40.95, 24.35, 0.9, 250, [("N1_1", 0.2)], quiet, region_of,
+                                          now=1000)["status"], "unconfirmed")
+
+        first = engine.correlate(40.95, 24.35, 0.8, 250, [("N1_1", 0.2)], flagged, region_of, now=1000)
+        second = engine.correlate(40.951, 24.351, 0.9, 280, [("N1_1", 0.1)], flagged, region_of, now=1060)
+        self.assertEqual(first["status"], "confirmed")
+        self.assertEqual(first["incident_id"], second["incident_id"])
+        # Far outside the window the same place is a new incident
+        third = engine.correlate(40.95, 24.35, 0.9, 250, [("N1_1", 0.2)], flagged, region_of, now=5000)
+        self.assertNotEqual(third["incident_id"], first["incident_id"])
+
+        incidents, cursor = engine.incidents()
+        self.assertEqual([(i["incident_id"], i["detections"]) for i in incidents], [(1, 2), (2, 1)])
+        self.assertEqual(incidents[0]["max_confidence"], 0.9)
+        self.assertEqual(engine.incidents(since=cursor), ([], cursor))
+
+class TestDroneCorrelation(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        topology = TopologyIndex()
+        topology.load(NODES, NODE_REGIONS, [])
+        self.patches = [patch.object(db_manager, 'topology', topology),
+                        patch.object(db_manager, 'anomalies', AnomalyDetector(topology.region_of)),
+                        patch.object(db_manager, 'correlation', CorrelationEngine())]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_smoke_near_the_drone_confirms_detection(self):
+        db_manager.anomalies.observe(recent_readings("N1_1", 10, gas_and_smoke=150.0))
+        db_manager.anomalies.observe(recent_readings("N1_2", 10))
+        result = db_manager.correlate_detection(40.9505, 24.3505, 0.85, 260.0)
+        self.assertEqual(result["status"], "confirmed")
+        self.assertEqual([s["node_id"] for s in result["sensors"]], ["N1_1", "N1_2"])
+        self.assertEqual(result["sensors_reporting"], 2)
+
+        response = self.client.get('/api/incidents', query_string={"region": HQ})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual([i["nodes"] for i in data["incidents"]], [["N1_1"]])
+        regional = self.client.get('/api/incidents', query_string={"region": 'Κεντρικής Μακεδονίας'})
+        self.assertEqual(regional.get_json()["incidents"], [])
+        again = self.client.get('/api/incidents', query_string={"region": HQ, "since": data["cursor"]})
+        self.assertEqual(again.get_json()["count"], 0)
+
+    def test_telemetry_carries_correlation(self):
+        response = self.client.get('/api/drone_telemetry')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertIn("ground_correlation", data)
+        if data["fire_detection"]["detected"]:
+            self.assertIn(data["ground_correlation"]["status"], ("confirmed", "unconfirmed", "no_coverage"))
+        else:
+            self.assertIsNone(data["ground_correlation"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 """
 Tests for database functionality
 """
+import time
 import unittest
 from unittest.mock import patch, MagicMock
 from app.database import DatabaseManager
@@ -57,5 +58,19 @@ class TestDatabaseManager(unittest.TestCase):
         region_id = self.db_manager._get_region_id('Invalid Region')
         self.assertIsNone(region_id)
 
+    def test_run_parallel(self):
+        """Independent calls run concurrently and are returned by name"""
+        def slow(value):
+            time.sleep(0.2)
+            return value
+
+        started = time.time()
+        results = self.db_manager.run_parallel(a=lambda: slow(1), b=lambda: slow(2), c=lambda: slow(3))
+        self.assertEqual(results, {'a': 1, 'b': 2, 'c': 3})
+        self.assertLess(time.time() - started, 0.5)
+
+        with self.assertRaises(ValueError):
+            self.db_manager.run_parallel(ok=lambda: 1, bad=lambda: int('x'))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Tests for sensor history downsampling
+"""
+import unittest
+from datetime import datetime, timedelta
+from app.downsample import downsample, parse_resolution, lttb_indices
+import numpy as np
+
+def make_readings(count, step_seconds=60):
+    start = datetime(2025, 5, 15, 8, 0, 0)
+    return [
+        {
+            "timestamp": (start + timedelta(seconds=i * step_seconds)).isoformat(),
+            "temperature": 20 + i,
+            "humidity": None if i % 2 else 50.0,
+            "gas_and_smoke": 10.0,
+            "wind_speed": 5.0,
+            "danger_level": i % 5,
+        }
+        for i in range(count)
+    ]
+
+class TestDownsample(unittest.TestCase):
+    """Test cases for bucket and LTTB downsampling"""
+
+    def test_parse_resolution(self):
+        """Resolutions convert to seconds"""
+        self.assertEqual(parse_resolution('15m'), 900)
+        self.assertEqual(parse_resolution('1d'), 86400)
+        with self.assertRaises(ValueError):
+            parse_resolution('fortnight')
+
+    def test_bucket_aggregates(self):
+        """Each bucket carries min/max/avg/last per field, ignoring missing values"""
+        result = downsample(make_readings(30), mode='bucket', bucket_seconds=900)
+        self.assertEqual(result['source_count'], 30)
+        self.assertEqual([p['count'] for p in result['points']], [15, 15])
+
+        first = result['points'][0]
+        self.assertEqual(first['timestamp'], '2025-05-15T08:00:00')
+        self.assertEqual(first['temperature'], {'min': 20.0, 'max': 34.0, 'avg': 27.0, 'last': 34.0})
+        self.assertEqual(first['humidity']['last'], 50.0)
+
+    def test_max_points_bounds_bucket_count(self):
+        """max_points picks a bucket width that never exceeds the limit"""
+        result = downsample(make_readings(1000), mode='bucket', max_points=50)
+        self.assertLessEqual(len(result['points']), 50)
+        self.assertEqual(sum(p['count'] for p in result['points']), 1000)
+
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        """LTTB keeps the first, last and extreme points"""
+        times = np.arange(100, dtype=float)
+        values = np.zeros(100)
+        values[42] = 100.0
+        indices = lttb_indices(times, values, 10)
+        self.assertEqual(len(indices), 10)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 99)
+        self.assertIn(42, indices)
+
+    def test_invalid_mode(self):
+        """Unknown modes and missing parameters are rejected"""
+        with self.assertRaises(ValueError):
+            downsample(make_readings(5), mode='median', max_points=2)
+        with self.assertRaises(ValueError):
+            downsample(make_readings(5), mode='lttb')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Tests for keyset-paginated sensor history
+"""
+import unittest
+from unittest.mock import patch
+from app.database import DatabaseManager, encode_history_cursor, decode_history_cursor, parse_time_bound
+
+READINGS = [
+    {"reading_id": 17, "timestamp": "2025-05-15T09:16:59.531068"},
+    {"reading_id": 16, "timestamp": "2025-05-15T09:16:59.531068"},
+    {"reading_id": 15, "timestamp": "2025-05-15T09:16:59.531068"},
+]
+
+class TestHistoryPaging(unittest.TestCase):
+    """Test cases for history cursors and pages"""
+
+    def setUp(self):
+        self.db_manager = DatabaseManager()
+
+    def test_cursor_round_trip(self):
+        """Cursors encode the (timestamp, reading_id) key"""
+        cursor = encode_history_cursor(READINGS[1])
+        self.assertEqual(decode_history_cursor(cursor), ("2025-05-15T09:16:59.531068", 16))
+        with self.assertRaises(ValueError):
+            decode_history_cursor("not-a-cursor")
+
+    def test_time_bounds(self):
+        """from/to values must be ISO-8601"""
+        self.assertEqual(parse_time_bound("2025-05-15T09:00"), "2025-05-15T09:00:00")
+        self.assertIsNone(parse_time_bound(""))
+        with self.assertRaises(ValueError):
+            parse_time_bound("yesterday")
+
+    def test_first_page_has_next_cursor(self):
+        """A full first page points at the older page only"""
+        with patch.object(self.db_manager, 'get_node_history', return_value=READINGS) as history:
+            page = self.db_manager.get_node_history_page('N1_3', 2)
+        history.assert_called_once_with('N1_3', limit=3, before=None, after=None, start=None, end=None)
+        self.assertEqual([r["reading_id"] for r in page["readings"]], [17, 16])
+        self.assertEqual(decode_history_cursor(page["next_cursor"])[1], 16)
+        self.assertIsNone(page["prev_cursor"])
+
+    def test_last_page_has_no_next_cursor(self):
+        """A short page after a cursor ends the walk back in time"""
+        cursor = encode_history_cursor(READINGS[1])
+        with patch.object(self.db_manager, 'get_node_history', return_value=READINGS[2:]):
+            page = self.db_manager.get_node_history_page('N1_3', 2, before=cursor)
+        self.assertIsNone(page["next_cursor"])
+        self.assertEqual(decode_history_cursor(page["prev_cursor"])[1], 15)
+
+if __name__ == '__main__':
+    unittest.main()
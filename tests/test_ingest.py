@@ -0,0 +1,121 @@
+"""
+Tests for batch ingestion of sensor readings
+"""
+import json
+import unittest
+from unittest.mock import patch
+from app import create_app
+from app.database import db_manager
+from app.ingest import BatchLedger, parse_batch, validate_readings
+from app.memory_store import MemoryStore
+from app.topology import TopologyIndex
+
+def reading(node_id="N1_1", **fields):
+    return {"node_id": node_id, "timestamp": "2025-05-15T08:00:00Z", "danger_level": 2,
+            "temperature": 25.456, "humidity": 40, "rain": False, **fields}
+
+class TestValidation(unittest.TestCase):
+    def test_rows_are_normalized_to_one_shape(self):
+        rows, errors, rejected = validate_readings([reading(), {"node_id": "N1_2"}])
+        self.assertEqual((errors, rejected), ([], 0))
+        self.assertEqual(rows[0]["timestamp"], "2025-05-15T08:00:00")
+        self.assertEqual(rows[0]["temperature"], 25.46)
+        self.assertEqual(list(rows[0]), list(rows[1]))
+        self.assertIsNotNone(rows[1]["timestamp"])
+
+    def test_invalid_readings_are_reported_by_index(self):
+        rows, errors, rejected = validate_readings([
+            reading(), reading(temperature=1500), reading(rain="maybe"), {"temperature": 20},
+            reading(reading_id=7), reading(colour="red"), reading(timestamp="yesterday"), "text",
+            reading(danger_level=6), reading(danger_level=-1), reading(danger_level=2 ** 40),
+        ])
+        self.assertEqual((len(rows), rejected), (1, 10))
+        self.assertEqual([e["index"] for e in errors], list(range(1, 11)))
+        self.assertEqual(errors[-1]["error"], "danger_level must be between 0 and 5")
+
+    def test_parse_ndjson_and_wrapped_batches(self):
+        body = b'{"node_id": "N1_1"}\n\n{"node_id": "N1_2"}\n'
+        self.assertEqual(len(parse_batch(body, "application/x-ndjson")[0]), 2)
+        with self.assertRaisesRegex(ValueError, "record 2"):
+            parse_batch(b'{"node_id": "N1_1"}\n{oops}\n', "application/x-ndjson")
+        readings, batch_id = parse_batch(b'{"batch_id": 42, "readings": [{}]}', "application/json")
+        self.assertEqual((len(readings), batch_id), (1, "42"))
+
+class TestIngestEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.store = MemoryStore()
+        self.store.upsert_rows("nodes", [{"node_id": node_id} for node_id in ("N1", "N1_1", "N1_2", "N1_3")])
+        self.patches = [
+            patch.object(db_manager, 'backend', self.store),
+            patch.object(db_manager, 'ingest_ledger', BatchLedger()),
+            patch.object(db_manager, 'topology', TopologyIndex()),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def post(self, readings, **kwargs):
+        return self.client.post('/api/ingest/readings', data=json.dumps(readings),
+                                content_type='application/json', **kwargs)
+
+    def test_batch_is_written_and_acknowledged(self):
+        response = self.post([reading(timestamp=f"2025-05-15T08:0{i}:00") for i in range(5)] + [reading(humidity="x")])
+        ack = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((ack["accepted"], ack["rejected"]), (5, 1))
+        self.assertEqual(ack["errors"][0]["index"], 5)
+        history = self.store.node_history("N1_1")
+        self.assertEqual([row["reading_id"] for row in history], [5, 4, 3, 2, 1])
+
+    def test_ndjson_body(self):
+        body = "\n".join(json.dumps(reading(node_id=f"N1_{i}")) for i in range(1, 4))
+        response = self.client.post('/api/ingest/readings', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.get_json()["accepted"], 3)
+        self.assertEqual(self.store.count("sensor_readings"), 3)
+
+    def test_resent_batch_is_not_written_twice(self):
+        first = self.post([reading()], headers={"X-Batch-Id": "b-1"}).get_json()
+        again = self.post([reading()], headers={"X-Batch-Id": "b-1"}).get_json()
+        self.assertTrue(again["duplicate"])
+        self.assertEqual(again["accepted"], first["accepted"])
+        self.assertEqual(self.store.count("sensor_readings"), 1)
+
+    def test_parent_may_only_report_its_children(self):
+        db_manager.topology.load([{"node_id": n} for n in ("N1", "N1_1", "N2_1")], [],
+                                 [{"parent_id": "N1", "child_id": "N1_1"}])
+        ack = self.post([reading("N1_1"), reading("N2_1")], query_string={"parent": "N1"}).get_json()
+        self.assertEqual((ack["accepted"], ack["rejected"]), (1, 1))
+        self.assertEqual(self.post([reading("N9")]).status_code, 422)
+
+    def test_topology_is_loaded_before_accepting_nodes(self):
+        self.assertFalse(db_manager.topology.ready)
+        self.assertEqual(self.post([reading("N9")]).status_code, 422)
+        self.assertTrue(db_manager.topology.ready)
+        # Without a topology to check against, the batch is refused rather than accepted unchecked
+        with patch.object(db_manager, 'topology', TopologyIndex()), \
+                patch.object(db_manager, 'backend', None), \
+                patch.object(db_manager, '_ensure_connected', return_value=False):
+            response = self.post([reading()])
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.store.count("sensor_readings"), 0)
+
+    def test_rejects_oversized_and_malformed_batches(self):
+        self.app.config['INGEST_MAX_BATCH'] = 2
+        self.assertEqual(self.post([reading()] * 3).status_code, 413)
+        self.assertEqual(self.client.post('/api/ingest/readings', data='{"x": 1}',
+                                          content_type='application/json').status_code, 400)
+
+    def test_unavailable_database_asks_to_retry(self):
+        with patch.object(db_manager, 'backend', None), \
+                patch.object(db_manager, '_ensure_connected', return_value=False):
+            response = self.post([reading()])
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Tests for the DatabaseManager read-through query cache
+"""
+import unittest
+from unittest.mock import MagicMock
+from app import create_app, cache
+from app.database import DatabaseManager
+
+class TestQueryCache(unittest.TestCase):
+    """Test cases for cached DatabaseManager queries"""
+
+    def setUp(self):
+        """Set up a connected manager backed by a fake Supabase client"""
+        self.app = create_app('testing')
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        cache.clear()
+
+        self.client = MagicMock()
+        query = self.client.table.return_value.select.return_value.eq.return_value
+        query.execute.return_value.data = [{"node_id": "N1_1", "title": "Node 1.1"}]
+
+        self.db_manager = DatabaseManager()
+        self.db_manager.supabase = self.client
+        self.db_manager.connected = True
+
+    def tearDown(self):
+        self.ctx.pop()
+
+    def test_repeated_query_is_served_from_cache(self):
+        """Second identical query does not reach Supabase"""
+        first = self.db_manager.get_node_info('N1_1')
+        second = self.db_manager.get_node_info('N1_1')
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.client.table.call_count, 1)
+        stats = self.db_manager.cache_stats()['node_info']
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_invalidate_node_forces_reload(self):
+        """Invalidation hooks drop cached entries for the node"""
+        self.db_manager.get_node_info('N1_1')
+        self.db_manager.invalidate_node('N1_1')
+        self.db_manager.get_node_info('N1_1')
+        self.assertEqual(self.client.table.call_count, 2)
+
+    def test_mock_fallback_is_not_cached(self):
+        """Mock data served while disconnected never enters the cache"""
+        self.db_manager.connected = False
+        self.db_manager._current_retry_delay = 60
+        self.db_manager._last_retry_time = float('inf')
+
+        self.assertEqual(self.db_manager.get_node_info('N1_1')['title'], 'Mock Sensor Node 1')
+        self.db_manager.connected = True
+        self.assertEqual(self.db_manager.get_node_info('N1_1')['title'], 'Node 1.1')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+"""
+Tests for the SQLite read replica
+"""
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from app import create_app, cache
+from app.database import DatabaseManager, encode_history_cursor
+from app.replica import ReplicaSync
+
+TABLES = {
+    "nodes": [
+        {"node_id": "N1", "title": "Node 1", "location": "A", "description": None, "is_parent": True, "lat": 40.97, "lng": 24.37},
+        {"node_id": "N1_1", "title": "Node 1.1", "location": "B", "description": None, "is_parent": False, "lat": 40.95, "lng": 24.35},
+    ],
+    "node_regions": [{"node_id": "N1", "region_id": "FR1"}, {"node_id": "N1_1", "region_id": "FR1"}],
+    "node_hierarchy": [{"parent_id": "N1", "child_id": "N1_1"}],
+    "sensor_readings": [
+        {"reading_id": i, "node_id": "N1_1", "timestamp": f"2025-05-15T08:0{i}:00", "danger_level": i % 5,
+         "temperature": 20.0 + i, "humidity": 40.0, "gas_and_smoke": 1.0, "rain": False}
+        for i in range(1, 6)
+    ],
+    "Parent_Node_Reports": [
+        {"report_id": 1, "parent_id": "N1", "child_id": "N1_1", "timestamp": "2025-05-15T15:57:11",
+         "data_received": True, "data_valid": True, "status_message": "All OK"},
+    ],
+}
+
+class FakeQuery:
+    """Minimal PostgREST query builder over in-memory rows"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def select(self, *_):
+        return self
+
+    def order(self, column, desc=False):
+        keys = column.split(",")
+        self.rows.sort(key=lambda row: tuple(row[key] for key in keys), reverse=desc)
+        return self
+
+    def gt(self, column, value):
+        self.rows = [row for row in self.rows if row[column] > value]
+        return self
+
+    def lte(self, column, value):
+        self.rows = [row for row in self.rows if row[column] <= value]
+        return self
+
+    def in_(self, column, values):
+        self.rows = [row for row in self.rows if row[column] in values]
+        return self
+
+    def limit(self, count):
+        self.rows = self.rows[:count]
+        return self
+
+    def range(self, start, end):
+        self.rows = self.rows[start:end + 1]
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=self.rows)
+
+class FakeClient:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def table(self, name):
+        return FakeQuery(self.tables[name])
+
+class TestReplica(unittest.TestCase):
+    """Test cases for ReplicaSync and replica-served DatabaseManager reads"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        cache.clear()
+        self.client = FakeClient({name: [dict(row) for row in rows] for name, rows in TABLES.items()})
+        self.replica = ReplicaSync()
+        self.replica.open(':memory:')
+
+    def tearDown(self):
+        self.ctx.pop()
+
+    def test_incremental_sync_advances_watermark(self):
+        """Only rows past the watermark are pulled on later syncs"""
+        touched = self.replica.sync_once(self.client, batch_size=2)
+        self.assertEqual(touched, {"N1_1", "N1"})
+        self.assertEqual(self.replica.store.count("sensor_readings"), 5)
+        self.assertEqual(self.replica.stats()["watermarks"]["sensor_readings"], 5)
+
+        self.client.tables["sensor_readings"].append(
+            {"reading_id": 6, "node_id": "N1_1", "timestamp": "2025-05-15T08:06:00", "danger_level": 4})
+        self.assertEqual(self.replica.sync_once(self.client, batch_size=2), {"N1_1"})
+        self.assertEqual(self.replica.rows_synced, 7)
+        self.assertEqual(self.replica.store.latest_readings(["N1_1"])["N1_1"]["reading_id"], 6)
+
+    def test_rows_committed_below_the_watermark_are_picked_up(self):
+        """A lower id that becomes visible after a higher one was pulled is fetched by the rescan"""
+        late = self.client.tables["sensor_readings"].pop(2)
+        self.replica.sync_once(self.client, batch_size=2)
+        self.assertEqual(self.replica.store.count("sensor_readings"), 4)
+
+        self.client.tables["sensor_readings"].append(late)
+        self.assertEqual(self.replica.sync_once(self.client, batch_size=2), {"N1_1"})
+        self.assertEqual(self.replica.store.count("sensor_readings"), 5)
+        self.assertEqual(self.replica.stats()["late_rows"], 1)
+        # Nothing missing: the rescan touches no nodes
+        self.assertEqual(self.replica.sync_once(self.client, batch_size=2), set())
+        # Outside the window it stays missed
+        replica = ReplicaSync()
+        replica.open(':memory:')
+        self.client.tables["sensor_readings"].remove(late)
+        replica.sync_once(self.client, rescan_ids=1)
+        self.client.tables["sensor_readings"].append(late)
+        replica.sync_once(self.client, rescan_ids=1)
+        self.assertEqual(replica.store.count("sensor_readings"), 4)
+
+    def test_reads_are_served_locally(self):
+        """With a ready replica, DatabaseManager never queries Supabase"""
+        self.replica.sync_once(self.client)
+        db_manager = DatabaseManager()
+        db_manager.replica = self.replica
+        db_manager.supabase = MagicMock()
+        db_manager.connected = True
+
+        self.assertEqual(db_manager.get_node_info("N1")["is_parent"], True)
+        self.assertEqual(db_manager.get_node_children("N1"), ["N1_1"])
+        self.assertEqual(db_manager.get_node_region("N1_1"), "FR1")
+        status = {row["node_id"]: row["danger_level"] for row in db_manager.get_nodes_with_status("Ανατολικής Μακεδονίας και Θράκης")}
+        self.assertEqual(status, {"N1": None, "N1_1": 0})
+
+        page = db_manager.get_node_history_page("N1_1", limit=2)
+        self.assertEqual([r["reading_id"] for r in page["readings"]], [5, 4])
+        older = db_manager.get_node_history("N1_1", limit=2, before=page["next_cursor"])
+        self.assertEqual([r["reading_id"] for r in older], [3, 2])
+        newer = db_manager.get_node_history("N1_1", limit=2, after=encode_history_cursor(older[0]))
+        self.assertEqual([r["reading_id"] for r in newer], [5, 4])
+        self.assertEqual(db_manager.get_parent_node_reports("N1")[0]["status_message"], "All OK")
+        db_manager.supabase.table.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests for last-known-good serving and the database circuit breaker
+"""
+import time
+import unittest
+from unittest.mock import MagicMock
+import httpx
+from app import create_app, cache
+from app.database import DatabaseManager, DatabaseUnavailable
+from app.resilience import CircuitBreaker, current_data_age
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test cases for CircuitBreaker state transitions"""
+
+    def test_opens_after_threshold_and_admits_one_trial(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_only_transport_errors_count(self):
+        manager = DatabaseManager()
+        manager.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        for error in (KeyError("node_id"), DatabaseUnavailable("not connected")):
+            with self.assertRaises(type(error)):
+                manager._guarded_call(MagicMock(side_effect=error))
+        self.assertEqual(manager.breaker.state, CircuitBreaker.CLOSED)
+        with self.assertRaises(httpx.ConnectTimeout):
+            manager._guarded_call(MagicMock(side_effect=httpx.ConnectTimeout("timed out")))
+        self.assertEqual(manager.breaker.state, CircuitBreaker.OPEN)
+
+    def test_non_transport_error_frees_the_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        breaker.release()
+        self.assertTrue(breaker.allow_request())
+
+class TestLastKnownGood(unittest.TestCase):
+    """Test cases for serving stale real data during outages"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        cache.clear()
+
+        self.client = MagicMock()
+        self.query = self.client.table.return_value.select.return_value.eq.return_value
+        self.query.execute.return_value.data = [{"node_id": "N1_1", "title": "Node 1.1"}]
+
+        self.db_manager = DatabaseManager()
+        self.db_manager.init_app(self.app)
+        self.db_manager.supabase = self.client
+        self.db_manager.connected = True
+
+    def tearDown(self):
+        self.ctx.pop()
+
+    def test_outage_serves_last_known_good_with_age(self):
+        """A failing query returns the previous real result instead of mock data"""
+        self.db_manager.get_node_info('N1_1')
+        self.db_manager.invalidate_node('N1_1')
+        self.query.execute.side_effect = ConnectionError("backend down")
+
+        self.assertEqual(self.db_manager.get_node_info('N1_1')['title'], 'Node 1.1')
+        self.assertIsNotNone(current_data_age())
+        self.assertEqual(self.db_manager.last_known_good.stats()['stale_served'], 1)
+
+    def test_open_breaker_skips_backend(self):
+        """Once open, the breaker answers from last-known-good without querying"""
+        self.db_manager.get_node_info('N1_1')
+        self.query.execute.side_effect = ConnectionError("backend down")
+        for _ in range(self.app.config['DB_BREAKER_FAILURE_THRESHOLD']):
+            self.db_manager.invalidate_node('N1_1')
+            self.db_manager.get_node_info('N1_1')
+        calls = self.query.execute.call_count
+
+        self.db_manager.invalidate_node('N1_1')
+        self.assertEqual(self.db_manager.get_node_info('N1_1')['title'], 'Node 1.1')
+        self.assertEqual(self.query.execute.call_count, calls)
+        self.assertEqual(self.db_manager.breaker.state, CircuitBreaker.OPEN)
+
+    def test_unknown_query_still_falls_back_to_mock(self):
+        """Without a last-known-good value the mock fallback remains"""
+        self.query.execute.side_effect = ConnectionError("backend down")
+        self.assertEqual(self.db_manager.get_node_info('N1_1')['title'], 'Mock Sensor Node 1')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Tests for vectorized fire-risk scoring
+"""
+import time
+import unittest
+from unittest.mock import patch
+import numpy as np
+from app import create_app
+from app.database import db_manager
+from app.memory_store import MemoryStore
+from app.risk import RiskEngine, fire_risk, risk_class
+from app.topology import TopologyIndex
+
+HQ = 'Αρχηγείο / Ε.Σ.Κ.Ε.ΔΙ.Κ.'
+
+def reading(node_id, minute, temperature, humidity, wind_speed, rain=False):
+    return {"node_id": node_id, "timestamp": f"2026-07-01T11:{minute:02d}:00", "temperature": temperature,
+            "humidity": humidity, "wind_speed": wind_speed, "rain": rain, "flora_density": 70.0,
+            "slope": 10.0, "vegetation_type": "Coniferous"}
+
+class TestFireRisk(unittest.TestCase):
+    def test_weather_drives_risk(self):
+        def score(temperature, humidity, wind_speed, rain=0.0):
+            return fire_risk(*[np.array([v], dtype=float) for v in
+                               (temperature, humidity, wind_speed, rain, 70, 10, 1.0)])[0]
+        hot_dry_windy = score(35, 15, 30)
+        self.assertGreater(hot_dry_windy, score(35, 15, 5))
+        self.assertGreater(score(35, 15, 5), score(20, 80, 5))
+        self.assertLess(score(35, 15, 30, rain=1.0), hot_dry_windy / 2)
+        self.assertEqual(risk_class(hot_dry_windy), "extreme")
+        self.assertEqual(risk_class(score(20, 80, 5)), "low")
+        self.assertTrue(np.isnan(score(35, np.nan, 30)))
+
+class TestRiskEngine(unittest.TestCase):
+    def test_latest_reading_per_node_is_scored(self):
+        engine = RiskEngine(capacity=2)
+        engine.observe([reading("N1_1", 0, 20, 80, 5), reading("N1_2", 0, 35, 15, 30),
+                        reading("N2_1", 0, 30, 30, 20), reading("N1_1", 5, 38, 10, 40),
+                        reading("N1_1", 1, 10, 90, 0)])
+        self.assertEqual(engine.stats()["scored"], 0)
+        engine.refresh()
+        top, matching = engine.top(limit=2)
+        self.assertEqual(matching, 3)
+        self.assertEqual([entry["node_id"] for entry in top], ["N1_1", "N1_2"])
+        # The older 11:01 reading for N1_1 does not replace the 11:05 one
+        self.assertEqual(top[0]["timestamp"], "2026-07-01T11:05:00")
+        region, _ = engine.top(["N2_1", "N9"], min_risk=0)
+        self.assertEqual([entry["node_id"] for entry in region], ["N2_1"])
+        self.assertIsNone(engine.risk_of("N9"))
+
+class TestRiskEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        topology = TopologyIndex()
+        topology.load([{"node_id": "N1_1"}, {"node_id": "N2_1"}],
+                      [{"node_id": "N1_1", "region_id": "FR1"}, {"node_id": "N2_1", "region_id": "FR2"}], [])
+        engine = RiskEngine()
+        engine.observe([reading("N1_1", 0, 35, 15, 30), reading("N2_1", 0, 20, 80, 5)])
+        engine.refresh()
+        self.patches = [patch.object(db_manager, 'topology', topology), patch.object(db_manager, 'risk', engine)]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_risk_by_region(self):
+        response = self.client.get('/api/risk', query_string={"region": HQ, "min_risk": 50})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([node["node_id"] for node in response.get_json()["nodes"]], ["N1_1"])
+        region = self.client.get('/api/risk', query_string={"region": 'Κεντρικής Μακεδονίας'}).get_json()
+        self.assertEqual([node["node_id"] for node in region["nodes"]], ["N2_1"])
+        self.assertEqual(self.client.get('/api/risk', query_string={"region": HQ, "limit": "x"}).status_code, 400)
+
+    def test_scheduled_refresh_reloads_stored_readings(self):
+        store = MemoryStore()
+        # Stored without going through ingest, and newer than the engine's N2_1 reading
+        store.insert_rows("sensor_readings", [reading("N2_1", 10, 38, 10, 40)])
+        with patch.object(db_manager, 'backend', store):
+            self.app.config['RISK_REFRESH_INTERVAL'] = 0.01
+            self.app.config['RISK_RELOAD_INTERVAL'] = 0
+            db_manager.start_risk_refresh(self.app)
+            try:
+                deadline = time.time() + 5
+                while db_manager.risk.risk_of("N2_1")["timestamp"] != "2026-07-01T11:10:00" and time.time() < deadline:
+                    time.sleep(0.01)
+            finally:
+                db_manager.risk.stop()
+        self.assertEqual(db_manager.risk.risk_of("N2_1")["class"], "extreme")
+
+if __name__ == '__main__':
+    unittest.main()
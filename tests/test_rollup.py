@@ -0,0 +1,125 @@
+"""
+Tests for the per-region danger rollup
+"""
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from app import create_app
+from app.database import db_manager
+from app.memory_store import MemoryStore
+from app.rollup import DangerRollup
+from app.topology import TopologyIndex
+
+REGIONS = {"N1": "FR1", "N1_1": "FR1", "N1_2": "FR1", "N2": "FR2"}
+NOW = datetime(2026, 7, 1, 12, 0, 0)
+
+def reading(node_id, level, minute):
+    return {"node_id": node_id, "danger_level": level, "timestamp": f"2026-07-01T11:{minute:02d}:00"}
+
+class TestDangerRollup(unittest.TestCase):
+    def setUp(self):
+        self.regions = dict(REGIONS)
+        self.rollup = DangerRollup(self.regions.get)
+        self.rollup.seed([
+            {"node_id": "N1_1", "danger_level": 1, "last_updated": "2026-07-01T11:10:00+00:00"},
+            {"node_id": "N1", "danger_level": 4, "last_updated": "2026-07-01T11:00:00+00:00"},
+            {"node_id": "N1_2", "danger_level": None, "last_updated": None},
+        ])
+
+    def summary(self, min_level=3):
+        return {r["region_id"]: r for r in self.rollup.summary({"FR1": 3, "FR2": 1}, min_level, NOW)}
+
+    def test_seed(self):
+        fr1 = self.summary()["FR1"]
+        self.assertEqual((fr1["reporting"], fr1["never_reported"], fr1["at_or_above"]), (2, 1, 1))
+        self.assertEqual(fr1["max_danger"], 4)
+        self.assertEqual(fr1["stalest"], {"node_id": "N1", "timestamp": "2026-07-01T11:00:00",
+                                          "age_seconds": 3600})
+        self.assertEqual(self.summary()["FR2"]["never_reported"], 1)
+
+    def test_readings_move_nodes_between_levels(self):
+        self.rollup.observe([reading("N1", 2, 20), reading("N1_1", 5, 30), reading("N1", 3, 5)])
+        fr1 = self.summary()["FR1"]
+        # The late reading for N1 (11:05) is older than its 11:20 one and is ignored
+        self.assertEqual(fr1["danger_levels"]["2"], 1)
+        self.assertEqual(fr1["danger_levels"]["4"], 0)
+        self.assertEqual((fr1["max_danger"], fr1["at_or_above"]), (5, 1))
+        self.assertEqual(fr1["stalest"]["node_id"], "N1")
+        self.assertEqual(self.rollup.stats()["readings_applied"], 2)
+
+    def test_stalest_follows_timestamps_not_arrival(self):
+        self.rollup.observe([reading("N1", 2, 30), reading("N1_1", 2, 40)])
+        # A late batch carrying an older reading for N1_1 arrives last and changes nothing
+        self.rollup.observe([reading("N1_1", 3, 20)])
+        self.assertEqual(self.summary()["FR1"]["stalest"]["node_id"], "N1")
+        self.rollup.observe([reading("N1", 2, 50)])
+        self.assertEqual(self.summary()["FR1"]["stalest"]["node_id"], "N1_1")
+
+    def test_reconcile_keeps_newer_readings(self):
+        changed = self.rollup.reconcile([
+            {"node_id": "N1", "danger_level": 2, "last_updated": "2026-07-01T10:00:00"},
+            {"node_id": "N1_1", "danger_level": 5, "last_updated": "2026-07-01T11:10:00"},
+            {"node_id": "N2", "danger_level": 3, "last_updated": "2026-07-01T11:30:00"},
+        ])
+        self.assertEqual(changed, 2)
+        summary = self.summary()
+        self.assertEqual((summary["FR1"]["max_danger"], summary["FR2"]["max_danger"]), (5, 3))
+        self.assertEqual(summary["FR1"]["stalest"]["node_id"], "N1")
+
+    def test_relocated_nodes_change_region(self):
+        self.regions["N1"] = "FR2"
+        self.rollup.relocate(["N1", "N1_1"])
+        summary = self.summary()
+        self.assertEqual((summary["FR1"]["max_danger"], summary["FR2"]["max_danger"]), (1, 4))
+        self.assertEqual(summary["FR2"]["stalest"]["node_id"], "N1")
+
+class TestRegionSummaryEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        topology = TopologyIndex()
+        topology.load([{"node_id": node_id} for node_id in REGIONS],
+                      [{"node_id": node_id, "region_id": region_id} for node_id, region_id in REGIONS.items()], [])
+        self.patches = [patch.object(db_manager, 'topology', topology),
+                        patch.object(db_manager, 'rollup', DangerRollup(topology.region_of)),
+                        patch.object(db_manager, 'write_rows')]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_ingested_readings_update_summary(self):
+        with patch.dict(db_manager.row_listeners, {'sensor_readings': [db_manager.rollup.observe]}):
+            db_manager.ingest('sensor_readings', [reading("N1_1", 4, 0), reading("N2", 1, 0)])
+        response = self.client.get('/api/regions/summary', query_string={"min_level": 4})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        regions = {r["region_id"]: r for r in data["regions"]}
+        self.assertEqual(data["at_or_above"], 1)
+        self.assertEqual((regions["FR1"]["nodes"], regions["FR1"]["reporting"]), (3, 1))
+        self.assertEqual(regions["FR1"]["region"], 'Ανατολικής Μακεδονίας και Θράκης')
+        self.assertEqual(self.client.get('/api/regions/summary?min_level=x').status_code, 400)
+
+    def test_refresh_picks_up_directly_stored_readings(self):
+        store = MemoryStore()
+        store.upsert_rows("nodes", [{"node_id": node_id} for node_id in REGIONS])
+        store.upsert_rows("node_regions", [{"node_id": node_id, "region_id": region_id}
+                                           for node_id, region_id in REGIONS.items()])
+        with self.app.app_context(), patch.object(db_manager, 'backend', store), \
+                patch.object(store, 'nodes_with_status', wraps=store.nodes_with_status) as statuses:
+            db_manager.refresh_topology()
+            # Written straight to storage, as a parent writing to Supabase would
+            store.insert_rows("sensor_readings", [reading("N2", 5, 10)])
+            # Unchanged topology: the latest readings are not rescanned until the interval passes
+            db_manager.refresh_topology()
+            self.assertEqual(statuses.call_count, 1)
+            with patch.dict(self.app.config, {'ROLLUP_RECONCILE_INTERVAL': 0}):
+                db_manager.refresh_topology()
+            self.assertEqual(statuses.call_count, 2)
+            regions = {r["region_id"]: r for r in db_manager.region_summary(min_level=5)}
+        self.assertEqual((regions["FR2"]["reporting"], regions["FR2"]["at_or_above"]), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Tests for the spatial node index and the /api/nodes viewport queries
+"""
+import time
+import random
+import unittest
+from unittest.mock import patch
+from app import create_app
+from app.database import db_manager
+from app.spatial import GridIndex, haversine_km, parse_bbox
+from app.topology import TopologyIndex
+
+NODES = [
+    {"node_id": "N1", "title": "Node 1", "is_parent": True, "lat": 40.97, "lng": 24.37},
+    {"node_id": "N1_1", "title": "Node 1.1", "is_parent": False, "lat": 40.95, "lng": 24.35},
+    {"node_id": "N2", "title": "Node 2", "is_parent": True, "lat": 40.99, "lng": 24.7},
+    {"node_id": "N3", "title": "No position", "is_parent": True, "lat": None, "lng": None},
+]
+NODE_REGIONS = [
+    {"node_id": "N1", "region_id": "FR1"},
+    {"node_id": "N1_1", "region_id": "FR1"},
+    {"node_id": "N2", "region_id": "FR2"},
+]
+
+class TestGridIndex(unittest.TestCase):
+    def test_queries_match_a_full_scan(self):
+        rng = random.Random(7)
+        points = [(str(i), rng.uniform(35, 42), rng.uniform(19, 28)) for i in range(5000)]
+        index = GridIndex(points, cell_degrees=0.1)
+        for _ in range(20):
+            lat, lng = rng.uniform(34, 43), rng.uniform(18, 29)
+            by_distance = sorted(((key, haversine_km(lat, lng, a, b)) for key, a, b in points),
+                                 key=lambda item: item[1])
+            self.assertEqual([key for key, _ in index.nearest(lat, lng, 5)],
+                             [key for key, _ in by_distance[:5]])
+            self.assertEqual([key for key, _ in index.within(lat, lng, 20)],
+                             [key for key, distance in by_distance if distance <= 20])
+            box = (lng - 0.5, lat - 0.3, lng + 0.5, lat + 0.3)
+            self.assertEqual(sorted(index.bbox(box)),
+                             sorted(key for key, a, b in points if box[1] <= a <= box[3] and box[0] <= b <= box[2]))
+
+    def test_far_away_nearest_stays_fast_and_exact(self):
+        rng = random.Random(11)
+        points = [(str(i), rng.uniform(35, 42), rng.uniform(19, 28)) for i in range(2000)]
+        index = GridIndex(points, cell_degrees=0.01)
+        for lat, lng in [(-89, -179), (89, 179), (38, -120)]:
+            started = time.perf_counter()
+            nearest = index.nearest(lat, lng, 3)
+            self.assertLess(time.perf_counter() - started, 0.5)
+            by_distance = sorted(((key, haversine_km(lat, lng, a, b)) for key, a, b in points),
+                                 key=lambda item: item[1])
+            self.assertEqual([key for key, _ in nearest], [key for key, _ in by_distance[:3]])
+        self.assertEqual(index.nearest(-89, -179, 3, max_km=100), [])
+
+    def test_parse_bbox(self):
+        self.assertEqual(parse_bbox("24,40.5,25,41"), (24.0, 40.5, 25.0, 41.0))
+        for value in ("24,40.5,25", "25,40,24,41", "a,b,c,d"):
+            with self.assertRaises(ValueError):
+                parse_bbox(value)
+
+class TestTopologySpatialQueries(unittest.TestCase):
+    def setUp(self):
+        self.index = TopologyIndex()
+        self.index.load(NODES, NODE_REGIONS, [])
+
+    def test_bbox_and_region_filter(self):
+        box = (24.3, 40.9, 24.8, 41.0)
+        self.assertEqual([n["node_id"] for n in self.index.nodes_in_bbox(box)], ["N1", "N1_1", "N2"])
+        self.assertEqual([n["node_id"] for n in self.index.nodes_in_bbox(box, "FR1")], ["N1", "N1_1"])
+        self.assertEqual(self.index.stats()["located_nodes"], 3)
+
+    def test_nearest_and_radius(self):
+        nearest = self.index.nearest_nodes(40.955, 24.352, 2)
+        self.assertEqual([n["node_id"] for n, _ in nearest], ["N1_1", "N1"])
+        within = self.index.nodes_within(40.955, 24.352, 5)
+        self.assertEqual([n["node_id"] for n, _ in within], ["N1_1", "N1"])
+        self.assertEqual(self.index.nearest_nodes(40.96, 24.36, 2, region_id="FR2")[0][0]["node_id"], "N2")
+
+class TestNodesEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        topology = TopologyIndex()
+        topology.load(NODES, NODE_REGIONS, [])
+        self.patch = patch.object(db_manager, 'topology', topology)
+        self.patch.start()
+        self.hq = 'Αρχηγείο / Ε.Σ.Κ.Ε.ΔΙ.Κ.'
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def test_bbox_query(self):
+        response = self.client.get('/api/nodes', query_string={"region": self.hq, "bbox": "24.3,40.9,24.5,41"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([n["node_id"] for n in response.get_json()["nodes"]], ["N1", "N1_1"])
+
+        empty = self.client.get('/api/nodes', query_string={"region": self.hq, "bbox": "20,35,20.1,35.1"})
+        self.assertEqual((empty.status_code, empty.get_json()["count"]), (200, 0))
+
+    def test_nearest_query_and_bad_arguments(self):
+        response = self.client.get('/api/nodes', query_string={"region": self.hq, "lat": 40.99, "lng": 24.69, "k": 1})
+        nodes = response.get_json()["nodes"]
+        self.assertEqual(nodes[0]["node_id"], "N2")
+        self.assertLess(nodes[0]["distance_km"], 1)
+
+        for args in ({"bbox": "1,2,3"}, {"lat": 40.9}, {"lat": 40.9, "lng": 24.3, "radius_km": -1}):
+            response = self.client.get('/api/nodes', query_string={"region": self.hq, **args})
+            self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
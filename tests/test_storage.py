@@ -0,0 +1,105 @@
+"""
+Tests for the local storage backends (SQLite and in-memory)
+"""
+import unittest
+from app import create_app, cache
+from app.database import DatabaseManager
+from app.storage import create_backend
+
+NODES = [
+    {"node_id": "N1", "title": "Node 1", "location": "A", "is_parent": True, "lat": 40.97, "lng": 24.37},
+    {"node_id": "N1_1", "title": "Node 1.1", "location": "B", "is_parent": False, "lat": 40.95, "lng": 24.35},
+    {"node_id": "N2", "title": "Node 2", "location": "C", "is_parent": True, "lat": 40.99, "lng": 24.7},
+]
+NODE_REGIONS = [
+    {"node_id": "N1", "region_id": "FR1"},
+    {"node_id": "N1_1", "region_id": "FR1"},
+    {"node_id": "N2", "region_id": "FR2"},
+]
+HIERARCHY = [{"parent_id": "N1", "child_id": "N1_1"}]
+# Readings 3 and 4 share a timestamp so paging must tie-break on reading_id
+READINGS = [
+    {"reading_id": i, "node_id": "N1_1", "timestamp": ts, "danger_level": i, "temperature": 20.0 + i, "rain": i % 2 == 0}
+    for i, ts in enumerate(["2025-05-15T08:00:00", "2025-05-15T08:01:00", "2025-05-15T08:02:00",
+                            "2025-05-15T08:02:00", "2025-05-15 08:03:00.5"], start=1)
+]
+REPORTS = [
+    {"report_id": 1, "parent_id": "N1", "child_id": "N1_1", "timestamp": "2025-05-15T15:57:11", "status_message": "All OK"},
+    {"report_id": 2, "parent_id": "N1", "child_id": "N1_1", "timestamp": "2025-05-15T16:57:11", "status_message": "Later"},
+]
+
+class BackendConformance:
+    """Shared expectations every local backend must meet"""
+
+    backend_name = None
+
+    def setUp(self):
+        self.store = create_backend(self.backend_name)
+        self.store.upsert_rows("nodes", NODES)
+        self.store.upsert_rows("node_regions", NODE_REGIONS)
+        self.store.upsert_rows("node_hierarchy", HIERARCHY)
+        self.store.upsert_rows("sensor_readings", READINGS)
+        self.store.upsert_rows("Parent_Node_Reports", REPORTS)
+
+    def ids(self, rows):
+        return [row["reading_id"] for row in rows]
+
+    def test_topology_queries(self):
+        self.assertEqual([n["node_id"] for n in self.store.all_nodes()], ["N1", "N1_1", "N2"])
+        self.assertIs(self.store.node("N1")["is_parent"], True)
+        self.assertEqual(self.store.node_children("N1"), ["N1_1"])
+        self.assertEqual(self.store.node_region("N2"), "FR2")
+        self.assertEqual(self.store.nodes_by_region("FR1", ("node_id", "title")),
+                         [{"node_id": "N1", "title": "Node 1"}, {"node_id": "N1_1", "title": "Node 1.1"}])
+
+    def test_history_paging(self):
+        self.assertEqual(self.ids(self.store.node_history("N1_1", 2)), [5, 4])
+        self.assertEqual(self.ids(self.store.node_history("N1_1", 2, before=("2025-05-15T08:02:00", 4))), [3, 2])
+        self.assertEqual(self.ids(self.store.node_history("N1_1", 2, after=("2025-05-15T08:01:00", 2))), [4, 3])
+        self.assertEqual(self.ids(self.store.node_history("N1_1", start="2025-05-15T08:01:00",
+                                                          end="2025-05-15T08:02:00")), [4, 3, 2])
+        self.assertEqual(self.store.node_history("N2"), [])
+
+    def test_latest_and_status(self):
+        latest = self.store.latest_readings(["N1_1", "N2"])
+        self.assertEqual(latest["N1_1"]["reading_id"], 5)
+        self.assertIsNone(latest["N2"])
+        status = {row["node_id"]: row["danger_level"] for row in self.store.nodes_with_status("FR1")}
+        self.assertEqual(status, {"N1": None, "N1_1": 5})
+        self.assertEqual(len(self.store.nodes_with_status()), 3)
+
+    def test_reports_newest_first(self):
+        self.assertEqual([r["report_id"] for r in self.store.parent_node_reports("N1")], [2, 1])
+
+    def test_upsert_replaces_by_primary_key(self):
+        self.store.upsert_rows("sensor_readings", [dict(READINGS[4], danger_level=0)])
+        self.assertEqual(self.store.latest_readings(["N1_1"])["N1_1"]["danger_level"], 0)
+        self.assertEqual(len(self.store.node_history("N1_1")), 5)
+
+class TestSQLiteStore(BackendConformance, unittest.TestCase):
+    backend_name = "sqlite"
+
+class TestMemoryStore(BackendConformance, unittest.TestCase):
+    backend_name = "memory"
+
+class TestConfiguredBackend(unittest.TestCase):
+    """DatabaseManager serves every read from a configured local backend"""
+
+    def test_manager_reads_from_memory_backend(self):
+        app = create_app('testing')
+        app.config['STORAGE_BACKEND'] = 'memory'
+        with app.app_context():
+            cache.clear()
+            db_manager = DatabaseManager()
+            db_manager.init_app(app)
+            db_manager.backend.upsert_rows("nodes", NODES)
+            db_manager.backend.upsert_rows("node_regions", NODE_REGIONS)
+            db_manager.backend.upsert_rows("sensor_readings", READINGS)
+
+            self.assertEqual(db_manager.get_node_info("N2")["title"], "Node 2")
+            self.assertEqual(len(db_manager.get_nodes_for_dashboard("Ανατολικής Μακεδονίας και Θράκης")), 2)
+            self.assertEqual(db_manager.get_node_history_page("N1_1", limit=2)["readings"][0]["reading_id"], 5)
+            self.assertFalse(db_manager.connected)
+
+if __name__ == '__main__':
+    unittest.main()
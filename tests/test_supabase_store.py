@@ -0,0 +1,88 @@
+"""
+Tests for reading past the PostgREST row cap in the Supabase store
+"""
+import unittest
+from unittest.mock import patch
+from httpx import QueryParams
+from postgrest import SyncPostgrestClient
+from app.supabase_store import SupabaseStore, PAGE_SIZE, history_query
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+class FakeRPC:
+    """An RPC call answered like PostgREST: honours order/offset/limit, never more than PAGE_SIZE rows"""
+    def __init__(self, rows, calls):
+        self.rows = rows
+        self.calls = calls
+        self.params = QueryParams()
+
+    def execute(self):
+        self.calls.append(dict(self.params))
+        rows = sorted(self.rows, key=lambda row: row[self.params["order"]]) if "order" in self.params else self.rows
+        offset = int(self.params.get("offset", 0))
+        limit = min(int(self.params.get("limit", PAGE_SIZE)), PAGE_SIZE)
+        return FakeResponse(rows[offset:offset + limit])
+
+class FakeClient:
+    def __init__(self, functions):
+        self.functions = functions
+        self.calls = []
+
+    def rpc(self, function, params):
+        return FakeRPC(self.functions[function](params), self.calls)
+
+class TestSupabaseStorePaging(unittest.TestCase):
+    def test_history_order_names_both_columns(self):
+        client = SyncPostgrestClient("http://localhost/rest/v1")
+        newest = history_query(client.from_("sensor_readings").select("*"), 10)
+        self.assertEqual(newest.params.get_list("order"), ["timestamp.desc,reading_id.desc"])
+        after = history_query(client.from_("sensor_readings").select("*"), 10, after=("2025-05-15T08:00:00", 7))
+        self.assertEqual(after.params.get_list("order"), ["timestamp.asc,reading_id.asc"])
+
+    def test_bucket_rpc_is_read_past_the_row_cap(self):
+        buckets = [{"bucket": f"2025-05-15T{i // 60:02d}:{i % 60:02d}:00", "count": 1, "danger_level_max": 1}
+                   for i in range(PAGE_SIZE + 200)]
+        client = FakeClient({"get_node_history_buckets": lambda params: buckets})
+        store = SupabaseStore(lambda: client)
+        result = store.node_history_downsampled("N1_1", "bucket", 60, None, None, None, 5000)
+        self.assertEqual(len(client.calls), 2)
+        self.assertEqual(result["bucket_seconds"], 60)
+        self.assertEqual(len(result["points"]), PAGE_SIZE + 200)
+        self.assertEqual(client.calls[1]["offset"], str(PAGE_SIZE))
+
+    def test_fallback_history_pages_up_to_max_rows(self):
+        readings = [{"reading_id": i, "node_id": "N1_1", "timestamp": f"2025-05-15T08:00:{i % 60:02d}",
+                     "danger_level": 1} for i in range(3000, 0, -1)]
+
+        def node_history(node_id, limit=None, before=None, after=None, start=None, end=None):
+            rows = [row for row in readings if before is None or row["reading_id"] < before[1]]
+            return rows[:min(limit, PAGE_SIZE)]
+
+        store = SupabaseStore(lambda: None)
+        with patch.object(store, "node_history", side_effect=node_history) as history, \
+                patch("app.supabase_store.downsample", side_effect=lambda rows, *args: rows):
+            rows = store.node_history_downsampled("N1_1", "lttb", None, 100, None, None, 2500)
+        self.assertEqual(len(rows), 2500)
+        self.assertEqual(rows[-1]["reading_id"], 501)
+        self.assertEqual([call.args[1] for call in history.call_args_list], [1000, 1000, 500])
+
+    def test_nodes_with_status_is_read_past_the_row_cap(self):
+        nodes = [{"node_id": f"N{i:05d}", "danger_level": i % 5} for i in range(2 * PAGE_SIZE + 5, 0, -1)]
+        client = FakeClient({"get_nodes_with_latest_status": lambda params: nodes})
+        statuses = SupabaseStore(lambda: client).nodes_with_status()
+        self.assertEqual(len(statuses), len(nodes))
+        self.assertEqual([row["node_id"] for row in statuses], sorted(row["node_id"] for row in nodes))
+        self.assertEqual([call["offset"] for call in client.calls], ["0", "1000", "2000"])
+
+    def test_latest_readings_are_requested_in_chunks(self):
+        node_ids = [f"N{i}" for i in range(2 * PAGE_SIZE + 1)]
+        client = FakeClient({"get_latest_readings": lambda params: [
+            {"node_id": node_id, "danger_level": 1} for node_id in params["node_ids"]]})
+        latest = SupabaseStore(lambda: client).latest_readings(node_ids)
+        self.assertEqual(len(client.calls), 3)
+        self.assertTrue(all(latest[node_id] is not None for node_id in node_ids))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+"""
+Tests for the background connection supervisor
+"""
+import unittest
+from unittest.mock import MagicMock
+from app.supervisor import ConnectionSupervisor
+
+class TestConnectionSupervisor(unittest.TestCase):
+    """Test cases for ConnectionSupervisor._tick"""
+
+    def setUp(self):
+        self.supervisor = ConnectionSupervisor()
+        self.db = MagicMock()
+
+    def test_healthy_connection_waits_full_interval(self):
+        """A passing health check sleeps until the next scheduled probe"""
+        self.db.connected = True
+        self.assertEqual(self.supervisor._tick(self.db, 15), 15)
+        self.db.check_health.assert_called_once()
+        self.db.mark_disconnected.assert_not_called()
+
+    def test_failed_health_check_marks_disconnected(self):
+        """A failing probe flips readiness and retries immediately"""
+        self.db.connected = True
+        self.db.check_health.side_effect = Exception("timeout")
+        self.assertEqual(self.supervisor._tick(self.db, 15), 0)
+        self.db.mark_disconnected.assert_called_once()
+        self.assertEqual(self.supervisor.last_error, "timeout")
+
+    def test_reconnect_counts_and_backoff(self):
+        """Disconnected ticks reconnect, or wait out the manager's backoff"""
+        self.db.connected = False
+        self.db.retry_wait.return_value = 8.0
+        self.assertEqual(self.supervisor._tick(self.db, 15), 8.0)
+        self.assertEqual(self.supervisor.reconnects, 0)
+
+        def connect():
+            self.db.connected = True
+        self.db._initialize_connection.side_effect = connect
+        self.assertEqual(self.supervisor._tick(self.db, 15), 15)
+        self.assertEqual(self.supervisor.reconnects, 1)
+
+if __name__ == '__main__':
+    unittest.main()
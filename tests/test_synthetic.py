@@ -0,0 +1,49 @@
+"""
+Tests for the synthetic dataset generator
+"""
+import unittest
+from datetime import datetime
+from app.synthetic import SyntheticDataset, TABLE_ORDER
+from app.storage import create_backend
+
+END = datetime(2025, 8, 1)
+
+class TestSyntheticDataset(unittest.TestCase):
+    def setUp(self):
+        self.dataset = SyntheticDataset(parents=13, children_per_parent=2, days=0.5, end=END, seed=7)
+
+    def test_same_seed_same_data(self):
+        other = SyntheticDataset(parents=13, children_per_parent=2, days=0.5, end=END, seed=7)
+        self.assertEqual(self.dataset.nodes(), other.nodes())
+        self.assertEqual(list(self.dataset.sensor_readings(3)), list(other.sensor_readings(3)))
+
+    def test_counts_match_streamed_rows(self):
+        for table, count in self.dataset.counts().items():
+            self.assertEqual(sum(1 for _ in self.dataset.table_rows(table)), count, table)
+
+    def test_topology_covers_every_region(self):
+        regions = {row["region_id"] for row in self.dataset.node_regions()}
+        self.assertEqual(len(regions), 13)
+        self.assertEqual(len(self.dataset.hierarchy()), 26)
+        parents = {n["node_id"] for n in self.dataset.nodes() if n["is_parent"]}
+        self.assertTrue(all(link["parent_id"] in parents for link in self.dataset.hierarchy()))
+
+    def test_reading_ids_follow_time(self):
+        rows = list(self.dataset.table_rows("sensor_readings"))
+        self.assertEqual(len({row["reading_id"] for row in rows}), len(rows))
+        by_id = sorted(rows, key=lambda row: row["reading_id"])
+        timestamps = [row["timestamp"] for row in by_id]
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertTrue(all(0 <= row["danger_level"] <= 5 for row in rows))
+
+    def test_loads_into_backend(self):
+        store = create_backend("memory")
+        for table in TABLE_ORDER:
+            if table != "fire_regions":
+                store.upsert_rows(table, list(self.dataset.table_rows(table)))
+        latest = store.latest_readings(["N1_1"])["N1_1"]
+        self.assertEqual(latest["timestamp"], "2025-07-31T23:59:00")
+        self.assertEqual(store.node_children("N1"), ["N1_1", "N1_2"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Tests for GeoJSON node tiles
+"""
+import unittest
+from unittest.mock import patch
+from app import create_app
+from app.database import db_manager
+from app.tiles import TileCache, build_tile, tile_bbox, tile_of
+from app.topology import TopologyIndex
+
+NODES = [
+    {"node_id": "N1", "title": "Node 1", "is_parent": True, "lat": 40.97, "lng": 24.37},
+    {"node_id": "N1_1", "title": "Node 1.1", "is_parent": False, "lat": 40.95, "lng": 24.35},
+    {"node_id": "N2", "title": "Node 2", "is_parent": True, "lat": 38.0, "lng": 23.7},
+]
+NODE_REGIONS = [
+    {"node_id": "N1", "region_id": "FR1"},
+    {"node_id": "N1_1", "region_id": "FR1"},
+    {"node_id": "N2", "region_id": "FR2"},
+]
+HIERARCHY = [{"parent_id": "N1", "child_id": "N1_1"}]
+HQ = 'Αρχηγείο / Ε.Σ.Κ.Ε.ΔΙ.Κ.'
+
+def load(nodes=NODES, hierarchy=HIERARCHY):
+    topology = TopologyIndex()
+    topology.load(nodes, NODE_REGIONS, hierarchy)
+    return topology
+
+class TestTiles(unittest.TestCase):
+    def test_tile_math(self):
+        x, y = tile_of(40.95, 24.35, 12)
+        min_lng, min_lat, max_lng, max_lat = tile_bbox(12, x, y)
+        self.assertTrue(min_lng <= 24.35 <= max_lng and min_lat <= 40.95 <= max_lat)
+
+    def test_tile_holds_nodes_and_links(self):
+        snapshot = load().snapshot
+        x, y = tile_of(40.95, 24.35, 15)
+        features = build_tile(snapshot, 15, x, y)["features"]
+        points = [f["properties"]["node_id"] for f in features if f["geometry"]["type"] == "Point"]
+        lines = [f for f in features if f["geometry"]["type"] == "LineString"]
+        # N1 sits in another tile at this zoom; its link to N1_1 still shows here
+        self.assertEqual(points, ["N1_1"])
+        self.assertEqual(lines[0]["properties"], {"parent_id": "N1", "child_id": "N1_1"})
+        self.assertEqual(lines[0]["geometry"]["coordinates"], [[24.37, 40.97], [24.35, 40.95]])
+
+        x, y = tile_of(38.0, 23.7, 15)
+        self.assertEqual(build_tile(snapshot, 15, x, y, region_id="FR1")["features"], [])
+
+    def test_only_tiles_around_changes_are_dropped(self):
+        old = load().snapshot
+        cache = TileCache(min_zoom=10, max_zoom=12)
+        north, south = tile_of(40.95, 24.35, 12), tile_of(38.0, 23.7, 12)
+        cache.get(old, 12, *north)
+        cache.get(old, 12, *south)
+
+        moved = [dict(n) for n in NODES]
+        moved[1]["lat"] = 40.96
+        new = load(moved).snapshot
+        cache.invalidate_changes(old, new, {"N1_1"})
+        self.assertEqual(cache.stats()["tiles"], 1)
+        cache.get(new, 12, *south)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+class TestTileEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.patches = [patch.object(db_manager, 'topology', load()),
+                        patch.object(db_manager, 'tiles', TileCache())]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_etag_revalidation(self):
+        x, y = tile_of(40.95, 24.35, 11)
+        response = self.client.get(f'/tiles/11/{x}/{y}', query_string={"region": HQ})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_type, 'application/geo+json')
+        self.assertEqual(len(response.get_json()["features"]), 3)
+
+        etag = response.headers['ETag']
+        again = self.client.get(f'/tiles/11/{x}/{y}', query_string={"region": HQ},
+                                headers={"If-None-Match": etag})
+        self.assertEqual((again.status_code, again.headers['ETag']), (304, etag))
+
+    def test_rejects_out_of_range_tiles(self):
+        self.assertEqual(self.client.get('/tiles/3/1/1', query_string={"region": HQ}).status_code, 400)
+        self.assertEqual(self.client.get('/tiles/12/5000/1', query_string={"region": HQ}).status_code, 404)
+        self.assertEqual(self.client.get('/tiles/12/1/1').status_code, 400)
+
+    def test_dashboard_no_longer_inlines_nodes(self):
+        with self.client.session_transaction() as session:
+            session['region'] = HQ
+        response = self.client.get('/dashboard')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'window.NODES', response.data)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Tests for the in-memory topology index
+"""
+import unittest
+from unittest.mock import patch
+from app.memory_store import MemoryStore
+from app.topology import TopologyIndex
+
+NODES = [
+    {"node_id": "N1", "title": "Node 1", "is_parent": True, "lat": 40.97, "lng": 24.37},
+    {"node_id": "N1_1", "title": "Node 1.1", "is_parent": False, "lat": 40.95, "lng": 24.35},
+    {"node_id": "N2", "title": "Node 2", "is_parent": True, "lat": 40.99, "lng": 24.7},
+]
+NODE_REGIONS = [
+    {"node_id": "N1", "region_id": "FR1"},
+    {"node_id": "N1_1", "region_id": "FR1"},
+    {"node_id": "N2", "region_id": "FR2"},
+]
+HIERARCHY = [{"parent_id": "N1", "child_id": "N1_1"}]
+
+class TestTopologyIndex(unittest.TestCase):
+    """Test cases for TopologyIndex"""
+
+    def setUp(self):
+        self.index = TopologyIndex()
+        self.index.load(NODES, NODE_REGIONS, HIERARCHY)
+
+    def test_lookups(self):
+        """Region, node and hierarchy lookups are answered from memory"""
+        self.assertTrue(self.index.ready)
+        self.assertEqual(self.index.region_of('N1_1'), 'FR1')
+        self.assertEqual(self.index.node_ids_in_region('FR1'), {'N1', 'N1_1'})
+        self.assertEqual([n['node_id'] for n in self.index.nodes_in_region('FR2')], ['N2'])
+        self.assertEqual(self.index.children_of('N1'), ['N1_1'])
+        self.assertEqual(self.index.parent_of('N1_1'), 'N1')
+        self.assertIsNone(self.index.region_of('UNKNOWN'))
+
+    def test_reload_reports_only_changes(self):
+        """A refresh returns just the nodes and regions that changed"""
+        moved = [dict(r) for r in NODE_REGIONS]
+        moved[2]["region_id"] = "FR1"
+        changed_nodes, changed_regions = self.index.load(NODES, moved, HIERARCHY)
+        self.assertEqual(changed_nodes, {'N2'})
+        self.assertEqual(changed_regions, {'FR1', 'FR2'})
+        self.assertEqual(self.index.node_ids_in_region('FR2'), set())
+
+    def test_refresh_skips_unchanged_tables(self):
+        """Tables are only reread when the store's topology version moved"""
+        store = MemoryStore()
+        store.upsert_rows("nodes", NODES)
+        store.upsert_rows("node_regions", NODE_REGIONS)
+        index = TopologyIndex()
+        with patch.object(store, 'all_nodes', wraps=store.all_nodes) as all_nodes:
+            index.refresh(store)
+            self.assertEqual(index.refresh(store), (set(), set()))
+            self.assertEqual(all_nodes.call_count, 1)
+            store.upsert_rows("node_regions", [{"node_id": "N2", "region_id": "FR1"}])
+            self.assertEqual(index.refresh(store), ({'N2'}, {'FR1', 'FR2'}))
+            self.assertEqual(all_nodes.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
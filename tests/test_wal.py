@@ -0,0 +1,170 @@
+"""
+Tests for the local write-ahead log
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from postgrest import APIError
+from app.database import DatabaseManager, DatabaseUnavailable
+from app.wal import WriteAheadLog
+
+def rows(count, node_id="N1_1", start=0):
+    return [{"node_id": node_id, "timestamp": f"2025-05-15T08:{(start + i) // 60:02d}:{(start + i) % 60:02d}",
+             "danger_level": 1} for i in range(count)]
+
+class RecordingWriter:
+    def __init__(self, fail_after=None):
+        self.batches = []
+        self.fail_after = fail_after
+
+    def __call__(self, table, batch):
+        if self.fail_after is not None and len(self.batches) >= self.fail_after:
+            raise ConnectionError("database down")
+        self.batches.append((table, list(batch)))
+
+class RejectingWriter(RecordingWriter):
+    """Rejects any batch holding a danger_level the column cannot take"""
+    def __call__(self, table, batch):
+        if any(row["danger_level"] > 5 for row in batch):
+            raise APIError({"message": "value out of range", "code": "22003"})
+        super().__call__(table, batch)
+
+class TestWriteAheadLog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_replays_in_order_across_segments(self):
+        wal = WriteAheadLog(self.directory, segment_bytes=2048)
+        self.assertFalse(wal.pending)
+        for i in range(10):
+            wal.append("sensor_readings", rows(5, start=i * 5))
+        wal.append("Parent_Node_Reports", [{"parent_id": "N1", "child_id": "N1_1",
+                                            "timestamp": "2025-05-15T09:00:00"}])
+        self.assertGreater(len(wal._segments()), 1)
+
+        writer = RecordingWriter()
+        result = wal.replay(writer, batch_rows=20)
+        self.assertEqual(result["rows"], 51)
+        self.assertEqual([(table, len(batch)) for table, batch in writer.batches],
+                         [("sensor_readings", 20), ("sensor_readings", 20), ("sensor_readings", 10),
+                          ("Parent_Node_Reports", 1)])
+        replayed = [row["timestamp"] for _, batch in writer.batches[:3] for row in batch]
+        self.assertEqual(replayed, sorted(replayed))
+        self.assertFalse(wal.pending)
+        self.assertEqual(len(wal._segments()), 1)
+        wal.close()
+
+    def test_truncates_torn_tail_on_open(self):
+        wal = WriteAheadLog(self.directory)
+        wal.append("sensor_readings", rows(3))
+        wal.append("sensor_readings", rows(3, start=3))
+        path = wal._segment_path(wal._seq)
+        wal.close()
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 5)
+
+        wal = WriteAheadLog(self.directory)
+        self.assertGreater(wal.truncated_bytes, 0)
+        writer = RecordingWriter()
+        self.assertEqual(wal.replay(writer)["rows"], 3)
+        wal.close()
+
+    def test_failed_replay_resumes_from_checkpoint(self):
+        wal = WriteAheadLog(self.directory)
+        for i in range(3):
+            wal.append("sensor_readings", rows(4, start=i * 4))
+        with self.assertRaises(ConnectionError):
+            wal.replay(RecordingWriter(fail_after=1), batch_rows=4)
+        self.assertTrue(wal.pending)
+        wal.close()
+
+        # Reopened after a restart: only the two uncommitted batches are written
+        wal = WriteAheadLog(self.directory)
+        writer = RecordingWriter()
+        dedupe = MagicMock(side_effect=lambda table, batch: batch)
+        self.assertEqual(wal.replay(writer, batch_rows=4, dedupe=dedupe)["rows"], 8)
+        self.assertEqual(dedupe.call_count, 1)
+        self.assertEqual(writer.batches[0][1][0]["timestamp"], "2025-05-15T08:00:04")
+        self.assertFalse(wal.pending)
+        wal.close()
+
+    def test_rejected_record_is_quarantined_and_replay_continues(self):
+        wal = WriteAheadLog(self.directory)
+        bad = rows(3)
+        bad[1]["danger_level"] = 99
+        wal.append("sensor_readings", bad)
+        for i in range(1, 3):
+            wal.append("sensor_readings", rows(3, start=i * 3))
+
+        writer = RejectingWriter()
+        result = wal.replay(writer, batch_rows=3)
+        self.assertEqual((result["rows"], result["rejected"]), (9, 1))
+        written = [row["timestamp"] for _, batch in writer.batches for row in batch]
+        self.assertEqual(len(written), 8)
+        self.assertNotIn(bad[1]["timestamp"], written)
+        self.assertFalse(wal.pending)
+        rejects = list(wal.rejects())
+        self.assertEqual([record["rows"][0]["danger_level"] for record in rejects], [99])
+        self.assertIn("out of range", rejects[0]["error"])
+        self.assertEqual(wal.stats()["rejected_rows"], 1)
+        wal.close()
+
+class TestManagerWriteAheadLog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.manager = DatabaseManager()
+        self.manager.wal = WriteAheadLog(self.directory)
+
+    def tearDown(self):
+        self.manager.wal.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_writes_go_to_the_wal_while_disconnected_and_replay_later(self):
+        store = MagicMock()
+        self.manager.supabase_store = store
+        self.manager.connected = False
+        self.manager.write_rows("sensor_readings", rows(3))
+        store.insert_rows.assert_not_called()
+        self.assertTrue(self.manager.wal.pending)
+
+        # Back online: new writes queue behind the log until it is replayed
+        self.manager.connected = True
+        with patch.object(self.manager, "_require_client"):
+            self.manager.write_rows("sensor_readings", rows(2, start=3))
+            store.insert_rows.assert_not_called()
+            store.node_history.return_value = [{"reading_id": 7, "node_id": "N1_1",
+                                                "timestamp": "2025-05-15T08:00:00+00:00", "danger_level": 1}]
+            result = self.manager.replay_wal()
+        self.assertEqual(result["rows"], 5)
+        store.insert_rows.assert_called_once()
+        written = store.insert_rows.call_args[0][1]
+        self.assertEqual([row["timestamp"] for row in written],
+                         [f"2025-05-15T08:00:0{i}" for i in range(1, 5)])
+        self.assertFalse(self.manager.wal.pending)
+
+    def test_dedupe_pages_the_window_and_keeps_distinct_rows(self):
+        store = MagicMock()
+        self.manager.supabase_store = store
+        logged = [{"node_id": "N1_1", "timestamp": "2025-05-15T08:00:00", "danger_level": level}
+                  for level in (1, 2, 2)]
+        # A full page of other readings, then the one written just before the crash
+        filler = [{"reading_id": i, "node_id": "N1_1", "timestamp": "2025-05-15T08:00:00", "danger_level": 0}
+                  for i in range(1000, 0, -1)]
+        store.node_history.side_effect = [filler, [{"reading_id": 2000, "node_id": "N1_1",
+                                                    "timestamp": "2025-05-15T08:00:00", "danger_level": 2}]]
+        with patch.object(self.manager, "_require_client"):
+            kept = self.manager._drop_already_written("sensor_readings", logged)
+        self.assertEqual([row["danger_level"] for row in kept], [1, 2])
+        self.assertEqual(store.node_history.call_args_list[1].kwargs["before"], ("2025-05-15T08:00:00", 1))
+        # The lookups go through the circuit breaker
+        with patch.object(self.manager.breaker, "allow_request", return_value=False), \
+                self.assertRaises(DatabaseUnavailable):
+            self.manager._drop_already_written("sensor_readings", logged)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Tests for the write-behind ingestion buffer
+"""
+import json
+import time
+import unittest
+from unittest.mock import patch
+from postgrest import APIError
+from app import create_app
+from app.database import db_manager
+from app.ingest import BatchLedger
+from app.topology import TopologyIndex
+from app.write_buffer import WriteBehindBuffer
+
+def rows(count, node_id="N1_1"):
+    return [{"node_id": node_id, "timestamp": f"2025-05-15T08:00:{i:02d}", "danger_level": 1} for i in range(count)]
+
+class RecordingWriter:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def write_rows(self, table, batch):
+        if self.fail:
+            raise ConnectionError("database down")
+        self.batches.append((table, list(batch)))
+
+class RejectingWriter(RecordingWriter):
+    """Rejects any batch holding a danger_level the column cannot take"""
+    def write_rows(self, table, batch):
+        if any(row["danger_level"] > 5 for row in batch):
+            raise APIError({"message": "value out of range", "code": "22003"})
+        super().write_rows(table, batch)
+
+class TestWriteBehindBuffer(unittest.TestCase):
+    def test_flushes_by_size_then_by_age(self):
+        buffer = WriteBehindBuffer(capacity=100, flush_rows=4, flush_interval=0.05)
+        writer = RecordingWriter()
+        buffer.offer("sensor_readings", rows(5))
+        self.assertEqual(buffer.flush_once(writer.write_rows), 4)
+        self.assertEqual(buffer.flush_once(writer.write_rows), 0)
+        time.sleep(0.06)
+        self.assertEqual(buffer.flush_once(writer.write_rows), 1)
+        self.assertEqual([len(batch) for _, batch in writer.batches], [4, 1])
+        stats = buffer.stats()
+        self.assertEqual((stats["depth"], stats["flushes"]), (0, 2))
+        self.assertIsNotNone(stats["flush_latency_ms"]["p95"])
+
+    def test_coalesces_identical_rows(self):
+        buffer = WriteBehindBuffer()
+        writer = RecordingWriter()
+        buffer.offer("sensor_readings", rows(3))
+        buffer.offer("sensor_readings", rows(3))
+        buffer.flush(writer.write_rows)
+        self.assertEqual(len(writer.batches[0][1]), 3)
+        self.assertEqual(buffer.stats()["rows_coalesced"], 3)
+
+    def test_full_buffer_refuses_and_failed_flush_keeps_rows(self):
+        buffer = WriteBehindBuffer(capacity=5)
+        self.assertTrue(buffer.offer("sensor_readings", rows(4)))
+        self.assertFalse(buffer.offer("Parent_Node_Reports", rows(2)))
+        self.assertGreaterEqual(buffer.retry_after(), 1)
+
+        with self.assertRaises(ConnectionError):
+            buffer.flush(RecordingWriter(fail=True).write_rows)
+        self.assertEqual(buffer.stats()["depth"], 4)
+        writer = RecordingWriter()
+        buffer.flush(writer.write_rows)
+        self.assertEqual(len(writer.batches[0][1]), 4)
+        self.assertEqual(buffer.stats()["rejected_batches"], 1)
+
+    def test_rejected_rows_are_dead_lettered(self):
+        buffer = WriteBehindBuffer()
+        batch = rows(8)
+        batch[2]["danger_level"] = 9
+        batch[7]["danger_level"] = 99
+        buffer.offer("sensor_readings", batch)
+        writer = RejectingWriter()
+        self.assertEqual(buffer.flush_once(writer.write_rows, force=True), 8)
+
+        written = [row for _, part in writer.batches for row in part]
+        self.assertEqual(len(written), 6)
+        self.assertTrue(all(row["danger_level"] == 1 for row in written))
+        self.assertEqual([letter["row"]["danger_level"] for letter in buffer.dead_letters], [9, 99])
+        stats = buffer.stats()
+        self.assertEqual((stats["depth"], stats["dead_lettered_rows"], stats["rows_written"]), (0, 2, 6))
+        self.assertIn("out of range", stats["last_error"])
+
+    def test_connection_failure_while_isolating_requeues_unwritten_rows(self):
+        buffer = WriteBehindBuffer()
+        batch = rows(4)
+        batch[3]["danger_level"] = 9
+        buffer.offer("sensor_readings", batch)
+        writer = RejectingWriter()
+        calls = []
+
+        def flaky(table, part):
+            calls.append(len(part))
+            if len(calls) == 3:
+                raise ConnectionError("database down")
+            writer.write_rows(table, part)
+
+        # All four rejected, the good half written, then the link drops
+        with self.assertRaises(ConnectionError):
+            buffer.flush_once(flaky, force=True)
+        self.assertEqual(buffer.stats()["depth"], 2)
+        buffer.flush(writer.write_rows)
+        self.assertEqual(buffer.stats()["depth"], 0)
+        self.assertEqual(sum(len(part) for _, part in writer.batches), 3)
+        self.assertEqual(buffer.dead_lettered_rows, 1)
+
+    def test_background_flusher_drains_on_stop(self):
+        app = create_app('testing')
+        buffer = WriteBehindBuffer(flush_rows=1000, flush_interval=30)
+        writer = RecordingWriter()
+        buffer.start(app, writer)
+        buffer.offer("sensor_readings", rows(10))
+        buffer.stop(timeout=2)
+        self.assertFalse(buffer.running)
+        self.assertEqual(sum(len(batch) for _, batch in writer.batches), 10)
+
+class TestIngestBackpressure(unittest.TestCase):
+    def test_full_queue_answers_429(self):
+        app = create_app('testing')
+        buffer = WriteBehindBuffer(capacity=3, flush_interval=0.01)
+        buffer.start(app, RecordingWriter(fail=True))
+        try:
+            topology = TopologyIndex()
+            topology.load([{"node_id": "N1_1"}], [], [])
+            with patch.object(db_manager, 'write_buffer', buffer), \
+                    patch.object(db_manager, 'topology', topology), \
+                    patch.object(db_manager, 'ingest_ledger', BatchLedger()):
+                client = app.test_client()
+                body = json.dumps([{"node_id": "N1_1", "danger_level": i} for i in range(2)])
+                first = client.post('/api/ingest/readings', data=body, content_type='application/json')
+                self.assertEqual(first.status_code, 202)
+                self.assertTrue(first.get_json()["queued"])
+                second = client.post('/api/ingest/readings', data=body, content_type='application/json')
+                self.assertEqual(second.status_code, 429)
+                self.assertIn('Retry-After', second.headers)
+        finally:
+            buffer.stop(timeout=2)
+
+if __name__ == '__main__':
+    unittest.main()